@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuditLog, SystemConfig
+from .models import AuditLog, SystemConfig, BackgroundTask
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
@@ -12,3 +12,19 @@ class AuditLogAdmin(admin.ModelAdmin):
 class SystemConfigAdmin(admin.ModelAdmin):
     list_display = ['clave', 'valor', 'actualizado_por', 'fecha_actualizacion']
     search_fields = ['clave', 'descripcion']
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ['tarea', 'estado', 'intentos', 'max_intentos', 'ejecutar_desde', 'fecha_fin']
+    list_filter = ['estado', 'tarea']
+    search_fields = ['tarea', 'ultimo_error']
+    readonly_fields = ['fecha_creacion', 'fecha_inicio', 'fecha_latido', 'fecha_fin', 'ultimo_error']
+    actions = ['reintentar']
+
+    @admin.action(description='🔁 Reintentar ahora')
+    def reintentar(self, request, queryset):
+        from django.utils import timezone
+        actualizadas = queryset.exclude(estado='en_proceso').update(
+            estado='pendiente', intentos=0, ejecutar_desde=timezone.now()
+        )
+        self.message_user(request, f'{actualizadas} tarea(s) vuelven a la cola.', level='success')
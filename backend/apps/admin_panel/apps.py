@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AdminPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.admin_panel'
+
+    def ready(self):
+        # Métricas materializadas: actualización incremental vía señales
+        from .metrics import conectar_senales
+        conectar_senales()
@@ -0,0 +1,156 @@
+"""
+Escritura diferida del audit log.
+
+registrar() no inserta en el momento: la entrada se agrega al lote activo
+cuando se confirma la transacción (transaction.on_commit), así que si la
+operación auditada se revierte la entrada se descarta. Al cerrar el lote
+todas las entradas se escriben juntas con un bulk_create.
+
+Los lotes abarcan:
+    - cada request (AuditLogMiddleware)
+    - cada tarea de la cola (task_queue.ejecutar)
+    - cualquier bloque `with audit.lote():` (comandos, shell)
+Fuera de un lote la entrada se escribe sola al confirmar.
+
+Destino de la escritura (setting AUDIT_LOG_SINK):
+    - 'db':   bulk_create al cerrar el lote (default)
+    - 'cola': una tarea de la cola por lote (la inserción la hace el worker)
+    - Ruta a una función propia que recibe la lista de AuditLog sin guardar
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+SINKS = {
+    'db': 'apps.admin_panel.audit.escribir_db',
+    'cola': 'apps.admin_panel.audit.escribir_en_cola',
+}
+
+_estado = threading.local()
+
+
+def _ip(request):
+    reenviada = request.META.get('HTTP_X_FORWARDED_FOR')
+    if reenviada:
+        return reenviada.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR')
+
+def registrar(accion, descripcion, usuario=None, modelo='', objeto_id=None, request=None):
+    """
+    Registra una entrada del audit log al confirmar la transacción actual.
+
+    Args:
+        accion (str): Uno de AuditLog.ACCIONES
+        descripcion (str): Detalle de la acción
+        usuario (User | int): Quién la realizó (por defecto request.user)
+        modelo (str): Modelo afectado
+        objeto_id (int): ID del objeto afectado
+        request: Request actual, para la IP y el user agent
+    """
+    if usuario is None and request is not None and request.user.is_authenticated:
+        usuario = request.user
+    entrada = AuditLog(
+        usuario_id=getattr(usuario, 'pk', usuario),
+        accion=accion,
+        modelo=modelo,
+        objeto_id=objeto_id,
+        descripcion=descripcion,
+        ip_address=_ip(request) if request is not None else None,
+        user_agent=request.META.get('HTTP_USER_AGENT', '') if request is not None else '',
+        fecha=timezone.now(),
+    )
+    transaction.on_commit(partial(_agregar, entrada))
+
+def _agregar(entrada):
+    buffer = getattr(_estado, 'buffer', None)
+    if buffer is None:
+        _escribir([entrada])
+    else:
+        buffer.append(entrada)
+
+@contextmanager
+def lote():
+    """
+    Agrupa las entradas registradas dentro del bloque en una sola escritura.
+
+    Anidable: un lote interno se vacía junto con el externo. Debe abrirse
+    fuera de la transacción (como el middleware) para que las entradas
+    confirmadas lleguen antes del cierre.
+    """
+    if getattr(_estado, 'buffer', None) is not None:
+        yield
+        return
+    _estado.buffer = []
+    try:
+        yield
+    finally:
+        entradas, _estado.buffer = _estado.buffer, None
+        if entradas:
+            _escribir(entradas)
+
+def _escribir(entradas):
+    nombre = getattr(settings, 'AUDIT_LOG_SINK', 'db')
+    try:
+        import_string(SINKS.get(nombre, nombre))(entradas)
+    except Exception:
+        # La acción auditada ya se confirmó: no romper la respuesta
+        logger.exception('No se pudieron escribir %s entradas del audit log: %s',
+                         len(entradas), [e.descripcion[:80] for e in entradas])
+
+
+# ============================================================================
+# DESTINOS
+# ============================================================================
+
+def escribir_db(entradas):
+    AuditLog.objects.bulk_create(entradas, batch_size=500)
+
+def escribir_en_cola(entradas):
+    from .task_queue import encolar
+
+    encolar(guardar_entradas, [
+        {
+            'usuario_id': e.usuario_id,
+            'accion': e.accion,
+            'modelo': e.modelo,
+            'objeto_id': e.objeto_id,
+            'descripcion': e.descripcion,
+            'ip_address': e.ip_address,
+            'user_agent': e.user_agent,
+            'fecha': e.fecha.isoformat(),
+        }
+        for e in entradas
+    ])
+
+def guardar_entradas(datos):
+    """Tarea del destino 'cola': inserta las entradas serializadas"""
+    AuditLog.objects.bulk_create(
+        [AuditLog(**{**d, 'fecha': parse_datetime(d['fecha'])}) for d in datos],
+        batch_size=500,
+    )
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+class AuditLogMiddleware:
+    """Una escritura del audit log por request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with lote():
+            return self.get_response(request)
@@ -0,0 +1,116 @@
+"""
+Management command para medir el costo del seguimiento de campos
+(apps.core.seguimiento) al cargar listados grandes.
+
+El seguimiento envuelve Model.from_db de User, Raffle, Payment, Refund y
+Ticket: cada instancia cargada copia sus campos rastreados. Se compara el
+mismo listado con y sin esa copia.
+
+Todo se ejecuta dentro de una transacción que se revierte al final: no deja
+datos en la base de datos.
+
+Ejecutar con: python manage.py benchmark_seguimiento --filas 20000 --repeticiones 5
+"""
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core import seguimiento
+from apps.users.models import User
+from apps.raffles.models import Raffle, Ticket
+
+
+class _Rollback(Exception):
+    """Fuerza el rollback de la transacción del benchmark"""
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo del seguimiento de campos al cargar listados grandes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=20000, help='Boletos del listado')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Listados por variante')
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        repeticiones = options['repeticiones']
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("⏱  BENCHMARK DEL SEGUIMIENTO DE CAMPOS"))
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Listado de {filas} boleto(s), {repeticiones} repetición(es) por variante\n")
+
+        try:
+            with transaction.atomic():
+                boletos = self.crear_datos(filas)
+                listados = {
+                    'Ticket.objects.all()': lambda: list(boletos.all()),
+                    "select_related('rifa', 'usuario')": lambda: list(boletos.select_related('rifa', 'usuario')),
+                }
+                resultados = {
+                    nombre: (self.medir(repeticiones, listar), self.sin_seguimiento(repeticiones, listar))
+                    for nombre, listar in listados.items()
+                }
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        for nombre, (con, sin) in resultados.items():
+            con, sin = con / repeticiones, sin / repeticiones
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n📋 {nombre}"))
+            self.stdout.write(f"{'sin seguimiento':18} {sin * 1000:9.2f} ms/listado")
+            self.stdout.write(f"{'con seguimiento':18} {con * 1000:9.2f} ms/listado")
+            self.stdout.write(
+                f"{'costo':18} {(con - sin) * 1000:9.2f} ms/listado   "
+                f"{(con - sin) / filas * 1e6:6.2f} µs/boleto   {(con / sin - 1) * 100:+5.1f}%"
+            )
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Benchmark finalizado (datos revertidos)"))
+
+    def crear_datos(self, filas):
+        """Una rifa temporal con `filas` boletos pagados"""
+        organizador = User.objects.create_user(
+            email=f'bench-org-{uuid.uuid4().hex[:8]}@benchmark.local',
+            nombre='Benchmark Organizador', password=None, rol='organizador'
+        )
+        comprador = User.objects.create_user(
+            email=f'bench-{uuid.uuid4().hex[:8]}@benchmark.local',
+            nombre='Benchmark Comprador', password=None, rol='participante'
+        )
+        rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa de benchmark', descripcion='Rifa temporal de benchmark',
+            premio_principal='N/A', precio_boleto=1000, total_boletos=filas,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        Ticket.objects.bulk_create([
+            Ticket(rifa=rifa, usuario=comprador, numero_boleto=n + 1,
+                   codigo_qr=str(uuid.uuid4()), estado='pagado')
+            for n in range(filas)
+        ], batch_size=1000)
+        return Ticket.objects.filter(rifa=rifa).order_by('pk')
+
+    def sin_seguimiento(self, repeticiones, listar):
+        """Mide con el from_db original de los modelos rastreados"""
+        envueltos = {
+            modelo: modelo.__dict__['from_db'] for modelo in list(seguimiento._CAMPOS)
+            if seguimiento.ATRIBUTO_FROM_DB in modelo.__dict__
+        }
+        for modelo in envueltos:
+            modelo.from_db = classmethod(getattr(modelo, seguimiento.ATRIBUTO_FROM_DB).__func__)
+        try:
+            return self.medir(repeticiones, listar)
+        finally:
+            for modelo, from_db in envueltos.items():
+                modelo.from_db = from_db
+
+    def medir(self, repeticiones, metodo):
+        """Ejecuta `metodo` N veces (tras una vuelta de calentamiento) y retorna los segundos totales"""
+        metodo()
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            metodo()
+        return time.perf_counter() - inicio
@@ -0,0 +1,64 @@
+"""
+Worker de la cola de tareas en segundo plano (ver apps.admin_panel.task_queue).
+
+Uso:
+    python manage.py procesar_tareas                   # una pasada (cron)
+    python manage.py procesar_tareas --loop            # worker continuo
+    python manage.py procesar_tareas --loop --intervalo 5 --purgar-dias 7
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.admin_panel import task_queue
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas pendientes de la cola (emails, notificaciones, reembolsos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Ejecutar como worker continuo')
+        parser.add_argument('--intervalo', type=float, default=2, help='Segundos de espera con la cola vacía (--loop)')
+        parser.add_argument('--max-tareas', type=int, default=None, help='Tareas por pasada')
+        parser.add_argument(
+            '--purgar-dias', type=int, default=None,
+            help='Eliminar tareas completadas hace más de N días al iniciar cada pasada'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.pasada(options)
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🔁 Worker de tareas activo, revisa la cola cada {options["intervalo"]}s (Ctrl+C para detener)'
+        ))
+        try:
+            while True:
+                # Evitar conexiones caducadas en procesos de larga duración
+                close_old_connections()
+                if not self.pasada(options, silencioso=True):
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹  Worker detenido'))
+
+    def pasada(self, options, silencioso=False):
+        """Procesa las tareas listas. Retorna cuántas se ejecutaron"""
+        recuperadas, fallidas = task_queue.recuperar_colgadas()
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f'♻️  {recuperadas} tarea(s) colgada(s) vuelven a la cola'))
+        if fallidas:
+            self.stdout.write(self.style.ERROR(f'❌ {fallidas} tarea(s) colgada(s) sin intentos restantes: fallidas'))
+        if options['purgar_dias'] is not None:
+            task_queue.purgar_completadas(options['purgar_dias'])
+
+        completadas, errores = task_queue.procesar_pendientes(limite=options['max_tareas'])
+        if completadas or errores:
+            mensaje = f'✅ {completadas} tarea(s) completada(s)'
+            if errores:
+                mensaje += f', ❌ {errores} con error (se reintentarán o quedaron fallidas)'
+            self.stdout.write(self.style.SUCCESS(mensaje) if not errores else self.style.WARNING(mensaje))
+        elif not silencioso:
+            self.stdout.write(self.style.SUCCESS('✅ No hay tareas pendientes'))
+        return completadas + errores
@@ -0,0 +1,24 @@
+"""
+Comando para recalcular desde cero las métricas materializadas
+
+Necesario al desplegar por primera vez las tablas de métricas o después de
+modificaciones masivas que no emiten señales (update() desde el shell, etc.).
+
+Uso: python manage.py reconstruir_metricas
+"""
+from django.core.management.base import BaseCommand
+
+from apps.admin_panel import metrics
+from apps.admin_panel.stats import invalidar_estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero las métricas materializadas de la plataforma'
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔄 Recalculando métricas...')
+        totales, diarios = metrics.reconstruir()
+        invalidar_estadisticas()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(totales)} contador(es) y {len(diarios)} registro(s) diario(s) reconstruidos'
+        ))
@@ -0,0 +1,41 @@
+"""
+Comando para comparar las métricas materializadas con los conteos en vivo
+
+Lista cada clave cuyo valor guardado difiere del calculado sobre las tablas
+de origen. Con --corregir reconstruye las métricas si hay diferencias.
+Termina con código 1 si encontró diferencias y no se corrigieron (útil en cron).
+
+Uso:
+    python manage.py verificar_metricas
+    python manage.py verificar_metricas --corregir
+"""
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.admin_panel import metrics
+from apps.admin_panel.stats import invalidar_estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Verifica las métricas materializadas contra los conteos en vivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help='Reconstruir si hay diferencias')
+
+    def handle(self, *args, **options):
+        diferencias = metrics.verificar()
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('✅ Las métricas coinciden con los conteos en vivo'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'⚠️  {len(diferencias)} diferencia(s):'))
+        for clave, guardado, vivo in diferencias:
+            self.stdout.write(f'   {clave}: guardado={guardado} en vivo={vivo}')
+
+        if options['corregir']:
+            metrics.reconstruir()
+            invalidar_estadisticas()
+            self.stdout.write(self.style.SUCCESS('✅ Métricas reconstruidas'))
+        else:
+            sys.exit(1)
@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-17 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0003_alter_auditlog_accion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True, verbose_name='Clave')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valor')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Métrica de la Plataforma',
+                'verbose_name_plural': 'Métricas de la Plataforma',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('clave', models.CharField(max_length=100, verbose_name='Clave')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Métrica Diaria',
+                'verbose_name_plural': 'Métricas Diarias',
+                'ordering': ['-fecha'],
+                'unique_together': {('clave', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-17 21:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0005_background_task'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha'),
+        ),
+    ]
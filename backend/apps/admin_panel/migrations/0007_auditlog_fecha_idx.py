@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-17 21:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0006_auditlog_fecha_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['fecha'], name='auditlog_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 21:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0007_auditlog_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundtask',
+            name='fecha_latido',
+            field=models.DateTimeField(blank=True, help_text='El worker lo renueva mientras ejecuta la tarea', null=True, verbose_name='Último Latido'),
+        ),
+    ]
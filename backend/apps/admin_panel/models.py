@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class AuditLog(models.Model):
     ACCIONES = (
@@ -39,12 +40,16 @@ class AuditLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='Dirección IP')
     user_agent = models.TextField(blank=True, verbose_name='User Agent')
     
-    fecha = models.DateTimeField(auto_now_add=True, verbose_name='Fecha')
+    # Se asigna al registrar la acción (la escritura puede ser diferida, ver audit.py)
+    fecha = models.DateTimeField(default=timezone.now, verbose_name='Fecha')
     
     class Meta:
         verbose_name = 'Log de Auditoría'
         verbose_name_plural = 'Logs de Auditoría'
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['fecha'], name='auditlog_fecha_idx'),
+        ]
     
     def __str__(self):
         usuario_str = self.usuario.email if self.usuario else 'Anónimo'
@@ -63,3 +68,77 @@ class SystemConfig(models.Model):
     
     def __str__(self):
         return self.clave
+
+class PlatformMetric(models.Model):
+    """
+    Contador acumulado de la plataforma (usuarios por rol, rifas por estado,
+    pagos, boletos...). Se actualiza incrementalmente (ver metrics.py) para
+    que los dashboards lo lean en O(1).
+    """
+    clave = models.CharField(max_length=100, unique=True, verbose_name='Clave')
+    valor = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='Valor')
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Última Actualización')
+    
+    class Meta:
+        verbose_name = 'Métrica de la Plataforma'
+        verbose_name_plural = 'Métricas de la Plataforma'
+    
+    def __str__(self):
+        return f"{self.clave} = {self.valor}"
+
+class DailyMetric(models.Model):
+    """
+    Acumulado diario de una métrica (registros de usuarios, pagos por estado)
+    para gráficos y ventanas de tiempo sin recorrer las tablas.
+    """
+    fecha = models.DateField(verbose_name='Fecha')
+    clave = models.CharField(max_length=100, verbose_name='Clave')
+    valor = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='Valor')
+    
+    class Meta:
+        verbose_name = 'Métrica Diaria'
+        verbose_name_plural = 'Métricas Diarias'
+        unique_together = ['clave', 'fecha']
+        ordering = ['-fecha']
+    
+    def __str__(self):
+        return f"{self.fecha} {self.clave} = {self.valor}"
+
+class BackgroundTask(models.Model):
+    """
+    Tarea de la cola en base de datos (ver task_queue.py). La ejecuta el
+    comando procesar_tareas fuera de los requests web, con reintentos y
+    espera exponencial entre ellos.
+    """
+    ESTADO_CHOICES = (
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    )
+
+    tarea = models.CharField(max_length=200, verbose_name='Tarea', help_text='Ruta de la función a ejecutar')
+    argumentos = models.JSONField(default=dict, blank=True, verbose_name='Argumentos')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name='Estado')
+    intentos = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    max_intentos = models.PositiveIntegerField(default=5, verbose_name='Máximo de Intentos')
+    ejecutar_desde = models.DateTimeField(default=timezone.now, verbose_name='Ejecutar Desde')
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name='Inicio del Último Intento')
+    fecha_latido = models.DateTimeField(
+        null=True, blank=True, verbose_name='Último Latido',
+        help_text='El worker lo renueva mientras ejecuta la tarea'
+    )
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Finalización')
+    ultimo_error = models.TextField(blank=True, verbose_name='Último Error')
+
+    class Meta:
+        verbose_name = 'Tarea en Segundo Plano'
+        verbose_name_plural = 'Tareas en Segundo Plano'
+        ordering = ['ejecutar_desde', 'id']
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_desde'], name='tarea_estado_ejecutar_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tarea} ({self.get_estado_display()})"
@@ -0,0 +1,94 @@
+"""
+Estadísticas agregadas de la plataforma para los paneles de administración.
+
+Los contadores se leen de las métricas materializadas (ver metrics.py): una
+consulta para los totales y pocas para las ventanas por día. Solo las rifas
+por vencer, que dependen de la hora actual, se cuentan en vivo. El resultado
+se sirve desde caché durante ADMIN_STATS_CACHE_TTL segundos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.raffles.models import Raffle
+from . import metrics
+
+CACHE_KEY = 'admin_panel:estadisticas'
+
+
+def obtener_estadisticas():
+    """
+    Retorna las estadísticas de la plataforma (cacheadas).
+
+    Returns:
+        dict: {'usuarios': {...}, 'rifas': {...}, 'pagos': {...},
+               'boletos': {...}, 'registros_por_dia': [(fecha, cantidad), ...]}
+    """
+    ttl = getattr(settings, 'ADMIN_STATS_CACHE_TTL', 60)
+    return cache.get_or_set(CACHE_KEY, calcular_estadisticas, ttl)
+
+
+def invalidar_estadisticas():
+    """Fuerza el recálculo en la próxima lectura"""
+    cache.delete(CACHE_KEY)
+
+
+def calcular_estadisticas():
+    """Arma las estadísticas a partir de las métricas materializadas"""
+    ahora = timezone.now()
+    hoy = timezone.localdate()
+    m = metrics.leer()
+
+    usuarios = {
+        'total': m['usuarios.total'],
+        'activos': m['usuarios.activos'],
+        'participantes': m['usuarios.rol.participante'],
+        'organizadores': m['usuarios.rol.organizador'],
+        'sponsors': m['usuarios.rol.sponsor'],
+        'admins': m['usuarios.rol.admin'],
+        'admins_y_superusuarios': m['usuarios.rol.admin'] + m['usuarios.rol.superuser'],
+        'sponsors_pendientes': m['usuarios.sponsors_pendientes'],
+        'pendientes_validacion': m['usuarios.pendientes_validacion'],
+        'ultimos_30_dias': metrics.sumar_diario('usuarios.registros', hoy - timedelta(days=30)),
+    }
+
+    rifas = {
+        'total': m['rifas.total'],
+        'activas': m['rifas.estado.activa'],
+        'pausadas': m['rifas.estado.pausada'],
+        'pendientes_aprobacion': m['rifas.estado.pendiente_aprobacion'],
+        'finalizadas': m['rifas.estado.finalizada'],
+        'canceladas': m['rifas.estado.cancelada'],
+        'por_vencer': Raffle.objects.filter(
+            estado='activa', fecha_sorteo__lte=ahora + timedelta(days=7)
+        ).count(),
+        'con_ganador': m['rifas.con_ganador'],
+        'capacidad_activa': m['rifas.capacidad_activa'],
+    }
+
+    pagos = {
+        'total': m['pagos.total'],
+        'completados': m['pagos.estado.completado'],
+        'pendientes': m['pagos.estado.pendiente'],
+        'fallidos': m['pagos.estado.fallido'],
+        'fallidos_mes': metrics.sumar_diario('pagos.estado.fallido', hoy.replace(day=1)),
+        'ingresos': m['pagos.monto.completado'],
+    }
+
+    boletos = {
+        'total': m['boletos.total'],
+        'pagados': m['boletos.estado.pagado'],
+        'pagados_rifas_activas': m['boletos.pagados_rifas_activas'],
+    }
+
+    registros = metrics.leer_diario('usuarios.registros', hoy - timedelta(days=6))
+
+    return {
+        'usuarios': usuarios,
+        'rifas': rifas,
+        'pagos': pagos,
+        'boletos': boletos,
+        'registros_por_dia': sorted(registros.items()),
+    }
@@ -0,0 +1,224 @@
+"""
+Cola de tareas en segundo plano sobre la base de datos.
+
+Saca de los requests web lo que depende de servicios lentos o externos
+(envío de emails, verificación de emails con AbstractAPI, notificaciones
+masivas, reembolsos de rifas canceladas). Con 2 workers síncronos de
+gunicorn una llamada SMTP lenta bloqueaba la mitad de la capacidad.
+
+Uso:
+    from apps.admin_panel.task_queue import encolar
+    encolar(enviar_email_bienvenida, user.pk)
+
+    - La tarea es una función de nivel de módulo (o su ruta como texto) y
+      los argumentos deben ser serializables en JSON (ids, no instancias).
+    - La fila se inserta en la transacción actual: si se revierte, la tarea
+      no existe, y el worker no la ve hasta el commit.
+    - El comando procesar_tareas las ejecuta. Si una tarea lanza una
+      excepción se reintenta con espera exponencial (TASK_QUEUE_RETRY_DELAY
+      * 2^(intento-1), hasta TASK_QUEUE_MAX_RETRY_DELAY) hasta
+      TASK_QUEUE_MAX_ATTEMPTS intentos; después queda 'fallida'.
+    - Cada worker reclama tareas con un UPDATE condicional (sin bloqueos,
+      funciona igual en SQLite, MySQL y PostgreSQL), así que se pueden
+      ejecutar varios workers a la vez.
+    - Mientras ejecuta una tarea el worker renueva su latido cada
+      TASK_QUEUE_HEARTBEAT segundos. Una tarea sin latido en
+      TASK_QUEUE_TIMEOUT segundos (el worker murió) vuelve a la cola; ese
+      intento cuenta, y si ya eran max_intentos queda 'fallida'.
+    - Con TASK_QUEUE_EAGER=True las tareas se ejecutan al confirmar la
+      transacción, en el mismo proceso (desarrollo sin worker).
+"""
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import audit
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+
+def _ruta(tarea):
+    if isinstance(tarea, str):
+        return tarea
+    return f'{tarea.__module__}.{tarea.__name__}'
+
+def encolar(tarea, *args, **kwargs):
+    """
+    Agrega una tarea a la cola.
+
+    Args:
+        tarea (callable | str): Función de nivel de módulo o su ruta
+        *args, **kwargs: Argumentos (serializables en JSON)
+
+    Returns:
+        BackgroundTask | None: La tarea creada (None en modo eager)
+    """
+    ruta = _ruta(tarea)
+    if getattr(settings, 'TASK_QUEUE_EAGER', False):
+        transaction.on_commit(lambda: _ejecutar_directo(ruta, args, kwargs))
+        return None
+    return BackgroundTask.objects.create(
+        tarea=ruta,
+        argumentos={'args': list(args), 'kwargs': kwargs},
+        max_intentos=getattr(settings, 'TASK_QUEUE_MAX_ATTEMPTS', 5),
+    )
+
+def _ejecutar_directo(ruta, args, kwargs):
+    try:
+        import_string(ruta)(*args, **kwargs)
+    except Exception:
+        logger.exception('Error al ejecutar la tarea %s', ruta)
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def retraso_reintento(intento):
+    """Segundos de espera antes del siguiente intento (exponencial con tope)"""
+    base = getattr(settings, 'TASK_QUEUE_RETRY_DELAY', 30)
+    tope = getattr(settings, 'TASK_QUEUE_MAX_RETRY_DELAY', 3600)
+    return min(base * 2 ** (intento - 1), tope)
+
+def recuperar_colgadas():
+    """
+    Libera las tareas 'en_proceso' sin latido en TASK_QUEUE_TIMEOUT segundos
+    (el worker que las tomó se detuvo a mitad).
+
+    El intento abandonado ya se contó al reclamarla: vuelve a 'pendiente'
+    si le quedan intentos y si no queda 'fallida'. Una tarea que mata al
+    worker no se repite indefinidamente.
+
+    Returns:
+        tuple: (tareas que vuelven a la cola, tareas fallidas)
+    """
+    ahora = timezone.now()
+    limite = ahora - timedelta(seconds=getattr(settings, 'TASK_QUEUE_TIMEOUT', 600))
+    colgadas = BackgroundTask.objects.filter(estado='en_proceso').filter(
+        # Tareas reclamadas antes de existir el latido: por fecha de inicio
+        Q(fecha_latido__lt=limite) | Q(fecha_latido__isnull=True, fecha_inicio__lt=limite)
+    )
+    error = f'Sin latido del worker desde hace más de {getattr(settings, "TASK_QUEUE_TIMEOUT", 600)}s (worker detenido)'
+    fallidas = colgadas.filter(intentos__gte=F('max_intentos')).update(
+        estado='fallida', fecha_fin=ahora, ultimo_error=error
+    )
+    recuperadas = colgadas.filter(intentos__lt=F('max_intentos')).update(
+        estado='pendiente', ejecutar_desde=ahora, ultimo_error=error
+    )
+    if fallidas:
+        logger.error('%s tarea(s) colgada(s) quedaron fallidas sin intentos restantes', fallidas)
+    return recuperadas, fallidas
+
+@contextmanager
+def latido(tarea_id):
+    """
+    Renueva fecha_latido de la tarea cada TASK_QUEUE_HEARTBEAT segundos
+    desde otro hilo mientras dura el bloque.
+    """
+    intervalo = getattr(settings, 'TASK_QUEUE_HEARTBEAT', 60)
+    detener = threading.Event()
+
+    def renovar():
+        try:
+            while not detener.wait(intervalo):
+                BackgroundTask.objects.filter(pk=tarea_id, estado='en_proceso').update(
+                    fecha_latido=timezone.now()
+                )
+        finally:
+            # Conexión propia del hilo
+            connection.close()
+
+    hilo = threading.Thread(target=renovar, name=f'latido-tarea-{tarea_id}', daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+def reclamar_siguiente():
+    """
+    Toma la próxima tarea lista para ejecutar.
+
+    El UPDATE ... WHERE estado='pendiente' solo tiene éxito en un worker:
+    si otro la tomó primero se prueba con la siguiente.
+
+    Returns:
+        BackgroundTask | None
+    """
+    ahora = timezone.now()
+    candidatas = BackgroundTask.objects.filter(
+        estado='pendiente', ejecutar_desde__lte=ahora
+    ).values_list('id', flat=True)[:20]
+    for tarea_id in candidatas:
+        tomada = BackgroundTask.objects.filter(pk=tarea_id, estado='pendiente').update(
+            estado='en_proceso', fecha_inicio=ahora, fecha_latido=ahora, intentos=F('intentos') + 1
+        )
+        if tomada:
+            return BackgroundTask.objects.get(pk=tarea_id)
+    return None
+
+def ejecutar(tarea):
+    """
+    Ejecuta una tarea reclamada y registra el resultado.
+
+    Returns:
+        bool: True si terminó sin errores
+    """
+    argumentos = tarea.argumentos or {}
+    try:
+        funcion = import_string(tarea.tarea)
+        # Las entradas del audit log de la tarea se escriben juntas al final
+        with latido(tarea.pk), audit.lote():
+            funcion(*argumentos.get('args', []), **argumentos.get('kwargs', {}))
+    except Exception:
+        tarea.ultimo_error = traceback.format_exc()
+        if tarea.intentos >= tarea.max_intentos:
+            tarea.estado = 'fallida'
+            tarea.fecha_fin = timezone.now()
+            logger.error('Tarea %s (#%s) fallida tras %s intentos', tarea.tarea, tarea.pk, tarea.intentos)
+        else:
+            tarea.estado = 'pendiente'
+            tarea.ejecutar_desde = timezone.now() + timedelta(seconds=retraso_reintento(tarea.intentos))
+            logger.warning('Tarea %s (#%s) falló, se reintentará: intento %s de %s',
+                           tarea.tarea, tarea.pk, tarea.intentos, tarea.max_intentos)
+        tarea.save(update_fields=['estado', 'ultimo_error', 'ejecutar_desde', 'fecha_fin'])
+        return False
+
+    tarea.estado = 'completada'
+    tarea.fecha_fin = timezone.now()
+    tarea.save(update_fields=['estado', 'fecha_fin'])
+    return True
+
+def procesar_pendientes(limite=None):
+    """
+    Ejecuta las tareas listas hasta vaciar la cola (o hasta `limite`).
+
+    Returns:
+        tuple: (completadas, con error)
+    """
+    completadas = errores = 0
+    while limite is None or completadas + errores < limite:
+        tarea = reclamar_siguiente()
+        if tarea is None:
+            break
+        if ejecutar(tarea):
+            completadas += 1
+        else:
+            errores += 1
+    return completadas, errores
+
+def purgar_completadas(dias):
+    """Elimina las tareas completadas hace más de `dias` días"""
+    limite = timezone.now() - timedelta(days=dias)
+    eliminadas, _ = BackgroundTask.objects.filter(estado='completada', fecha_fin__lt=limite).delete()
+    return eliminadas
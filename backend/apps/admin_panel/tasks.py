@@ -0,0 +1,58 @@
+"""
+Tareas en segundo plano del panel de administración (ver task_queue.py).
+"""
+from django.utils import timezone
+
+from apps.payments.refund_service import reembolsar_rifa
+from apps.raffles.models import Raffle
+from . import audit, metrics
+from .stats import invalidar_estadisticas
+
+
+def reembolsar_rifa_cancelada(rifa_id, admin_id, comentarios=''):
+    """
+    Reembolsa los pagos de una rifa cancelada (ver payments.refund_service).
+
+    El avance se va guardando en revision_admin de la rifa. Si la tarea se
+    interrumpe, el reintento continúa con los pagos que faltan.
+    """
+    def informar(resultado):
+        Raffle.objects.filter(pk=rifa_id).update(
+            revision_admin=f"Rifa cancelada. {comentarios}. Reembolsos en proceso: "
+                           f"{resultado['pagos']}/{resultado['total_pagos']} pagos.",
+            fecha_revision=timezone.now(),
+        )
+
+    resultado = reembolsar_rifa(rifa_id, procesado_por_id=admin_id, comentarios=comentarios, progreso=informar)
+
+    resumen = (
+        f"Reembolsos: {resultado['pagos']} pagos ({resultado['boletos']} boletos). "
+        f"Total reembolsado: ${resultado['monto']:,.0f}"
+    )
+    if resultado['con_reembolso_previo'] or resultado['boletos_sin_pago']:
+        resumen += (
+            f". Revisar: {resultado['con_reembolso_previo']} pagos con reembolso previo, "
+            f"{resultado['boletos_sin_pago']} boletos pagados sin pago asociado"
+        )
+
+    rifa = Raffle.objects.get(pk=rifa_id)
+    rifa.revision_admin = f"Rifa cancelada. {comentarios}. {resumen}"
+    rifa.fecha_revision = timezone.now()
+    rifa.save(update_fields=['revision_admin', 'fecha_revision'])
+
+    # Registrar en audit log principal
+    audit.registrar(
+        usuario=admin_id,
+        accion='cancelar_rifa_con_reembolsos',
+        modelo='Raffle',
+        objeto_id=rifa.id,
+        descripcion=f'Rifa "{rifa.titulo}" cancelada. {resumen}. Motivo: {comentarios[:100]}'
+    )
+
+
+def reconstruir_metricas():
+    """
+    Recalcula las métricas materializadas (ver metrics.programar_reconstruccion)
+    """
+    metrics.reconstruir()
+    invalidar_estadisticas()
@@ -1,3 +1,709 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.payments.models import Payment, Refund
+from apps.raffles.models import Raffle, Ticket, Winner
+from apps.raffles.purchase_service import comprar_boletos
+from apps.raffles.reservation_service import expirar_reservas
+from apps.users.models import User, Notification
+from . import audit, metrics, task_queue
+from .models import AuditLog, BackgroundTask, PlatformMetric
+from .tasks import reconstruir_metricas
+from .stats import obtener_estadisticas, invalidar_estadisticas, calcular_estadisticas
+
+
+def tarea_de_prueba(valores, fallar=False):
+    """Tarea de la cola para ColaTareasTests"""
+    if fallar:
+        raise ValueError('Fallo de prueba')
+    valores.append('ok')
+
+
+def sink_con_error(entradas):
+    """Destino del audit log que falla, para AuditoriaDiferidaTests"""
+    raise RuntimeError('Destino caído')
+
+
+def _claves_mysql(plan):
+    """Índices elegidos ('key') en un plan EXPLAIN FORMAT=JSON de MySQL"""
+    if isinstance(plan, dict):
+        claves = {plan['key']} if 'key' in plan else set()
+        for valor in plan.values():
+            claves |= _claves_mysql(valor)
+        return claves
+    if isinstance(plan, list):
+        return set().union(*map(_claves_mysql, plan)) if plan else set()
+    return set()
+
+
+@skipUnless(connection.vendor in ('sqlite', 'mysql'), 'Planes verificados en SQLite y MySQL')
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PlanesDeConsultaTests(TestCase):
+    """
+    Las consultas frecuentes (dashboard, listados, detalle) usan los índices
+    declarados en Meta.indexes. Si un cambio en una consulta o en un índice
+    hace que el motor vuelva a recorrer la tabla, este test falla.
+
+    Las consultas no se copian aquí: se ejecuta la vista o el servicio real,
+    se capturan sus SELECT y se pide el plan de las que tienen la forma
+    buscada, con los mismos valores que recibió la base de datos.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.usuario = User.objects.create_user(email='part@test.cl', nombre='Participante', password=None)
+        cls.admin = User.objects.create_user(email='admin@test.cl', nombre='Admin', password=None, rol='admin')
+        ahora = timezone.now()
+        cls.rifa = None
+        for i, estado in enumerate(['activa', 'activa', 'finalizada', 'cancelada', 'borrador']):
+            rifa = Raffle.objects.create(
+                organizador=cls.organizador, titulo=f'Rifa {i}', descripcion='Rifa de prueba',
+                premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+                fecha_sorteo=ahora + timedelta(days=i), estado=estado,
+            )
+            cls.rifa = cls.rifa or rifa
+            Ticket.objects.bulk_create([
+                Ticket(rifa=rifa, usuario=cls.usuario, numero_boleto=n, codigo_qr=str(uuid.uuid4()),
+                       estado='pagado' if n % 3 else 'reservado')
+                for n in range(1, 21)
+            ])
+        Notification.objects.bulk_create([
+            Notification(usuario=cls.usuario, tipo='sistema', titulo='Aviso', mensaje='Aviso', leida=bool(i % 2))
+            for i in range(10)
+        ])
+        for i, estado in enumerate(['completado', 'pendiente', 'fallido', 'completado']):
+            Payment.objects.create(usuario=cls.usuario, monto=1000, estado=estado,
+                                   metodo_pago='tarjeta', transaction_id=f'TX-{i}')
+        AuditLog.objects.bulk_create([AuditLog(accion='otro', descripcion='Prueba') for _ in range(10)])
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def get(self, url, usuario=None):
+        """Ejecuta la vista real (como lo haría el navegador)"""
+        if usuario is not None:
+            self.client.force_login(usuario)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(f'EXPLAIN FORMAT=JSON {sql}')
+                return _claves_mysql(json.loads(cursor.fetchone()[0]))
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(str(fila[-1]) for fila in cursor.fetchall())
+
+    def assertUsaIndice(self, ejecutar, fragmentos, indice):
+        """
+        Cada SELECT que ejecuta `ejecutar()` y contiene todos los
+        `fragmentos` (SQL sin comillas de identificadores) usa `indice`.
+        """
+        with CaptureQueriesContext(connection) as capturadas:
+            ejecutar()
+        consultas = [
+            c['sql'] for c in capturadas
+            if c['sql'].startswith('SELECT')
+            and all(f in c['sql'].replace('"', '').replace('`', '') for f in fragmentos)
+        ]
+        self.assertTrue(consultas, f'Ninguna consulta contiene {fragmentos}')
+        for sql in consultas:
+            plan = self.plan(sql)
+            if connection.vendor == 'mysql':
+                self.assertIn(indice, plan, sql)
+            else:
+                self.assertRegex(plan, rf'INDEX {indice}\b', sql)
+
+    # ------------------------------------------------------------------
+    # Rifas
+    # ------------------------------------------------------------------
+
+    def test_listado_rifas_activas(self):
+        # home_view: las 6 rifas activas más recientes
+        self.assertUsaIndice(
+            lambda: self.get('/'),
+            ["raffles_raffle.estado = 'activa'", 'ORDER BY raffles_raffle.fecha_creacion DESC'],
+            'rifa_estado_creacion_idx',
+        )
+
+    def test_proximos_sorteos(self):
+        # participant_dashboard_view: rifas activas que se sortean en 7 días
+        self.assertUsaIndice(
+            lambda: self.get('/raffles/participant/dashboard/', self.usuario),
+            ['raffles_raffle.fecha_sorteo <=', 'ORDER BY raffles_raffle.fecha_sorteo ASC'],
+            'rifa_estado_sorteo_idx',
+        )
+
+    def test_rifas_finalizadas(self):
+        # raffle_list_view con ?estado=finalizada
+        self.assertUsaIndice(
+            lambda: self.get('/raffles/?estado=finalizada'),
+            ["raffles_raffle.estado = 'finalizada'", 'ORDER BY raffles_raffle.fecha_sorteo DESC'],
+            'rifa_estado_sorteo_idx',
+        )
+
+    # ------------------------------------------------------------------
+    # Boletos
+    # ------------------------------------------------------------------
+
+    def test_boletos_vendidos_de_rifa(self):
+        # roulette_data_view: ETag desde los boletos pagados de la rifa
+        self.assertUsaIndice(
+            lambda: self.get(f'/raffles/{self.rifa.pk}/roulette/data/'),
+            ['FROM raffles_ticket', "raffles_ticket.estado = 'pagado'", 'COUNT('],
+            'boleto_rifa_estado_idx',
+        )
+
+    def test_mis_boletos(self):
+        # participant_dashboard_view: últimos boletos del usuario
+        self.assertUsaIndice(
+            lambda: self.get('/raffles/participant/dashboard/', self.usuario),
+            ['raffles_ticket.usuario_id =', 'ORDER BY raffles_ticket.fecha_compra DESC'],
+            'boleto_usuario_compra_idx',
+        )
+
+    def test_cursor_boletos_de_rifa(self):
+        # Página siguiente de /api/tickets/ (BoletoCursorPagination)
+        siguiente = self.get(f'/api/tickets/?rifa={self.rifa.pk}&page_size=5', self.usuario).data['next']
+        self.assertUsaIndice(
+            lambda: self.get(siguiente),
+            ['raffles_ticket.rifa_id =', 'ORDER BY raffles_ticket.fecha_compra ASC'],
+            'boleto_rifa_compra_idx',
+        )
+
+    @skipUnless(connection.features.supports_partial_indexes, 'Sin índices parciales')
+    def test_reservas_vencidas(self):
+        self.assertUsaIndice(
+            expirar_reservas,
+            ["raffles_ticket.estado = 'reservado'", 'ORDER BY raffles_ticket.id ASC'],
+            'boleto_reservado_idx',
+        )
+
+    # ------------------------------------------------------------------
+    # Notificaciones, pagos y audit log
+    # ------------------------------------------------------------------
+
+    def test_notificaciones_del_usuario(self):
+        # notifications_api_list: desplegable de notificaciones
+        self.assertUsaIndice(
+            lambda: self.get('/notifications/api/list/', self.usuario),
+            ['FROM users_notification', 'ORDER BY users_notification.fecha_creacion DESC'],
+            'notif_usuario_fecha_idx',
+        )
+
+    def test_pagos_por_estado(self):
+        # payments_management_view: totales por estado (count y aggregate)
+        self.assertUsaIndice(
+            lambda: self.get('/admin-panel/payments/', self.admin),
+            ["WHERE payments_payment.estado = 'completado'"],
+            'pago_estado_fecha_idx',
+        )
+
+    def test_ingresos_del_dia(self):
+        # payments_management_view: ingresos de hoy
+        self.assertUsaIndice(
+            lambda: self.get('/admin-panel/payments/', self.admin),
+            ["payments_payment.estado = 'completado'", 'payments_payment.fecha_creacion >='],
+            'pago_estado_fecha_idx',
+        )
+
+    def test_pagos_del_usuario(self):
+        # PaymentViewSet.mis_pagos
+        self.assertUsaIndice(
+            lambda: self.get('/api/payments/mis_pagos/', self.usuario),
+            ['FROM payments_payment', 'WHERE payments_payment.usuario_id ='],
+            'pago_usuario_fecha_idx',
+        )
+
+    def test_logs_recientes(self):
+        # admin_dashboard_view: últimos 15 registros
+        self.assertUsaIndice(
+            lambda: self.get('/admin-panel/dashboard/', self.admin),
+            ['FROM admin_panel_auditlog', 'ORDER BY admin_panel_auditlog.fecha DESC'],
+            'auditlog_fecha_idx',
+        )
+
+    def test_logs_del_dia(self):
+        # audit_logs_view: registros de hoy y de la semana
+        self.assertUsaIndice(
+            lambda: self.get('/admin-panel/audit-logs/', self.admin),
+            ['COUNT(', 'admin_panel_auditlog.fecha >='],
+            'auditlog_fecha_idx',
+        )
+
+
+class EstadisticasDashboardTests(TestCase):
+    """Estadísticas cacheadas de los dashboards contra los valores en vivo"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            metrics.reconstruir()
+        self.organizador = self.crear(User.objects.create_user, email='org@test.cl', nombre='Organizador',
+                                      password=None, rol='organizador')
+
+    def crear(self, funcion, **campos):
+        """Crea ejecutando los on_commit (los deltas de métricas se aplican al confirmar)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return funcion(**campos)
+
+    def crear_datos(self):
+        usuario = self.crear(User.objects.create_user, email=f'p{uuid.uuid4().hex[:8]}@test.cl',
+                             nombre='Participante', password=None)
+        self.crear(User.objects.create_user, email=f's{uuid.uuid4().hex[:8]}@test.cl', nombre='Sponsor',
+                   password=None, rol='sponsor', cuenta_validada=False)
+        for i, estado in enumerate(['activa', 'activa', 'pausada', 'finalizada']):
+            rifa = self.crear(
+                Raffle.objects.create, organizador=self.organizador, titulo=f'Rifa {i}', descripcion='Rifa',
+                premio_principal='Premio', precio_boleto=1000, total_boletos=50,
+                fecha_sorteo=timezone.now() + timedelta(days=3 + i * 5), estado=estado,
+            )
+            for n in range(1, 4):
+                self.crear(Ticket.objects.create, rifa=rifa, usuario=usuario, numero_boleto=n,
+                           codigo_qr=str(uuid.uuid4()), estado='pagado' if n < 3 else 'reservado')
+        for estado in ['completado', 'completado', 'pendiente', 'fallido']:
+            self.crear(Payment.objects.create, usuario=usuario, monto=2500, estado=estado,
+                       metodo_pago='tarjeta', transaction_id=f'TX-{uuid.uuid4()}')
+
+    def assertCoincideConValoresEnVivo(self, stats):
+        usuarios, rifas, pagos, boletos = stats['usuarios'], stats['rifas'], stats['pagos'], stats['boletos']
+        self.assertEqual(usuarios['total'], User.objects.count())
+        self.assertEqual(usuarios['participantes'], User.objects.filter(rol='participante').count())
+        self.assertEqual(usuarios['sponsors_pendientes'],
+                         User.objects.filter(rol='sponsor', cuenta_validada=False).count())
+        self.assertEqual(rifas['total'], Raffle.objects.count())
+        self.assertEqual(rifas['activas'], Raffle.objects.filter(estado='activa').count())
+        self.assertEqual(rifas['pausadas'], Raffle.objects.filter(estado='pausada').count())
+        self.assertEqual(rifas['por_vencer'], Raffle.objects.filter(
+            estado='activa', fecha_sorteo__lte=timezone.now() + timedelta(days=7)).count())
+        self.assertEqual(rifas['capacidad_activa'],
+                         Raffle.objects.filter(estado='activa').aggregate(t=Sum('total_boletos'))['t'] or 0)
+        self.assertEqual(pagos['total'], Payment.objects.count())
+        self.assertEqual(pagos['completados'], Payment.objects.filter(estado='completado').count())
+        self.assertEqual(pagos['ingresos'],
+                         Payment.objects.filter(estado='completado').aggregate(t=Sum('monto'))['t'] or 0)
+        self.assertEqual(boletos['total'], Ticket.objects.count())
+        self.assertEqual(boletos['pagados'], Ticket.objects.filter(estado='pagado').count())
+        self.assertEqual(boletos['pagados_rifas_activas'],
+                         Ticket.objects.filter(estado='pagado', rifa__estado='activa').count())
+
+    def test_coinciden_con_valores_en_vivo(self):
+        self.crear_datos()
+        stats = obtener_estadisticas()
+        self.assertEqual(stats['rifas']['activas'], 2)
+        self.assertEqual(stats['boletos']['pagados_rifas_activas'], 4)
+        self.assertCoincideConValoresEnVivo(stats)
+        hoy = timezone.localdate()
+        self.assertEqual(dict(stats['registros_por_dia'])[hoy], User.objects.count())
+
+    def test_cambios_de_estado_se_reflejan(self):
+        self.crear_datos()
+        rifa = Raffle.objects.filter(estado='activa').first()
+        rifa.estado = 'pausada'
+        self.crear(rifa.save, update_fields=['estado', 'fecha_actualizacion'])
+        pago = Payment.objects.filter(estado='pendiente').get()
+        pago.estado = 'completado'
+        self.crear(pago.save)
+        self.assertCoincideConValoresEnVivo(calcular_estadisticas())
+
+    def test_se_sirven_desde_cache_hasta_invalidar(self):
+        self.crear_datos()
+        antes = obtener_estadisticas()
+        self.crear(Raffle.objects.create, organizador=self.organizador, titulo='Nueva', descripcion='Rifa',
+                   premio_principal='Premio', precio_boleto=1000, total_boletos=10,
+                   fecha_sorteo=timezone.now() + timedelta(days=30), estado='activa')
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_estadisticas(), antes)
+        invalidar_estadisticas()
+        despues = obtener_estadisticas()
+        self.assertEqual(despues['rifas']['activas'], antes['rifas']['activas'] + 1)
+        self.assertCoincideConValoresEnVivo(despues)
+
+    @override_settings(ADMIN_STATS_CACHE_TTL=0)
+    def test_ttl_cero_no_cachea(self):
+        self.crear_datos()
+        obtener_estadisticas()
+        self.crear(User.objects.create_user, email='nuevo@test.cl', nombre='Nuevo', password=None)
+        self.assertCoincideConValoresEnVivo(obtener_estadisticas())
+
+
+class MetricasIncrementalesTests(TestCase):
+    """
+    Los contadores que se actualizan con cada save() coinciden con un
+    recálculo en vivo, sin un SELECT previo por save().
+    """
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            metrics.reconstruir()
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """Ejecuta aplicando los deltas de on_commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return funcion(*args, **kwargs)
+
+    def crear_rifa(self, organizador, estado='activa'):
+        return self.ejecutar(
+            Raffle.objects.create, organizador=organizador, titulo='Rifa', descripcion='Rifa',
+            premio_principal='Premio', precio_boleto=1500, total_boletos=40,
+            fecha_sorteo=timezone.now() + timedelta(days=5), estado=estado,
+        )
+
+    def assertSinDiferencias(self):
+        self.assertEqual(metrics.verificar(), [])
+
+    def test_operaciones_coinciden_con_recalculo(self):
+        organizador = self.ejecutar(User.objects.create_user, email='org@test.cl', nombre='Org',
+                                    password=None, rol='organizador')
+        usuario = self.ejecutar(User.objects.create_user, email='p@test.cl', nombre='P', password=None)
+        rifa = self.crear_rifa(organizador, estado='borrador')
+        otra = self.crear_rifa(organizador)
+
+        # Cambio de estado con update_fields y con save() completo
+        rifa.estado = 'activa'
+        self.ejecutar(rifa.save, update_fields=['estado', 'fecha_actualizacion'])
+        usuario.rol = 'sponsor'
+        usuario.cuenta_validada = False
+        self.ejecutar(usuario.save)
+        self.assertSinDiferencias()
+
+        # Compras masivas (bulk_create + registrar_boletos) y un boleto individual
+        boletos = self.ejecutar(comprar_boletos, rifa.pk, usuario, 5)
+        self.ejecutar(comprar_boletos, otra.pk, usuario, 3)
+        boleto = Ticket.objects.get(pk=boletos[0].pk)
+        boleto.estado = 'pagado'
+        self.ejecutar(boleto.save)
+        self.assertSinDiferencias()
+
+        pago = self.ejecutar(Payment.objects.create, usuario=usuario, monto=1500, estado='pendiente',
+                             metodo_pago='tarjeta', transaction_id='TX-INC-1')
+        pago = Payment.objects.get(pk=pago.pk)
+        pago.estado = 'completado'
+        self.ejecutar(pago.save)
+        reembolso = self.ejecutar(Refund.objects.create, pago=pago, monto=1500, motivo='otro', razon='Prueba')
+        reembolso.estado = 'completado'
+        self.ejecutar(reembolso.save)
+        self.assertSinDiferencias()
+
+        # La rifa sale de 'activa': sus boletos pagados dejan de contar como activos
+        rifa = Raffle.objects.get(pk=rifa.pk)
+        rifa.estado = 'finalizada'
+        self.ejecutar(rifa.save)
+        self.ejecutar(Winner.objects.create, rifa=rifa, boleto=boleto)
+        self.assertSinDiferencias()
+
+        self.ejecutar(otra.delete)
+        self.ejecutar(Winner.objects.filter(rifa=rifa).get().delete)
+        self.assertSinDiferencias()
+
+    def test_acciones_masivas_del_admin(self):
+        admin_usuarios = site._registry[User]
+        request = RequestFactory().post('/django-admin/users/user/')
+        request.user = self.ejecutar(User.objects.create_superuser, email='admin@test.cl', nombre='Admin',
+                                     password='x')
+        for n in range(3):
+            self.ejecutar(User.objects.create_user, email=f'p{n}@test.cl', nombre='P', password=None,
+                          cuenta_validada=False)
+        participantes = User.objects.filter(rol='participante')
+
+        with mock.patch.object(admin_usuarios, 'message_user'):
+            self.ejecutar(admin_usuarios.deactivate_users, request, participantes)
+            self.ejecutar(admin_usuarios.validate_accounts, request, participantes)
+            self.ejecutar(admin_usuarios.promote_to_organizer, request, User.objects.filter(email='p0@test.cl'))
+            self.assertSinDiferencias()
+            self.ejecutar(admin_usuarios.activate_users, request, User.objects.all())
+        self.assertSinDiferencias()
+        self.assertEqual(metrics.leer()['usuarios.rol.organizador'], 1)
+
+    def test_guardar_dos_veces_la_misma_instancia(self):
+        organizador = self.ejecutar(User.objects.create_user, email='org@test.cl', nombre='Org',
+                                    password=None, rol='organizador')
+        rifa = self.crear_rifa(organizador, estado='borrador')
+        for estado in ('pendiente_aprobacion', 'activa', 'pausada'):
+            rifa.estado = estado
+            self.ejecutar(rifa.save, update_fields=['estado', 'fecha_actualizacion'])
+        self.assertSinDiferencias()
+
+    def test_instancia_cargada_con_only(self):
+        organizador = self.ejecutar(User.objects.create_user, email='org@test.cl', nombre='Org',
+                                    password=None, rol='organizador')
+        rifa_id = self.crear_rifa(organizador).pk
+        rifa = Raffle.objects.only('id', 'titulo').get(pk=rifa_id)
+        rifa.estado = 'cancelada'
+        self.ejecutar(rifa.save, update_fields=['estado'])
+        self.assertSinDiferencias()
+
+    def test_save_sin_campos_rastreados_no_consulta(self):
+        usuario = self.ejecutar(User.objects.create_user, email='p@test.cl', nombre='P', password=None)
+        usuario = User.objects.get(pk=usuario.pk)
+        usuario.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            usuario.save(update_fields=['last_login'])
+
+    def test_save_completo_no_lee_el_estado_previo(self):
+        usuario = self.ejecutar(User.objects.create_user, email='p@test.cl', nombre='P', password=None)
+        pago = self.ejecutar(Payment.objects.create, usuario=usuario, monto=1000, estado='pendiente',
+                             metodo_pago='tarjeta', transaction_id='TX-SELECT')
+        pago = Payment.objects.get(pk=pago.pk)
+        pago.estado = 'fallido'
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                pago.save()
+        self.assertEqual(metrics.leer()['pagos.estado.fallido'], 1)
+        self.assertSinDiferencias()
+
+
+    def test_save_de_boleto_lee_la_rifa_una_vez(self):
+        organizador = self.ejecutar(User.objects.create_user, email='org@test.cl', nombre='Org',
+                                    password=None, rol='organizador')
+        usuario = self.ejecutar(User.objects.create_user, email='p@test.cl', nombre='P', password=None)
+        rifa = self.crear_rifa(organizador)
+        boleto = self.ejecutar(comprar_boletos, rifa.pk, usuario, 1)[0]
+
+        boleto = Ticket.objects.get(pk=boleto.pk)
+        boleto.estado = 'pagado'
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(2):
+                boleto.save()
+        self.assertSinDiferencias()
+
+        # Con la rifa ya cargada no hay consultas extra
+        boleto = Ticket.objects.select_related('rifa').get(pk=boleto.pk)
+        boleto.estado = 'cancelado'
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                boleto.save()
+        self.assertSinDiferencias()
+
+@override_settings(TASK_QUEUE_EAGER=False)
+class LecturaMetricasSinReconstruirTests(TestCase):
+    """leer() sin métricas reconstruidas no escribe: encola la reconstrucción"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(email='a@test.cl', nombre='A', password=None)
+        User.objects.create_user(email='b@test.cl', nombre='B', password=None, rol='organizador')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_valores_en_vivo_cacheados_hasta_reconstruir(self):
+        PlatformMetric.objects.all().delete()
+        metrics.leer()
+        # Solo lee las métricas: ni la cola ni calcular_en_vivo() otra vez
+        with self.assertNumQueries(1):
+            self.assertEqual(metrics.leer()['usuarios.total'], 2)
+
+        User.objects.create_user(email='c@test.cl', nombre='C', password=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            reconstruir_metricas()
+        self.assertEqual(metrics.leer()['usuarios.total'], 3)
+
+    def test_responde_en_vivo_y_encola_una_vez(self):
+        PlatformMetric.objects.all().delete()
+        self.assertEqual(metrics.leer()['usuarios.total'], 2)
+        self.assertEqual(metrics.leer()['usuarios.rol.organizador'], 1)
+        self.assertFalse(PlatformMetric.objects.exists())
+        tarea = BackgroundTask.objects.get()
+        self.assertEqual(tarea.tarea, metrics.TAREA_RECONSTRUIR)
+
+        reconstruir_metricas()
+        self.assertTrue(PlatformMetric.objects.filter(clave=metrics.CLAVE_RECONSTRUIDO).exists())
+        self.assertEqual(metrics.leer()['usuarios.total'], 2)
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_reconstruir_dos_veces(self):
+        metrics.reconstruir()
+        metrics.reconstruir()
+        self.assertEqual(PlatformMetric.objects.filter(clave=metrics.CLAVE_RECONSTRUIDO).count(), 1)
+        self.assertEqual(metrics.verificar(), [])
+
+
+@override_settings(TASK_QUEUE_EAGER=False, TASK_QUEUE_MAX_ATTEMPTS=3, TASK_QUEUE_RETRY_DELAY=30,
+                   TASK_QUEUE_MAX_RETRY_DELAY=100, TASK_QUEUE_TIMEOUT=600)
+class ColaTareasTests(TestCase):
+    """task_queue: reclamo condicional, reintentos con espera exponencial y tareas colgadas"""
+
+    def encolar(self, fallar=False):
+        return task_queue.encolar(tarea_de_prueba, [], fallar=fallar)
+
+    def test_encolar_guarda_ruta_y_argumentos(self):
+        tarea = self.encolar(fallar=True)
+        self.assertEqual(tarea.tarea, 'apps.admin_panel.tests.tarea_de_prueba')
+        self.assertEqual(tarea.argumentos, {'args': [[]], 'kwargs': {'fallar': True}})
+        self.assertEqual((tarea.estado, tarea.intentos, tarea.max_intentos), ('pendiente', 0, 3))
+
+    def test_reclamar_toma_cada_tarea_una_vez(self):
+        primera, segunda = self.encolar(), self.encolar()
+
+        tomada = task_queue.reclamar_siguiente()
+        self.assertEqual(tomada.pk, primera.pk)
+        self.assertEqual((tomada.estado, tomada.intentos), ('en_proceso', 1))
+        self.assertIsNotNone(tomada.fecha_latido)
+        self.assertEqual(task_queue.reclamar_siguiente().pk, segunda.pk)
+        self.assertIsNone(task_queue.reclamar_siguiente())
+
+    def test_reclamar_omite_tareas_futuras_y_tomadas(self):
+        futura = self.encolar()
+        futura.ejecutar_desde = timezone.now() + timedelta(minutes=5)
+        futura.save(update_fields=['ejecutar_desde'])
+        tomada = self.encolar()
+        # Otro worker la reclamó entre la lectura de candidatas y el UPDATE
+        BackgroundTask.objects.filter(pk=tomada.pk).update(estado='en_proceso')
+
+        self.assertIsNone(task_queue.reclamar_siguiente())
+
+    def test_retraso_exponencial_con_tope(self):
+        self.assertEqual([task_queue.retraso_reintento(i) for i in (1, 2, 3, 4)], [30, 60, 100, 100])
+
+    def test_tarea_fallida_se_reintenta_con_espera(self):
+        tarea = self.encolar(fallar=True)
+
+        completadas, errores = task_queue.procesar_pendientes()
+
+        self.assertEqual((completadas, errores), (0, 1))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ('pendiente', 1))
+        self.assertIn('Fallo de prueba', tarea.ultimo_error)
+        espera = (tarea.ejecutar_desde - timezone.now()).total_seconds()
+        self.assertTrue(25 < espera <= 30, espera)
+        self.assertIsNone(task_queue.reclamar_siguiente())
+
+    def test_tarea_fallida_tras_max_intentos(self):
+        tarea = self.encolar(fallar=True)
+        for _ in range(3):
+            BackgroundTask.objects.filter(pk=tarea.pk).update(ejecutar_desde=timezone.now())
+            task_queue.procesar_pendientes()
+
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.intentos), ('fallida', 3))
+        self.assertIsNotNone(tarea.fecha_fin)
+
+    def test_tarea_completada(self):
+        tarea = self.encolar()
+        self.assertEqual(task_queue.procesar_pendientes(), (1, 0))
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'completada')
+
+    def colgada(self, intentos, latido, inicio=None):
+        tarea = self.encolar()
+        BackgroundTask.objects.filter(pk=tarea.pk).update(
+            estado='en_proceso', intentos=intentos,
+            fecha_inicio=inicio or latido, fecha_latido=latido,
+        )
+        return tarea
+
+    def test_recuperar_colgadas_cuenta_el_intento(self):
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        con_intentos = self.colgada(1, hace_una_hora)
+        agotada = self.colgada(3, hace_una_hora)
+        anterior_al_latido = self.colgada(1, None, inicio=hace_una_hora)
+        # Empezó hace una hora pero el worker sigue renovando el latido
+        viva = self.colgada(1, timezone.now(), inicio=hace_una_hora)
+
+        self.assertEqual(task_queue.recuperar_colgadas(), (2, 1))
+
+        estados = dict(BackgroundTask.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados[con_intentos.pk], 'pendiente')
+        self.assertEqual(estados[anterior_al_latido.pk], 'pendiente')
+        self.assertEqual(estados[agotada.pk], 'fallida')
+        self.assertEqual(estados[viva.pk], 'en_proceso')
+        self.assertIn('latido', BackgroundTask.objects.get(pk=agotada.pk).ultimo_error)
+        self.assertEqual(task_queue.recuperar_colgadas(), (0, 0))
+
+
+@override_settings(AUDIT_LOG_SINK='db', TASK_QUEUE_EAGER=False)
+class AuditoriaDiferidaTests(TestCase):
+    """audit: entradas acumuladas por lote, escritas juntas y descartadas si la transacción se revierte"""
+
+    def registrar(self, cantidad, accion='login'):
+        for i in range(cantidad):
+            audit.registrar(accion, f'Entrada {i}')
+
+    def inserts(self, consultas):
+        return [c for c in consultas if c['sql'].startswith('INSERT INTO "admin_panel_auditlog"')]
+
+    def test_lote_escribe_todo_junto_al_cerrar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with audit.lote():
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.registrar(3)
+                self.assertFalse(AuditLog.objects.exists())
+
+        self.assertEqual(AuditLog.objects.count(), 3)
+        self.assertEqual(len(self.inserts(consultas)), 1)
+
+    def test_no_escribe_antes_del_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.registrar(1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_rollback_descarta_las_entradas(self):
+        with audit.lote():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.registrar(1, accion='crear_rifa')
+                try:
+                    with transaction.atomic():
+                        self.registrar(2, accion='eliminar_rifa')
+                        raise ValueError('Operación revertida')
+                except ValueError:
+                    pass
+
+        self.assertEqual(list(AuditLog.objects.values_list('accion', flat=True)), ['crear_rifa'])
+
+    def test_fuera_de_un_lote_escribe_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.registrar(2)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_middleware_un_insert_por_request(self):
+        def vista(request):
+            # La transacción de la vista se confirma dentro del request
+            with self.captureOnCommitCallbacks(execute=True):
+                self.registrar(3)
+            return 'respuesta'
+        request = RequestFactory().get('/')
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(audit.AuditLogMiddleware(vista)(request), 'respuesta')
+
+        self.assertEqual(AuditLog.objects.count(), 3)
+        self.assertEqual(len(self.inserts(consultas)), 1)
+
+    @override_settings(AUDIT_LOG_SINK='cola')
+    def test_destino_cola(self):
+        with audit.lote():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.registrar(2)
+
+        self.assertFalse(AuditLog.objects.exists())
+        tarea = BackgroundTask.objects.get()
+        self.assertEqual(tarea.tarea, 'apps.admin_panel.audit.guardar_entradas')
+        self.assertEqual(task_queue.procesar_pendientes(), (1, 0))
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    @override_settings(AUDIT_LOG_SINK='apps.admin_panel.tests.sink_con_error')
+    def test_error_del_destino_no_interrumpe(self):
+        with self.assertLogs('apps.admin_panel.audit', level='ERROR'):
+            with audit.lote():
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.registrar(1)
+        self.assertFalse(AuditLog.objects.exists())
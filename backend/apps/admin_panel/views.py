@@ -1,13 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Count, Sum, Q
 from django.http import HttpResponse, JsonResponse
 from apps.users.models import User, Notification, Profile
 from apps.raffles.models import Raffle, Ticket, Winner
 from apps.payments.models import Payment
+from . import audit
 from .models import AuditLog
+from .stats import obtener_estadisticas
+from .task_queue import encolar
+from .tasks import reembolsar_rifa_cancelada
 from openpyxl import Workbook
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -38,56 +42,46 @@ def user_profile_view(request, user_id):
 @login_required
 @user_passes_test(is_admin)
 def admin_dashboard_view(request):
-    from datetime import datetime, timedelta
-    from django.db.models.functions import TruncDate
+    from datetime import timedelta
     import json
 
+    # Estadísticas agregadas (pocas consultas, servidas desde caché - ver stats.py)
+    stats = obtener_estadisticas()
+    usuarios, rifas, pagos, boletos = stats['usuarios'], stats['rifas'], stats['pagos'], stats['boletos']
+
     # Estadísticas principales
-    total_users = User.objects.count()
-    total_raffles = Raffle.objects.count()
-    total_payments = Payment.objects.count()
-    total_revenue = Payment.objects.filter(estado='completado').aggregate(Sum('monto'))['monto__sum'] or 0
-    active_raffles = Raffle.objects.filter(estado='activa').count()
-    active_users = User.objects.filter(is_active=True).count()
+    total_users = usuarios['total']
+    total_raffles = rifas['total']
+    total_payments = pagos['total']
+    total_revenue = pagos['ingresos']
+    active_raffles = rifas['activas']
+    active_users = usuarios['activos']
 
     # Estadísticas secundarias
-    tickets_sold = Ticket.objects.count()
-    total_winners = Raffle.objects.filter(ganador__isnull=False).count()
-    total_sponsors = User.objects.filter(rol='sponsor').count()
-    rifas_pausadas = Raffle.objects.filter(estado='pausada').count()
-    rifas_pendientes_aprobacion = Raffle.objects.filter(estado='pendiente_aprobacion').count()
-    sponsors_pendientes = User.objects.filter(rol='sponsor', cuenta_validada=False).count()
+    tickets_sold = boletos['total']
+    total_winners = rifas['con_ganador']
+    total_sponsors = usuarios['sponsors']
+    rifas_pausadas = rifas['pausadas']
+    rifas_pendientes_aprobacion = rifas['pendientes_aprobacion']
+    sponsors_pendientes = usuarios['sponsors_pendientes']
 
     # Distribución por roles
-    participantes_count = User.objects.filter(rol='participante').count()
-    organizadores_count = User.objects.filter(rol='organizador').count()
-    sponsors_count = User.objects.filter(rol='sponsor').count()
-    admins_count = User.objects.filter(rol__in=['admin', 'superuser']).count()
+    participantes_count = usuarios['participantes']
+    organizadores_count = usuarios['organizadores']
+    sponsors_count = usuarios['sponsors']
+    admins_count = usuarios['admins_y_superusuarios']
 
     # Crecimiento (últimos 30 días vs 30 días anteriores)
     today = timezone.now().date()
-    last_30_days = today - timedelta(days=30)
-    users_last_30 = User.objects.filter(fecha_registro__gte=last_30_days).count()
+    users_last_30 = usuarios['ultimos_30_dias']
     users_growth = 5  # Placeholder - calcular real después
     revenue_growth = 12  # Placeholder
-    completed_payments = Payment.objects.filter(estado='completado').count()
+    completed_payments = pagos['completados']
 
-    # Datos para gráficos - Últimos 7 días
-    last_7_days = today - timedelta(days=6)
-    users_by_day = User.objects.filter(
-        fecha_registro__gte=last_7_days,
-        fecha_registro__isnull=False
-    ).annotate(
-        day=TruncDate('fecha_registro')
-    ).values('day').annotate(
-        count=Count('id')
-    ).order_by('day')
-
-    # Crear labels y data para el gráfico
+    # Crear labels y data para el gráfico - Últimos 7 días
     date_dict = {today - timedelta(days=i): 0 for i in range(6, -1, -1)}
-    for entry in users_by_day:
-        if entry['day'] is not None:
-            date_dict[entry['day']] = entry['count']
+    for day, count in stats['registros_por_dia']:
+        date_dict[day] = count
 
     chart_labels = [date.strftime('%d/%m') for date in sorted(date_dict.keys())]
     chart_data = [date_dict[date] for date in sorted(date_dict.keys())]
@@ -107,7 +101,10 @@ def admin_dashboard_view(request):
     ).order_by('-fecha_registro'))
 
     # Formatear fechas para JSON
+    # values() no pasa por el descriptor del campo: desencriptar el teléfono aquí
     for sponsor in sponsors_pendientes_list:
+        if sponsor['telefono']:
+            sponsor['telefono'] = sponsor['telefono'].descifrar()
         if sponsor['fecha_registro']:
             sponsor['fecha_registro'] = sponsor['fecha_registro'].strftime('%d/%m/%Y %H:%M')
 
@@ -115,26 +112,17 @@ def admin_dashboard_view(request):
     recent_logs = AuditLog.objects.select_related('usuario').order_by('-fecha')[:15]
 
     # Alertas del sistema
-    pending_validations = User.objects.filter(cuenta_validada=False).count()
-    expiring_raffles = Raffle.objects.filter(
-        estado='activa',
-        fecha_sorteo__lte=timezone.now() + timedelta(days=7)
-    ).count()
-    first_day_of_month = today.replace(day=1)
-    failed_payments = Payment.objects.filter(
-        estado='fallido',
-        fecha_creacion__gte=first_day_of_month
-    ).count()
+    pending_validations = usuarios['pendientes_validacion']
+    expiring_raffles = rifas['por_vencer']
+    failed_payments = pagos['fallidos_mes']
 
     # Métricas de rendimiento
-    total_tickets = Ticket.objects.count()
-    sold_tickets = Ticket.objects.filter(estado='pagado').count()
+    total_tickets = boletos['total']
+    sold_tickets = boletos['pagados']
     conversion_rate = round((sold_tickets / total_tickets * 100) if total_tickets > 0 else 0, 1)
 
-    total_capacity = Raffle.objects.filter(estado='activa').aggregate(
-        total=Sum('total_boletos')
-    )['total'] or 0
-    sold_capacity = Ticket.objects.filter(rifa__estado='activa', estado='pagado').count()
+    total_capacity = rifas['capacidad_activa']
+    sold_capacity = boletos['pagados_rifas_activas']
     occupancy_rate = round((sold_capacity / total_capacity * 100) if total_capacity > 0 else 0, 1)
 
     satisfaction_rate = 85  # Placeholder
@@ -384,7 +372,7 @@ def raffles_management_view(request):
 @user_passes_test(is_admin)
 def payments_management_view(request):
     from django.core.paginator import Paginator
-    from datetime import datetime
+    from datetime import datetime, timedelta
 
     payments = Payment.objects.select_related('usuario').all()
 
@@ -392,7 +380,8 @@ def payments_management_view(request):
     search = request.GET.get('search', '')
     if search:
         payments = payments.filter(
-            Q(transaction_id__icontains=search) |
+            # transaction_id está encriptado: búsqueda exacta por su índice ciego
+            Q(transaction_id_hash=search) |
             Q(usuario__nombre__icontains=search) |
             Q(usuario__email__icontains=search) |
             Q(descripcion__icontains=search)
@@ -472,11 +461,13 @@ def payments_management_view(request):
     ).order_by('-monto_total')
 
     # Últimas transacciones (para estadísticas rápidas)
-    today = timezone.now().date()
-    pagos_hoy = Payment.objects.filter(fecha_creacion__date=today).count()
+    # Rango del día (no __date) para que la consulta use el índice de fecha
+    inicio_dia = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    hoy = {'fecha_creacion__gte': inicio_dia, 'fecha_creacion__lt': inicio_dia + timedelta(days=1)}
+    pagos_hoy = Payment.objects.filter(**hoy).count()
     ingresos_hoy = Payment.objects.filter(
-        fecha_creacion__date=today,
-        estado='completado'
+        estado='completado',
+        **hoy
     ).aggregate(total=Sum('monto'))['total'] or 0
 
     # Top usuarios por gasto
@@ -581,11 +572,14 @@ def audit_logs_view(request):
         logs = logs.order_by(sort)
 
     # Estadísticas
-    today = timezone.now().date()
     total_logs = AuditLog.objects.count()
-    logs_today = AuditLog.objects.filter(fecha__date=today).count()
+    # Rangos sobre fecha (no __date) para que las consultas usen su índice
+    inicio_dia = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    logs_today = AuditLog.objects.filter(
+        fecha__gte=inicio_dia, fecha__lt=inicio_dia + timedelta(days=1)
+    ).count()
     logs_this_week = AuditLog.objects.filter(
-        fecha__gte=today - timedelta(days=7)
+        fecha__gte=inicio_dia - timedelta(days=7)
     ).count()
     unique_users = AuditLog.objects.values('usuario').distinct().count()
 
@@ -709,37 +703,41 @@ def export_raffles_pdf(request):
 def superuser_dashboard_view(request):
     """Comprehensive superuser control panel"""
 
+    # Aggregated statistics (few queries, cached - see stats.py)
+    stats = obtener_estadisticas()
+    usuarios, rifas, pagos, boletos = stats['usuarios'], stats['rifas'], stats['pagos'], stats['boletos']
+
     # User statistics by role
     users_stats = {
-        'total': User.objects.count(),
-        'participantes': User.objects.filter(rol='participante').count(),
-        'organizadores': User.objects.filter(rol='organizador').count(),
-        'sponsors': User.objects.filter(rol='sponsor').count(),
-        'admins': User.objects.filter(rol='admin').count(),
-        'pending_sponsors': User.objects.filter(rol='sponsor', cuenta_validada=False).count(),
+        'total': usuarios['total'],
+        'participantes': usuarios['participantes'],
+        'organizadores': usuarios['organizadores'],
+        'sponsors': usuarios['sponsors'],
+        'admins': usuarios['admins'],
+        'pending_sponsors': usuarios['sponsors_pendientes'],
     }
 
     # Raffle statistics
     raffles_stats = {
-        'total': Raffle.objects.count(),
-        'activas': Raffle.objects.filter(estado='activa').count(),
-        'completadas': Raffle.objects.filter(estado='finalizada').count(),
-        'canceladas': Raffle.objects.filter(estado='cancelada').count(),
+        'total': rifas['total'],
+        'activas': rifas['activas'],
+        'completadas': rifas['finalizadas'],
+        'canceladas': rifas['canceladas'],
     }
 
     # Payment statistics
     payments_stats = {
-        'total': Payment.objects.count(),
-        'completados': Payment.objects.filter(estado='completado').count(),
-        'pendientes': Payment.objects.filter(estado='pendiente').count(),
-        'fallidos': Payment.objects.filter(estado='fallido').count(),
-        'total_amount': Payment.objects.filter(estado='completado').aggregate(Sum('monto'))['monto__sum'] or 0,
+        'total': pagos['total'],
+        'completados': pagos['completados'],
+        'pendientes': pagos['pendientes'],
+        'fallidos': pagos['fallidos'],
+        'total_amount': pagos['ingresos'],
     }
 
     # Tickets statistics
     tickets_stats = {
-        'total': Ticket.objects.count(),
-        'vendidos': Ticket.objects.filter(estado='vendido').count(),
+        'total': boletos['total'],
+        'vendidos': boletos['pagados'],
     }
 
     # Recent activity
@@ -788,8 +786,8 @@ def approve_sponsor_ajax(request, user_id):
         )
 
         # Log action
-        AuditLog.objects.create(
-            usuario=request.user,
+        audit.registrar(
+            request=request,
             accion='aprobar_sponsor',
             descripcion=f'Sponsor {user.email} aprobado por administrador'
         )
@@ -815,8 +813,8 @@ def reject_sponsor_ajax(request, user_id):
         )
 
         # Log action before deletion
-        AuditLog.objects.create(
-            usuario=request.user,
+        audit.registrar(
+            request=request,
             accion='rechazar_sponsor',
             descripcion=f'Sponsor {user.email} rechazado. Motivo: {motivo}'
         )
@@ -840,8 +838,8 @@ def change_user_role_ajax(request, user_id):
             user.save()
 
             # Log action
-            AuditLog.objects.create(
-                usuario=request.user,
+            audit.registrar(
+                request=request,
                 accion='cambiar_rol',
                 descripcion=f'Rol de {user.email} cambiado de {old_role} a {new_role}'
             )
@@ -860,8 +858,8 @@ def suspend_user_ajax(request, user_id):
         user.save()
 
         # Log action
-        AuditLog.objects.create(
-            usuario=request.user,
+        audit.registrar(
+            request=request,
             accion='suspender_usuario',
             descripcion=f'Usuario {user.email} suspendido'
         )
@@ -879,8 +877,8 @@ def activate_user_ajax(request, user_id):
         user.save()
 
         # Log action
-        AuditLog.objects.create(
-            usuario=request.user,
+        audit.registrar(
+            request=request,
             accion='activar_usuario',
             descripcion=f'Usuario {user.email} activado'
         )
@@ -897,8 +895,8 @@ def delete_user_ajax(request, user_id):
         email = user.email
 
         # Log action before deletion
-        AuditLog.objects.create(
-            usuario=request.user,
+        audit.registrar(
+            request=request,
             accion='eliminar_usuario',
             descripcion=f'Usuario {email} eliminado permanentemente'
         )
@@ -918,23 +916,28 @@ def cancel_raffle_ajax(request, raffle_id):
         if raffle.estado == 'cancelada':
             return JsonResponse({'success': False, 'message': 'La rifa ya está cancelada'})
 
-        # Cancel raffle
-        raffle.estado = 'cancelada'
-        raffle.save()
-
         # Count tickets to refund
-        tickets_count = Ticket.objects.filter(rifa=raffle, estado='vendido').count()
+        tickets_count = Ticket.objects.filter(rifa=raffle, estado='pagado').count()
 
-        # Log action
-        AuditLog.objects.create(
-            usuario=request.user,
-            accion='cancelar_rifa',
-            descripcion=f'Rifa "{raffle.titulo}" cancelada. {tickets_count} boletos afectados.'
-        )
+        # Cancel raffle; refunds run in the task queue (payments.refund_service)
+        with transaction.atomic():
+            raffle.estado = 'cancelada'
+            raffle.save(update_fields=['estado', 'fecha_actualizacion'])
+            if tickets_count:
+                encolar(reembolsar_rifa_cancelada, raffle.id, request.user.id, 'Cancelada desde el panel de administración')
+
+            # Log action
+            audit.registrar(
+                request=request,
+                accion='cancelar_rifa',
+                modelo='Raffle',
+                objeto_id=raffle.id,
+                descripcion=f'Rifa "{raffle.titulo}" cancelada. {tickets_count} boletos afectados.'
+            )
 
         return JsonResponse({
             'success': True,
-            'message': f'Rifa cancelada. {tickets_count} boletos afectados.'
+            'message': f'Rifa cancelada. {tickets_count} boletos afectados; reembolsos en proceso.'
         })
     return JsonResponse({'success': False, 'message': 'Método no permitido'})
 
@@ -945,62 +948,27 @@ def force_winner_ajax(request, raffle_id):
     if request.method == 'POST':
         raffle = get_object_or_404(Raffle, id=raffle_id)
 
-        # Verificar si ya hay un ganador
-        if Winner.objects.filter(rifa=raffle).exists():
-            return JsonResponse({'success': False, 'message': 'La rifa ya tiene un ganador'})
-
-        # Get sold tickets (pagado, no vendido)
-        tickets = list(Ticket.objects.filter(rifa=raffle, estado='pagado').select_related('usuario'))
-
-        if not tickets:
-            return JsonResponse({'success': False, 'message': 'No hay boletos pagados'})
-
-        # Importar función de sorteo verificable
-        from apps.raffles.views import generar_sorteo_verificable
-
-        # Realizar sorteo verificable
-        resultado_sorteo = generar_sorteo_verificable(raffle, tickets)
-        winning_ticket = resultado_sorteo['winning_ticket']
-
-        # Create winner with verification data
-        winner = Winner.objects.create(
-            rifa=raffle,
-            boleto=winning_ticket,
-            verificado=False,
-            premio_entregado=False,
-            seed_aleatorio=resultado_sorteo['seed_aleatorio'],
-            timestamp_sorteo=resultado_sorteo['timestamp_sorteo'],
-            hash_verificacion=resultado_sorteo['hash_verificacion'],
-            participantes_totales=resultado_sorteo['participantes_totales'],
-            acta_digital=resultado_sorteo['acta_digital'],
-            algoritmo='SHA256+Timestamp'
-        )
-
-        # Update raffle status
-        raffle.estado = 'finalizada'
-        raffle.save()
+        # Importar servicio de sorteo verificable
+        from apps.raffles.draw_service import sortear, SorteoError
 
-        # Crear notificación para el ganador
-        Notification.objects.create(
-            usuario=winning_ticket.usuario,
-            tipo='ganador',
-            titulo='🎉 ¡Felicidades! Has ganado',
-            mensaje=f'¡Felicitaciones! Has ganado el sorteo "{raffle.titulo}". Premio: {raffle.premio_principal}',
-            enlace=f'/raffles/{raffle.id}/',
-            rifa_relacionada=raffle
-        )
+        # Realizar sorteo verificable (ganador, estado y notificaciones)
+        try:
+            winner = sortear(raffle)
+        except SorteoError as e:
+            return JsonResponse({'success': False, 'message': str(e)})
+        winning_ticket = winner.boleto
 
         # Log action
-        AuditLog.objects.create(
-            usuario=request.user,
+        audit.registrar(
+            request=request,
             accion='sorteo_manual',
-            descripcion=f'Sorteo realizado manualmente para "{raffle.titulo}": Ganador {winning_ticket.usuario.nombre} (Boleto #{winning_ticket.numero_boleto}). Hash: {resultado_sorteo["hash_verificacion"][:16]}...'
+            descripcion=f'Sorteo realizado manualmente para "{raffle.titulo}": Ganador {winning_ticket.usuario.nombre} (Boleto #{winning_ticket.numero_boleto}). Hash: {winner.hash_verificacion[:16]}...'
         )
 
         return JsonResponse({
             'success': True,
             'message': f'Ganador seleccionado: {winning_ticket.usuario.nombre} (Boleto #{winning_ticket.numero_boleto})',
-            'hash_verificacion': resultado_sorteo['hash_verificacion']
+            'hash_verificacion': winner.hash_verificacion
         })
     return JsonResponse({'success': False, 'message': 'Método no permitido'})
 
@@ -1013,8 +981,8 @@ def delete_raffle_ajax(request, raffle_id):
         titulo = raffle.titulo
 
         # Log action before deletion
-        AuditLog.objects.create(
-            usuario=request.user,
+        audit.registrar(
+            request=request,
             accion='eliminar_rifa',
             descripcion=f'Rifa "{titulo}" eliminada permanentemente'
         )
@@ -1070,8 +1038,8 @@ def refund_payment_ajax(request, payment_id):
             payment.save()
 
             # Registrar en audit log
-            AuditLog.objects.create(
-                usuario=request.user,
+            audit.registrar(
+                request=request,
                 accion='reembolso',
                 modelo='Payment',
                 objeto_id=payment.id,
@@ -1128,11 +1096,11 @@ def revisar_rifa_pausada(request, rifa_id):
             rifa.estado = 'activa'
             rifa.revision_admin = f"Plazo extendido por {dias_extension} días. {comentarios}"
             rifa.fecha_revision = timezone.now()
-            rifa.save()
+            rifa.save(update_fields=['nueva_fecha_sorteo', 'fecha_sorteo', 'estado', 'revision_admin', 'fecha_revision', 'fecha_actualizacion'])
 
             # Registrar en audit log
-            AuditLog.objects.create(
-                usuario=request.user,
+            audit.registrar(
+                request=request,
                 accion='extender_plazo',
                 modelo='Raffle',
                 objeto_id=rifa.id,
@@ -1142,100 +1110,30 @@ def revisar_rifa_pausada(request, rifa_id):
             messages.success(request, f'✅ Plazo extendido. Nueva fecha: {nueva_fecha.strftime("%d/%m/%Y %H:%M")}')
 
         elif accion == 'cancelar':
-            # Obtener todos los boletos pagados de esta rifa
-            boletos_pagados = Ticket.objects.filter(rifa=rifa, estado='pagado')
-            total_boletos_reembolsar = boletos_pagados.count()
+            # Contar los boletos pagados de esta rifa
+            total_boletos_reembolsar = Ticket.objects.filter(rifa=rifa, estado='pagado').count()
 
             if total_boletos_reembolsar > 0:
-                # Procesar reembolsos automáticos
-                from apps.payments.models import Payment, Refund
-
-                reembolsos_exitosos = 0
-                reembolsos_fallidos = 0
-                monto_total_reembolsado = 0
-
-                for boleto in boletos_pagados:
-                    try:
-                        # Buscar el pago asociado al boleto
-                        pago = Payment.objects.filter(
-                            usuario=boleto.usuario,
-                            rifa=rifa,
-                            estado='completado'
-                        ).first()
-
-                        if pago:
-                            # Crear registro de reembolso
-                            refund = Refund.objects.create(
-                                pago=pago,
-                                procesado_por=request.user,
-                                motivo='cancelacion',
-                                razon=f'Reembolso automático por cancelación de rifa. Motivo: {comentarios[:100]}',
-                                monto=pago.monto,
-                                estado='completado',
-                                fecha_procesado=timezone.now()
-                            )
-
-                            # Actualizar estado del pago
-                            pago.estado = 'reembolsado'
-                            pago.notas_admin = f'Reembolso automático por cancelación de rifa #{rifa.id}. {comentarios[:50]}'
-                            pago.save()
-
-                            # Actualizar estado del boleto
-                            boleto.estado = 'cancelado'
-                            boleto.save()
-
-                            monto_total_reembolsado += pago.monto
-                            reembolsos_exitosos += 1
-
-                            # Registrar en audit log individual
-                            AuditLog.objects.create(
-                                usuario=request.user,
-                                accion='reembolso_automatico',
-                                modelo='Payment',
-                                objeto_id=pago.id,
-                                descripcion=f'Reembolso automático de ${pago.monto} a {boleto.usuario.email} por cancelación de rifa "{rifa.titulo}"'
-                            )
-
-                    except Exception as e:
-                        reembolsos_fallidos += 1
-                        # Log del error pero continuar con los demás
-                        AuditLog.objects.create(
-                            usuario=request.user,
-                            accion='error_reembolso',
-                            modelo='Ticket',
-                            objeto_id=boleto.id,
-                            descripcion=f'Error al reembolsar boleto #{boleto.numero_boleto} a {boleto.usuario.email}: {str(e)}'
-                        )
-
-                # Actualizar estado de la rifa
-                rifa.estado = 'cancelada'
-                rifa.revision_admin = f"Rifa cancelada. {comentarios}. Reembolsos: {reembolsos_exitosos} exitosos, {reembolsos_fallidos} fallidos. Total reembolsado: ${monto_total_reembolsado:,.0f}"
-                rifa.fecha_revision = timezone.now()
-                rifa.save()
-
-                # Registrar en audit log principal
-                AuditLog.objects.create(
-                    usuario=request.user,
-                    accion='cancelar_rifa_con_reembolsos',
-                    modelo='Raffle',
-                    objeto_id=rifa.id,
-                    descripcion=f'Rifa "{rifa.titulo}" cancelada con {reembolsos_exitosos} reembolsos automáticos (${monto_total_reembolsado:,.0f}). Motivo: {comentarios[:100]}'
-                )
-
-                if reembolsos_fallidos > 0:
-                    messages.warning(request, f'⚠️ Rifa cancelada. {reembolsos_exitosos} reembolsos exitosos, {reembolsos_fallidos} fallidos. Revisar logs.')
-                else:
-                    messages.success(request, f'✅ Rifa cancelada. {reembolsos_exitosos} reembolsos procesados automáticamente (${monto_total_reembolsado:,.0f})')
+                # Reembolsos automáticos en la cola de tareas (el resultado
+                # queda en revision_admin y en el audit log)
+                with transaction.atomic():
+                    rifa.estado = 'cancelada'
+                    rifa.revision_admin = f"Rifa cancelada. {comentarios}. Reembolso de {total_boletos_reembolsar} boletos en proceso."
+                    rifa.fecha_revision = timezone.now()
+                    rifa.save(update_fields=['estado', 'revision_admin', 'fecha_revision', 'fecha_actualizacion'])
+                    encolar(reembolsar_rifa_cancelada, rifa.id, request.user.id, comentarios)
+
+                messages.success(request, f'✅ Rifa cancelada. Reembolso de {total_boletos_reembolsar} boletos en proceso; el resultado quedará en la revisión de la rifa.')
             else:
                 # No hay boletos vendidos, cancelar directamente
                 rifa.estado = 'cancelada'
                 rifa.revision_admin = f"Rifa cancelada por administración. Sin boletos vendidos. {comentarios}"
                 rifa.fecha_revision = timezone.now()
-                rifa.save()
+                rifa.save(update_fields=['estado', 'revision_admin', 'fecha_revision', 'fecha_actualizacion'])
 
                 # Registrar en audit log
-                AuditLog.objects.create(
-                    usuario=request.user,
+                audit.registrar(
+                    request=request,
                     accion='cancelar_rifa',
                     modelo='Raffle',
                     objeto_id=rifa.id,
@@ -1251,11 +1149,11 @@ def revisar_rifa_pausada(request, rifa_id):
             rifa.estado = 'cerrada'
             rifa.revision_admin = f"Aprobada para sorteo con {boletos_vendidos_count} boletos vendidos. {comentarios}"
             rifa.fecha_revision = timezone.now()
-            rifa.save()
+            rifa.save(update_fields=['estado', 'revision_admin', 'fecha_revision', 'fecha_actualizacion'])
 
             # Registrar en audit log
-            AuditLog.objects.create(
-                usuario=request.user,
+            audit.registrar(
+                request=request,
                 accion='aprobar_sorteo_parcial',
                 modelo='Raffle',
                 objeto_id=rifa.id,
@@ -1306,7 +1204,7 @@ def revisar_rifa_pendiente(request, rifa_id):
             rifa.revisado_por = request.user
             rifa.fecha_revision_aprobacion = timezone.now()
             rifa.comentarios_revision = comentarios
-            rifa.save()
+            rifa.save(update_fields=['estado', 'revisado_por', 'fecha_revision_aprobacion', 'comentarios_revision', 'fecha_actualizacion'])
 
             # Notificar al organizador
             Notification.objects.create(
@@ -1319,8 +1217,8 @@ def revisar_rifa_pendiente(request, rifa_id):
             )
 
             # Registrar en el log de auditoría
-            AuditLog.objects.create(
-                usuario=request.user,
+            audit.registrar(
+                request=request,
                 accion='aprobar_rifa',
                 modelo='Raffle',
                 objeto_id=rifa.id,
@@ -1337,7 +1235,7 @@ def revisar_rifa_pendiente(request, rifa_id):
             rifa.fecha_revision_aprobacion = timezone.now()
             rifa.motivo_rechazo = motivo
             rifa.comentarios_revision = comentarios
-            rifa.save()
+            rifa.save(update_fields=['estado', 'revisado_por', 'fecha_revision_aprobacion', 'motivo_rechazo', 'comentarios_revision', 'fecha_actualizacion'])
 
             # Notificar al organizador
             Notification.objects.create(
@@ -1350,8 +1248,8 @@ def revisar_rifa_pendiente(request, rifa_id):
             )
 
             # Registrar en el log de auditoría
-            AuditLog.objects.create(
-                usuario=request.user,
+            audit.registrar(
+                request=request,
                 accion='rechazar_rifa',
                 modelo='Raffle',
                 objeto_id=rifa.id,
@@ -1,19 +1,113 @@
 """
 Utilidades de encriptación para datos sensibles
+
+El cifrador (Fernet o MultiFernet) se construye una sola vez por proceso y se
+reutiliza en lugar de derivar la clave y crear el objeto en cada llamada.
+
+Rotación de claves (settings.ENCRYPTION_KEYRING):
+    - La primera clave del keyring encripta; todas desencriptan.
+    - La clave derivada de SECRET_KEY se agrega al final para seguir
+      leyendo los datos existentes, mientras ENCRYPTION_LEGACY_SECRET_KEY
+      sea True (default).
+    - Un campo queda con la clave nueva al leerse y volver a guardarse
+      (los campos que no se leen se guardan con el mismo texto cifrado), o
+      en bloque con python manage.py rotar_claves_cifrado.
+
+Para retirar una clave: rotar_claves_cifrado re-encripta todas las filas
+con la primera clave; cuando rotar_claves_cifrado --verificar no informa
+pendientes se puede quitar la clave del keyring (o, si era la derivada de
+SECRET_KEY, definir ENCRYPTION_LEGACY_SECRET_KEY=False).
 """
-from cryptography.fernet import Fernet
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from django.conf import settings
 import base64
 import hashlib
+import hmac
 
 def get_encryption_key():
     """
     Genera una clave de encriptación basada en SECRET_KEY
     """
+    return _clave_desde_secret_key(settings.SECRET_KEY)
+
+def _clave_desde_secret_key(secret_key):
     # Usar SECRET_KEY como base para la clave de encriptación
-    key = hashlib.sha256(settings.SECRET_KEY.encode()).digest()
+    key = hashlib.sha256(secret_key.encode()).digest()
     return base64.urlsafe_b64encode(key)
 
+def _clave_desde_keyring(secreto):
+    """
+    Convierte una entrada del keyring en clave Fernet.
+    Acepta una clave Fernet (Fernet.generate_key()) o un secreto arbitrario,
+    que se deriva con SHA256 igual que SECRET_KEY.
+    """
+    try:
+        if len(base64.urlsafe_b64decode(secreto.encode())) == 32:
+            return secreto.encode()
+    except ValueError:
+        pass
+    return _clave_desde_secret_key(secreto)
+
+def _claves(keyring, secret_key, legado):
+    claves = [_clave_desde_keyring(secreto) for secreto in keyring]
+    clave_legado = _clave_desde_secret_key(secret_key)
+    if clave_legado not in claves and (legado or not claves):
+        # Sin keyring la clave de SECRET_KEY es la única: no se puede retirar
+        claves.append(clave_legado)
+    return claves
+
+@lru_cache(maxsize=8)
+def _construir_cifrador(keyring, secret_key, legado=True):
+    """
+    Construye el cifrador (cacheado por proceso).
+    Los argumentos son la clave del caché: si cambia la configuración
+    (p. ej. override_settings en pruebas) se construye un cifrador nuevo.
+    """
+    claves = _claves(keyring, secret_key, legado)
+    if len(claves) == 1:
+        return Fernet(claves[0])
+    return MultiFernet([Fernet(clave) for clave in claves])
+
+def _configuracion():
+    return (
+        tuple(getattr(settings, 'ENCRYPTION_KEYRING', None) or ()),
+        settings.SECRET_KEY,
+        getattr(settings, 'ENCRYPTION_LEGACY_SECRET_KEY', True),
+    )
+
+def get_cipher():
+    """
+    Retorna el cifrador compartido del proceso
+    """
+    return _construir_cifrador(*_configuracion())
+
+@lru_cache(maxsize=8)
+def _cifrador_principal(keyring, secret_key, legado=True):
+    return Fernet(_claves(keyring, secret_key, legado)[0])
+
+def recifrar(texto_cifrado):
+    """
+    Re-encripta con la primera clave un texto cifrado con otra del keyring.
+
+    Returns:
+        str | None: El nuevo texto cifrado, o None si ya usa la primera clave
+
+    Raises:
+        InvalidToken: Ninguna clave configurada lo desencripta
+    """
+    token = texto_cifrado.encode()
+    try:
+        _cifrador_principal(*_configuracion()).decrypt(token)
+        return None
+    except InvalidToken:
+        pass
+    cifrador = get_cipher()
+    if not isinstance(cifrador, MultiFernet):
+        raise InvalidToken
+    return cifrador.rotate(token).decode()
+
 def encrypt_data(data):
     """
     Encripta datos sensibles
@@ -22,8 +116,7 @@ def encrypt_data(data):
         return data
     
     try:
-        fernet = Fernet(get_encryption_key())
-        encrypted = fernet.encrypt(data.encode())
+        encrypted = get_cipher().encrypt(data.encode())
         return encrypted.decode()
     except Exception as e:
         # En caso de error, loguear y retornar dato sin encriptar
@@ -39,8 +132,7 @@ def decrypt_data(encrypted_data):
         return encrypted_data
     
     try:
-        fernet = Fernet(get_encryption_key())
-        decrypted = fernet.decrypt(encrypted_data.encode())
+        decrypted = get_cipher().decrypt(encrypted_data.encode())
         return decrypted.decode()
     except Exception as e:
         # Si no se puede desencriptar, retornar el valor original
@@ -50,8 +142,20 @@ def decrypt_data(encrypted_data):
 def hash_sensitive_data(data):
     """
     Hashea datos sensibles de forma irreversible (para búsquedas)
+
+    HMAC-SHA256 con settings.BLIND_INDEX_KEY: el mismo dato siempre produce
+    el mismo hash (permite índices y unique), pero sin la clave no se puede
+    verificar un valor adivinado contra la base de datos.
     """
     if not data:
         return data
     
-    return hashlib.sha256(data.encode()).hexdigest()
+    return hmac.new(_clave_indice_ciego(), data.encode(), hashlib.sha256).hexdigest()
+
+def _clave_indice_ciego():
+    return _derivar_clave_indice(getattr(settings, 'BLIND_INDEX_KEY', None) or settings.SECRET_KEY)
+
+@lru_cache(maxsize=8)
+def _derivar_clave_indice(clave):
+    # Separada de la clave de encriptación aunque ambas partan del mismo secreto
+    return hashlib.sha256(f'blind-index:{clave}'.encode()).digest()
@@ -1,57 +1,168 @@
 """
 Campos de modelo personalizados con encriptación
+
+La desencriptación es perezosa: from_db_value entrega el texto cifrado
+envuelto en EncryptedValue y el descriptor EncryptedAttribute lo desencripta
+recién al leer el atributo, guardando el resultado en la instancia. Un listado
+que nunca muestra telefono o transaction_id no paga el costo de Fernet.
+
+Para formularios, serializers y templates el cambio es transparente: todos
+leen el atributo del modelo y reciben texto plano.
+
+values() y values_list() no pasan por el descriptor y retornan EncryptedValue:
+usar valor.descifrar() si se necesita el texto plano.
+
+Como Fernet es aleatorio, un campo encriptado no sirve para buscar ni para
+unique. BlindIndexField guarda junto a él un HMAC determinista del texto
+plano que sí se puede indexar.
 """
 from django.db import models
-from .encryption import encrypt_data, decrypt_data
+from django.db.models.query_utils import DeferredAttribute
+from .encryption import encrypt_data, decrypt_data, hash_sensitive_data
 
-class EncryptedCharField(models.CharField):
+class EncryptedValue(str):
     """
-    CharField que encripta datos automáticamente
+    Texto cifrado tal como viene de la base de datos (aún sin desencriptar)
+    """
+
+    def descifrar(self):
+        """Retorna el texto plano"""
+        return decrypt_data(str(self))
+
+class EncryptedAttribute(DeferredAttribute):
+    """
+    Descriptor que desencripta en el primer acceso y memoriza el resultado
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, EncryptedValue):
+            value = value.descifrar()
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # Descriptor de datos: sin __set__ el __dict__ de la instancia
+        # ocultaría a __get__ y nunca se desencriptaría
+        instance.__dict__[self.field.attname] = value
+
+class EncryptedFieldMixin:
     """
-    
+    Lógica común de los campos encriptados
+    """
+    descriptor_class = EncryptedAttribute
+
     def from_db_value(self, value, expression, connection):
-        """Desencripta al leer de la base de datos"""
+        """Marca el valor como cifrado; se desencripta al leer el atributo"""
         if value is None:
             return value
-        return decrypt_data(value)
-    
+        return EncryptedValue(value)
+
+    def pre_save(self, model_instance, add):
+        """Si el valor nunca se leyó, se guarda el mismo texto cifrado"""
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, EncryptedValue):
+            return value
+        return super().pre_save(model_instance, add)
+
     def get_prep_value(self, value):
         """Encripta antes de guardar en la base de datos"""
         if value is None:
             return value
+        if isinstance(value, EncryptedValue):
+            return str(value)
         return encrypt_data(str(value))
 
-class EncryptedTextField(models.TextField):
+class EncryptedCharField(EncryptedFieldMixin, models.CharField):
+    """
+    CharField que encripta datos automáticamente
+    """
+
+class EncryptedTextField(EncryptedFieldMixin, models.TextField):
     """
     TextField que encripta datos automáticamente
     """
-    
-    def from_db_value(self, value, expression, connection):
-        """Desencripta al leer de la base de datos"""
-        if value is None:
-            return value
-        return decrypt_data(value)
-    
+
+class EncryptedEmailField(EncryptedFieldMixin, models.EmailField):
+    """
+    EmailField que encripta datos automáticamente
+    """
+
     def get_prep_value(self, value):
         """Encripta antes de guardar en la base de datos"""
-        if value is None:
-            return value
-        return encrypt_data(str(value))
+        if value is None or isinstance(value, EncryptedValue):
+            return super().get_prep_value(value)
+        # Los emails se normalizan a minúsculas antes de encriptar
+        return super().get_prep_value(str(value).lower())
 
-class EncryptedEmailField(models.EmailField):
+class BlindIndexValue(str):
     """
-    EmailField que encripta datos automáticamente
+    Hash ya calculado (leído de la base de datos o producido por pre_save)
     """
-    
+
+class BlindIndexField(models.CharField):
+    """
+    Índice ciego: HMAC-SHA256 del texto plano de otro campo del modelo.
+
+    Se recalcula en cada save() a partir de `source`. Las búsquedas reciben
+    el texto plano y lo hashean automáticamente:
+
+        Payment.objects.get(transaction_id_hash='TXN-ABC123')
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', 64)
+        kwargs.setdefault('editable', False)
+        if not kwargs.get('unique'):
+            kwargs.setdefault('db_index', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        if kwargs.get('max_length') == 64:
+            del kwargs['max_length']
+        if kwargs.get('editable') is False:
+            del kwargs['editable']
+        if kwargs.get('db_index') and not kwargs.get('unique'):
+            del kwargs['db_index']
+        return name, path, args, kwargs
+
+    def calcular(self, model_instance):
+        """Calcula el hash a partir del valor actual del campo origen"""
+        fuente = model_instance._meta.get_field(self.source)
+        valor = getattr(model_instance, fuente.attname)
+        if valor in (None, ''):
+            return None
+        return BlindIndexValue(hash_sensitive_data(str(valor)))
+
+    def pre_save(self, model_instance, add):
+        fuente = model_instance._meta.get_field(self.source)
+        actual = getattr(model_instance, self.attname)
+        # Origen sin leer (EncryptedValue) y hash ya presente: no desencriptar
+        if actual and isinstance(model_instance.__dict__.get(fuente.attname), EncryptedValue):
+            return actual
+        valor = self.calcular(model_instance)
+        setattr(model_instance, self.attname, valor)
+        return valor
+
     def from_db_value(self, value, expression, connection):
-        """Desencripta al leer de la base de datos"""
         if value is None:
             return value
-        return decrypt_data(value)
-    
+        return BlindIndexValue(value)
+
+    def get_lookup(self, lookup_name):
+        # iexact no prepara el valor (no se hashearía): el admin lo usa con
+        # search_fields = ['=campo'], así que se trata como exact
+        if lookup_name == 'iexact':
+            lookup_name = 'exact'
+        return super().get_lookup(lookup_name)
+
     def get_prep_value(self, value):
-        """Encripta antes de guardar en la base de datos"""
-        if value is None:
+        """Hashea el texto plano de las búsquedas; los hashes pasan sin cambios"""
+        if value is None or isinstance(value, BlindIndexValue):
             return value
-        # Los emails se normalizan a minúsculas antes de encriptar
-        return encrypt_data(str(value).lower())
+        return hash_sensitive_data(str(value))
@@ -0,0 +1,143 @@
+"""
+Paginación por cursor (keyset) para listados grandes de la API.
+
+PageNumberPagination ejecuta un COUNT(*) y un OFFSET que crece con cada
+página: la página 5000 de los boletos de una rifa lee y descarta 100.000
+filas. Estas clases ordenan por (campo, id) y cada página continúa desde la
+última fila entregada:
+
+    WHERE campo >= :campo AND (campo > :campo OR id > :id)
+    ORDER BY campo, id LIMIT page_size + 1
+
+El par es único, así que no se necesita el offset que CursorPagination usa
+para valores repetidos, y la condición sobre el primer campo es un rango que
+el índice (..., campo) resuelve directamente. No hay conteo total: la
+respuesta trae solo 'next', 'previous' y 'results'.
+
+Uso (por ViewSet):
+    pagination_class = BoletoCursorPagination
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor sobre (ordering[0], id). ordering es ('campo', 'id') o
+    ('-campo', '-id'); también acepta un solo campo único ('id').
+    """
+
+    ordering = ('-fecha_creacion', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        # El cursor depende del orden: no se combina con ?ordering=
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        atras = self.cursor is not None and self.cursor.reverse
+        posicion = self._leer_posicion(queryset.model) if self.cursor else None
+
+        # Hacia atrás se recorre en orden inverso y se da vuelta la página
+        orden = [_invertir(campo) for campo in self.ordering] if atras else list(self.ordering)
+        queryset = queryset.order_by(*orden)
+        if posicion is not None:
+            queryset = queryset.filter(_despues_de(orden, posicion))
+
+        filas = list(queryset[:self.page_size + 1])
+        self.page = filas[:self.page_size]
+        hay_mas = len(filas) > self.page_size
+        if atras:
+            self.page.reverse()
+
+        self.has_next = bool(self.page) and (posicion is not None if atras else hay_mas)
+        self.has_previous = bool(self.page) and (hay_mas if atras else posicion is not None)
+        if self.page:
+            self.next_position = self._posicion(queryset.model, self.page[-1])
+            self.previous_position = self._posicion(queryset.model, self.page[0])
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    # ------------------------------------------------------------------
+    # Posición: valores de los campos del orden de una fila, en JSON
+    # ------------------------------------------------------------------
+
+    def _campos(self, modelo):
+        return [modelo._meta.get_field(campo.lstrip('-')) for campo in self.ordering]
+
+    def _posicion(self, modelo, fila):
+        campos = self._campos(modelo)
+        if isinstance(fila, dict):
+            # Fila de values() (apps.core.serializacion)
+            fila = modelo(**{campo.attname: fila[campo.attname] for campo in campos})
+        return json.dumps([campo.value_to_string(fila) for campo in campos])
+
+    def _leer_posicion(self, modelo):
+        try:
+            valores = json.loads(self.cursor.position)
+            campos = self._campos(modelo)
+            if len(valores) != len(campos):
+                raise ValueError
+            return [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+def _invertir(campo):
+    return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+def _despues_de(orden, valores):
+    """Filas estrictamente posteriores a `valores` en el orden dado"""
+    def comparar(campo, valor, estricto):
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        return Q(**{f"{campo.lstrip('-')}__{operador if estricto else operador + 'e'}": valor})
+
+    if len(orden) == 1:
+        return comparar(orden[0], valores[0], True)
+    (primero, desempate), (valor, valor_desempate) = orden, valores
+    # El rango sobre el primer campo va aparte para que lo resuelva el índice
+    return comparar(primero, valor, False) & (
+        comparar(primero, valor, True) | comparar(desempate, valor_desempate, True)
+    )
+
+
+# ============================================================================
+# PAGINACIONES POR LISTADO
+# ============================================================================
+
+class BoletoCursorPagination(KeysetCursorPagination):
+    """Boletos en orden de compra (índices (rifa|usuario, fecha_compra))"""
+    ordering = ('fecha_compra', 'id')
+
+
+class PagoCursorPagination(KeysetCursorPagination):
+    """Pagos, más recientes primero"""
+    ordering = ('-fecha_creacion', '-id')
+
+
+class NotificacionCursorPagination(KeysetCursorPagination):
+    """Notificaciones, más recientes primero (índice (usuario, fecha_creacion))"""
+    ordering = ('-fecha_creacion', '-id')
@@ -0,0 +1,161 @@
+"""
+Proyección de campos en la API (sparse fieldsets).
+
+    GET /api/raffles/?fields=id,titulo,precio_boleto,porcentaje_vendido
+    GET /api/raffles/5/?omit=descripcion,boletos
+
+CamposDinamicosMixin (serializer) quita los campos no pedidos: no se
+calculan (SerializerMethodField, propiedades) ni se codifican.
+ProyeccionMixin (ViewSet) lleva la misma selección a la consulta con only(),
+así las columnas que nadie pidió (p. ej. el texto largo de 'descripcion')
+no se leen de la base de datos, y deja en select_related solo las
+relaciones que siguen en uso.
+
+Los campos que no son columnas (propiedades del modelo y
+SerializerMethodField) declaran lo que leen en Meta.columnas_requeridas.
+Si un campo seleccionado no se puede traducir a columnas la consulta queda
+completa: nunca se difiere una columna que después se cargaría fila a fila.
+
+Solo aplica a lecturas (GET/HEAD) que traen ?fields= u ?omit=.
+"""
+from django.core.exceptions import FieldDoesNotExist
+
+PARAM_CAMPOS = 'fields'
+PARAM_OMITIR = 'omit'
+
+
+def _nombres(request, parametro):
+    # Request de DRF o HttpRequest de Django (serializers usados desde vistas normales)
+    parametros = getattr(request, 'query_params', request.GET)
+    nombres = {nombre.strip() for nombre in parametros.get(parametro, '').split(',')}
+    nombres.discard('')
+    return nombres or None
+
+
+def seleccion_solicitada(request):
+    """
+    (campos, omitidos) pedidos en la query string. campos es None si no se
+    restringió con ?fields=. Retorna None si la petición no pide proyección.
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    campos, omitidos = _nombres(request, PARAM_CAMPOS), _nombres(request, PARAM_OMITIR)
+    if campos is None and omitidos is None:
+        return None
+    return campos, omitidos or set()
+
+
+def columnas_de_orden(paginator):
+    """Campos del orden fijo de una paginación por cursor (vacío si no tiene)"""
+    ordering = getattr(paginator, 'ordering', None) or ()
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    return [campo.lstrip('-') for campo in ordering]
+
+
+def _ruta_columna(modelo, atributos):
+    """
+    Ruta de only() para un source de DRF ('titulo', 'organizador.nombre').
+    '' si es una relación inversa/M2M (se carga con prefetch, sin columna
+    propia); None si no corresponde a columnas del modelo.
+    """
+    partes = []
+    for posicion, atributo in enumerate(atributos):
+        try:
+            campo = modelo._meta.get_field(atributo)
+        except FieldDoesNotExist:
+            return None
+        ultimo = posicion == len(atributos) - 1
+        if campo.one_to_many or campo.many_to_many:
+            return '' if ultimo else None
+        partes.append(atributo)
+        if campo.is_relation:
+            modelo = campo.related_model
+        elif not ultimo:
+            return None
+    return '__'.join(partes)
+
+
+# ============================================================================
+# SERIALIZER
+# ============================================================================
+
+class CamposDinamicosMixin:
+    """
+    Serializer con ?fields= / ?omit=. Va antes de ModelSerializer:
+
+        class RaffleListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+            class Meta:
+                columnas_requeridas = {'porcentaje_vendido': ('boletos_vendidos', 'total_boletos')}
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        seleccion = seleccion_solicitada(self.context.get('request'))
+        self.proyectado = seleccion is not None
+        if seleccion:
+            campos, omitidos = seleccion
+            for nombre in list(self.fields):
+                if (campos is not None and nombre not in campos) or nombre in omitidos:
+                    self.fields.pop(nombre)
+
+    def columnas_modelo(self):
+        """
+        Rutas de only() que leen los campos seleccionados (siempre incluye la
+        clave primaria), o None si alguno no se puede traducir.
+        """
+        modelo = self.Meta.model
+        requeridas = getattr(self.Meta, 'columnas_requeridas', {})
+        columnas = {modelo._meta.pk.name}
+        for nombre, campo in self.fields.items():
+            if nombre in requeridas:
+                columnas.update(requeridas[nombre])
+                continue
+            if campo.source == '*':
+                return None
+            ruta = _ruta_columna(modelo, campo.source_attrs)
+            if ruta is None:
+                return None
+            if ruta:
+                columnas.add(ruta)
+        return columnas
+
+
+# ============================================================================
+# VIEWSET
+# ============================================================================
+
+class ProyeccionMixin:
+    """
+    ViewSet cuyo serializer usa CamposDinamicosMixin: aplica only() y ajusta
+    select_related según los campos pedidos, en listados y en get_object().
+    """
+
+    def filter_queryset(self, queryset):
+        return self.proyectar(super().filter_queryset(queryset))
+
+    def incluye_campo(self, nombre):
+        """False si la petición excluye el campo (para evitar prefetch inútiles)"""
+        seleccion = seleccion_solicitada(self.request)
+        if seleccion is None:
+            return True
+        campos, omitidos = seleccion
+        return (campos is None or nombre in campos) and nombre not in omitidos
+
+    def proyectar(self, queryset, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        serializer = serializer_class(context=self.get_serializer_context())
+        if not getattr(serializer, 'proyectado', False):
+            return queryset
+        columnas = serializer.columnas_modelo()
+        if columnas is None:
+            return queryset
+
+        # La paginación por cursor lee los campos del orden de cada página
+        columnas.update(columnas_de_orden(self.paginator))
+
+        relaciones = {ruta.rsplit('__', 1)[0] for ruta in columnas if '__' in ruta}
+        queryset = queryset.select_related(None)
+        if relaciones:
+            queryset = queryset.select_related(*relaciones)
+        return queryset.only(*columnas)
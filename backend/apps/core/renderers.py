@@ -0,0 +1,66 @@
+"""
+Renderer y parser JSON de la API con orjson (opcional).
+
+orjson codifica y decodifica en C, varias veces más rápido que el módulo
+json de la biblioteca estándar que usan JSONRenderer/JSONParser de DRF. Se
+instala con requirements.txt (Docker, Azure) o con el extra ".[rapido]" del
+pyproject; si no está instalado, estas clases se comportan exactamente como
+las de DRF.
+
+La salida es la misma que la de JSONRenderer: UTF-8 compacto, U+2028/U+2029
+escapados y los tipos que orjson no conoce (Decimal, textos traducibles,
+datetime con 'Z') pasan por el encoder de DRF.
+
+Configurado en settings.REST_FRAMEWORK (DEFAULT_RENDERER_CLASSES y
+DEFAULT_PARSER_CLASSES).
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+ORJSON_DISPONIBLE = orjson is not None
+
+if ORJSON_DISPONIBLE:
+    # datetime al encoder de DRF: mismo formato ISO ('Z' para UTC) que JSONRenderer
+    OPCIONES_ORJSON = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer que usa orjson cuando está instalado"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not ORJSON_DISPONIBLE or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # ?indent / Accept: ...; indent=4 (API navegable): orjson solo indenta a 2
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        contenido = orjson.dumps(data, default=JSONEncoder().default, option=OPCIONES_ORJSON)
+        # Igual que JSONRenderer: JSON válido también como literal de JavaScript
+        return contenido.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser que usa orjson cuando está instalado"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not ORJSON_DISPONIBLE:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            contenido = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                contenido = contenido.decode(encoding)
+            return orjson.loads(contenido)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,113 @@
+"""
+Valores previos de los campos rastreados de un modelo, sin consultas.
+
+Al cargar una instancia de la base de datos (Model.from_db) se guarda una
+copia de los campos rastreados. En pre_save esa copia pasa a ser el "estado
+previo" del save y en post_save se actualiza con lo que se guardó, así los
+receptores de post_save saben qué cambió sin un SELECT previo.
+
+    seguimiento.rastrear(Raffle, ['estado', 'total_boletos'])
+
+    def _al_guardar(sender, instance, created, **kwargs):
+        previos = seguimiento.previos(instance)   # None: no cambió nada rastreado
+        actuales = seguimiento.actuales(instance)
+
+La copia se toma en from_db y no en post_init: post_init se emite también
+para las instancias nuevas (que no tienen estado previo) y el despacho de la
+señal cuesta más que la copia misma, en cada fila de cada listado (ver
+python manage.py benchmark_seguimiento).
+
+Un save(update_fields=[...]) que no incluye campos rastreados (p. ej.
+last_login o boletos_vendidos) no cuenta como cambio. Si la instancia no se
+cargó de la base de datos (Model(pk=...)) o se cargó con only()/defer() sin
+alguno de los campos rastreados y se guarda, el valor que falta se lee de la
+base de datos.
+
+Los cambios hechos en otro proceso entre la carga y el save() no se ven
+(igual que con el SELECT en pre_save, que tampoco bloqueaba la fila).
+"""
+from collections import defaultdict
+
+from django.db.models.signals import pre_save, post_save
+
+_CAMPOS = defaultdict(set)
+
+ATRIBUTO_CARGADOS = '_seguimiento_cargados'
+ATRIBUTO_PREVIOS = '_seguimiento_previos'
+ATRIBUTO_GUARDADOS = '_seguimiento_guardados'
+
+# from_db original del modelo, envuelto por rastrear()
+ATRIBUTO_FROM_DB = '_seguimiento_from_db'
+
+
+def rastrear(modelo, campos):
+    """
+    Rastrea `campos` (attname: 'estado', 'rifa_id') de `modelo`.
+    Se puede llamar desde varias apps: los campos se acumulan.
+    """
+    _CAMPOS[modelo].update(campos)
+    if ATRIBUTO_FROM_DB not in modelo.__dict__:
+        original = modelo.from_db
+        setattr(modelo, ATRIBUTO_FROM_DB, original)
+        modelo.from_db = classmethod(_cargar_con_copia(original))
+    uid = f'core.seguimiento.{modelo._meta.label}'
+    pre_save.connect(_al_pre_guardar, sender=modelo, dispatch_uid=f'{uid}.pre_save')
+    post_save.connect(_al_guardar, sender=modelo, dispatch_uid=f'{uid}.post_save')
+
+
+def previos(instance):
+    """
+    Valores rastreados antes del save() en curso (desde post_save), o None si
+    la fila es nueva, se guardó en crudo (loaddata) o no cambió ningún campo
+    rastreado.
+    """
+    return instance.__dict__.get(ATRIBUTO_PREVIOS)
+
+
+def actuales(instance):
+    """Valores rastreados tal como quedaron en la base de datos tras el save()"""
+    valores = instance.__dict__
+    base = valores.get(ATRIBUTO_PREVIOS)
+    if base is None:
+        base = valores.get(ATRIBUTO_CARGADOS) or {}
+    # Los valores se toman en post_save: auto_now_add/auto_now ya están asignados
+    return {**base, **_copia(instance, valores.get(ATRIBUTO_GUARDADOS, ()))}
+
+
+def _copia(instance, campos):
+    # __dict__ y no getattr: un campo diferido no se consulta
+    valores = instance.__dict__
+    return {campo: valores[campo] for campo in campos if campo in valores}
+
+
+def _cargar_con_copia(original):
+    campos = _CAMPOS
+
+    def from_db(cls, db, field_names, values):
+        instance = original.__func__(cls, db, field_names, values)
+        # _copia en línea: se ejecuta por cada fila cargada
+        valores = instance.__dict__
+        valores[ATRIBUTO_CARGADOS] = {campo: valores[campo] for campo in campos[cls] if campo in valores}
+        return instance
+
+    return from_db
+
+
+def _al_pre_guardar(sender, instance, raw=False, update_fields=None, **kwargs):
+    campos = _CAMPOS[sender]
+    guardados = campos if update_fields is None else campos & set(update_fields)
+    instance.__dict__[ATRIBUTO_GUARDADOS] = guardados
+
+    if raw or instance._state.adding or instance.pk is None or not guardados:
+        instance.__dict__[ATRIBUTO_PREVIOS] = None
+        return
+
+    anteriores = dict(instance.__dict__.get(ATRIBUTO_CARGADOS) or {})
+    faltantes = campos - anteriores.keys()
+    if faltantes:
+        anteriores.update(sender._base_manager.filter(pk=instance.pk).values(*faltantes).first() or {})
+    instance.__dict__[ATRIBUTO_PREVIOS] = anteriores
+
+
+def _al_guardar(sender, instance, **kwargs):
+    instance.__dict__[ATRIBUTO_CARGADOS] = actuales(instance)
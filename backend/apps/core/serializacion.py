@@ -0,0 +1,102 @@
+"""
+Serializers rápidos de solo lectura para listados calientes de la API.
+
+Un ModelSerializer crea una instancia de modelo por fila y llama al
+to_representation de cada campo. En los listados grandes (rifas, boletos)
+eso domina el tiempo de respuesta. Un SerializerRapido lee filas de
+values() (diccionarios, sin instancias) y arma cada resultado con un solo
+literal de dict, con el mismo formato de salida que el serializer DRF
+equivalente (decimales como texto, fechas ISO en la zona horaria actual,
+URLs de archivos absolutas si hay request).
+
+ListadoRapidoMixin usa el serializer rápido en list() del ViewSet cuando la
+petición no pide ?fields= / ?omit= (esa proyección la resuelve el
+serializer DRF, ver apps.core.proyeccion). Funciona con PageNumberPagination
+y con KeysetCursorPagination.
+
+Benchmark: python manage.py benchmark_serializacion
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .proyeccion import columnas_de_orden, seleccion_solicitada
+
+
+class SerializerRapido:
+    """
+    Base: cada subclase declara `columnas` (argumentos de values()) y
+    representar_fila(fila), que retorna el dict de salida.
+    """
+
+    columnas = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        request = self.context.get('request')
+        self._url_absoluta = request.build_absolute_uri if request is not None else None
+
+    def representar(self, filas):
+        representar_fila = self.representar_fila
+        return [representar_fila(fila) for fila in filas]
+
+    def representar_fila(self, fila):
+        raise NotImplementedError
+
+    # ------------------------------------------------------------------
+    # Formatos (los mismos que los campos de DRF)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def decimal(valor, decimales=2):
+        """DecimalField: texto con `decimales` posiciones"""
+        if valor is None:
+            return None
+        return '{:f}'.format(valor.quantize(Decimal(1).scaleb(-decimales)))
+
+    @staticmethod
+    def fecha_hora(valor):
+        """DateTimeField: ISO 8601 en la zona horaria actual ('Z' para UTC)"""
+        if valor is None:
+            return None
+        if settings.USE_TZ and timezone.is_aware(valor):
+            valor = valor.astimezone(timezone.get_current_timezone())
+        texto = valor.isoformat()
+        return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+
+    def archivo(self, nombre, storage):
+        """FileField/ImageField: URL del archivo (absoluta si hay request)"""
+        if not nombre:
+            return None
+        url = storage.url(nombre)
+        return self._url_absoluta(url) if self._url_absoluta else url
+
+
+class ListadoRapidoMixin:
+    """
+    ViewSet con `serializer_rapido`: list() (y las acciones que llamen a
+    listar_rapido) serializan filas de values() en vez de instancias.
+    """
+
+    serializer_rapido = None
+
+    def list(self, request, *args, **kwargs):
+        if not self.usa_serializer_rapido():
+            return super().list(request, *args, **kwargs)
+        return self.listar_rapido(self.filter_queryset(self.get_queryset()))
+
+    def usa_serializer_rapido(self):
+        return self.serializer_rapido is not None and seleccion_solicitada(self.request) is None
+
+    def listar_rapido(self, queryset, paginar=True):
+        serializer = self.serializer_rapido(context=self.get_serializer_context())
+        # El cursor de la paginación lee los campos del orden de cada fila
+        columnas = dict.fromkeys([*serializer.columnas, *columnas_de_orden(self.paginator)])
+        filas = queryset.values(*columnas)
+
+        pagina = self.paginate_queryset(filas) if paginar else None
+        if pagina is not None:
+            return self.get_paginated_response(serializer.representar(pagina))
+        return Response(serializer.representar(filas))
@@ -296,6 +296,7 @@ def create_demo_raffles_view(request):
     from apps.users.models import User
     from apps.raffles.models import Raffle, Ticket
     from apps.payments.models import Payment
+    from apps.admin_panel import metrics
     import pytz
     
     # Verificar secreto
@@ -405,6 +406,9 @@ def create_demo_raffles_view(request):
                 'error': str(e)
             })
     
+    # Los borrados masivos no pasan por las métricas: recalcularlas (en la cola de tareas)
+    metrics.programar_reconstruccion()
+    
     result['success'] = True
     result['mensaje'] = f'{len(rifas_data)} rifas creadas con {result["total_boletos"]} boletos'
     
@@ -426,6 +430,7 @@ def create_demo_raffles_with_sponsors_view(request):
     from apps.users.models import User
     from apps.raffles.models import Raffle, Ticket, SponsorshipRequest
     from apps.payments.models import Payment
+    from apps.admin_panel import metrics
     import pytz
     
     # Verificar secreto
@@ -587,6 +592,9 @@ def create_demo_raffles_with_sponsors_view(request):
                 'error': str(e)
             })
     
+    # Los borrados masivos no pasan por las métricas: recalcularlas (en la cola de tareas)
+    metrics.programar_reconstruccion()
+    
     result['success'] = True
     result['mensaje'] = f'{len(rifas_data)} rifas creadas con {result["total_boletos"]} boletos y {result["sponsors_creados"]} sponsors'
     
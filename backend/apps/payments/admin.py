@@ -5,7 +5,7 @@ from .models import Payment, Refund
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ['transaction_id', 'usuario', 'monto', 'metodo_pago', 'estado', 'fecha_creacion']
     list_filter = ['estado', 'metodo_pago', 'fecha_creacion']
-    search_fields = ['transaction_id', 'usuario__nombre', 'usuario__email']
+    search_fields = ['=transaction_id_hash', 'usuario__nombre', 'usuario__email']
     readonly_fields = ['transaction_id', 'fecha_creacion']
 
 @admin.register(Refund)
@@ -7,14 +7,17 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, Prefetch
 
+from apps.raffles.models import Ticket
 from .models import Payment, Refund
 from .serializers import (
     PaymentSerializer, PaymentListSerializer, PaymentCreateSerializer,
     RefundSerializer, RefundListSerializer, RefundCreateSerializer,
     PaymentStatsSerializer
 )
+from apps.admin_panel import metrics as metricas
+from apps.core.pagination import PagoCursorPagination
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -36,6 +39,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Cursor por (fecha_creacion, id): páginas profundas sin OFFSET ni COUNT
+    pagination_class = PagoCursorPagination
     
     def get_serializer_class(self):
         """Retorna serializer apropiado"""
@@ -74,7 +79,20 @@ class PaymentViewSet(viewsets.ModelViewSet):
         if fecha_hasta:
             queryset = queryset.filter(fecha_creacion__lte=fecha_hasta)
         
-        return queryset
+        return self.optimizar(queryset)
+    
+    def optimizar(self, queryset):
+        """Trae las relaciones que lee el serializer de la acción en consultas fijas"""
+        if self.action in ('list', 'mis_pagos'):
+            return PaymentListSerializer.anotar(queryset)
+        queryset = queryset.select_related('usuario')
+        # boletos_list lee el título de la rifa de cada boleto
+        return queryset.prefetch_related(Prefetch(
+            'boletos',
+            queryset=Ticket.objects.select_related('rifa').only(
+                'id', 'numero_boleto', 'estado', 'rifa__id', 'rifa__titulo'
+            ),
+        ))
     
     def perform_create(self, serializer):
         """Asigna el usuario al crear el pago"""
@@ -83,7 +101,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def mis_pagos(self, request):
         """Retorna pagos del usuario actual"""
-        pagos = Payment.objects.filter(usuario=request.user)
+        pagos = self.optimizar(Payment.objects.filter(usuario=request.user))
         serializer = PaymentListSerializer(pagos, many=True)
         return Response(serializer.data)
     
@@ -149,24 +167,21 @@ class PaymentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def stats(self, request):
         """Retorna estadísticas de pagos (solo admin)"""
-        # Calcular estadísticas
-        total_pagos = Payment.objects.count()
-        pagos_completados = Payment.objects.filter(estado='completado').count()
-        pagos_pendientes = Payment.objects.filter(estado='pendiente').count()
-        pagos_fallidos = Payment.objects.filter(estado='fallido').count()
+        # Contadores materializados (ver apps.admin_panel.metrics)
+        m = metricas.leer()
+        total_pagos = m['pagos.total']
+        pagos_completados = m['pagos.estado.completado']
+        pagos_pendientes = m['pagos.estado.pendiente']
+        pagos_fallidos = m['pagos.estado.fallido']
         
-        total_recaudado = Payment.objects.filter(
-            estado='completado'
-        ).aggregate(total=Sum('monto'))['total'] or 0
+        total_recaudado = m['pagos.monto.completado']
         
-        total_reembolsado = Refund.objects.filter(
-            estado='completado'
-        ).aggregate(total=Sum('monto'))['total'] or 0
+        total_reembolsado = m['reembolsos.monto_completado']
         
         # Métodos de pago más usados
         metodos_pago = {}
         for metodo, nombre in Payment.METODO_PAGO:
-            count = Payment.objects.filter(metodo_pago=metodo).count()
+            count = m[f'pagos.metodo.{metodo}']
             if count > 0:
                 metodos_pago[nombre] = count
         
@@ -227,6 +242,10 @@ class RefundViewSet(viewsets.ModelViewSet):
         if estado:
             queryset = queryset.filter(estado=estado)
         
+        # pago_info y usuario_nombre leen el pago y su usuario
+        queryset = queryset.select_related('pago__usuario')
+        if self.action != 'list':
+            queryset = queryset.select_related('procesado_por')
         return queryset
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
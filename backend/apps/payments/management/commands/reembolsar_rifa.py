@@ -0,0 +1,56 @@
+"""
+Comando para reembolsar (o terminar de reembolsar) los pagos de una rifa cancelada.
+
+Normalmente lo hace la tarea reembolsar_rifa_cancelada al cancelar la rifa
+desde el panel. Si se interrumpió, ejecutarlo de nuevo continúa con los
+pagos que faltan.
+
+Uso:
+    python manage.py reembolsar_rifa 42
+    python manage.py reembolsar_rifa 42 --lote 200 --motivo "Cancelación por el organizador"
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payments.refund_service import reembolsar_rifa
+from apps.raffles.models import Raffle
+
+
+class Command(BaseCommand):
+    help = 'Reembolsa por lotes los pagos completados de una rifa cancelada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rifa_id', type=int, help='ID de la rifa cancelada')
+        parser.add_argument('--lote', type=int, default=500, help='Pagos por transacción')
+        parser.add_argument('--motivo', default='', help='Motivo que se registra en los reembolsos')
+
+    def handle(self, *args, **options):
+        rifa = Raffle.objects.filter(pk=options['rifa_id']).first()
+        if rifa is None:
+            raise CommandError(f'La rifa #{options["rifa_id"]} no existe')
+        if rifa.estado != 'cancelada':
+            raise CommandError(f'La rifa #{rifa.id} no está cancelada (estado: {rifa.estado})')
+
+        self.stdout.write(f'💸 Reembolsando pagos de la rifa #{rifa.id} "{rifa.titulo}"')
+
+        def informar(resultado):
+            self.stdout.write(
+                f'   {resultado["pagos"]}/{resultado["total_pagos"]} pagos '
+                f'({resultado["boletos"]} boletos, ${resultado["monto"]:,.0f})'
+            )
+
+        resultado = reembolsar_rifa(
+            rifa.id, comentarios=options['motivo'], tamano_lote=options['lote'], progreso=informar
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado["pagos"]} pago(s) reembolsado(s), {resultado["boletos"]} boleto(s) cancelado(s), '
+            f'total ${resultado["monto"]:,.0f}'
+        ))
+        if resultado['con_reembolso_previo']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {resultado["con_reembolso_previo"]} pago(s) ya tenían un reembolso: revisar manualmente'
+            ))
+        if resultado['boletos_sin_pago']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {resultado["boletos_sin_pago"]} boleto(s) pagado(s) sin pago asociado'
+            ))
@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-17 20:31
+
+import apps.core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_alter_payment_payment_intent_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='transaction_id_hash',
+            field=apps.core.fields.BlindIndexField(null=True, source='transaction_id', unique=True, verbose_name='Hash de ID de Transacción'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='transaction_id',
+            field=apps.core.fields.EncryptedCharField(max_length=400, verbose_name='ID de Transacción'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-17 21:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_payment_transaction_id_hash'),
+        ('raffles', '0014_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='pago_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['usuario', 'fecha_creacion'], name='pago_usuario_fecha_idx'),
+        ),
+    ]
@@ -1,7 +1,7 @@
 from django.db import models
 from django.conf import settings
 from apps.raffles.models import Ticket
-from apps.core.fields import EncryptedCharField
+from apps.core.fields import EncryptedCharField, BlindIndexField
 
 class Payment(models.Model):
     METODO_PAGO = (
@@ -28,7 +28,9 @@ class Payment(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADO_PAGO, default='pendiente', verbose_name='Estado')
     
     # Detalles de la transacción (Encriptados)
-    transaction_id = EncryptedCharField(max_length=400, unique=True, verbose_name='ID de Transacción')  # Encriptado
+    transaction_id = EncryptedCharField(max_length=400, verbose_name='ID de Transacción')  # Encriptado
+    # HMAC del transaction_id: unicidad y búsqueda exacta indexadas (Fernet es aleatorio)
+    transaction_id_hash = BlindIndexField(source='transaction_id', unique=True, null=True, verbose_name='Hash de ID de Transacción')
     payment_intent_id = EncryptedCharField(max_length=400, blank=True, verbose_name='Payment Intent ID')  # Encriptado
     
     # Fechas
@@ -43,6 +45,12 @@ class Payment(models.Model):
         verbose_name = 'Pago'
         verbose_name_plural = 'Pagos'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Estadísticas del panel de pagos (por estado y por día)
+            models.Index(fields=['estado', 'fecha_creacion'], name='pago_estado_fecha_idx'),
+            # Historial de pagos de un usuario
+            models.Index(fields=['usuario', 'fecha_creacion'], name='pago_usuario_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"Pago {self.transaction_id} - ${self.monto}"
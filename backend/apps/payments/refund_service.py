@@ -0,0 +1,138 @@
+"""
+Servicio de reembolsos por cancelación de rifa.
+
+Los pagos de la rifa se resuelven con la tabla intermedia Payment.boletos
+(un pago cubre uno o más boletos de la misma compra) y se procesan por
+lotes de pagos, cada uno en su transacción y con un número fijo de
+consultas sin importar su tamaño:
+    - SELECT ... FOR UPDATE de los pagos 'completado' del lote
+    - bulk_create de los Refund y de las entradas del AuditLog
+    - UPDATE del estado de los pagos y de sus boletos 'pagado'
+
+Un lote confirmado ya no vuelve a aparecer (sus pagos quedan
+'reembolsado'), así que si el proceso se interrumpe basta con ejecutarlo de
+nuevo para continuar. Los pagos que ya tenían un Refund (p. ej. solicitado
+por el usuario) se omiten y se informan para revisión manual.
+
+Como update() y bulk_create no emiten señales, las métricas y la caché de
+la rifa se actualizan explícitamente.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.admin_panel import metrics
+from apps.admin_panel.models import AuditLog
+from apps.raffles import cache_service
+from apps.raffles.models import Raffle, Ticket
+from apps.users.models import User
+from .models import Payment, Refund
+
+TAMANO_LOTE = 500
+
+
+def pagos_de_rifa(rifa_id):
+    """Pagos con al menos un boleto de la rifa (subconsulta, sin JOIN ni DISTINCT)"""
+    pago_ids = Payment.boletos.through.objects.filter(ticket__rifa_id=rifa_id).values('payment_id')
+    return Payment.objects.filter(id__in=pago_ids)
+
+def pagos_pendientes(rifa_id):
+    """Pagos completados de la rifa que todavía no tienen reembolso"""
+    return pagos_de_rifa(rifa_id).filter(estado='completado').exclude(
+        id__in=Refund.objects.values('pago_id')
+    )
+
+def reembolsar_rifa(rifa_id, procesado_por_id=None, comentarios='', tamano_lote=TAMANO_LOTE, progreso=None):
+    """
+    Reembolsa todos los pagos completados de una rifa cancelada.
+
+    Args:
+        rifa_id (int): Rifa cancelada
+        procesado_por_id (int): Administrador que ordenó la cancelación
+        comentarios (str): Motivo, se copia a los reembolsos y pagos
+        tamano_lote (int): Pagos por transacción
+        progreso (callable): Se llama con el resultado parcial tras cada lote
+
+    Returns:
+        dict: {'total_pagos', 'pagos', 'boletos', 'monto',
+               'con_reembolso_previo', 'boletos_sin_pago'}
+    """
+    rifa = Raffle.objects.only('id', 'titulo', 'estado', 'precio_boleto').get(pk=rifa_id)
+    resultado = {
+        'total_pagos': pagos_pendientes(rifa_id).count(),
+        'pagos': 0,
+        'boletos': 0,
+        'monto': Decimal('0'),
+        'con_reembolso_previo': 0,
+        'boletos_sin_pago': 0,
+    }
+
+    while True:
+        pagos, boletos, monto = _reembolsar_lote(rifa, procesado_por_id, comentarios, tamano_lote)
+        if not pagos:
+            break
+        resultado['pagos'] += pagos
+        resultado['boletos'] += boletos
+        resultado['monto'] += monto
+        if progreso:
+            progreso(resultado)
+
+    resultado['con_reembolso_previo'] = pagos_de_rifa(rifa_id).filter(
+        estado='completado', reembolso__isnull=False
+    ).count()
+    resultado['boletos_sin_pago'] = Ticket.objects.filter(rifa_id=rifa_id, estado='pagado').count()
+    return resultado
+
+def _reembolsar_lote(rifa, procesado_por_id, comentarios, tamano_lote):
+    """Procesa un lote de pagos. Retorna (pagos, boletos, monto)"""
+    ahora = timezone.now()
+    with transaction.atomic():
+        lote = list(
+            pagos_pendientes(rifa.pk).select_for_update().order_by('id').values(
+                'id', 'usuario_id', *metrics.CAMPOS_RASTREADOS[Payment]
+            )[:tamano_lote]
+        )
+        if not lote:
+            return 0, 0, Decimal('0')
+        pago_ids = [pago['id'] for pago in lote]
+        emails = dict(User.objects.filter(id__in={pago['usuario_id'] for pago in lote}).values_list('id', 'email'))
+
+        Refund.objects.bulk_create([
+            Refund(
+                pago_id=pago['id'],
+                procesado_por_id=procesado_por_id,
+                motivo='cancelacion',
+                razon=f'Reembolso automático por cancelación de rifa. Motivo: {comentarios[:100]}',
+                monto=pago['monto'],
+                estado='completado',
+                fecha_procesado=ahora,
+            )
+            for pago in lote
+        ])
+        Payment.objects.filter(id__in=pago_ids).update(
+            estado='reembolsado',
+            notas_admin=f'Reembolso automático por cancelación de rifa #{rifa.id}. {comentarios[:50]}',
+        )
+        boletos = Ticket.objects.filter(
+            rifa_id=rifa.pk, estado='pagado', pagos__id__in=pago_ids
+        ).update(estado='cancelado')
+
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                usuario_id=procesado_por_id,
+                accion='reembolso_automatico',
+                modelo='Payment',
+                objeto_id=pago['id'],
+                descripcion=f'Reembolso automático de ${pago["monto"]} a {emails.get(pago["usuario_id"], "")} por cancelación de rifa "{rifa.titulo}"'
+            )
+            for pago in lote
+        ])
+
+        monto = sum((pago['monto'] for pago in lote), Decimal('0'))
+        metrics.registrar_pagos(lote, 'reembolsado')
+        metrics.registrar_reembolsos('completado', monto)
+        metrics.registrar_boletos(rifa, 'pagado', 'cancelado', boletos)
+        cache_service.invalidar_rifa(rifa.pk)
+
+    return len(lote), boletos, monto
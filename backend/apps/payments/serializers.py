@@ -4,6 +4,7 @@ Maneja conversión de modelos de pagos y reembolsos a JSON.
 """
 
 from rest_framework import serializers
+from django.db.models import Count
 from .models import Payment, Refund
 
 
@@ -54,9 +55,15 @@ class PaymentListSerializer(serializers.ModelSerializer):
             'estado', 'fecha_creacion', 'cantidad_boletos'
         ]
     
+    @staticmethod
+    def anotar(queryset):
+        """Agrega los totales que lee el serializer (una consulta por página)"""
+        return queryset.select_related('usuario').annotate(num_boletos=Count('boletos'))
+
     def get_cantidad_boletos(self, obj):
-        """Cuenta la cantidad de boletos"""
-        return obj.boletos.count()
+        """Cantidad de boletos (anotada por anotar(); si falta, se cuenta)"""
+        cantidad = getattr(obj, 'num_boletos', None)
+        return obj.boletos.count() if cantidad is None else cantidad
 
 
 class PaymentCreateSerializer(serializers.ModelSerializer):
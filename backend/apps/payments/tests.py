@@ -1,3 +1,238 @@
-from django.test import TestCase
+import io
+import uuid
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection, IntegrityError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.admin_panel.models import AuditLog
+from apps.core.encryption import hash_sensitive_data
+
+from apps.raffles.models import Raffle, Ticket
+from apps.users.models import User
+from .models import Payment, Refund
+from .refund_service import reembolsar_rifa, _reembolsar_lote
+
+
+class ConsultasApiPagosTests(APITestCase):
+    """
+    Los endpoints de pagos y reembolsos hacen un número fijo de consultas
+    sin importar cuántos pagos (ni boletos por pago) serializan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.usuario = User.objects.create_user(email='part@test.cl', nombre='Participante', password=None)
+        cls.admin = User.objects.create_user(
+            email='admin@test.cl', nombre='Admin', password=None, rol='admin', is_staff=True
+        )
+        cls.rifas = [
+            Raffle.objects.create(
+                organizador=organizador, titulo=f'Rifa {i}', descripcion='Rifa de prueba',
+                premio_principal='Premio', precio_boleto=1000, total_boletos=1000,
+                fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+        self.numero = 0
+
+    def crear_pago(self, boletos=3):
+        """Pago con boletos de las dos rifas"""
+        tickets = []
+        for n in range(boletos):
+            self.numero += 1
+            tickets.append(Ticket.objects.create(
+                rifa=self.rifas[n % 2], usuario=self.usuario, numero_boleto=self.numero,
+                codigo_qr=str(uuid.uuid4()), estado='pagado'
+            ))
+        pago = Payment.objects.create(
+            usuario=self.usuario, monto=1000 * boletos, metodo_pago='tarjeta',
+            estado='completado', transaction_id=f'TX-{uuid.uuid4()}'
+        )
+        pago.boletos.set(tickets)
+        return pago
+
+    def assertConsultasFijas(self, url, crear, consultas):
+        """Mismo número de consultas con 2 y con 8 registros creados por crear()"""
+        for cantidad in (2, 6):
+            for _ in range(cantidad):
+                crear()
+            with self.assertNumQueries(consultas):
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+
+    def test_listado_pagos(self):
+        self.assertConsultasFijas('/api/payments/', self.crear_pago, 1)
+
+    def test_mis_pagos(self):
+        self.client.force_authenticate(self.usuario)
+        self.assertConsultasFijas('/api/payments/mis_pagos/', self.crear_pago, 1)
+
+    def test_detalle_pago(self):
+        pago = self.crear_pago(boletos=2)
+        crear = lambda: pago.boletos.add(self.crear_pago(boletos=1).boletos.get())
+        self.assertConsultasFijas(f'/api/payments/{pago.pk}/', crear, 2)
+
+    def test_listado_reembolsos(self):
+        crear = lambda: Refund.objects.create(
+            pago=self.crear_pago(boletos=1), monto=1000, motivo='otro', razon='Prueba'
+        )
+        self.assertConsultasFijas('/api/refunds/', crear, 2)
+
+    def test_cantidad_boletos_anotada(self):
+        self.crear_pago(boletos=3)
+        self.crear_pago(boletos=1)
+        respuesta = self.client.get('/api/payments/')
+        self.assertEqual(sorted(p['cantidad_boletos'] for p in respuesta.data['results']), [1, 3])
+
+
+class IndiceCiegoTests(TestCase):
+    """Búsqueda exacta de transaction_id mediante su HMAC (transaction_id_hash)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(email='ciego@test.cl', nombre='Ciego', password=None)
+
+    def crear_pago(self, transaction_id):
+        return Payment.objects.create(usuario=self.usuario, monto=1000, metodo_pago='tarjeta',
+                                      estado='completado', transaction_id=transaction_id)
+
+    def test_busqueda_por_texto_plano(self):
+        pago = self.crear_pago('TXN-ABC123')
+        self.crear_pago('TXN-OTRO')
+        self.assertEqual(Payment.objects.get(transaction_id_hash='TXN-ABC123'), pago)
+        self.assertEqual(Payment.objects.get(transaction_id_hash__iexact='TXN-ABC123'), pago)
+        self.assertFalse(Payment.objects.filter(transaction_id_hash='TXN-NOEXISTE').exists())
+        guardado = Payment.objects.values_list('transaction_id_hash', flat=True).get(pk=pago.pk)
+        self.assertEqual(guardado, hash_sensitive_data('TXN-ABC123'))
+        self.assertNotIn('TXN-ABC123', guardado)
+
+    def test_transaction_id_unico(self):
+        self.crear_pago('TXN-DUP')
+        with self.assertRaises(IntegrityError):
+            self.crear_pago('TXN-DUP')
+
+    def test_hash_se_actualiza_al_cambiar_el_origen(self):
+        pago = self.crear_pago('TXN-VIEJO')
+        pago.transaction_id = 'TXN-NUEVO'
+        pago.save()
+        self.assertEqual(Payment.objects.get(transaction_id_hash='TXN-NUEVO'), pago)
+        self.assertFalse(Payment.objects.filter(transaction_id_hash='TXN-VIEJO').exists())
+
+    def test_guardar_sin_leer_no_desencripta(self):
+        pago = Payment.objects.get(pk=self.crear_pago('TXN-LAZY').pk)
+        pago.notas_admin = 'Revisado'
+        pago.save()
+        self.assertEqual(Payment.objects.get(transaction_id_hash='TXN-LAZY'), pago)
+
+    def test_backfill_completa_hashes_vacios(self):
+        pagos = [self.crear_pago(f'TXN-{n}') for n in range(5)]
+        Payment.objects.update(transaction_id_hash=None)
+        salida = io.StringIO()
+        call_command('backfill_blind_indexes', modelo='payments.Payment', lote=2, stdout=salida)
+        self.assertIn('5 fila(s) actualizadas', salida.getvalue())
+        for n, pago in enumerate(pagos):
+            self.assertEqual(Payment.objects.get(transaction_id_hash=f'TXN-{n}'), pago)
+
+    def test_backfill_todos_recalcula_con_clave_nueva(self):
+        pago = self.crear_pago('TXN-ROTAR')
+        with override_settings(BLIND_INDEX_KEY='otra-clave-de-indice'):
+            self.assertFalse(Payment.objects.filter(transaction_id_hash='TXN-ROTAR').exists())
+            salida = io.StringIO()
+            call_command('backfill_blind_indexes', modelo='payments.Payment', stdout=salida)
+            self.assertIn('0 fila(s) actualizadas', salida.getvalue())
+            call_command('backfill_blind_indexes', modelo='payments.Payment', todos=True, stdout=salida)
+            self.assertEqual(Payment.objects.get(transaction_id_hash='TXN-ROTAR'), pago)
+
+
+class ReembolsosRifaTests(TestCase):
+    """refund_service: reembolsos por lotes y continuación tras una ejecución parcial"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.comprador = User.objects.create_user(email='comprador@test.cl', nombre='Comprador', password=None)
+        cls.admin = User.objects.create_user(email='admin@test.cl', nombre='Admin', password=None, rol='admin')
+        cls.rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='cancelada',
+        )
+        cls.numero = 0
+        # 6 pagos de 2 boletos, 1 pago con reembolso previo y 1 boleto pagado sin pago
+        cls.pagos = [cls.crear_pago(2) for _ in range(6)]
+        cls.con_reembolso = cls.crear_pago(2)
+        Refund.objects.create(pago=cls.con_reembolso, monto=2000, motivo='otro', razon='Solicitado por el usuario')
+        cls.crear_boleto()
+
+    @classmethod
+    def crear_boleto(cls):
+        cls.numero += 1
+        return Ticket.objects.create(rifa=cls.rifa, usuario=cls.comprador, numero_boleto=cls.numero,
+                                     codigo_qr=str(uuid.uuid4()), estado='pagado')
+
+    @classmethod
+    def crear_pago(cls, boletos):
+        pago = Payment.objects.create(usuario=cls.comprador, monto=1000 * boletos, metodo_pago='tarjeta',
+                                      estado='completado', transaction_id=f'TXN-{uuid.uuid4().hex}')
+        pago.boletos.set([cls.crear_boleto() for _ in range(boletos)])
+        return pago
+
+    def test_reembolsa_por_lotes(self):
+        avances = []
+
+        resultado = reembolsar_rifa(self.rifa.pk, procesado_por_id=self.admin.pk, comentarios='Cancelada',
+                                    tamano_lote=4, progreso=lambda r: avances.append(r['pagos']))
+
+        self.assertEqual(avances, [4, 6])
+        self.assertEqual(resultado['total_pagos'], 6)
+        self.assertEqual((resultado['pagos'], resultado['boletos'], resultado['monto']), (6, 12, 12000))
+        self.assertEqual(resultado['con_reembolso_previo'], 1)
+        # Los 2 boletos del pago con reembolso previo y el boleto sin pago
+        self.assertEqual(resultado['boletos_sin_pago'], 3)
+        self.assertEqual(Payment.objects.filter(pk__in=[p.pk for p in self.pagos], estado='reembolsado').count(), 6)
+        self.assertEqual(Refund.objects.filter(motivo='cancelacion', procesado_por=self.admin).count(), 6)
+        self.assertEqual(Payment.objects.get(pk=self.con_reembolso.pk).estado, 'completado')
+        self.assertEqual(AuditLog.objects.filter(accion='reembolso_automatico').count(), 6)
+
+    def test_consultas_por_lote_no_dependen_del_tamano(self):
+        rifa = Raffle.objects.get(pk=self.rifa.pk)
+        with CaptureQueriesContext(connection) as lote_chico:
+            self.assertEqual(_reembolsar_lote(rifa, self.admin.pk, '', 1)[0], 1)
+        with CaptureQueriesContext(connection) as lote_grande:
+            self.assertEqual(_reembolsar_lote(rifa, self.admin.pk, '', 5)[0], 5)
+
+        self.assertEqual(len(lote_chico), len(lote_grande))
+
+    def test_continua_tras_ejecucion_parcial(self):
+        class Interrumpido(Exception):
+            pass
+
+        def interrumpir(resultado):
+            raise Interrumpido()
+
+        # El proceso se detiene después de confirmar el primer lote
+        with self.assertRaises(Interrumpido):
+            reembolsar_rifa(self.rifa.pk, procesado_por_id=self.admin.pk, tamano_lote=4, progreso=interrumpir)
+        self.assertEqual(Refund.objects.filter(motivo='cancelacion').count(), 4)
+
+        resultado = reembolsar_rifa(self.rifa.pk, procesado_por_id=self.admin.pk, tamano_lote=4)
+
+        self.assertEqual((resultado['total_pagos'], resultado['pagos'], resultado['boletos']), (2, 2, 4))
+        reembolsos = Refund.objects.filter(motivo='cancelacion')
+        self.assertEqual(reembolsos.count(), 6)
+        self.assertEqual(set(reembolsos.values_list('pago_id', flat=True)), {p.pk for p in self.pagos})
+        self.assertEqual(AuditLog.objects.filter(accion='reembolso_automatico').count(), 6)
+        self.assertFalse(Ticket.objects.filter(pagos__in=self.pagos, estado='pagado').exists())
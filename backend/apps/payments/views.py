@@ -21,11 +21,16 @@ from django.contrib import messages
 from django.conf import settings
 # - Acceso a configuraciones del proyecto (settings.py)
 
+from django.db import transaction
+# - Transacciones atómicas (bloqueo de boletos durante el pago)
+
 # === IMPORTACIONES DE MODELOS ===
 from apps.raffles.models import Ticket
 # - Modelo Ticket para validar boletos reservados
 
 from .models import Payment
+from apps.admin_panel import metrics as metricas
+from apps.raffles import cache_service, live_events
 # - Modelo Payment para registrar transacciones
 
 # === SEGURIDAD ===
@@ -107,47 +112,65 @@ def process_payment_view(request, ticket_ids):
             transaction_id = f"TXN-{uuid.uuid4().hex[:12].upper()}"
             logger.info(f"Transaction ID generado: {transaction_id}")
 
-            # === PASO 7: CREAR REGISTRO DE PAGO ===
-            payment = Payment.objects.create(
-                usuario=request.user,
-                monto=total_amount,
-                metodo_pago=metodo_pago,
-                transaction_id=transaction_id,
-                estado='procesando'
-            )
-            logger.info(f"Payment creado con ID: {payment.id}")
-
-            # === PASO 8: ASOCIAR BOLETOS AL PAGO ===
-            payment.boletos.set(tickets)
-            logger.info(f"Boletos asociados al pago")
-
-            # === PASO 9: SIMULAR PAYMENT INTENT ===
-            simulated_payment_id = f"pi_{uuid.uuid4().hex[:16]}"
-            try:
-                payment.payment_intent_id = simulated_payment_id
-                logger.info(f"Payment intent ID asignado")
-            except Exception as e:
-                logger.warning(f"No se pudo asignar payment_intent_id: {str(e)}")
-
-            # === MARCAR PAGO COMO COMPLETADO ===
-            payment.estado = 'completado'
-            payment.save()
-            logger.info(f"Payment marcado como completado")
-
-            # === ACTUALIZAR ESTADO DE BOLETOS ===
-            tickets.update(estado='pagado')
-            logger.info(f"Tickets actualizados a estado 'pagado'")
+            # === BLOQUEAR BOLETOS RESERVADOS ===
+            # select_for_update() evita que expirar_reservas elimine la reserva
+            # mientras se paga; si ya expiró, el boleto no aparece aquí
+            with transaction.atomic():
+                tickets_a_pagar = list(tickets.select_for_update())
+                if len(tickets_a_pagar) != len(ticket_id_list):
+                    messages.error(request, 'Tu reserva expiró. Por favor, vuelve a comprar tus boletos.')
+                    return redirect('raffles:list')
+                total_amount = sum(ticket.rifa.precio_boleto for ticket in tickets_a_pagar)
+
+                # === PASO 7: CREAR REGISTRO DE PAGO ===
+                payment = Payment.objects.create(
+                    usuario=request.user,
+                    monto=total_amount,
+                    metodo_pago=metodo_pago,
+                    transaction_id=transaction_id,
+                    estado='procesando'
+                )
+                logger.info(f"Payment creado con ID: {payment.id}")
+
+                # === PASO 8: ASOCIAR BOLETOS AL PAGO ===
+                payment.boletos.set(tickets_a_pagar)
+                logger.info(f"Boletos asociados al pago")
+
+                # === PASO 9: SIMULAR PAYMENT INTENT ===
+                simulated_payment_id = f"pi_{uuid.uuid4().hex[:16]}"
+                try:
+                    payment.payment_intent_id = simulated_payment_id
+                    logger.info(f"Payment intent ID asignado")
+                except Exception as e:
+                    logger.warning(f"No se pudo asignar payment_intent_id: {str(e)}")
+
+                # === MARCAR PAGO COMO COMPLETADO ===
+                payment.estado = 'completado'
+                payment.save()
+                logger.info(f"Payment marcado como completado")
+
+                # === ACTUALIZAR ESTADO DE BOLETOS ===
+                Ticket.objects.filter(id__in=[t.id for t in tickets_a_pagar]).update(estado='pagado')
+                # update() no emite señales: registrar en las métricas por rifa
+                por_rifa = {}
+                for ticket in tickets_a_pagar:
+                    por_rifa.setdefault(ticket.rifa_id, [ticket.rifa, 0])[1] += 1
+                for rifa, cantidad in por_rifa.values():
+                    metricas.registrar_boletos(rifa, 'reservado', 'pagado', cantidad)
+                    cache_service.invalidar_rifa(rifa.pk)
+                    live_events.publicar_ventas(rifa.pk)
+                logger.info(f"Tickets actualizados a estado 'pagado'")
 
             # === CREAR NOTIFICACIÓN ===
             try:
                 from apps.users.models import Notification
-                primera_rifa = tickets.first().rifa
+                primera_rifa = tickets_a_pagar[0].rifa
                 
                 notif = Notification.objects.create(
                     usuario=request.user,
                     tipo='compra',
                     titulo='Compra de boletos exitosa',
-                    mensaje=f'Has comprado {tickets.count()} boleto(s) para la rifa "{primera_rifa.titulo}". Total: CLP${total_amount:,.0f}',
+                    mensaje=f'Has comprado {len(tickets_a_pagar)} boleto(s) para la rifa "{primera_rifa.titulo}". Total: CLP${total_amount:,.0f}',
                     enlace=f'/raffles/{primera_rifa.id}/',
                     rifa_relacionada=primera_rifa
                 )
@@ -8,6 +8,14 @@ class RaffleAdmin(admin.ModelAdmin):
     search_fields = ['titulo', 'organizador__nombre']
     readonly_fields = ['boletos_vendidos', 'fecha_creacion', 'fecha_actualizacion']
 
+    def save_model(self, request, obj, form, change):
+        # Solo lo editado: un save completo reescribiría boletos_vendidos con
+        # el valor leído al abrir el formulario (las compras lo cambian con F())
+        if change:
+            obj.save(update_fields=[*form.changed_data, 'fecha_actualizacion'])
+        else:
+            super().save_model(request, obj, form, change)
+
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
     list_display = ['rifa', 'numero_boleto', 'usuario', 'estado', 'fecha_compra']
@@ -7,22 +7,26 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Q, Sum, Count
+from django.db.models import Q, Sum, Count, Prefetch
 from django.shortcuts import get_object_or_404
-import random
-import hashlib
-import time
 
 from .models import Raffle, Ticket, SponsorshipRequest, OrganizerSponsorRequest, Winner
+from .purchase_service import comprar_boletos, CompraError
+from .draw_service import sortear, SorteoError
+from apps.admin_panel import metrics as metricas
+from apps.core.pagination import BoletoCursorPagination
+from apps.core.proyeccion import ProyeccionMixin
+from apps.core.serializacion import ListadoRapidoMixin
 from .serializers import (
     RaffleSerializer, RaffleListSerializer, RaffleCreateSerializer,
     TicketSerializer, TicketListSerializer,
+    RaffleListFastSerializer, TicketListFastSerializer,
     SponsorshipRequestSerializer, OrganizerSponsorRequestSerializer,
     WinnerSerializer, RaffleStatsSerializer
 )
 
 
-class RaffleViewSet(viewsets.ModelViewSet):
+class RaffleViewSet(ListadoRapidoMixin, ProyeccionMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión completa de rifas.
     
@@ -39,12 +43,17 @@ class RaffleViewSet(viewsets.ModelViewSet):
     - POST /api/raffles/{id}/rechazar/ - Rechazar rifa (admin)
     - POST /api/raffles/{id}/activar/ - Activar rifa
     - POST /api/raffles/{id}/pausar/ - Pausar rifa
+    - POST /api/raffles/{id}/comprar/ - Reservar boletos
     - POST /api/raffles/{id}/realizar_sorteo/ - Realizar sorteo
     - GET /api/raffles/stats/ - Estadísticas generales
+    
+    Las lecturas aceptan ?fields=a,b / ?omit=c (apps.core.proyeccion).
+    Sin ellos, los listados usan RaffleListFastSerializer (apps.core.serializacion).
     """
     
     queryset = Raffle.objects.all()
     serializer_class = RaffleSerializer
+    serializer_rapido = RaffleListFastSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
     def get_serializer_class(self):
@@ -84,6 +93,14 @@ class RaffleViewSet(viewsets.ModelViewSet):
                 Q(premio_principal__icontains=search)
             )
         
+        # Relaciones que lee el serializer de cada acción (sin consultas por fila)
+        queryset = queryset.select_related('organizador')
+        if self.action not in ('list', 'create') and self.incluye_campo('boletos'):
+            # RaffleSerializer anida los boletos: una sola consulta para todos
+            queryset = queryset.prefetch_related(Prefetch(
+                'boletos',
+                queryset=Ticket.objects.only('id', 'rifa_id', 'numero_boleto', 'estado', 'fecha_compra'),
+            ))
         return queryset
     
     def perform_create(self, serializer):
@@ -93,15 +110,21 @@ class RaffleViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def activas(self, request):
         """Retorna rifas activas"""
-        rifas = Raffle.objects.filter(estado='activa')
-        serializer = RaffleListSerializer(rifas, many=True)
+        rifas = Raffle.objects.filter(estado='activa').select_related('organizador')
+        if self.usa_serializer_rapido():
+            return self.listar_rapido(rifas, paginar=False)
+        rifas = self.proyectar(rifas, RaffleListSerializer)
+        serializer = RaffleListSerializer(rifas, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def mis_rifas(self, request):
         """Retorna rifas del usuario actual"""
-        rifas = Raffle.objects.filter(organizador=request.user)
-        serializer = RaffleListSerializer(rifas, many=True)
+        rifas = Raffle.objects.filter(organizador=request.user).select_related('organizador')
+        if self.usa_serializer_rapido():
+            return self.listar_rapido(rifas, paginar=False)
+        rifas = self.proyectar(rifas, RaffleListSerializer)
+        serializer = RaffleListSerializer(rifas, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -121,7 +144,7 @@ class RaffleViewSet(viewsets.ModelViewSet):
         
         rifa.estado = 'pendiente_aprobacion'
         rifa.fecha_solicitud = timezone.now()
-        rifa.save()
+        rifa.save(update_fields=['estado', 'fecha_solicitud', 'fecha_actualizacion'])
         
         return Response({
             'message': 'Rifa enviada para aprobación.',
@@ -142,7 +165,7 @@ class RaffleViewSet(viewsets.ModelViewSet):
         rifa.revisado_por = request.user
         rifa.fecha_revision_aprobacion = timezone.now()
         rifa.comentarios_revision = request.data.get('comentarios', '')
-        rifa.save()
+        rifa.save(update_fields=['estado', 'revisado_por', 'fecha_revision_aprobacion', 'comentarios_revision', 'fecha_actualizacion'])
         
         return Response({
             'message': 'Rifa aprobada exitosamente.',
@@ -169,7 +192,7 @@ class RaffleViewSet(viewsets.ModelViewSet):
         rifa.revisado_por = request.user
         rifa.fecha_revision_aprobacion = timezone.now()
         rifa.motivo_rechazo = motivo
-        rifa.save()
+        rifa.save(update_fields=['estado', 'revisado_por', 'fecha_revision_aprobacion', 'motivo_rechazo', 'fecha_actualizacion'])
         
         return Response({
             'message': 'Rifa rechazada.',
@@ -192,7 +215,7 @@ class RaffleViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         rifa.estado = 'activa'
-        rifa.save()
+        rifa.save(update_fields=['estado', 'fecha_actualizacion'])
         
         return Response({
             'message': 'Rifa activada exitosamente.',
@@ -218,13 +241,44 @@ class RaffleViewSet(viewsets.ModelViewSet):
         rifa.estado = 'pausada'
         rifa.motivo_pausa = motivo
         rifa.fecha_pausa = timezone.now()
-        rifa.save()
+        rifa.save(update_fields=['estado', 'motivo_pausa', 'fecha_pausa', 'fecha_actualizacion'])
         
         return Response({
             'message': 'Rifa pausada.',
             'rifa': RaffleSerializer(rifa).data
         })
     
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def comprar(self, request, pk=None):
+        """Reserva boletos de una rifa activa para el usuario autenticado"""
+        if request.user.rol == 'organizador':
+            return Response({
+                'error': 'Los organizadores no pueden comprar boletos de rifas.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            cantidad = int(request.data.get('cantidad', 1))
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'La cantidad de boletos debe ser un número entero.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            boletos = comprar_boletos(pk, request.user, cantidad)
+        except Raffle.DoesNotExist:
+            return Response({
+                'error': 'La rifa no existe o no está activa.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        except CompraError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': f'{len(boletos)} boleto(s) reservado(s). Completa el pago para confirmarlos.',
+            'boletos': TicketListSerializer(boletos, many=True).data
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def realizar_sorteo(self, request, pk=None):
         """Realiza el sorteo de una rifa"""
@@ -240,53 +294,14 @@ class RaffleViewSet(viewsets.ModelViewSet):
                 'error': 'Solo se pueden sortear rifas activas o cerradas.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar que haya boletos vendidos
-        boletos_pagados = Ticket.objects.filter(rifa=rifa, estado='pagado')
-        if not boletos_pagados.exists():
-            return Response({
-                'error': 'No hay boletos pagados para sortear.'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Verificar que no tenga ganador
-        if hasattr(rifa, 'ganador'):
+        # Sorteo verificable (ver draw_service)
+        try:
+            winner = sortear(rifa)
+        except SorteoError as e:
             return Response({
-                'error': 'Esta rifa ya tiene un ganador.'
+                'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Realizar sorteo
-        timestamp = int(time.time())
-        seed = hashlib.sha256(f"{rifa.id}{timestamp}".encode()).hexdigest()
-        random.seed(seed)
-        
-        boleto_ganador = random.choice(boletos_pagados)
-        boleto_ganador.estado = 'ganador'
-        boleto_ganador.save()
-        
-        # Crear registro de ganador
-        acta = f"""
-ACTA DIGITAL DE SORTEO
-Rifa: {rifa.titulo}
-Fecha: {timezone.now()}
-Algoritmo: SHA256 + Random Seed
-Seed Aleatorio: {seed}
-Timestamp: {timestamp}
-Total Participantes: {boletos_pagados.count()}
-Boleto Ganador: #{boleto_ganador.numero_boleto}
-Usuario Ganador: {boleto_ganador.usuario.nombre}
-        """
-        
-        winner = Winner.objects.create(
-            rifa=rifa,
-            boleto=boleto_ganador,
-            seed_aleatorio=seed,
-            timestamp_sorteo=timestamp,
-            participantes_totales=boletos_pagados.count(),
-            acta_digital=acta
-        )
-        
-        rifa.estado = 'finalizada'
-        rifa.save()
-        
         return Response({
             'message': 'Sorteo realizado exitosamente.',
             'winner': WinnerSerializer(winner).data
@@ -295,26 +310,22 @@ Usuario Ganador: {boleto_ganador.usuario.nombre}
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Retorna estadísticas generales de rifas"""
+        # Contadores materializados (ver apps.admin_panel.metrics)
+        m = metricas.leer()
         stats = {
-            'total_rifas': Raffle.objects.count(),
-            'rifas_activas': Raffle.objects.filter(estado='activa').count(),
-            'rifas_finalizadas': Raffle.objects.filter(estado='finalizada').count(),
-            'total_boletos_vendidos': Ticket.objects.filter(estado='pagado').count(),
-            'total_recaudado': Ticket.objects.filter(
-                estado='pagado'
-            ).aggregate(
-                total=Sum('rifa__precio_boleto')
-            )['total'] or 0,
-            'rifas_pendientes_aprobacion': Raffle.objects.filter(
-                estado='pendiente_aprobacion'
-            ).count()
+            'total_rifas': m['rifas.total'],
+            'rifas_activas': m['rifas.estado.activa'],
+            'rifas_finalizadas': m['rifas.estado.finalizada'],
+            'total_boletos_vendidos': m['boletos.estado.pagado'],
+            'total_recaudado': m['boletos.recaudado'],
+            'rifas_pendientes_aprobacion': m['rifas.estado.pendiente_aprobacion'],
         }
         
         serializer = RaffleStatsSerializer(stats)
         return Response(serializer.data)
 
 
-class TicketViewSet(viewsets.ReadOnlyModelViewSet):
+class TicketViewSet(ListadoRapidoMixin, ProyeccionMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para gestión de boletos (solo lectura via API).
     
@@ -322,11 +333,17 @@ class TicketViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /api/tickets/ - Lista de boletos
     - GET /api/tickets/{id}/ - Detalle de boleto
     - GET /api/tickets/mis_boletos/ - Boletos del usuario
+    
+    Las lecturas aceptan ?fields=a,b / ?omit=c (apps.core.proyeccion).
+    Sin ellos, el listado usa TicketListFastSerializer (apps.core.serializacion).
     """
     
     queryset = Ticket.objects.all()
     serializer_class = TicketSerializer
+    serializer_rapido = TicketListFastSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    # Cursor por (fecha_compra, id): páginas profundas sin OFFSET ni COUNT
+    pagination_class = BoletoCursorPagination
     
     def get_serializer_class(self):
         """Retorna serializer apropiado"""
@@ -353,13 +370,17 @@ class TicketViewSet(viewsets.ReadOnlyModelViewSet):
         if estado:
             queryset = queryset.filter(estado=estado)
         
+        # TicketListSerializer no lee relaciones; TicketSerializer sí
+        if self.action != 'list':
+            queryset = queryset.select_related('rifa', 'usuario')
         return queryset
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def mis_boletos(self, request):
         """Retorna boletos del usuario actual"""
-        boletos = Ticket.objects.filter(usuario=request.user)
-        serializer = TicketSerializer(boletos, many=True)
+        boletos = Ticket.objects.filter(usuario=request.user).select_related('rifa', 'usuario')
+        boletos = self.proyectar(boletos, TicketSerializer)
+        serializer = TicketSerializer(boletos, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
 
@@ -398,7 +419,7 @@ class SponsorshipRequestViewSet(viewsets.ModelViewSet):
         if estado:
             queryset = queryset.filter(estado=estado)
         
-        return queryset
+        return queryset.select_related('rifa', 'sponsor')
     
     def perform_create(self, serializer):
         """Asigna el sponsor al crear"""
@@ -409,7 +430,7 @@ class SponsorshipRequestViewSet(viewsets.ModelViewSet):
         """Acepta una solicitud de patrocinio (organizador)"""
         solicitud = self.get_object()
         
-        if solicitud.rifa.organizador != request.user:
+        if solicitud.rifa.organizador_id != request.user.id:
             return Response({
                 'error': 'Solo el organizador puede aceptar solicitudes.'
             }, status=status.HTTP_403_FORBIDDEN)
@@ -433,7 +454,7 @@ class SponsorshipRequestViewSet(viewsets.ModelViewSet):
         """Rechaza una solicitud de patrocinio (organizador)"""
         solicitud = self.get_object()
         
-        if solicitud.rifa.organizador != request.user:
+        if solicitud.rifa.organizador_id != request.user.id:
             return Response({
                 'error': 'Solo el organizador puede rechazar solicitudes.'
             }, status=status.HTTP_403_FORBIDDEN)
@@ -476,7 +497,7 @@ class OrganizerSponsorRequestViewSet(viewsets.ModelViewSet):
         elif user.rol == 'sponsor':
             queryset = queryset.filter(sponsor=user)
         
-        return queryset
+        return queryset.select_related('rifa', 'sponsor', 'organizador')
 
 
 class WinnerViewSet(viewsets.ReadOnlyModelViewSet):
@@ -488,6 +509,6 @@ class WinnerViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /api/winners/{id}/ - Detalle de ganador
     """
     
-    queryset = Winner.objects.all()
+    queryset = Winner.objects.select_related('rifa', 'boleto__usuario').order_by('-fecha_sorteo')
     serializer_class = WinnerSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
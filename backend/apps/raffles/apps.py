@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class RafflesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.raffles'
+
+    def ready(self):
+        # Caché de páginas públicas: invalidación por versión vía señales
+        from . import cache_service, live_events
+        cache_service.conectar_senales()
+        # Eventos en vivo (SSE): ventas, estado y ganador
+        live_events.conectar_senales()
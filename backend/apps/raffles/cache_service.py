@@ -0,0 +1,158 @@
+"""
+Caché de las páginas públicas de rifas.
+
+Cada rifa tiene un número de versión en la caché. Las claves de las páginas
+y fragmentos incluyen el id y la versión de las rifas que muestran, así que
+al cambiar una rifa basta con incrementar su versión: las entradas viejas
+dejan de leerse y expiran solas.
+
+La versión se incrementa (en on_commit) cuando:
+    - se guarda la rifa o su ganador (señales post_save)
+    - se crean, pagan o expiran boletos (llamadas explícitas en
+      purchase_service, reservation_service y process_payment_view, que
+      usan operaciones masivas sin señales)
+
+Solo se cachea la respuesta completa para visitantes anónimos sin mensajes
+pendientes y cuando el template no usó el token CSRF (que es por usuario).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.http import HttpResponse
+
+from .models import Raffle, Ticket, Winner
+
+
+def _clave_version(rifa_id):
+    return f'rifas:version:{rifa_id}'
+
+def _version_inicial():
+    # Si la versión se pierde (desalojo, reinicio de la caché) la nueva no
+    # coincide con ninguna anterior, así nunca se sirve una entrada vieja
+    return time.time_ns()
+
+def versiones(rifa_ids):
+    """
+    Retorna la versión actual de cada rifa.
+
+    Returns:
+        dict: {rifa_id: version}
+    """
+    claves = {_clave_version(rifa_id): rifa_id for rifa_id in rifa_ids}
+    guardadas = cache.get_many(list(claves))
+    resultado = {}
+    for clave, rifa_id in claves.items():
+        if clave not in guardadas:
+            cache.add(clave, _version_inicial(), None)
+            guardadas[clave] = cache.get(clave)
+        resultado[rifa_id] = guardadas[clave]
+    return resultado
+
+def version_rifa(rifa_id):
+    """Retorna la versión actual de una rifa"""
+    return versiones([rifa_id])[rifa_id]
+
+def _incrementar_version(rifa_id):
+    clave = _clave_version(rifa_id)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, _version_inicial(), None)
+
+def invalidar_rifa(rifa_id):
+    """
+    Invalida las páginas y fragmentos de una rifa al confirmar la transacción.
+
+    Antes del commit otro request podría volver a cachear los datos viejos
+    con la versión nueva.
+    """
+    transaction.on_commit(lambda: _incrementar_version(rifa_id))
+
+def firma(rifa_ids):
+    """Resume ids y versiones de un conjunto de rifas para usar en una clave"""
+    ids = list(rifa_ids)
+    actuales = versiones(ids)
+    texto = ','.join(f'{rifa_id}:{actuales[rifa_id]}' for rifa_id in ids)
+    return hashlib.md5(texto.encode()).hexdigest()
+
+
+# ============================================================================
+# RESPUESTAS ANÓNIMAS
+# ============================================================================
+
+def _ttl():
+    return getattr(settings, 'PUBLIC_PAGE_CACHE_TTL', 60)
+
+def es_cacheable(request):
+    """Solo GET/HEAD anónimos y sin mensajes pendientes de mostrar"""
+    if _ttl() <= 0 or request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # len() no marca los mensajes como leídos
+    return len(messages.get_messages(request)) == 0
+
+def respuesta_anonima(request, clave, generar, timeout=None):
+    """
+    Sirve desde caché la respuesta de una página pública para anónimos.
+
+    Args:
+        request: Request actual
+        clave (str | callable): Clave de la página (debe incluir ids y
+            versiones). Si es callable se evalúa solo cuando la página es
+            cacheable; si es o retorna None la respuesta no se cachea
+        generar (callable): Genera la respuesta si no está en caché
+        timeout (int): Segundos en caché (default PUBLIC_PAGE_CACHE_TTL)
+
+    Returns:
+        HttpResponse
+    """
+    if not es_cacheable(request):
+        return generar()
+    if callable(clave):
+        clave = clave()
+    if clave is None:
+        return generar()
+
+    clave = f'rifas:pagina:{clave}'
+    contenido = cache.get(clave)
+    if contenido is not None:
+        return HttpResponse(contenido)
+
+    response = generar()
+    if (response.status_code == 200 and not response.streaming
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')):
+        cache.set(clave, response.content, timeout or _ttl())
+    return response
+
+def fragmento(clave, generar, timeout=None):
+    """
+    Cachea un fragmento de datos (cualquier valor serializable con pickle).
+
+    A diferencia de respuesta_anonima se usa también para usuarios
+    autenticados: el fragmento no debe depender del usuario.
+    """
+    return cache.get_or_set(f'rifas:fragmento:{clave}', generar, timeout or _ttl())
+
+
+# ============================================================================
+# SEÑALES
+# ============================================================================
+
+def _al_guardar_rifa(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_rifa(instance.pk)
+
+def _al_guardar_relacionado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_rifa(instance.rifa_id)
+
+def conectar_senales():
+    post_save.connect(_al_guardar_rifa, sender=Raffle, dispatch_uid='cache_rifa_raffle')
+    post_save.connect(_al_guardar_relacionado, sender=Winner, dispatch_uid='cache_rifa_winner')
+    post_save.connect(_al_guardar_relacionado, sender=Ticket, dispatch_uid='cache_rifa_ticket')
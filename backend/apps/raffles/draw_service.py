@@ -0,0 +1,326 @@
+"""
+Sorteo verificable: único punto de entrada para elegir ganadores.
+
+Lo usan perform_raffle_draw, select_winner_view, RaffleViewSet.realizar_sorteo
+y admin_panel.force_winner_ajax a través de sortear().
+
+Algoritmo (ALGORITMO = 'SHA256+Digest'), sin cargar los boletos en memoria:
+    1. digest_participantes() recorre los ids de los boletos pagados en
+       orden (iterator) y los va sumando a un SHA-256: memoria constante.
+    2. La semilla es SHA-256 de timestamp|rifa|cantidad|digest, con el
+       timestamp en microsegundos.
+    3. indice_ganador() deriva de la semilla una posición en [0, cantidad)
+       con una instancia propia de random.Random (no toca el estado global).
+    4. boleto_en_posicion() trae solo esa fila (ORDER BY id OFFSET n LIMIT 1).
+
+verificar_sorteo() repite el cálculo a partir de los datos del Winner (ver
+el comando verify_draw). También reconoce los dos algoritmos anteriores,
+guardados como 'SHA256+Timestamp':
+    - vistas: semilla SHA-256 de timestamp|rifa|título|ids y random.choice
+      sobre los boletos ordenados por número.
+    - API (sin hash_verificacion): semilla SHA-256 de rifa+timestamp en
+      segundos y random.choice sobre los boletos ordenados por número.
+"""
+import hashlib
+import random
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.users.models import Notification
+from apps.users.notification_service import notificar_participantes
+from .models import Raffle, Ticket, Winner
+
+ALGORITMO = 'SHA256+Digest'
+ALGORITMO_ANTERIOR = 'SHA256+Timestamp'
+
+# Estados que participan del sorteo. 'ganador' solo existe en sorteos
+# anteriores de la API, que marcaban así el boleto ganador.
+ESTADOS_PARTICIPANTES = ('pagado', 'ganador')
+
+# Boletos que se leen por consulta al calcular el digest
+TAMANO_LOTE_DIGEST = 2000
+
+
+class SorteoError(Exception):
+    """No se puede realizar el sorteo (ya tiene ganador, sin boletos...)"""
+
+
+# ============================================================================
+# MOTOR
+# ============================================================================
+
+def boletos_participantes(rifa_id, hasta_id=None):
+    """Boletos participantes de la rifa en el orden del sorteo (por id)"""
+    boletos = Ticket.objects.filter(rifa_id=rifa_id, estado__in=ESTADOS_PARTICIPANTES)
+    if hasta_id is not None:
+        boletos = boletos.filter(id__lte=hasta_id)
+    return boletos.order_by('id')
+
+def _recorrer_ids(rifa_id, limite=None):
+    ids = boletos_participantes(rifa_id).values_list('id', flat=True)
+    if limite is not None:
+        ids = ids[:limite]
+    return ids.iterator(chunk_size=TAMANO_LOTE_DIGEST)
+
+def digest_participantes(rifa_id, limite=None):
+    """
+    SHA-256 de los ids de los boletos participantes, calculado en streaming.
+
+    Args:
+        rifa_id (int): Rifa
+        limite (int): Considerar solo los primeros N boletos (al verificar,
+            los que existían al momento del sorteo)
+
+    Returns:
+        tuple: (digest hexadecimal, cantidad de boletos, último id)
+    """
+    digest = hashlib.sha256()
+    cantidad = 0
+    ultimo_id = None
+    for ticket_id in _recorrer_ids(rifa_id, limite):
+        digest.update(f'{ticket_id},'.encode())
+        cantidad += 1
+        ultimo_id = ticket_id
+    return digest.hexdigest(), cantidad, ultimo_id
+
+def calcular_semilla(timestamp, rifa_id, cantidad, digest):
+    return hashlib.sha256(f'{timestamp}|{rifa_id}|{cantidad}|{digest}'.encode()).hexdigest()
+
+def indice_ganador(semilla, cantidad):
+    """Posición ganadora en [0, cantidad) derivada de la semilla (función pura)"""
+    return random.Random(int(semilla, 16)).randrange(cantidad)
+
+def boleto_en_posicion(rifa_id, indice, hasta_id=None, orden='id'):
+    """Trae solo el boleto en la posición indicada (una fila, vía OFFSET)"""
+    boletos = boletos_participantes(rifa_id, hasta_id).order_by(orden)
+    return boletos.select_related('usuario')[indice]
+
+def calcular_hash_verificacion(semilla, timestamp, boleto):
+    texto = f'{semilla}|{timestamp}|{boleto.id}|{boleto.numero_boleto}'
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+def generar_sorteo(raffle):
+    """
+    Calcula el resultado del sorteo de una rifa (no crea el Winner).
+
+    Returns:
+        dict | None: None si no hay boletos pagados. Si no:
+            winning_ticket, seed_aleatorio, timestamp_sorteo (µs),
+            hash_verificacion, participantes_totales, digest_participantes,
+            algoritmo, acta_digital
+    """
+    # Microsegundos: el momento exacto no se puede predecir
+    timestamp = time.time_ns() // 1000
+    digest, cantidad, ultimo_id = digest_participantes(raffle.pk)
+    if cantidad == 0:
+        return None
+
+    semilla = calcular_semilla(timestamp, raffle.pk, cantidad, digest)
+    # Acotar a los boletos del digest por si se paga uno nuevo mientras tanto
+    ganador = boleto_en_posicion(raffle.pk, indice_ganador(semilla, cantidad), hasta_id=ultimo_id)
+    hash_verificacion = calcular_hash_verificacion(semilla, timestamp, ganador)
+
+    acta = f"""ACTA DIGITAL DE SORTEO - {raffle.titulo}
+ID Rifa: {raffle.id}
+Fecha sorteo: {timezone.now().strftime('%d/%m/%Y %H:%M:%S')}
+Timestamp: {timestamp}
+Participantes: {cantidad}
+Algoritmo: {ALGORITMO}
+Digest participantes: {digest}
+Semilla: {semilla}
+Hash Verificación: {hash_verificacion}
+Ganador: {ganador.usuario.nombre} - Boleto #{ganador.numero_boleto}
+"""
+
+    return {
+        'winning_ticket': ganador,
+        'seed_aleatorio': semilla,
+        'timestamp_sorteo': timestamp,
+        'hash_verificacion': hash_verificacion,
+        'participantes_totales': cantidad,
+        'digest_participantes': digest,
+        'algoritmo': ALGORITMO,
+        'acta_digital': acta,
+    }
+
+
+# ============================================================================
+# SORTEO
+# ============================================================================
+
+def sortear(raffle):
+    """
+    Realiza el sorteo, registra el Winner, finaliza la rifa y notifica.
+
+    Bloquea la fila de la rifa: dos sorteos simultáneos de la misma rifa
+    no pueden crear dos ganadores. La rifa se relee bajo el bloqueo y solo
+    se guarda su estado: `raffle` puede estar desactualizada (p. ej.
+    boletos_vendidos) y un save() completo pisaría las ventas concurrentes.
+
+    Raises:
+        SorteoError: La rifa ya tiene ganador o no tiene boletos pagados
+
+    Returns:
+        Winner
+    """
+    with transaction.atomic():
+        rifa = Raffle.objects.select_for_update().get(pk=raffle.pk)
+        if Winner.objects.filter(rifa_id=rifa.pk).exists():
+            raise SorteoError('Esta rifa ya tiene un ganador')
+
+        resultado = generar_sorteo(rifa)
+        if resultado is None:
+            raise SorteoError('No hay boletos pagados para sortear')
+        ganador = resultado['winning_ticket']
+
+        winner = Winner.objects.create(
+            rifa=rifa,
+            boleto=ganador,
+            verificado=False,
+            premio_entregado=False,
+            seed_aleatorio=resultado['seed_aleatorio'],
+            timestamp_sorteo=resultado['timestamp_sorteo'],
+            hash_verificacion=resultado['hash_verificacion'],
+            participantes_totales=resultado['participantes_totales'],
+            digest_participantes=resultado['digest_participantes'],
+            acta_digital=resultado['acta_digital'],
+            algoritmo=resultado['algoritmo'],
+        )
+
+        rifa.estado = 'finalizada'
+        rifa.save(update_fields=['estado', 'fecha_actualizacion'])
+
+        _notificar(rifa, ganador)
+
+    # Quien llamó sigue usando su instancia (respuesta, plantilla)
+    raffle.estado = rifa.estado
+    raffle.fecha_actualizacion = rifa.fecha_actualizacion
+
+    return winner
+
+def _notificar(raffle, ganador):
+    """
+    Notifica al ganador y al resto de los participantes.
+
+    Los participantes se notifican al confirmar el sorteo; en rifas grandes
+    en segundo plano.
+    """
+    Notification.objects.create(
+        usuario=ganador.usuario,
+        tipo='ganador',
+        titulo='🎉 ¡Felicidades! Has ganado',
+        mensaje=f'¡Felicitaciones! Has ganado el sorteo "{raffle.titulo}". Premio: {raffle.premio_principal}',
+        enlace=f'/raffles/{raffle.id}/',
+        rifa_relacionada=raffle
+    )
+
+    # Un INSERT por lote de destinatarios (ver notification_service)
+    notificar_participantes(
+        raffle,
+        tipo='sorteo',
+        titulo=f'Sorteo finalizado: {raffle.titulo}',
+        mensaje=f'El sorteo ha finalizado. El ganador es {ganador.usuario.nombre}.',
+        enlace=f'/raffles/{raffle.id}/',
+        estados=ESTADOS_PARTICIPANTES,
+        excluir=ganador.usuario_id,
+    )
+
+
+# ============================================================================
+# VERIFICACIÓN
+# ============================================================================
+
+def verificar_sorteo(winner):
+    """
+    Repite el sorteo de un Winner con memoria constante.
+
+    Solo considera los primeros participantes_totales boletos (por id): las
+    ventas posteriores al sorteo no afectan la verificación.
+
+    Returns:
+        dict: {'valido': bool, 'algoritmo': str, 'boleto_calculado': Ticket | None,
+               'comprobaciones': [(descripción, ok), ...]}
+    """
+    if winner.algoritmo == ALGORITMO:
+        return _verificar_digest(winner)
+    if winner.hash_verificacion:
+        return _verificar_anterior_vistas(winner)
+    return _verificar_anterior_api(winner)
+
+def _resultado(winner, algoritmo, comprobaciones, boleto):
+    if boleto is not None:
+        comprobaciones.append(('Boleto ganador', boleto.pk == winner.boleto_id))
+    else:
+        comprobaciones.append(('Boleto ganador', False))
+    return {
+        'valido': all(ok for _, ok in comprobaciones),
+        'algoritmo': algoritmo,
+        'boleto_calculado': boleto,
+        'comprobaciones': comprobaciones,
+    }
+
+def _verificar_digest(winner):
+    rifa_id = winner.rifa_id
+    n = winner.participantes_totales or 0
+    digest, cantidad, ultimo_id = digest_participantes(rifa_id, limite=n)
+    semilla = calcular_semilla(winner.timestamp_sorteo, rifa_id, cantidad, digest)
+    comprobaciones = [
+        ('Cantidad de participantes', cantidad == n),
+        ('Digest de participantes', digest == winner.digest_participantes),
+        ('Semilla', semilla == winner.seed_aleatorio),
+    ]
+    boleto = None
+    if cantidad:
+        boleto = boleto_en_posicion(rifa_id, indice_ganador(semilla, cantidad), hasta_id=ultimo_id)
+        comprobaciones.append((
+            'Hash de verificación',
+            calcular_hash_verificacion(semilla, winner.timestamp_sorteo, boleto) == winner.hash_verificacion,
+        ))
+    return _resultado(winner, ALGORITMO, comprobaciones, boleto)
+
+def _verificar_anterior_vistas(winner):
+    """Sorteos de generar_sorteo_verificable (antes de draw_service)"""
+    rifa = winner.rifa
+    n = winner.participantes_totales or 0
+    # Semilla: timestamp|rifa|título|id1,id2,... (ids en orden, en streaming)
+    semilla = hashlib.sha256(f'{winner.timestamp_sorteo}|{rifa.id}|{rifa.titulo}|'.encode())
+    cantidad = 0
+    ultimo_id = None
+    for ticket_id in _recorrer_ids(rifa.id, n):
+        semilla.update(f'{"," if cantidad else ""}{ticket_id}'.encode())
+        cantidad += 1
+        ultimo_id = ticket_id
+    semilla = semilla.hexdigest()
+    comprobaciones = [
+        ('Cantidad de participantes', cantidad == n),
+        ('Semilla (requiere el título original)', semilla == winner.seed_aleatorio),
+    ]
+    boleto = None
+    if cantidad:
+        # random.seed(int) + random.choice(lista ordenada por número)
+        indice = random.Random(int(semilla, 16)).randrange(cantidad)
+        boleto = boleto_en_posicion(rifa.id, indice, hasta_id=ultimo_id, orden='numero_boleto')
+        comprobaciones.append((
+            'Hash de verificación',
+            calcular_hash_verificacion(semilla, winner.timestamp_sorteo, boleto) == winner.hash_verificacion,
+        ))
+    return _resultado(winner, ALGORITMO_ANTERIOR, comprobaciones, boleto)
+
+def _verificar_anterior_api(winner):
+    """Sorteos de RaffleViewSet.realizar_sorteo (antes de draw_service)"""
+    rifa_id = winner.rifa_id
+    n = winner.participantes_totales or 0
+    semilla = hashlib.sha256(f'{rifa_id}{winner.timestamp_sorteo}'.encode()).hexdigest()
+    _, cantidad, ultimo_id = digest_participantes(rifa_id, limite=n)
+    comprobaciones = [
+        ('Cantidad de participantes', cantidad == n),
+        ('Semilla', semilla == winner.seed_aleatorio),
+    ]
+    boleto = None
+    if cantidad:
+        # random.seed(str) + random.choice(queryset ordenado por número)
+        indice = random.Random(semilla).randrange(cantidad)
+        boleto = boleto_en_posicion(rifa_id, indice, hasta_id=ultimo_id, orden='numero_boleto')
+    return _resultado(winner, ALGORITMO_ANTERIOR, comprobaciones, boleto)
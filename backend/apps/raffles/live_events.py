@@ -0,0 +1,250 @@
+"""
+Eventos en vivo de las rifas (ventas, cambios de estado y ganador).
+
+Publicar / suscribir sobre un broker intercambiable (setting LIVE_EVENTS_BROKER):
+    - 'memoria': colas en el proceso. Sirve con un solo proceso (runserver,
+      un worker) porque los eventos no cruzan entre procesos.
+    - 'redis':   canales pub/sub de Redis (o compatible) en
+      LIVE_EVENTS_REDIS_URL; requiere el paquete redis. Necesario con
+      varios workers o varias máquinas.
+    - Ruta a una clase propia con la misma interfaz que BrokerMemoria.
+    - 'desactivado': no se publica nada y raffle_events_view responde 204
+      (default con varios workers si no se configura 'redis').
+
+Cada espectador de raffle_events_view mantiene una sola suscripción y
+recibe los eventos a medida que ocurren, en lugar de recargar la página.
+Los streams solo se abren en la ventana del sorteo en vivo (ventana()) y
+cada proceso atiende a lo más LIVE_EVENTS_MAX_STREAMS a la vez: cada stream
+ocupa un hilo del worker (gunicorn gthread) mientras está abierto.
+
+Eventos (canal 'rifa:<id>'):
+    - 'ventas':  {'boletos_vendidos', 'total_boletos', 'porcentaje_vendido'}
+    - 'estado':  {'estado'}
+    - 'ganador': {'id', 'numero_boleto', 'nombre'}
+"""
+import json
+import queue
+import threading
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core import seguimiento
+from .models import Raffle, Winner
+
+BROKERS = {
+    'memoria': 'apps.raffles.live_events.BrokerMemoria',
+    'redis': 'apps.raffles.live_events.BrokerRedis',
+}
+DESACTIVADO = 'desactivado'
+
+# Minutos después de la hora del sorteo en que sigue la animación en vivo
+# (la misma ventana que usa raffle_detail_view para la ruleta)
+MINUTOS_DESPUES_DEL_SORTEO = 3
+
+
+# ============================================================================
+# BROKERS
+# ============================================================================
+
+class SuscripcionMemoria:
+    """Cola propia de un suscriptor del BrokerMemoria"""
+
+    def __init__(self, broker, canal):
+        self.broker = broker
+        self.canal = canal
+        self.cola = queue.Queue(maxsize=1000)
+
+    def esperar(self, timeout):
+        """Retorna el próximo mensaje (str) o None si pasó el timeout"""
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cerrar(self):
+        self.broker._quitar(self)
+
+class BrokerMemoria:
+    """Pub/sub dentro del proceso: un publicar() llega a todas las colas del canal"""
+
+    def __init__(self):
+        self._suscriptores = {}
+        self._lock = threading.Lock()
+
+    def suscribir(self, canal):
+        suscripcion = SuscripcionMemoria(self, canal)
+        with self._lock:
+            self._suscriptores.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def publicar(self, canal, mensaje):
+        with self._lock:
+            suscriptores = list(self._suscriptores.get(canal, ()))
+        for suscripcion in suscriptores:
+            try:
+                suscripcion.cola.put_nowait(mensaje)
+            except queue.Full:
+                # Cliente que no consume: se descarta el mensaje para él
+                pass
+
+    def _quitar(self, suscripcion):
+        with self._lock:
+            suscriptores = self._suscriptores.get(suscripcion.canal)
+            if suscriptores is not None:
+                suscriptores.discard(suscripcion)
+                if not suscriptores:
+                    del self._suscriptores[suscripcion.canal]
+
+class SuscripcionRedis:
+    def __init__(self, cliente, canal):
+        self.pubsub = cliente.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(canal)
+
+    def esperar(self, timeout):
+        mensaje = self.pubsub.get_message(timeout=timeout)
+        if mensaje is None:
+            return None
+        datos = mensaje['data']
+        return datos.decode() if isinstance(datos, bytes) else datos
+
+    def cerrar(self):
+        self.pubsub.close()
+
+class BrokerRedis:
+    """Pub/sub de Redis: los eventos llegan a los espectadores de todos los workers"""
+
+    def __init__(self):
+        import redis
+        url = getattr(settings, 'LIVE_EVENTS_REDIS_URL', 'redis://127.0.0.1:6379/2')
+        self.cliente = redis.Redis.from_url(url)
+
+    def suscribir(self, canal):
+        return SuscripcionRedis(self.cliente, canal)
+
+    def publicar(self, canal, mensaje):
+        self.cliente.publish(canal, mensaje)
+
+@lru_cache(maxsize=None)
+def _broker(nombre):
+    return import_string(BROKERS.get(nombre, nombre))()
+
+def activos():
+    """False si LIVE_EVENTS_BROKER='desactivado'"""
+    return getattr(settings, 'LIVE_EVENTS_BROKER', 'memoria') not in ('', DESACTIVADO)
+
+def get_broker():
+    """Broker configurado en LIVE_EVENTS_BROKER (una instancia por proceso)"""
+    return _broker(getattr(settings, 'LIVE_EVENTS_BROKER', 'memoria'))
+
+
+# ============================================================================
+# VENTANA Y LÍMITE DE STREAMS
+# ============================================================================
+
+def ventana(raffle):
+    """
+    (desde, hasta) en que los espectadores mantienen un stream abierto:
+    LIVE_EVENTS_WINDOW_MINUTES antes del sorteo hasta el fin de la animación.
+    """
+    antes = timedelta(minutes=getattr(settings, 'LIVE_EVENTS_WINDOW_MINUTES', 10))
+    return raffle.fecha_sorteo - antes, raffle.fecha_sorteo + timedelta(minutes=MINUTOS_DESPUES_DEL_SORTEO)
+
+def en_vivo(raffle, ahora=None):
+    """True si la rifa activa está dentro de su ventana de eventos"""
+    desde, hasta = ventana(raffle)
+    return raffle.estado == 'activa' and desde <= (ahora or timezone.now()) <= hasta
+
+_streams_abiertos = 0
+_streams_lock = threading.Lock()
+
+def tomar_stream():
+    """Reserva un stream del proceso; False si ya hay LIVE_EVENTS_MAX_STREAMS abiertos"""
+    global _streams_abiertos
+    with _streams_lock:
+        if _streams_abiertos >= getattr(settings, 'LIVE_EVENTS_MAX_STREAMS', 4):
+            return False
+        _streams_abiertos += 1
+        return True
+
+def soltar_stream():
+    global _streams_abiertos
+    with _streams_lock:
+        _streams_abiertos -= 1
+
+
+# ============================================================================
+# PUBLICACIÓN
+# ============================================================================
+
+def canal_rifa(rifa_id):
+    return f'rifa:{rifa_id}'
+
+def formatear(evento, datos):
+    """Mensaje en formato Server-Sent Events"""
+    return f'event: {evento}\ndata: {json.dumps(datos)}\n\n'
+
+def publicar(rifa_id, evento, datos):
+    """Publica un evento de la rifa al confirmar la transacción"""
+    if not activos():
+        return
+    mensaje = formatear(evento, datos)
+    transaction.on_commit(lambda: get_broker().publicar(canal_rifa(rifa_id), mensaje))
+
+def datos_ventas(raffle):
+    return {
+        'boletos_vendidos': raffle.boletos_vendidos,
+        'total_boletos': raffle.total_boletos,
+        'porcentaje_vendido': round(raffle.porcentaje_vendido, 2),
+    }
+
+def datos_ganador(winner):
+    return {
+        'id': winner.boleto_id,
+        'numero_boleto': winner.boleto.numero_boleto,
+        'nombre': winner.boleto.usuario.nombre,
+    }
+
+def publicar_ventas(rifa_id):
+    """
+    Publica el avance de ventas leído después del commit.
+
+    Para las operaciones masivas (compra, pago, expiración de reservas) que
+    actualizan boletos_vendidos con F() y no emiten señales.
+    """
+    if not activos():
+        return
+
+    def enviar():
+        raffle = Raffle.objects.only('boletos_vendidos', 'total_boletos').filter(pk=rifa_id).first()
+        if raffle is not None:
+            get_broker().publicar(canal_rifa(rifa_id), formatear('ventas', datos_ventas(raffle)))
+    transaction.on_commit(enviar)
+
+
+# ============================================================================
+# SEÑALES
+# ============================================================================
+
+def _al_guardar_rifa(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    # Estado al cargar la rifa (apps.core.seguimiento), sin consultar la base de datos
+    previos = seguimiento.previos(instance)
+    if previos is not None and previos['estado'] != instance.estado:
+        publicar(instance.pk, 'estado', {'estado': instance.estado})
+    publicar(instance.pk, 'ventas', datos_ventas(instance))
+
+def _al_crear_ganador(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        publicar(instance.rifa_id, 'ganador', datos_ganador(instance))
+
+def conectar_senales():
+    seguimiento.rastrear(Raffle, ['estado'])
+    post_save.connect(_al_guardar_rifa, sender=Raffle, dispatch_uid='eventos_rifa')
+    post_save.connect(_al_crear_ganador, sender=Winner, dispatch_uid='eventos_ganador')
@@ -0,0 +1,115 @@
+"""
+Management command para comparar el camino de compra anterior (un INSERT por
+boleto + raffle.save()) contra purchase_service.comprar_boletos (bulk_create +
+UPDATE con F()) en sus modos pesimista y optimista.
+
+Todo se ejecuta dentro de una transacción que se revierte al final: no deja
+datos en la base de datos.
+
+Ejecutar con: python manage.py benchmark_compra --cantidad 50 --repeticiones 5
+"""
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.users.models import User
+from apps.raffles.models import Raffle, Ticket, TicketNumberPool
+from apps.raffles.purchase_service import comprar_boletos
+
+
+class _Rollback(Exception):
+    """Fuerza el rollback de la transacción del benchmark"""
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo y las consultas de la compra por bucle vs bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=50, help='Boletos por compra')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Compras por método')
+
+    def handle(self, *args, **options):
+        cantidad = options['cantidad']
+        repeticiones = options['repeticiones']
+        total = cantidad * repeticiones * 3
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("⏱  BENCHMARK DE COMPRA DE BOLETOS"))
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Compras de {cantidad} boleto(s), {repeticiones} repetición(es) por método\n")
+
+        try:
+            with transaction.atomic():
+                organizador = User.objects.create_user(
+                    email=f'bench-org-{uuid.uuid4().hex[:8]}@benchmark.local',
+                    nombre='Benchmark Organizador', password=None, rol='organizador'
+                )
+                comprador = User.objects.create_user(
+                    email=f'bench-{uuid.uuid4().hex[:8]}@benchmark.local',
+                    nombre='Benchmark Comprador', password=None, rol='participante'
+                )
+                raffle = Raffle.objects.create(
+                    organizador=organizador,
+                    titulo='Rifa de benchmark',
+                    descripcion='Rifa temporal de benchmark',
+                    premio_principal='N/A',
+                    precio_boleto=1000,
+                    total_boletos=total,
+                    fecha_sorteo=timezone.now() + timedelta(days=1),
+                    estado='activa',
+                )
+
+                resultados = {
+                    'Bucle (create por boleto)': self.medir(
+                        repeticiones, lambda: self.compra_bucle(raffle.pk, comprador, cantidad)
+                    ),
+                    'Servicio pesimista': self.medir(
+                        repeticiones, lambda: comprar_boletos(raffle.pk, comprador, cantidad, modo='pesimista')
+                    ),
+                    'Servicio optimista': self.medir(
+                        repeticiones, lambda: comprar_boletos(raffle.pk, comprador, cantidad, modo='optimista')
+                    ),
+                }
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        for nombre, (segundos, consultas) in resultados.items():
+            self.stdout.write(
+                f"{nombre:32} {segundos * 1000 / repeticiones:9.2f} ms/compra   "
+                f"{consultas / repeticiones:6.1f} consultas/compra"
+            )
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Benchmark finalizado (datos revertidos)"))
+
+    def medir(self, repeticiones, compra):
+        """Ejecuta `compra` N veces y retorna (segundos totales, consultas totales)"""
+        with CaptureQueriesContext(connection) as contexto:
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                compra()
+            segundos = time.perf_counter() - inicio
+        return segundos, len(contexto.captured_queries)
+
+    def compra_bucle(self, raffle_id, usuario, cantidad):
+        """Camino anterior de buy_ticket_view: un INSERT por boleto y raffle.save()"""
+        with transaction.atomic():
+            raffle = Raffle.objects.select_for_update().get(pk=raffle_id, estado='activa')
+            numeros = TicketNumberPool.para_rifa(raffle).tomar_numeros(cantidad)
+            tickets = []
+            for numero in numeros:
+                tickets.append(Ticket.objects.create(
+                    rifa=raffle,
+                    usuario=usuario,
+                    numero_boleto=numero,
+                    codigo_qr=str(uuid.uuid4()),
+                    estado='reservado'
+                ))
+                raffle.boletos_vendidos += 1
+            raffle.save()
+        return tickets
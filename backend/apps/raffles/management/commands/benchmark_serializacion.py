@@ -0,0 +1,140 @@
+"""
+Management command para comparar el rendimiento de serialización de los
+listados de la API:
+
+- ModelSerializer + JSONRenderer de DRF (json de la biblioteca estándar)
+- ModelSerializer + FastJSONRenderer (orjson si está instalado)
+- Serializer rápido sobre values() + FastJSONRenderer
+
+Cada método consulta, serializa y codifica el listado completo. Todo se
+ejecuta dentro de una transacción que se revierte al final: no deja datos
+en la base de datos.
+
+Ejecutar con: python manage.py benchmark_serializacion --filas 2000 --repeticiones 5
+"""
+import json
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.renderers import FastJSONRenderer, ORJSON_DISPONIBLE
+from apps.users.models import User
+from apps.raffles.models import Raffle, Ticket
+from apps.raffles.serializers import (
+    RaffleListSerializer, TicketListSerializer,
+    RaffleListFastSerializer, TicketListFastSerializer,
+)
+
+
+class _Rollback(Exception):
+    """Fuerza el rollback de la transacción del benchmark"""
+
+
+class Command(BaseCommand):
+    help = 'Compara el rendimiento de serialización JSON de los listados de rifas y boletos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=2000, help='Rifas y boletos por listado')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Listados por método')
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        repeticiones = options['repeticiones']
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("⏱  BENCHMARK DE SERIALIZACIÓN JSON"))
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Listados de {filas} fila(s), {repeticiones} repetición(es) por método")
+        self.stdout.write(f"Renderer rápido: {'orjson' if ORJSON_DISPONIBLE else 'json (orjson no instalado)'}\n")
+
+        try:
+            with transaction.atomic():
+                rifas, boletos = self.crear_datos(filas)
+                listados = {
+                    'Rifas': (rifas.select_related('organizador'), RaffleListSerializer, RaffleListFastSerializer),
+                    'Boletos': (boletos, TicketListSerializer, TicketListFastSerializer),
+                }
+                resultados = {
+                    nombre: self.comparar(queryset, serializer, rapido, repeticiones)
+                    for nombre, (queryset, serializer, rapido) in listados.items()
+                }
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        for listado, metodos in resultados.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n📋 {listado}"))
+            base = metodos['DRF + json'] / repeticiones
+            for nombre, segundos in metodos.items():
+                por_listado = segundos / repeticiones
+                self.stdout.write(
+                    f"{nombre:24} {por_listado * 1000:9.2f} ms/listado   "
+                    f"{filas / por_listado:11,.0f} filas/s   x{base / por_listado:4.1f}"
+                )
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Benchmark finalizado (datos revertidos)"))
+
+    def crear_datos(self, filas):
+        """Rifas y boletos temporales para los listados"""
+        organizador = User.objects.create_user(
+            email=f'bench-org-{uuid.uuid4().hex[:8]}@benchmark.local',
+            nombre='Benchmark Organizador', password=None, rol='organizador'
+        )
+        comprador = User.objects.create_user(
+            email=f'bench-{uuid.uuid4().hex[:8]}@benchmark.local',
+            nombre='Benchmark Comprador', password=None, rol='participante'
+        )
+        rifas = Raffle.objects.bulk_create([
+            Raffle(
+                organizador=organizador,
+                titulo=f'Rifa de benchmark {i}',
+                descripcion='Rifa temporal de benchmark',
+                premio_principal='N/A',
+                precio_boleto=1000,
+                total_boletos=filas,
+                boletos_vendidos=i % filas,
+                fecha_sorteo=timezone.now() + timedelta(days=1),
+                estado='activa',
+            )
+            for i in range(filas)
+        ])
+        rifa = Raffle.objects.filter(organizador=organizador).order_by('pk').first()
+        Ticket.objects.bulk_create([
+            Ticket(rifa=rifa, usuario=comprador, numero_boleto=n + 1,
+                   codigo_qr=str(uuid.uuid4()), estado='pagado')
+            for n in range(filas)
+        ], batch_size=1000)
+        return (
+            Raffle.objects.filter(organizador=organizador).order_by('pk'),
+            Ticket.objects.filter(rifa=rifa).order_by('pk'),
+        )
+
+    def comparar(self, queryset, serializer, rapido, repeticiones):
+        """Segundos totales por método; verifica que todos generen el mismo JSON"""
+        metodos = {
+            'DRF + json': lambda: JSONRenderer().render(serializer(queryset.all(), many=True).data),
+            'DRF + orjson': lambda: FastJSONRenderer().render(serializer(queryset.all(), many=True).data),
+            'values() + orjson': lambda: FastJSONRenderer().render(
+                rapido().representar(queryset.values(*rapido.columnas))
+            ),
+        }
+        if not ORJSON_DISPONIBLE:
+            metodos = {nombre.replace('orjson', 'json'): metodo for nombre, metodo in metodos.items()}
+
+        referencia, *otras = [json.loads(metodo()) for metodo in metodos.values()]
+        if any(salida != referencia for salida in otras):
+            self.stdout.write(self.style.ERROR("❌ Los métodos no generan el mismo JSON"))
+
+        return {nombre: self.medir(repeticiones, metodo) for nombre, metodo in metodos.items()}
+
+    def medir(self, repeticiones, metodo):
+        """Ejecuta `metodo` N veces y retorna los segundos totales"""
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            metodo()
+        return time.perf_counter() - inicio
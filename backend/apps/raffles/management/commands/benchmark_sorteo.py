@@ -0,0 +1,115 @@
+"""
+Management command para comparar el sorteo anterior (lista de todos los
+boletos pagados + random.choice sobre el estado global) contra
+draw_service.generar_sorteo (digest en streaming + un boleto por OFFSET),
+y medir la verificación con draw_service.verificar_sorteo.
+
+Todo se ejecuta dentro de una transacción que se revierte al final: no deja
+datos en la base de datos.
+
+Ejecutar con: python manage.py benchmark_sorteo --boletos 20000
+"""
+import hashlib
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.users.models import User
+from apps.raffles.models import Raffle, Ticket, Winner
+from apps.raffles.draw_service import generar_sorteo, verificar_sorteo
+
+
+class _Rollback(Exception):
+    """Fuerza el rollback de la transacción del benchmark"""
+
+
+class Command(BaseCommand):
+    help = 'Compara tiempo, consultas y memoria del sorteo anterior vs draw_service'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boletos', type=int, default=20000, help='Boletos pagados de la rifa')
+
+    def handle(self, *args, **options):
+        cantidad = options['boletos']
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("⏱  BENCHMARK DE SORTEO"))
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Rifa con {cantidad} boleto(s) pagado(s)\n")
+
+        try:
+            with transaction.atomic():
+                usuario = User.objects.create_user(
+                    email=f'bench-{uuid.uuid4().hex[:8]}@benchmark.local',
+                    nombre='Benchmark', password=None, rol='organizador'
+                )
+                raffle = Raffle.objects.create(
+                    organizador=usuario,
+                    titulo='Rifa de benchmark',
+                    descripcion='Rifa temporal de benchmark',
+                    premio_principal='N/A',
+                    precio_boleto=1000,
+                    total_boletos=cantidad,
+                    fecha_sorteo=timezone.now() + timedelta(days=1),
+                    estado='activa',
+                )
+                Ticket.objects.bulk_create([
+                    Ticket(rifa=raffle, usuario=usuario, numero_boleto=numero,
+                           codigo_qr=str(uuid.uuid4()), estado='pagado')
+                    for numero in range(1, cantidad + 1)
+                ], batch_size=1000)
+
+                resultados = {
+                    'Anterior (lista + choice)': self.medir(lambda: self.sorteo_lista(raffle)),
+                    'draw_service.generar_sorteo': self.medir(lambda: generar_sorteo(raffle)),
+                }
+
+                resultado = generar_sorteo(raffle)
+                winner = Winner.objects.create(
+                    rifa=raffle,
+                    boleto=resultado['winning_ticket'],
+                    seed_aleatorio=resultado['seed_aleatorio'],
+                    timestamp_sorteo=resultado['timestamp_sorteo'],
+                    hash_verificacion=resultado['hash_verificacion'],
+                    participantes_totales=resultado['participantes_totales'],
+                    digest_participantes=resultado['digest_participantes'],
+                    algoritmo=resultado['algoritmo'],
+                )
+                resultados['draw_service.verificar_sorteo'] = self.medir(lambda: verificar_sorteo(winner))
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        for nombre, (segundos, consultas, memoria) in resultados.items():
+            self.stdout.write(
+                f"{nombre:32} {segundos * 1000:9.2f} ms   {consultas:4d} consultas   "
+                f"{memoria / 1024:9.1f} KiB pico"
+            )
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Benchmark finalizado (datos revertidos)"))
+
+    def medir(self, sorteo):
+        """Ejecuta `sorteo` y retorna (segundos, consultas, pico de memoria en bytes)"""
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as contexto:
+            inicio = time.perf_counter()
+            sorteo()
+            segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return segundos, len(contexto.captured_queries), pico
+
+    def sorteo_lista(self, raffle):
+        """Camino anterior: carga todos los boletos y usa el random global"""
+        boletos = list(Ticket.objects.filter(rifa=raffle, estado='pagado').order_by('numero_boleto'))
+        ids = ','.join(str(boleto.id) for boleto in boletos)
+        semilla = hashlib.sha256(f'{int(time.time())}|{raffle.id}|{raffle.titulo}|{ids}'.encode()).hexdigest()
+        random.seed(int(semilla, 16))
+        return random.choice(boletos)
@@ -28,7 +28,7 @@ class Command(BaseCommand):
                     f'({rifa.porcentaje_vendido:.1f}%). '
                     f'Esperando revisión del administrador.'
                 )
-                rifa.save()
+                rifa.save(update_fields=['estado', 'fecha_pausa', 'motivo_pausa', 'fecha_actualizacion'])
                 rifas_pausadas += 1
                 
                 self.stdout.write(
@@ -40,7 +40,7 @@ class Command(BaseCommand):
             else:
                 # Si se vendieron todos los boletos, cerrar la rifa
                 rifa.estado = 'cerrada'
-                rifa.save()
+                rifa.save(update_fields=['estado', 'fecha_actualizacion'])
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'✅ Rifa cerrada: "{rifa.titulo}" - Todos los boletos vendidos'
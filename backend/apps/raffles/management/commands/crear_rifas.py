@@ -10,7 +10,8 @@ from decimal import Decimal
 import random
 
 from apps.users.models import User
-from apps.raffles.models import Raffle, Ticket
+from apps.raffles.models import Raffle
+from apps.raffles.purchase_service import crear_boletos, incrementar_vendidos
 
 
 class Command(BaseCommand):
@@ -153,39 +154,29 @@ class Command(BaseCommand):
         numeros = list(range(1, total_boletos + 1))
         random.shuffle(numeros)
 
-        vendidos = 0
+        # Acumular (comprador, número) y crear todos los boletos con un único bulk_create
+        asignaciones = []
         for comprador in compradores:
-            if vendidos >= cantidad_a_vender:
+            if len(asignaciones) >= cantidad_a_vender:
                 break
 
             # Cada comprador compra 1-5 boletos
-            max_compra = min(5, cantidad_a_vender - vendidos, len(numeros))
+            max_compra = min(5, cantidad_a_vender - len(asignaciones), len(numeros))
             if max_compra <= 0:
                 break
 
             cantidad = random.randint(1, max_compra)
 
             for _ in range(cantidad):
-                if not numeros or vendidos >= cantidad_a_vender:
+                if not numeros or len(asignaciones) >= cantidad_a_vender:
                     break
 
-                numero = numeros.pop()
+                asignaciones.append((comprador, numeros.pop()))
 
-                # Generar código QR único
-                import uuid
-                codigo_qr = f"TKT-{raffle.id}-{numero}-{uuid.uuid4().hex[:8]}"
-
-                Ticket.objects.create(
-                    rifa=raffle,
-                    usuario=comprador,
-                    numero_boleto=numero,
-                    estado='pagado',
-                    codigo_qr=codigo_qr
-                )
-                vendidos += 1
+        boletos = crear_boletos(raffle, asignaciones, estado='pagado')
+        vendidos = len(boletos)
 
         # Actualizar contador en la rifa
-        raffle.boletos_vendidos = vendidos
-        raffle.save(update_fields=['boletos_vendidos'])
+        incrementar_vendidos(raffle, vendidos)
 
         return vendidos
@@ -0,0 +1,60 @@
+"""
+Comando de gestión para expirar boletos 'reservado' cuyo pago nunca se completó
+y devolver sus números al pool de la rifa.
+
+Uso:
+    python manage.py expirar_reservas                  # una pasada (cron)
+    python manage.py expirar_reservas --loop           # barrido continuo
+    python manage.py expirar_reservas --minutos 10 --intervalo 30
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.raffles.reservation_service import expirar_reservas
+
+
+class Command(BaseCommand):
+    help = 'Expira reservas de boletos vencidas y libera sus números'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutos', type=int, default=None,
+            help='TTL de la reserva en minutos (por defecto TICKET_RESERVATION_TTL_MINUTES)'
+        )
+        parser.add_argument('--lote', type=int, default=500, help='Boletos por transacción')
+        parser.add_argument('--loop', action='store_true', help='Ejecutar como barrido continuo')
+        parser.add_argument('--intervalo', type=int, default=60, help='Segundos entre pasadas con --loop')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.barrer(options)
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🔁 Barrido de reservas cada {options["intervalo"]}s (Ctrl+C para detener)'
+        ))
+        try:
+            while True:
+                # Evitar conexiones caducadas en procesos de larga duración
+                close_old_connections()
+                self.barrer(options)
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹  Barrido detenido'))
+
+    def barrer(self, options):
+        liberados = expirar_reservas(minutos=options['minutos'], tamano_lote=options['lote'])
+
+        if not liberados:
+            self.stdout.write(self.style.SUCCESS('✅ No hay reservas vencidas'))
+            return
+
+        for rifa_id, cantidad in liberados.items():
+            self.stdout.write(
+                self.style.WARNING(f'⌛ Rifa #{rifa_id}: {cantidad} reserva(s) expirada(s)')
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'\n🔓 Se liberaron {sum(liberados.values())} boleto(s) en {len(liberados)} rifa(s)'
+        ))
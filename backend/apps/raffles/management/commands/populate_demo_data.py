@@ -11,6 +11,8 @@ import random
 
 from apps.users.models import User
 from apps.raffles.models import Raffle, Ticket
+from apps.raffles.purchase_service import crear_boletos, incrementar_vendidos
+from apps.admin_panel import metrics
 
 
 class Command(BaseCommand):
@@ -127,6 +129,9 @@ class Command(BaseCommand):
         # Crear rifas y compras
         self.crear_rifas_completas(organizadores, sponsors, participantes)
 
+        # Los borrados masivos de --clear no pasan por las métricas: recalcularlas
+        metrics.reconstruir()
+
         # Resumen
         self.stdout.write("\n" + "=" * 60)
         self.stdout.write(self.style.SUCCESS("📊 RESUMEN FINAL"))
@@ -364,40 +369,33 @@ class Command(BaseCommand):
             numeros_disponibles = list(range(1, total_boletos + 1))
             random.shuffle(numeros_disponibles)
 
-            boletos_vendidos = 0
+            # Acumular (comprador, número) y crear todos los boletos con un único bulk_create
+            asignaciones = []
             for comprador in compradores:
-                if boletos_vendidos >= boletos_a_vender:
+                if len(asignaciones) >= boletos_a_vender:
                     break
 
                 # Determinar cuántos boletos compra este usuario
-                max_a_comprar = min(5, boletos_a_vender - boletos_vendidos, len(numeros_disponibles))
+                max_a_comprar = min(5, boletos_a_vender - len(asignaciones), len(numeros_disponibles))
                 if max_a_comprar <= 0:
                     break
 
                 cantidad = random.randint(1, max_a_comprar)
 
                 for _ in range(cantidad):
-                    if not numeros_disponibles or boletos_vendidos >= boletos_a_vender:
+                    if not numeros_disponibles or len(asignaciones) >= boletos_a_vender:
                         break
 
-                    numero = numeros_disponibles.pop(0)
+                    asignaciones.append((comprador, numeros_disponibles.pop(0)))
 
-                    try:
-                        import uuid
-                        Ticket.objects.create(
-                            rifa=raffle,
-                            usuario=comprador,
-                            numero_boleto=numero,
-                            estado='pagado',
-                            codigo_qr=str(uuid.uuid4())[:20]  # Código QR único
-                        )
-                        boletos_vendidos += 1
-                    except Exception as ticket_error:
-                        self.stdout.write(self.style.WARNING(f"    ⚠ Error creando boleto {numero}: {str(ticket_error)}"))
+            boletos_vendidos = 0
+            try:
+                boletos_vendidos = len(crear_boletos(raffle, asignaciones, estado='pagado'))
+            except Exception as ticket_error:
+                self.stdout.write(self.style.WARNING(f"    ⚠ Error creando boletos: {str(ticket_error)}"))
 
             # Actualizar contador de boletos vendidos
-            raffle.boletos_vendidos = boletos_vendidos
-            raffle.save(update_fields=['boletos_vendidos'])
+            incrementar_vendidos(raffle, boletos_vendidos)
 
             self.stdout.write(f"    ✓ Rifa '{titulo[:40]}...' - {boletos_vendidos}/{total_boletos} boletos vendidos")
 
@@ -36,7 +36,7 @@ class Command(BaseCommand):
                 rifa.estado = 'cerrada'
                 rifa.motivo_pausa = f'No se alcanzó el mínimo de {minimo_requerido} boletos vendidos para viabilidad económica. Boletos vendidos: {rifa.boletos_vendidos}. Fecha límite: {rifa.fecha_sorteo.strftime("%d/%m/%Y %H:%M")}'
                 rifa.fecha_pausa = now
-                rifa.save()
+                rifa.save(update_fields=['estado', 'motivo_pausa', 'fecha_pausa', 'fecha_actualizacion'])
                 
                 rifas_cerradas += 1
                 
@@ -0,0 +1,54 @@
+"""
+Comando para verificar sorteos repitiendo el cálculo desde los datos guardados
+
+Recalcula digest, semilla, posición ganadora y hash de verificación de cada
+Winner con draw_service.verificar_sorteo (memoria constante: los ids de los
+boletos se recorren en streaming). Termina con código 1 si algún sorteo no
+coincide.
+
+Uso:
+    python manage.py verify_draw <rifa_id> [<rifa_id> ...]
+    python manage.py verify_draw --todos
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.raffles.models import Winner
+from apps.raffles.draw_service import verificar_sorteo
+
+
+class Command(BaseCommand):
+    help = 'Verifica sorteos repitiendo el cálculo a partir de la semilla guardada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rifas', nargs='*', type=int, help='IDs de las rifas a verificar')
+        parser.add_argument('--todos', action='store_true', help='Verificar todos los sorteos')
+
+    def handle(self, *args, **options):
+        ganadores = Winner.objects.select_related('rifa', 'boleto').order_by('rifa_id')
+        if options['rifas']:
+            ganadores = ganadores.filter(rifa_id__in=options['rifas'])
+        elif not options['todos']:
+            raise CommandError('Indica al menos un ID de rifa o usa --todos')
+
+        invalidos = 0
+        for winner in ganadores.iterator():
+            resultado = verificar_sorteo(winner)
+            titulo = f'Rifa #{winner.rifa_id} "{winner.rifa.titulo}" - Boleto #{winner.boleto.numero_boleto} ({resultado["algoritmo"]})'
+            if resultado['valido']:
+                self.stdout.write(self.style.SUCCESS(f'✅ {titulo}'))
+                continue
+
+            invalidos += 1
+            self.stdout.write(self.style.ERROR(f'❌ {titulo}'))
+            for descripcion, ok in resultado['comprobaciones']:
+                self.stdout.write(f'   {"✓" if ok else "✗"} {descripcion}')
+            calculado = resultado['boleto_calculado']
+            if calculado is not None and calculado.pk != winner.boleto_id:
+                self.stdout.write(f'   Boleto calculado: #{calculado.numero_boleto} (id {calculado.pk})')
+
+        if invalidos:
+            self.stdout.write(self.style.ERROR(f'\n❌ {invalidos} sorteo(s) no coinciden'))
+            sys.exit(1)
+        self.stdout.write(self.style.SUCCESS('\n✅ Verificación completada'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-17 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raffles', '0010_alter_sponsorshiprequest_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketNumberPool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('siguiente_numero', models.IntegerField(default=1, verbose_name='Siguiente Número')),
+                ('numeros_liberados', models.JSONField(blank=True, default=list, verbose_name='Números Liberados')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('rifa', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pool_numeros', to='raffles.raffle')),
+            ],
+            options={
+                'verbose_name': 'Pool de Números',
+                'verbose_name_plural': 'Pools de Números',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raffles', '0011_ticketnumberpool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketnumberpool',
+            name='version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Versión'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raffles', '0012_ticketnumberpool_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='winner',
+            name='digest_participantes',
+            field=models.CharField(blank=True, help_text='SHA256 de los ids de los boletos pagados (en orden) al momento del sorteo', max_length=64, null=True, verbose_name='Digest de Participantes'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-17 21:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raffles', '0013_winner_digest_participantes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='raffle',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='rifa_estado_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='raffle',
+            index=models.Index(fields=['estado', 'fecha_sorteo'], name='rifa_estado_sorteo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['rifa', 'estado'], name='boleto_rifa_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['usuario', 'fecha_compra'], name='boleto_usuario_compra_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('estado', 'reservado')), fields=['id', 'fecha_compra'], name='boleto_reservado_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-17 21:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raffles', '0014_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['rifa', 'fecha_compra'], name='boleto_rifa_compra_idx'),
+        ),
+    ]
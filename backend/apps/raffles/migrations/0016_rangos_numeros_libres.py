@@ -0,0 +1,75 @@
+# Generated by Django 5.0 on 2026-10-17 21:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rangos_desde_lista(apps, schema_editor):
+    """Convierte la lista JSON numeros_liberados de cada pool en rangos"""
+    TicketNumberPool = apps.get_model('raffles', 'TicketNumberPool')
+    TicketNumberRange = apps.get_model('raffles', 'TicketNumberRange')
+    for pool in TicketNumberPool.objects.iterator():
+        rangos = []
+        for numero in sorted(set(pool.numeros_liberados)):
+            if rangos and rangos[-1][1] == numero - 1:
+                rangos[-1][1] = numero
+            else:
+                rangos.append([numero, numero])
+        TicketNumberRange.objects.bulk_create([
+            TicketNumberRange(pool=pool, inicio=inicio, fin=fin) for inicio, fin in rangos
+        ])
+
+
+def lista_desde_rangos(apps, schema_editor):
+    TicketNumberPool = apps.get_model('raffles', 'TicketNumberPool')
+    for pool in TicketNumberPool.objects.iterator():
+        pool.numeros_liberados = [
+            numero
+            for inicio, fin in pool.rangos_libres.order_by('inicio').values_list('inicio', 'fin')
+            for numero in range(inicio, fin + 1)
+        ]
+        pool.save(update_fields=['numeros_liberados'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raffles', '0015_ticket_rifa_compra_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketNumberRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.IntegerField(verbose_name='Inicio')),
+                ('fin', models.IntegerField(verbose_name='Fin')),
+                ('pool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rangos_libres', to='raffles.ticketnumberpool')),
+            ],
+            options={
+                'verbose_name': 'Rango de Números Libres',
+                'verbose_name_plural': 'Rangos de Números Libres',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ticketnumberrange',
+            constraint=models.UniqueConstraint(fields=('pool', 'inicio'), name='rango_pool_inicio_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='ticketnumberrange',
+            constraint=models.CheckConstraint(check=models.Q(('inicio__lte', models.F('fin'))), name='rango_inicio_lte_fin'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketnumberrange',
+            index=models.Index(fields=['pool', 'fin'], name='rango_pool_fin_idx'),
+        ),
+        migrations.RunPython(rangos_desde_lista, lista_desde_rangos),
+        migrations.RemoveField(
+            model_name='ticketnumberpool',
+            name='numeros_liberados',
+        ),
+        migrations.RemoveField(
+            model_name='ticketnumberpool',
+            name='version',
+        ),
+    ]
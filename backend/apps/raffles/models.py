@@ -1,5 +1,5 @@
 # Importación del sistema de modelos de Django para definir estructura de base de datos
-from django.db import models
+from django.db import models, transaction
 # Importación de configuración global del proyecto para acceder a AUTH_USER_MODEL
 from django.conf import settings
 # Importación de utilidades de zona horaria para manejar fechas/horas correctamente
@@ -123,6 +123,13 @@ class Raffle(models.Model):
         verbose_name_plural = 'Rifas'
         # Ordenamiento por defecto: más recientes primero (DESC por fecha_creacion)
         ordering = ['-fecha_creacion']
+        # Índices para los listados: siempre filtran por estado y ordenan
+        # por fecha de creación (home, listado) o de sorteo (próximos
+        # sorteos, finalizadas, rifas vencidas)
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='rifa_estado_creacion_idx'),
+            models.Index(fields=['estado', 'fecha_sorteo'], name='rifa_estado_sorteo_idx'),
+        ]
     
     def __str__(self):
         """
@@ -293,6 +300,21 @@ class Ticket(models.Model):
         unique_together = ['rifa', 'numero_boleto']
         # Ordenamiento por defecto: por número de boleto ascendente (1, 2, 3, ...)
         ordering = ['numero_boleto']
+        indexes = [
+            # Boletos vendidos de una rifa (conteos, sorteo, reembolsos)
+            models.Index(fields=['rifa', 'estado'], name='boleto_rifa_estado_idx'),
+            # "Mis boletos" y el cursor de la API (BoletoCursorPagination)
+            models.Index(fields=['usuario', 'fecha_compra'], name='boleto_usuario_compra_idx'),
+            models.Index(fields=['rifa', 'fecha_compra'], name='boleto_rifa_compra_idx'),
+            # Reservas vencidas (reservation_service, paginada por id). Parcial:
+            # las reservas son una fracción mínima de la tabla. MySQL no
+            # soporta índices parciales y no lo crea (ver SILENCED_SYSTEM_CHECKS)
+            models.Index(
+                fields=['id', 'fecha_compra'],
+                name='boleto_reservado_idx',
+                condition=models.Q(estado='reservado'),
+            ),
+        ]
     
     def __str__(self):
         """
@@ -307,6 +329,309 @@ class Ticket(models.Model):
         """
         return f"Boleto #{self.numero_boleto} - {self.rifa.titulo}"
 
+class TicketNumberPool(models.Model):
+    """
+    Asignador persistente de números de boleto para una rifa.
+    Combina un puntero de avance (siguiente_numero) con una tabla de rangos
+    libres (TicketNumberRange) para los números devueltos por reservas
+    expiradas o cancelaciones.
+
+    Tomar N números lee a lo sumo N rangos (índice pool + inicio) y devolver
+    N números toca solo los rangos vecinos: el costo depende de la compra,
+    no del tamaño de la rifa ni de cuántos números hay libres.
+
+    Invariantes:
+        - Todo número >= siguiente_numero nunca ha sido asignado.
+        - Los rangos libres son disjuntos, no adyacentes y < siguiente_numero.
+    """
+
+    # Rifa dueña del pool - relación 1:1, se elimina junto con la rifa
+    rifa = models.OneToOneField(Raffle, on_delete=models.CASCADE, related_name='pool_numeros')
+    # Próximo número nunca asignado (puntero de avance)
+    siguiente_numero = models.IntegerField(default=1, verbose_name='Siguiente Número')
+    # Última modificación del pool
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name='Última Actualización')
+
+    class Meta:
+        verbose_name = 'Pool de Números'
+        verbose_name_plural = 'Pools de Números'
+
+    def __str__(self):
+        return f"Pool de números - {self.rifa_id}"
+
+    @classmethod
+    def para_rifa(cls, rifa):
+        """
+        Obtiene el pool de la rifa, construyéndolo la primera vez.
+
+        El pool y sus rangos se crean en la misma transacción: si dos
+        procesos lo intentan a la vez, get_or_create deja uno solo y el otro
+        lo lee ya completo.
+
+        Args:
+            rifa (Raffle): Rifa cuyo pool se necesita
+
+        Returns:
+            TicketNumberPool: Pool con la rifa ya cacheada en pool.rifa
+        """
+        pool = cls.objects.filter(rifa=rifa).first()
+        if pool is None:
+            siguiente, rangos = cls._estado_inicial(rifa)
+            with transaction.atomic():
+                pool, creado = cls.objects.get_or_create(rifa=rifa, defaults={'siguiente_numero': siguiente})
+                if creado:
+                    pool._crear_rangos(rangos)
+        pool.rifa = rifa
+        return pool
+
+    @classmethod
+    def construir(cls, rifa):
+        """
+        Reconstruye el pool desde los boletos existentes de la rifa.
+        Es la única operación O(total_boletos) y solo se ejecuta una vez por
+        rifa (o al reparar un pool inconsistente).
+        """
+        siguiente, rangos = cls._estado_inicial(rifa)
+        with transaction.atomic():
+            pool, creado = cls.objects.get_or_create(rifa=rifa, defaults={'siguiente_numero': siguiente})
+            if not creado:
+                pool._recargar_bloqueado()
+                pool.rangos_libres.all().delete()
+                pool.siguiente_numero = siguiente
+                pool._guardar()
+            pool._crear_rangos(rangos)
+        pool.rifa = rifa
+        return pool
+
+    @staticmethod
+    def _estado_inicial(rifa):
+        """Puntero y rangos libres calculados a partir de los boletos existentes"""
+        ocupados = Ticket.objects.filter(rifa=rifa).order_by('numero_boleto').values_list('numero_boleto', flat=True)
+        rangos = []
+        anterior = 0
+        for numero in ocupados:
+            if numero > anterior + 1:
+                rangos.append((anterior + 1, numero - 1))
+            anterior = numero
+        return anterior + 1, rangos
+
+    def _crear_rangos(self, rangos):
+        TicketNumberRange.objects.bulk_create([
+            TicketNumberRange(pool=self, inicio=inicio, fin=fin) for inicio, fin in rangos
+        ])
+
+    @property
+    def cantidad_disponible(self):
+        """Cantidad de números que aún se pueden asignar"""
+        libres = self.rangos_libres.aggregate(
+            total=models.Sum(models.F('fin') - models.F('inicio') + 1)
+        )['total'] or 0
+        return libres + max(0, self.rifa.total_boletos - self.siguiente_numero + 1)
+
+    def _recargar_bloqueado(self):
+        """Relee el puntero con SELECT ... FOR UPDATE (llamar dentro de transaction.atomic)"""
+        self.siguiente_numero = TicketNumberPool.objects.select_for_update().values_list(
+            'siguiente_numero', flat=True
+        ).get(pk=self.pk)
+
+    def _guardar(self):
+        self.save(update_fields=['siguiente_numero', 'fecha_actualizacion'])
+
+    def tomar_numeros(self, cantidad):
+        """
+        Asigna los `cantidad` números libres más bajos.
+
+        Bloquea la fila del pool y los rangos que consume mientras dura la
+        operación (unas pocas sentencias, sin importar el tamaño de la rifa).
+
+        Returns:
+            list[int]: Números asignados, o lista vacía si no alcanzan
+        """
+        if cantidad <= 0:
+            return []
+
+        with transaction.atomic():
+            self._recargar_bloqueado()
+            # Cada rango aporta al menos un número: bastan los `cantidad` primeros
+            rangos = list(self.rangos_libres.select_for_update().order_by('inicio')[:cantidad])
+            numeros, agotados, recorte = _repartir(rangos, cantidad)
+
+            faltan = cantidad - len(numeros)
+            if faltan and self.siguiente_numero + faltan - 1 > self.rifa.total_boletos:
+                return []
+
+            if agotados:
+                TicketNumberRange.objects.filter(pk__in=agotados).delete()
+            if recorte:
+                rango, nuevo_inicio = recorte
+                TicketNumberRange.objects.filter(pk=rango.pk).update(inicio=nuevo_inicio)
+            if faltan:
+                numeros += range(self.siguiente_numero, self.siguiente_numero + faltan)
+                self.siguiente_numero += faltan
+                self._guardar()
+        return numeros
+
+    def tomar_numeros_optimista(self, cantidad):
+        """
+        Variante de tomar_numeros que no bloquea la fila del pool.
+
+        1. Cada rango libre se reclama con un UPDATE/DELETE condicionado a
+           los límites leídos (compare-and-set por rango): dos compradores
+           solo chocan si eligen el mismo rango, y el que pierde sigue con
+           el siguiente.
+        2. El resto sale del puntero con un incremento atómico condicionado a
+           no pasar de total_boletos; cada comprador obtiene un bloque
+           distinto sin reintentos.
+        3. Si aun así faltan números (rangos perdidos por conflicto y puntero
+           agotado) se completa con tomar_numeros.
+
+        Bajo contención el orden "números más bajos primero" es aproximado.
+
+        Returns:
+            list[int]: Números asignados, o lista vacía si no alcanzan
+        """
+        if cantidad <= 0:
+            return []
+
+        numeros = []
+        for rango in self.rangos_libres.order_by('inicio')[:cantidad]:
+            tomados = _reclamar_rango(rango, cantidad - len(numeros))
+            numeros += tomados
+            if len(numeros) == cantidad:
+                return numeros
+
+        faltan = cantidad - len(numeros)
+        with transaction.atomic():
+            avanzados = TicketNumberPool.objects.filter(
+                pk=self.pk, siguiente_numero__lte=self.rifa.total_boletos - faltan + 1
+            ).update(siguiente_numero=models.F('siguiente_numero') + faltan, fecha_actualizacion=timezone.now())
+            if avanzados:
+                # La fila queda bloqueada por el UPDATE hasta el commit: el valor leído es el propio
+                self.siguiente_numero = TicketNumberPool.objects.values_list(
+                    'siguiente_numero', flat=True
+                ).get(pk=self.pk)
+                return numeros + list(range(self.siguiente_numero - faltan, self.siguiente_numero))
+
+        resto = self.tomar_numeros(faltan)
+        if not resto:
+            self.liberar_numeros(numeros)
+            return []
+        return numeros + resto
+
+    def liberar_numeros(self, numeros):
+        """
+        Devuelve números ocupados al pool uniéndolos con los rangos vecinos.
+        Un rango que termina justo antes del puntero se compacta
+        retrocediéndolo.
+        """
+        if not numeros:
+            return
+
+        with transaction.atomic():
+            self._recargar_bloqueado()
+            nuevos = _agrupar(sorted({n for n in numeros if n < self.siguiente_numero}))
+            if not nuevos:
+                return
+
+            # Los números devueltos estaban ocupados: solo pueden tocar rangos
+            # por sus extremos (bloqueados hasta el commit)
+            vecinos = list(self.rangos_libres.select_for_update().filter(
+                models.Q(fin__in=[inicio - 1 for inicio, _ in nuevos])
+                | models.Q(inicio__in=[fin + 1 for _, fin in nuevos])
+            ))
+
+            rangos = _unir(nuevos + [(rango.inicio, rango.fin) for rango in vecinos])
+            if rangos[-1][1] == self.siguiente_numero - 1:
+                self.siguiente_numero = rangos.pop()[0]
+                self._guardar()
+
+            if vecinos:
+                TicketNumberRange.objects.filter(pk__in=[rango.pk for rango in vecinos]).delete()
+            self._crear_rangos(rangos)
+
+
+class TicketNumberRange(models.Model):
+    """
+    Rango de números libres [inicio, fin] de un TicketNumberPool (ver sus
+    invariantes). Los rangos se consumen por su extremo inferior.
+    """
+
+    pool = models.ForeignKey(TicketNumberPool, on_delete=models.CASCADE, related_name='rangos_libres')
+    # Primer y último número libre del rango (ambos incluidos)
+    inicio = models.IntegerField(verbose_name='Inicio')
+    fin = models.IntegerField(verbose_name='Fin')
+
+    class Meta:
+        verbose_name = 'Rango de Números Libres'
+        verbose_name_plural = 'Rangos de Números Libres'
+        constraints = [
+            # También es el índice (pool, inicio) con el que se leen en orden
+            models.UniqueConstraint(fields=['pool', 'inicio'], name='rango_pool_inicio_uniq'),
+            models.CheckConstraint(check=models.Q(inicio__lte=models.F('fin')), name='rango_inicio_lte_fin'),
+        ]
+        indexes = [
+            # Vecino izquierdo al devolver números (ver liberar_numeros)
+            models.Index(fields=['pool', 'fin'], name='rango_pool_fin_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.inicio}-{self.fin}"
+
+
+def _repartir(rangos, cantidad):
+    """
+    Toma hasta `cantidad` números de los rangos (ordenados) sin persistir.
+
+    Returns:
+        tuple: (números, ids de rangos agotados, (rango, nuevo inicio) o None)
+    """
+    numeros, agotados = [], []
+    for rango in rangos:
+        faltan = cantidad - len(numeros)
+        if not faltan:
+            break
+        tamano = rango.fin - rango.inicio + 1
+        if tamano <= faltan:
+            numeros += range(rango.inicio, rango.fin + 1)
+            agotados.append(rango.pk)
+        else:
+            numeros += range(rango.inicio, rango.inicio + faltan)
+            return numeros, agotados, (rango, rango.inicio + faltan)
+    return numeros, agotados, None
+
+
+def _reclamar_rango(rango, cantidad):
+    """Compare-and-set sobre un rango: retorna los números tomados ([] si cambió)"""
+    mismo_rango = TicketNumberRange.objects.filter(pk=rango.pk, inicio=rango.inicio, fin=rango.fin)
+    if rango.fin - rango.inicio + 1 <= cantidad:
+        borrados, _ = mismo_rango.delete()
+        return list(range(rango.inicio, rango.fin + 1)) if borrados else []
+    if mismo_rango.update(inicio=rango.inicio + cantidad):
+        return list(range(rango.inicio, rango.inicio + cantidad))
+    return []
+
+
+def _agrupar(numeros):
+    """[1, 2, 3, 7, 8] → [(1, 3), (7, 8)] (números ordenados y sin repetir)"""
+    rangos = []
+    for numero in numeros:
+        if rangos and rangos[-1][1] == numero - 1:
+            rangos[-1] = (rangos[-1][0], numero)
+        else:
+            rangos.append((numero, numero))
+    return rangos
+
+
+def _unir(rangos):
+    """Une rangos que se solapan o son adyacentes; retorna la lista ordenada"""
+    unidos = []
+    for inicio, fin in sorted(rangos):
+        if unidos and inicio <= unidos[-1][1] + 1:
+            unidos[-1] = (unidos[-1][0], max(unidos[-1][1], fin))
+        else:
+            unidos.append((inicio, fin))
+    return unidos
+
 class SponsorshipRequest(models.Model):
     ESTADO_CHOICES = (
         ('pendiente', 'Pendiente'),
@@ -397,6 +722,7 @@ class Winner(models.Model):
     algoritmo = models.CharField(max_length=50, default='SHA256+Timestamp', verbose_name='Algoritmo Utilizado')
     hash_verificacion = models.CharField(max_length=64, null=True, blank=True, verbose_name='Hash de Verificación', help_text='Hash SHA256 de toda la información del sorteo')
     participantes_totales = models.IntegerField(null=True, blank=True, verbose_name='Total de Participantes', help_text='Número de boletos pagados al momento del sorteo')
+    digest_participantes = models.CharField(max_length=64, null=True, blank=True, verbose_name='Digest de Participantes', help_text='SHA256 de los ids de los boletos pagados (en orden) al momento del sorteo')
     
     # Acta digital del sorteo
     acta_digital = models.TextField(null=True, blank=True, verbose_name='Acta Digital del Sorteo', help_text='Registro completo y auditable del sorteo')
@@ -0,0 +1,177 @@
+"""
+Servicio de compra de boletos.
+
+Centraliza la creación de boletos para que la vista HTML, la API REST y los
+cargadores de datos demo usen el mismo camino:
+    - Los números se toman del TicketNumberPool de la rifa (O(N)).
+    - Todos los boletos de una orden se insertan con un único bulk_create.
+    - boletos_vendidos se incrementa con un solo UPDATE usando F().
+
+Modos de compra (settings.TICKET_PURCHASE_MODE):
+    - 'pesimista': bloquea la fila de la rifa durante toda la compra.
+    - 'optimista': reserva el cupo con un UPDATE condicional
+      (boletos_vendidos + n <= total_boletos) y asigna números con
+      compare-and-set por rango libre, sin bloquear la rifa.
+"""
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from apps.admin_panel import metrics
+from . import cache_service, live_events
+from .models import Raffle, Ticket, TicketNumberPool
+
+
+class CompraError(Exception):
+    """Error de negocio al comprar boletos (mensaje apto para mostrar al usuario)"""
+
+
+def crear_boletos(raffle, asignaciones, estado='reservado'):
+    """
+    Inserta en un solo bulk_create los boletos indicados.
+
+    No modifica boletos_vendidos ni toma números del pool: el llamador es
+    responsable de ambos (ver comprar_boletos e incrementar_vendidos).
+
+    Args:
+        raffle (Raffle): Rifa a la que pertenecen los boletos
+        asignaciones (iterable): Pares (usuario, numero_boleto)
+        estado (str): Estado inicial de los boletos
+
+    Returns:
+        list[Ticket]: Boletos creados, con id asignado
+    """
+    boletos = [
+        Ticket(
+            rifa=raffle,
+            usuario=usuario,
+            numero_boleto=numero,
+            codigo_qr=str(uuid.uuid4()),
+            estado=estado,
+        )
+        for usuario, numero in asignaciones
+    ]
+    if not boletos:
+        return []
+
+    Ticket.objects.bulk_create(boletos)
+
+    # MySQL no retorna los ids generados en bulk_create: recuperarlos por codigo_qr
+    if any(boleto.pk is None for boleto in boletos):
+        ids = dict(
+            Ticket.objects.filter(
+                codigo_qr__in=[boleto.codigo_qr for boleto in boletos]
+            ).values_list('codigo_qr', 'id')
+        )
+        for boleto in boletos:
+            boleto.pk = ids[boleto.codigo_qr]
+
+    # bulk_create no emite post_save: registrar en las métricas a mano
+    metrics.registrar_boletos(raffle, None, estado, len(boletos))
+    cache_service.invalidar_rifa(raffle.pk)
+    live_events.publicar_ventas(raffle.pk)
+
+    return boletos
+
+
+def incrementar_vendidos(raffle, cantidad):
+    """Incrementa boletos_vendidos con un único UPDATE atómico"""
+    Raffle.objects.filter(pk=raffle.pk).update(
+        boletos_vendidos=F('boletos_vendidos') + cantidad
+    )
+    raffle.boletos_vendidos += cantidad
+
+
+def comprar_boletos(raffle_id, usuario, cantidad, estado='reservado', modo=None):
+    """
+    Reserva `cantidad` boletos de una rifa activa para un usuario.
+
+    Args:
+        raffle_id (int): ID de la rifa
+        usuario (User): Comprador
+        cantidad (int): Cantidad de boletos a reservar
+        estado (str): Estado inicial de los boletos
+        modo (str): 'pesimista' u 'optimista' (por defecto settings.TICKET_PURCHASE_MODE)
+
+    Returns:
+        list[Ticket]: Boletos creados
+
+    Raises:
+        CompraError: Si la cantidad es inválida o no hay boletos suficientes
+        Raffle.DoesNotExist: Si la rifa no existe o no está activa
+    """
+    if cantidad < 1:
+        raise CompraError('La cantidad de boletos debe ser al menos 1.')
+
+    modo = modo or getattr(settings, 'TICKET_PURCHASE_MODE', 'pesimista')
+    if modo == 'optimista':
+        return _comprar_optimista(raffle_id, usuario, cantidad, estado)
+    return _comprar_pesimista(raffle_id, usuario, cantidad, estado)
+
+
+def _comprar_pesimista(raffle_id, usuario, cantidad, estado):
+    """
+    Bloquea la fila de la rifa (select_for_update) solo durante tres
+    operaciones: tomar números del pool, un bulk_create y un UPDATE.
+    """
+    with transaction.atomic():
+        raffle = Raffle.objects.select_for_update().get(pk=raffle_id, estado='activa')
+
+        if raffle.boletos_vendidos + cantidad > raffle.total_boletos:
+            raise CompraError(f'Solo hay {raffle.boletos_disponibles} boletos disponibles.')
+
+        pool = TicketNumberPool.para_rifa(raffle)
+        numeros = pool.tomar_numeros(cantidad)
+        if not numeros:
+            raise CompraError(f'Solo hay {pool.cantidad_disponible} boletos disponibles.')
+
+        boletos = crear_boletos(raffle, [(usuario, numero) for numero in numeros], estado)
+        incrementar_vendidos(raffle, len(boletos))
+
+    return boletos
+
+
+def _comprar_optimista(raffle_id, usuario, cantidad, estado):
+    """
+    Compra sin bloquear la fila de la rifa.
+
+    1. Reserva el cupo con un único UPDATE condicional; la base de datos
+       garantiza que boletos_vendidos nunca supere total_boletos.
+    2. Toma números del pool sin bloquear su fila (ver tomar_numeros_optimista).
+    3. Inserta los boletos con bulk_create.
+
+    Si falla el paso 2 o 3 se devuelve el cupo y los números tomados.
+    Para que el cupo se libere de inmediato, llamar fuera de una transacción.
+    """
+    reservados = Raffle.objects.filter(
+        pk=raffle_id,
+        estado='activa',
+        boletos_vendidos__lte=F('total_boletos') - cantidad,
+    ).update(boletos_vendidos=F('boletos_vendidos') + cantidad)
+
+    if not reservados:
+        raffle = Raffle.objects.get(pk=raffle_id, estado='activa')
+        raise CompraError(f'Solo hay {raffle.boletos_disponibles} boletos disponibles.')
+
+    raffle = Raffle.objects.get(pk=raffle_id)
+    pool = None
+    numeros = []
+    try:
+        pool = TicketNumberPool.para_rifa(raffle)
+        numeros = pool.tomar_numeros_optimista(cantidad)
+        if not numeros:
+            raise CompraError(f'Solo hay {pool.cantidad_disponible} boletos disponibles.')
+
+        with transaction.atomic():
+            boletos = crear_boletos(raffle, [(usuario, numero) for numero in numeros], estado)
+    except Exception:
+        # Compensar: devolver el cupo reservado y los números tomados
+        Raffle.objects.filter(pk=raffle_id).update(boletos_vendidos=F('boletos_vendidos') - cantidad)
+        if numeros:
+            pool.liberar_numeros(numeros)
+        raise
+
+    return boletos
+
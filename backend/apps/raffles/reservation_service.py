@@ -0,0 +1,114 @@
+"""
+Servicio de expiración de reservas.
+
+Los boletos se crean en estado 'reservado' (ver purchase_service) y pasan a
+'pagado' en process_payment_view. Si el comprador abandona el pago, la
+reserva caduca tras settings.TICKET_RESERVATION_TTL_MINUTES:
+    - El boleto se elimina (la restricción rifa + numero_boleto impide
+      reutilizar el número mientras exista la fila).
+    - boletos_vendidos se decrementa con un UPDATE usando F().
+    - El número vuelve al TicketNumberPool de la rifa.
+
+Se procesa por lotes para no bloquear muchas filas a la vez.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.admin_panel import metrics
+from . import cache_service, live_events
+from .models import Raffle, Ticket, TicketNumberPool
+
+
+def limite_expiracion(minutos=None):
+    """Fecha antes de la cual una reserva se considera vencida"""
+    if minutos is None:
+        minutos = getattr(settings, 'TICKET_RESERVATION_TTL_MINUTES', 15)
+    return timezone.now() - timedelta(minutes=minutos)
+
+
+def expirar_reservas(minutos=None, tamano_lote=500):
+    """
+    Expira todas las reservas vencidas, lote por lote.
+
+    Args:
+        minutos (int): TTL de la reserva (por defecto TICKET_RESERVATION_TTL_MINUTES)
+        tamano_lote (int): Máximo de boletos por transacción
+
+    Returns:
+        dict: {rifa_id: cantidad de boletos liberados}
+    """
+    limite = limite_expiracion(minutos)
+    liberados = defaultdict(int)
+    ultimo_id = 0
+
+    while True:
+        # Paginación por id: los boletos con pago asociado se saltan y no
+        # vuelven a aparecer en el siguiente lote
+        ids = list(
+            Ticket.objects.filter(
+                estado='reservado', fecha_compra__lt=limite, id__gt=ultimo_id
+            ).order_by('id').values_list('id', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            break
+
+        ultimo_id = ids[-1]
+        for rifa_id, cantidad in _expirar_lote(ids, limite).items():
+            liberados[rifa_id] += cantidad
+
+    return dict(liberados)
+
+
+def _expirar_lote(ids, limite):
+    """
+    Expira un lote de boletos en una sola transacción.
+
+    Los boletos se vuelven a leer con select_for_update: si process_payment_view
+    los está pagando en paralelo, se espera y se descartan los que ya no estén
+    reservados. Los boletos asociados a un Payment nunca se eliminan.
+    """
+    from apps.payments.models import Payment
+
+    with transaction.atomic():
+        filas = list(
+            Ticket.objects.select_for_update().filter(
+                id__in=ids, estado='reservado', fecha_compra__lt=limite
+            ).values_list('id', 'rifa_id', 'numero_boleto')
+        )
+        con_pago = set(
+            Payment.boletos.through.objects.filter(
+                ticket_id__in=[fila[0] for fila in filas]
+            ).values_list('ticket_id', flat=True)
+        )
+
+        por_rifa = defaultdict(list)
+        ids_expirados = []
+        for ticket_id, rifa_id, numero in filas:
+            if ticket_id in con_pago:
+                continue
+            por_rifa[rifa_id].append(numero)
+            ids_expirados.append(ticket_id)
+
+        if not ids_expirados:
+            return {}
+
+        Ticket.objects.filter(id__in=ids_expirados).delete()
+
+        rifas = Raffle.objects.only('estado', 'precio_boleto').in_bulk(list(por_rifa))
+        for rifa_id, numeros in por_rifa.items():
+            metrics.registrar_boletos(rifas[rifa_id], 'reservado', None, len(numeros))
+            cache_service.invalidar_rifa(rifa_id)
+            live_events.publicar_ventas(rifa_id)
+            Raffle.objects.filter(pk=rifa_id).update(
+                boletos_vendidos=F('boletos_vendidos') - len(numeros)
+            )
+            pool = TicketNumberPool.objects.filter(rifa_id=rifa_id).first()
+            if pool is not None:
+                pool.liberar_numeros(numeros)
+
+    return {rifa_id: len(numeros) for rifa_id, numeros in por_rifa.items()}
@@ -5,10 +5,12 @@ Maneja conversión de modelos a JSON y validaciones de negocio.
 
 from rest_framework import serializers
 from django.utils import timezone
+from apps.core.proyeccion import CamposDinamicosMixin
+from apps.core.serializacion import SerializerRapido
 from .models import Raffle, Ticket, SponsorshipRequest, OrganizerSponsorRequest, Winner
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para boletos"""
 
     usuario_nombre = serializers.CharField(source='usuario.nombre', read_only=True)
@@ -25,7 +27,7 @@ class TicketSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'fecha_compra', 'codigo_qr']
 
 
-class TicketListSerializer(serializers.ModelSerializer):
+class TicketListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer ligero para listados de boletos"""
 
     class Meta:
@@ -33,7 +35,7 @@ class TicketListSerializer(serializers.ModelSerializer):
         fields = ['id', 'numero_boleto', 'estado', 'fecha_compra']
 
 
-class RaffleSerializer(serializers.ModelSerializer):
+class RaffleSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer completo para rifas"""
 
     organizador_nombre = serializers.CharField(source='organizador.nombre', read_only=True)
@@ -66,6 +68,24 @@ class RaffleSerializer(serializers.ModelSerializer):
             'boletos_vendidos', 'fecha_solicitud', 'fecha_revision_aprobacion',
             'fecha_pausa', 'fecha_revision'
         ]
+        # Columnas que leen los campos calculados (para ?fields= / ?omit=)
+        columnas_requeridas = {
+            'porcentaje_vendido': ('boletos_vendidos', 'total_boletos'),
+            'total_recaudado': ('boletos_vendidos', 'precio_boleto'),
+            'tiempo_restante': ('estado', 'fecha_sorteo', 'nueva_fecha_sorteo'),
+            'puede_comprar': ('estado', 'boletos_vendidos', 'total_boletos'),
+        }
+
+    def update(self, instance, validated_data):
+        """
+        Como ModelSerializer.update() pero guarda solo los campos recibidos:
+        un save() completo pisaría boletos_vendidos con el valor leído al
+        cargar la rifa si hubo compras entretanto.
+        """
+        for campo, valor in validated_data.items():
+            setattr(instance, campo, valor)
+        instance.save(update_fields=[*validated_data, 'fecha_actualizacion'])
+        return instance
 
     def get_total_recaudado(self, obj):
         """Calcula el total recaudado por la rifa"""
@@ -126,7 +146,7 @@ class RaffleSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class RaffleListSerializer(serializers.ModelSerializer):
+class RaffleListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer ligero para listados de rifas"""
 
     organizador_nombre = serializers.CharField(source='organizador.nombre', read_only=True)
@@ -140,6 +160,9 @@ class RaffleListSerializer(serializers.ModelSerializer):
             'fecha_sorteo', 'estado', 'premio_principal',
             'organizador_nombre'
         ]
+        columnas_requeridas = {
+            'porcentaje_vendido': ('boletos_vendidos', 'total_boletos'),
+        }
 
 
 class RaffleCreateSerializer(serializers.ModelSerializer):
@@ -237,3 +260,49 @@ class RaffleStatsSerializer(serializers.Serializer):
     total_boletos_vendidos = serializers.IntegerField()
     total_recaudado = serializers.DecimalField(max_digits=15, decimal_places=2)
     rifas_pendientes_aprobacion = serializers.IntegerField()
+
+
+# ============================================================================
+# SERIALIZERS RÁPIDOS (solo lectura, filas de values())
+# ============================================================================
+
+class RaffleListFastSerializer(SerializerRapido):
+    """Misma salida que RaffleListSerializer, desde values()"""
+
+    columnas = (
+        'id', 'titulo', 'imagen', 'precio_boleto', 'total_boletos',
+        'boletos_vendidos', 'fecha_sorteo', 'estado', 'premio_principal',
+        'organizador__nombre'
+    )
+    storage_imagen = Raffle._meta.get_field('imagen').storage
+
+    def representar_fila(self, fila):
+        total, vendidos = fila['total_boletos'], fila['boletos_vendidos']
+        return {
+            'id': fila['id'],
+            'titulo': fila['titulo'],
+            'imagen': self.archivo(fila['imagen'], self.storage_imagen),
+            'precio_boleto': self.decimal(fila['precio_boleto']),
+            'total_boletos': total,
+            'boletos_vendidos': vendidos,
+            # Raffle.porcentaje_vendido
+            'porcentaje_vendido': float((vendidos / total) * 100 if total > 0 else 0),
+            'fecha_sorteo': self.fecha_hora(fila['fecha_sorteo']),
+            'estado': fila['estado'],
+            'premio_principal': fila['premio_principal'],
+            'organizador_nombre': fila['organizador__nombre'],
+        }
+
+
+class TicketListFastSerializer(SerializerRapido):
+    """Misma salida que TicketListSerializer, desde values()"""
+
+    columnas = ('id', 'numero_boleto', 'estado', 'fecha_compra')
+
+    def representar_fila(self, fila):
+        return {
+            'id': fila['id'],
+            'numero_boleto': fila['numero_boleto'],
+            'estado': fila['estado'],
+            'fecha_compra': self.fecha_hora(fila['fecha_compra']),
+        }
@@ -1,3 +1,1020 @@
-from django.test import TestCase
+import io
+import random
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, IntegrityError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase, APIRequestFactory
+
+from apps.core import renderers
+from apps.users.models import User
+from .models import (
+    Raffle, Ticket, Winner, SponsorshipRequest, OrganizerSponsorRequest,
+    TicketNumberPool, TicketNumberRange,
+)
+from .draw_service import (
+    sortear, verificar_sorteo, indice_ganador, boleto_en_posicion, calcular_semilla,
+    digest_participantes, SorteoError,
+)
+from . import cache_service, live_events, views
+from .api_views import RaffleViewSet
+from .purchase_service import comprar_boletos, CompraError
+from .reservation_service import expirar_reservas
+from .serializers import (
+    RaffleSerializer, RaffleListSerializer, TicketListSerializer,
+    RaffleListFastSerializer, TicketListFastSerializer,
+)
+
+
+class PoolNumerosTests(TestCase):
+    """Asignación de números con TicketNumberPool (puntero + rangos libres)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+
+    def crear_pool(self, total=10):
+        rifa = Raffle.objects.create(
+            organizador=self.organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=total,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        return TicketNumberPool.para_rifa(rifa)
+
+    def rangos(self, pool):
+        return list(pool.rangos_libres.order_by('inicio').values_list('inicio', 'fin'))
+
+    def test_toma_los_mas_bajos(self):
+        pool = self.crear_pool()
+        self.assertEqual(pool.tomar_numeros(3), [1, 2, 3])
+        self.assertEqual(pool.tomar_numeros(2), [4, 5])
+        self.assertEqual(pool.cantidad_disponible, 5)
+
+    def test_reutiliza_liberados(self):
+        pool = self.crear_pool()
+        pool.tomar_numeros(8)
+        pool.liberar_numeros([6, 2, 3])
+        self.assertEqual(self.rangos(pool), [(2, 3), (6, 6)])
+        self.assertEqual(pool.tomar_numeros(2), [2, 3])
+        self.assertEqual(pool.tomar_numeros(2), [6, 9])
+        self.assertEqual(self.rangos(pool), [])
+
+    def test_une_rangos_y_compacta_puntero(self):
+        pool = self.crear_pool()
+        pool.tomar_numeros(6)
+        pool.liberar_numeros([2])
+        pool.liberar_numeros([4])
+        pool.liberar_numeros([3])
+        self.assertEqual(self.rangos(pool), [(2, 4)])
+        # 5 y 6 tocan el puntero: todo vuelve a ser "nunca asignado"
+        pool.liberar_numeros([5, 6])
+        self.assertEqual(self.rangos(pool), [])
+        self.assertEqual(TicketNumberPool.objects.get(pk=pool.pk).siguiente_numero, 2)
+
+    def test_agotamiento(self):
+        pool = self.crear_pool(total=5)
+        self.assertEqual(pool.tomar_numeros(5), [1, 2, 3, 4, 5])
+        self.assertEqual(pool.tomar_numeros(1), [])
+        pool.liberar_numeros([3])
+        self.assertEqual(pool.tomar_numeros(2), [])
+        self.assertEqual(self.rangos(pool), [(3, 3)])
+        self.assertEqual(pool.tomar_numeros(1), [3])
+        self.assertEqual(pool.cantidad_disponible, 0)
+
+    def test_construye_desde_boletos_existentes(self):
+        rifa = self.crear_pool().rifa
+        TicketNumberPool.objects.filter(rifa=rifa).delete()
+        Ticket.objects.bulk_create([
+            Ticket(rifa=rifa, usuario=self.organizador, numero_boleto=n, codigo_qr=str(uuid.uuid4()))
+            for n in (1, 2, 5, 9)
+        ])
+        pool = TicketNumberPool.para_rifa(rifa)
+        self.assertEqual(pool.siguiente_numero, 10)
+        self.assertEqual(self.rangos(pool), [(3, 4), (6, 8)])
+        self.assertEqual(pool.tomar_numeros(4), [3, 4, 6, 7])
+
+    def test_consultas_no_dependen_de_los_libres(self):
+        pocos, muchos = self.crear_pool(total=4000), self.crear_pool(total=4000)
+        for pool in (pocos, muchos):
+            pool.tomar_numeros(3000)
+        pocos.liberar_numeros([10, 20, 30])
+        muchos.liberar_numeros(range(1, 3000, 2))
+        self.assertEqual(muchos.rangos_libres.count(), 1500)
+
+        for pool in (pocos, muchos):
+            with CaptureQueriesContext(connection) as consultas:
+                tomados = pool.tomar_numeros(2)
+                pool.liberar_numeros(tomados[:1])
+            with CaptureQueriesContext(connection) as consultas_optimista:
+                self.assertEqual(len(pool.tomar_numeros_optimista(2)), 2)
+            pool.cuenta = (len(consultas), len(consultas_optimista))
+        self.assertEqual(pocos.cuenta, muchos.cuenta)
+
+    def test_optimista_salta_rangos_en_conflicto(self):
+        pool = self.crear_pool()
+        pool.tomar_numeros(6)
+        pool.liberar_numeros([2, 4])
+        leidos = list(pool.rangos_libres.order_by('inicio'))
+        # Otro comprador se llevó el rango 2 entre la lectura y el compare-and-set
+        TicketNumberRange.objects.filter(inicio=2).delete()
+        rangos = mock.MagicMock()
+        rangos.order_by.return_value = leidos
+        with mock.patch.object(TicketNumberPool, 'rangos_libres', rangos):
+            self.assertEqual(pool.tomar_numeros_optimista(2), [4, 7])
+
+    def test_optimista_no_pasa_del_total(self):
+        pool = self.crear_pool(total=3)
+        self.assertEqual(pool.tomar_numeros_optimista(2), [1, 2])
+        self.assertEqual(pool.tomar_numeros_optimista(2), [])
+        self.assertEqual(TicketNumberPool.objects.get(pk=pool.pk).siguiente_numero, 3)
+        self.assertEqual(pool.tomar_numeros_optimista(1), [3])
+
+
+class CompraBoletosTests(TestCase):
+    """Compra de boletos con purchase_service (bulk_create + UPDATE con F())"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.comprador = User.objects.create_user(email='part@test.cl', nombre='Participante', password=None)
+
+    def setUp(self):
+        self.rifa = Raffle.objects.create(
+            organizador=self.organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=50,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+
+    def comprar(self, cantidad, **kwargs):
+        return comprar_boletos(self.rifa.pk, self.comprador, cantidad, **kwargs)
+
+    def test_numeros_y_contador(self):
+        boletos = self.comprar(3)
+        self.assertEqual([boleto.numero_boleto for boleto in boletos], [1, 2, 3])
+        self.assertTrue(all(boleto.pk and boleto.estado == 'reservado' for boleto in boletos))
+        self.assertEqual([boleto.numero_boleto for boleto in self.comprar(2)], [4, 5])
+        self.rifa.refresh_from_db()
+        self.assertEqual(self.rifa.boletos_vendidos, 5)
+        self.assertEqual(Ticket.objects.filter(rifa=self.rifa, usuario=self.comprador).count(), 5)
+
+    def test_consultas_no_dependen_de_la_cantidad(self):
+        self.comprar(1)
+        with CaptureQueriesContext(connection) as uno:
+            self.comprar(1)
+        with CaptureQueriesContext(connection) as veinte:
+            self.comprar(20)
+        self.assertEqual(len(uno), len(veinte))
+
+    def test_no_vende_mas_que_el_total(self):
+        self.comprar(48)
+        with self.assertRaisesMessage(CompraError, 'Solo hay 2 boletos disponibles.'):
+            self.comprar(3)
+        self.assertEqual(Raffle.objects.get(pk=self.rifa.pk).boletos_vendidos, 48)
+        self.assertEqual(len(self.comprar(2)), 2)
+
+    def test_rifa_no_activa(self):
+        Raffle.objects.filter(pk=self.rifa.pk).update(estado='pausada')
+        with self.assertRaises(Raffle.DoesNotExist):
+            self.comprar(1)
+        with self.assertRaises(CompraError):
+            self.comprar(0)
+
+    # ------------------------------------------------------------------
+    # Modo optimista (UPDATE condicional, sin bloquear la rifa)
+    # ------------------------------------------------------------------
+
+    def test_optimista_numeros_y_contador(self):
+        self.assertEqual([b.numero_boleto for b in self.comprar(3, modo='optimista')], [1, 2, 3])
+        self.assertEqual([b.numero_boleto for b in self.comprar(2, modo='optimista')], [4, 5])
+        self.assertEqual(Raffle.objects.get(pk=self.rifa.pk).boletos_vendidos, 5)
+
+    def test_optimista_rechaza_sobreventa(self):
+        self.comprar(48, modo='optimista')
+        with self.assertRaisesMessage(CompraError, 'Solo hay 2 boletos disponibles.'):
+            self.comprar(3, modo='optimista')
+        # El UPDATE condicional no aplicó: ni cupo ni números consumidos
+        self.assertEqual(Raffle.objects.get(pk=self.rifa.pk).boletos_vendidos, 48)
+        self.assertEqual(TicketNumberPool.objects.get(rifa=self.rifa).siguiente_numero, 49)
+
+    def test_optimista_compensa_si_falla_la_insercion(self):
+        self.comprar(2, modo='optimista')
+        with mock.patch('apps.raffles.purchase_service.crear_boletos', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.comprar(3, modo='optimista')
+        self.assertEqual(Raffle.objects.get(pk=self.rifa.pk).boletos_vendidos, 2)
+        self.assertEqual([b.numero_boleto for b in self.comprar(3, modo='optimista')], [3, 4, 5])
+
+    def test_cambio_de_estado_no_pisa_las_ventas(self):
+        admin = User.objects.create_user(email='admin@test.cl', nombre='Admin', password=None, rol='admin', is_staff=True)
+        leida = Raffle.objects.get(pk=self.rifa.pk)
+        # Compras entre la lectura de la rifa y el guardado de la acción
+        self.comprar(4, modo='optimista')
+        cliente = APIClient()
+        cliente.force_authenticate(admin)
+        with mock.patch.object(RaffleViewSet, 'get_object', return_value=leida):
+            respuesta = cliente.post(f'/api/raffles/{self.rifa.pk}/pausar/', {'motivo_pausa': 'Revisión'})
+        self.assertEqual(respuesta.status_code, 200)
+        rifa = Raffle.objects.get(pk=self.rifa.pk)
+        self.assertEqual((rifa.estado, rifa.boletos_vendidos), ('pausada', 4))
+
+    def test_edicion_no_pisa_las_ventas(self):
+        admin = User.objects.create_user(email='admin@test.cl', nombre='Admin', password=None, rol='admin', is_staff=True)
+        cliente = APIClient()
+        cliente.force_authenticate(admin)
+        for metodo, datos in (('patch', {'titulo': 'Editada'}), ('put', {
+            'organizador': self.organizador.pk, 'titulo': 'Editada otra vez', 'descripcion': 'Rifa de prueba',
+            'precio_boleto': 1000, 'total_boletos': 50, 'fecha_sorteo': self.rifa.fecha_sorteo.isoformat(),
+            'premio_principal': 'Premio',
+        })):
+            leida = Raffle.objects.get(pk=self.rifa.pk)
+            # Compras entre la lectura de la rifa y el guardado de la edición
+            self.comprar(2, modo='optimista')
+            with mock.patch.object(RaffleViewSet, 'get_object', return_value=leida):
+                respuesta = getattr(cliente, metodo)(f'/api/raffles/{self.rifa.pk}/', datos, format='json')
+            self.assertEqual(respuesta.status_code, 200, respuesta.content)
+            rifa = Raffle.objects.get(pk=self.rifa.pk)
+            self.assertEqual((rifa.titulo, rifa.boletos_vendidos), (datos['titulo'], leida.boletos_vendidos + 2))
+
+
+class ExpiracionReservasTests(TestCase):
+    """Expiración de reservas vencidas (reservation_service)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.comprador = User.objects.create_user(email='part@test.cl', nombre='Participante', password=None)
+
+    def setUp(self):
+        self.rifa = Raffle.objects.create(
+            organizador=self.organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=20,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+
+    def comprar(self, cantidad, hace_minutos=0):
+        boletos = comprar_boletos(self.rifa.pk, self.comprador, cantidad)
+        Ticket.objects.filter(pk__in=[b.pk for b in boletos]).update(
+            fecha_compra=timezone.now() - timedelta(minutes=hace_minutos)
+        )
+        return boletos
+
+    def test_expira_y_devuelve_numeros(self):
+        vencidos = self.comprar(3, hace_minutos=30)    # 1, 2, 3
+        pagado = self.comprar(1, hace_minutos=30)[0]  # 4
+        recientes = self.comprar(2)                    # 5, 6
+        Ticket.objects.filter(pk=pagado.pk).update(estado='pagado')
+
+        self.assertEqual(expirar_reservas(minutos=15, tamano_lote=2), {self.rifa.pk: 3})
+
+        self.assertFalse(Ticket.objects.filter(pk__in=[b.pk for b in vencidos]).exists())
+        self.assertEqual(Ticket.objects.filter(pk__in=[pagado.pk, *[b.pk for b in recientes]]).count(), 3)
+        self.assertEqual(Raffle.objects.get(pk=self.rifa.pk).boletos_vendidos, 3)
+        # Los números vuelven al pool y se reasignan primero
+        self.assertEqual([b.numero_boleto for b in self.comprar(4)], [1, 2, 3, 7])
+
+    def test_no_expira_boletos_con_pago(self):
+        from apps.payments.models import Payment
+
+        boleto = self.comprar(1, hace_minutos=30)[0]
+        pago = Payment.objects.create(usuario=self.comprador, monto=1000, metodo_pago='tarjeta',
+                                      estado='pendiente', transaction_id='TX-1')
+        pago.boletos.add(boleto)
+        self.assertEqual(expirar_reservas(minutos=15), {})
+        self.assertTrue(Ticket.objects.filter(pk=boleto.pk).exists())
+
+    def test_comando(self):
+        self.comprar(2, hace_minutos=30)
+        salida = io.StringIO()
+        call_command('expirar_reservas', minutos=15, stdout=salida)
+        self.assertIn('Se liberaron 2 boleto(s) en 1 rifa(s)', salida.getvalue())
+        self.assertEqual(Raffle.objects.get(pk=self.rifa.pk).boletos_vendidos, 0)
+        self.assertEqual(TicketNumberPool.objects.get(rifa=self.rifa).siguiente_numero, 1)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+                   PUBLIC_PAGE_CACHE_TTL=60)
+class CachePaginasPublicasTests(TestCase):
+    """Versiones por rifa y caché de páginas públicas solo para anónimos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.usuario = User.objects.create_user(email='p@test.cl', nombre='P', password='clave-segura-123')
+        cls.rifa = Raffle.objects.create(
+            organizador=cls.organizador, titulo='Rifa cacheada', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=50,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def renders_listado(self, cliente=None, veces=2):
+        """Cuántas veces se renderizó /raffles/ en `veces` requests"""
+        cliente = cliente or self.client
+        with mock.patch('apps.raffles.views.render', wraps=views.render) as render:
+            for _ in range(veces):
+                self.assertEqual(cliente.get('/raffles/').status_code, 200)
+        return render.call_count
+
+    def test_version_cambia_al_confirmar(self):
+        version = cache_service.version_rifa(self.rifa.pk)
+        self.assertEqual(cache_service.version_rifa(self.rifa.pk), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_service.invalidar_rifa(self.rifa.pk)
+            # Antes del commit otro request seguiría viendo la versión vieja
+            self.assertEqual(cache_service.version_rifa(self.rifa.pk), version)
+        self.assertNotEqual(cache_service.version_rifa(self.rifa.pk), version)
+
+    def test_version_perdida_no_repite_una_anterior(self):
+        version = cache_service.version_rifa(self.rifa.pk)
+        cache.clear()
+        self.assertNotEqual(cache_service.version_rifa(self.rifa.pk), version)
+
+    def test_guardar_y_comprar_invalidan(self):
+        firma = cache_service.firma([self.rifa.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rifa.save(update_fields=['descripcion', 'fecha_actualizacion'])
+        self.assertNotEqual(cache_service.firma([self.rifa.pk]), firma)
+
+        firma = cache_service.firma([self.rifa.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            comprar_boletos(self.rifa.pk, self.usuario, 2)
+        self.assertNotEqual(cache_service.firma([self.rifa.pk]), firma)
+
+    def test_anonimos_reciben_la_pagina_cacheada(self):
+        self.assertEqual(self.renders_listado(), 1)
+        # Una venta cambia la clave: la página se vuelve a generar
+        with self.captureOnCommitCallbacks(execute=True):
+            comprar_boletos(self.rifa.pk, self.usuario, 1)
+        self.assertEqual(self.renders_listado(), 1)
+
+    def test_autenticados_no_usan_la_cache(self):
+        self.assertEqual(self.renders_listado(), 1)
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.renders_listado(), 2)
+
+    @override_settings(PUBLIC_PAGE_CACHE_TTL=0)
+    def test_ttl_cero_desactiva(self):
+        self.assertEqual(self.renders_listado(), 2)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ParticipantesRifaTests(TestCase):
+    """raffle_participants_view: participantes por páginas (keyset por id)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.usuarios = [
+            User.objects.create_user(email=f'p{i}@test.cl', nombre=f'Participante {i}', password=None)
+            for i in range(3)
+        ]
+        cls.rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        Ticket.objects.bulk_create([
+            Ticket(rifa=cls.rifa, usuario=cls.usuarios[n % 3], numero_boleto=n, codigo_qr=str(uuid.uuid4()),
+                   estado='reservado' if n % 4 == 0 else 'pagado')
+            for n in range(1, 13)
+        ])
+        cls.pagados = list(
+            Ticket.objects.filter(rifa=cls.rifa, estado='pagado').order_by('id').values_list('id', 'numero_boleto')
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def url(self, **parametros):
+        consulta = '&'.join(f'{clave}={valor}' for clave, valor in parametros.items())
+        return f'/raffles/{self.rifa.pk}/participantes/' + (f'?{consulta}' if consulta else '')
+
+    def test_recorre_todas_las_paginas(self):
+        vistos, desde = [], 0
+        while desde is not None:
+            datos = self.client.get(self.url(desde=desde, limite=4)).json()
+            self.assertLessEqual(len(datos['participantes']), 4)
+            vistos += [(p['id'], p['numero_boleto']) for p in datos['participantes']]
+            desde = datos['siguiente']
+        # Solo boletos pagados, en orden de id y sin repetir
+        self.assertEqual(vistos, self.pagados)
+
+    def test_una_pagina(self):
+        datos = self.client.get(self.url(limite=3)).json()
+        self.assertEqual([p['id'] for p in datos['participantes']], [i for i, _ in self.pagados[:3]])
+        self.assertEqual(datos['siguiente'], self.pagados[2][0])
+        self.assertEqual(datos['participantes'][0]['nombre'], 'Participante 1')
+        ultima = self.client.get(self.url(desde=self.pagados[-2][0])).json()
+        self.assertEqual(len(ultima['participantes']), 1)
+        self.assertIsNone(ultima['siguiente'])
+
+    def test_consultas_fijas_por_pagina(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.url(limite=5))
+        # La misma página se sirve desde caché (solo se verifica la rifa)
+        with self.assertNumQueries(1):
+            self.client.get(self.url(limite=5))
+
+    def test_pago_nuevo_invalida_la_pagina(self):
+        antes = self.client.get(self.url()).json()['participantes']
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.create(rifa=self.rifa, usuario=self.usuarios[0], numero_boleto=50,
+                                  codigo_qr=str(uuid.uuid4()), estado='pagado')
+        despues = self.client.get(self.url()).json()['participantes']
+        self.assertEqual(len(despues), len(antes) + 1)
+
+    def test_parametros(self):
+        self.assertEqual(self.client.get(self.url(desde='abc')).status_code, 400)
+        self.assertEqual(self.client.get('/raffles/999999/participantes/').status_code, 404)
+        self.assertEqual(self.client.post(self.url()).status_code, 405)
+        # limite se acota al rango permitido
+        self.assertEqual(len(self.client.get(self.url(limite=0)).json()['participantes']), 1)
+
+    def test_detalle_no_incrusta_participantes(self):
+        respuesta = self.client.get(f'/raffles/{self.rifa.pk}/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotContains(respuesta, 'Participante 1')
+        # La cuadrícula pide páginas a medida que se hace scroll
+        self.assertContains(respuesta, f'/raffles/{self.rifa.pk}/participantes/?limite=')
+
+
+class DatosRuletaTests(TestCase):
+    """roulette_data_view: ETag desde la base de datos, 304 y deltas con 'conocidos'"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.usuario = User.objects.create_user(email='p@test.cl', nombre='Participante', password=None)
+        cls.rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        cls.url = f'/raffles/{cls.rifa.pk}/roulette/data/'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.numero = 0
+
+    def boletos(self, cantidad, estado='pagado'):
+        """Boletos creados con bulk_create: no incrementan la versión de la caché"""
+        nuevos = []
+        for _ in range(cantidad):
+            self.numero += 1
+            nuevos.append(Ticket(rifa=self.rifa, usuario=self.usuario, numero_boleto=self.numero,
+                                 codigo_qr=str(uuid.uuid4()), estado=estado))
+        Ticket.objects.bulk_create(nuevos)
+        return list(Ticket.objects.filter(rifa=self.rifa).order_by('-id')[:cantidad])[::-1]
+
+    def test_304_mientras_no_hay_ventas(self):
+        self.boletos(3)
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()['ids']), 3)
+        etag = respuesta['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_venta_sin_invalidar_la_cache_cambia_el_etag(self):
+        # Otro worker con su propia caché no incrementa la versión de esta:
+        # el ETag se basa en los boletos pagados, no en la caché
+        self.boletos(2)
+        etag = self.client.get(self.url)['ETag']
+        self.boletos(1)
+        with mock.patch('apps.raffles.views.version_rifa', side_effect=AssertionError):
+            respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()['ids']), 3)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_reembolso_cambia_el_etag(self):
+        pagados = self.boletos(3)
+        etag = self.client.get(self.url)['ETag']
+        Ticket.objects.filter(pk=pagados[1].pk).update(estado='cancelado')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_delta_desde_el_ultimo_conocido(self):
+        self.boletos(3)
+        datos = self.client.get(self.url).json()
+        nuevos = self.boletos(2)
+        delta = self.client.get(self.url, {'since': datos['ultimo'], 'conocidos': 3}).json()
+        self.assertFalse(delta['completo'])
+        self.assertEqual(delta['ids'], [b.pk for b in nuevos])
+        self.assertEqual(delta['ultimo'], nuevos[-1].pk)
+
+    def test_reserva_pagada_despues_fuerza_lista_completa(self):
+        reservado, = self.boletos(1, estado='reservado')
+        self.boletos(2)
+        datos = self.client.get(self.url).json()
+        self.assertEqual(len(datos['ids']), 2)
+        # Un boleto anterior a 'ultimo' se paga: el cliente no lo recibiría con el delta
+        Ticket.objects.filter(pk=reservado.pk).update(estado='pagado')
+        resync = self.client.get(self.url, {'since': datos['ultimo'], 'conocidos': 2}).json()
+        self.assertTrue(resync['completo'])
+        self.assertEqual(resync['ids'][0], reservado.pk)
+        self.assertEqual(len(resync['ids']), 3)
+
+    def test_parametros(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/raffles/999999/roulette/data/').status_code, 404)
+
+
+@override_settings(LIVE_EVENTS_BROKER='memoria', LIVE_EVENTS_STREAM_SECONDS=0,
+                   LIVE_EVENTS_WINDOW_MINUTES=10, LIVE_EVENTS_MAX_STREAMS=4)
+class EventosEnVivoTests(TestCase):
+    """raffle_events_view: stream solo en la ventana del sorteo, cupo por proceso y eventos de estado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(minutes=5), estado='activa',
+        )
+        cls.url = f'/raffles/{cls.rifa.pk}/eventos/'
+
+    def contenido(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_fuera_de_la_ventana_responde_204(self):
+        Raffle.objects.filter(pk=self.rifa.pk).update(fecha_sorteo=timezone.now() + timedelta(hours=2))
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+        Raffle.objects.filter(pk=self.rifa.pk).update(fecha_sorteo=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    def test_rifa_no_activa_responde_204(self):
+        Raffle.objects.filter(pk=self.rifa.pk).update(estado='pausada')
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    @override_settings(LIVE_EVENTS_BROKER='desactivado')
+    def test_broker_desactivado_responde_204(self):
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    def test_en_la_ventana_envia_el_estado_actual(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        contenido = self.contenido(response)
+        self.assertTrue(contenido.startswith(f'retry: {views.REINTENTO_MS}\n\n'))
+        self.assertIn('event: ventas\n', contenido)
+        self.assertIn('event: estado\ndata: {"estado": "activa"}', contenido)
+        self.assertNotIn('event: ganador', contenido)
+
+    @override_settings(LIVE_EVENTS_MAX_STREAMS=0)
+    def test_sin_cupo_solo_indica_reintentar(self):
+        with mock.patch.object(live_events, 'get_broker') as get_broker:
+            contenido = self.contenido(self.client.get(self.url))
+
+        self.assertEqual(contenido, f'retry: {views.REINTENTO_OCUPADO_MS}\n\n')
+        get_broker.assert_not_called()
+
+    def test_el_cupo_se_libera_al_terminar(self):
+        with override_settings(LIVE_EVENTS_MAX_STREAMS=1):
+            self.contenido(self.client.get(self.url))
+            contenido = self.contenido(self.client.get(self.url))
+
+        self.assertIn('event: estado', contenido)
+
+    def test_evento_de_estado_solo_si_cambia(self):
+        suscripcion = live_events.get_broker().suscribir(live_events.canal_rifa(self.rifa.pk))
+        self.addCleanup(suscripcion.cerrar)
+        rifa = Raffle.objects.get(pk=self.rifa.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rifa.titulo = 'Rifa renombrada'
+            rifa.save()
+        self.assertIn('event: ventas', suscripcion.esperar(0))
+        self.assertIsNone(suscripcion.esperar(0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rifa.estado = 'pausada'
+            rifa.save()
+        self.assertEqual(suscripcion.esperar(0), live_events.formatear('estado', {'estado': 'pausada'}))
+        self.assertIn('event: ventas', suscripcion.esperar(0))
+
+    def test_guardar_rifa_no_consulta_el_estado_previo(self):
+        rifa = Raffle.objects.get(pk=self.rifa.pk)
+        rifa.estado = 'pausada'
+
+        with CaptureQueriesContext(connection) as consultas:
+            rifa.save(update_fields=['estado', 'fecha_actualizacion'])
+
+        # Las métricas pueden contar boletos; la rifa misma no se vuelve a leer
+        sql_rifa = [c['sql'] for c in consultas if 'FROM "raffles_raffle"' in c['sql']]
+        self.assertEqual(sql_rifa, [])
+
+
+class SorteoTests(TestCase):
+    """Sorteo verificable (draw_service)"""
+
+    def setUp(self):
+        self.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        self.participante = User.objects.create_user(
+            email='part@test.cl', nombre='Participante', password=None, rol='participante'
+        )
+        self.rifa = Raffle.objects.create(
+            organizador=self.organizador,
+            titulo='Rifa de prueba',
+            descripcion='Rifa de prueba',
+            premio_principal='Premio',
+            precio_boleto=1000,
+            total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(days=1),
+            estado='activa',
+        )
+        self.crear_boletos(range(1, 51))
+
+    def crear_boletos(self, numeros):
+        Ticket.objects.bulk_create([
+            Ticket(rifa=self.rifa, usuario=self.participante, numero_boleto=numero,
+                   codigo_qr=str(uuid.uuid4()), estado='pagado')
+            for numero in numeros
+        ])
+
+    def test_indice_reproducible(self):
+        semilla = 'ab' * 32
+        self.assertEqual(indice_ganador(semilla, 1000), indice_ganador(semilla, 1000))
+
+    def test_no_altera_random_global(self):
+        estado = random.getstate()
+        sortear(self.rifa)
+        self.assertEqual(random.getstate(), estado)
+
+    def test_sorteo_verificable(self):
+        winner = sortear(self.rifa)
+        self.assertEqual(winner.participantes_totales, 50)
+        self.assertEqual(Raffle.objects.get(pk=self.rifa.pk).estado, 'finalizada')
+        self.assertTrue(verificar_sorteo(winner)['valido'])
+
+    def test_ventas_posteriores_no_afectan_verificacion(self):
+        winner = sortear(self.rifa)
+        self.crear_boletos(range(51, 61))
+        self.assertTrue(verificar_sorteo(Winner.objects.get(pk=winner.pk))['valido'])
+
+    def test_detecta_datos_alterados(self):
+        winner = sortear(self.rifa)
+        winner.timestamp_sorteo += 1
+        self.assertFalse(verificar_sorteo(winner)['valido'])
+
+    def test_no_permite_segundo_sorteo(self):
+        sortear(self.rifa)
+        with self.assertRaises(SorteoError):
+            sortear(self.rifa)
+
+    def test_no_pisa_ventas_de_una_instancia_desactualizada(self):
+        rifa = Raffle.objects.get(pk=self.rifa.pk)
+        # Ventas confirmadas después de cargar la rifa (p. ej. por otro worker)
+        Raffle.objects.filter(pk=self.rifa.pk).update(boletos_vendidos=50)
+
+        with CaptureQueriesContext(connection) as consultas:
+            sortear(rifa)
+
+        guardada = Raffle.objects.get(pk=self.rifa.pk)
+        self.assertEqual(guardada.estado, 'finalizada')
+        self.assertEqual(guardada.boletos_vendidos, 50)
+        self.assertEqual(rifa.estado, 'finalizada')
+        update = [c['sql'] for c in consultas if c['sql'].startswith('UPDATE "raffles_raffle"')]
+        self.assertEqual(len(update), 1)
+        self.assertNotIn('boletos_vendidos', update[0])
+
+    def ids_participantes(self):
+        return list(Ticket.objects.filter(rifa=self.rifa, estado='pagado').order_by('id').values_list('id', flat=True))
+
+    def test_boleto_en_posicion_trae_una_fila_por_offset(self):
+        ids = self.ids_participantes()
+
+        for indice in (0, 17, 49):
+            with CaptureQueriesContext(connection) as consultas:
+                boleto = boleto_en_posicion(self.rifa.pk, indice)
+            self.assertEqual(boleto.pk, ids[indice])
+            self.assertEqual(len(consultas), 1)
+            self.assertIn('LIMIT 1', consultas[0]['sql'])
+            if indice:
+                self.assertIn(f'OFFSET {indice}', consultas[0]['sql'])
+
+    def test_boleto_en_posicion_ignora_no_participantes_y_posteriores(self):
+        ids = self.ids_participantes()
+        Ticket.objects.filter(pk=ids[0]).update(estado='reservado')
+        self.crear_boletos(range(51, 61))
+
+        self.assertEqual(boleto_en_posicion(self.rifa.pk, 0).pk, ids[1])
+        with self.assertRaises(IndexError):
+            boleto_en_posicion(self.rifa.pk, 49, hasta_id=ids[-1])
+
+    def test_ganador_es_el_boleto_en_la_posicion_de_la_semilla(self):
+        Ticket.objects.filter(pk=self.ids_participantes()[3]).update(estado='reservado')
+        ids = self.ids_participantes()
+        timestamp = 1700000000123456
+
+        with mock.patch('apps.raffles.draw_service.time.time_ns', return_value=timestamp * 1000):
+            winner = sortear(self.rifa)
+
+        digest, cantidad, _ = digest_participantes(self.rifa.pk)
+        semilla = calcular_semilla(timestamp, self.rifa.pk, cantidad, digest)
+        self.assertEqual(cantidad, 49)
+        self.assertEqual(winner.seed_aleatorio, semilla)
+        self.assertEqual(winner.boleto_id, ids[indice_ganador(semilla, cantidad)])
+
+
+class ConsultasApiTests(APITestCase):
+    """
+    Cada endpoint hace un número fijo de consultas sin importar cuántas
+    filas serializa (sin N+1). Se mide con pocos y con más registros.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.sponsor = User.objects.create_user(
+            email='sponsor@test.cl', nombre='Sponsor', password=None, rol='sponsor'
+        )
+        cls.admin = User.objects.create_user(
+            email='admin@test.cl', nombre='Admin', password=None, rol='admin', is_staff=True
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+        self.rifas = 0
+
+    def crear_rifa(self, boletos=0):
+        self.rifas += 1
+        rifa = Raffle.objects.create(
+            organizador=self.organizador, titulo=f'Rifa {self.rifas}', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        compradores = [
+            User.objects.create_user(email=f'p{self.rifas}-{n}@test.cl', nombre='Participante', password=None)
+            for n in range(min(boletos, 2))
+        ]
+        Ticket.objects.bulk_create([
+            Ticket(rifa=rifa, usuario=compradores[n % len(compradores)], numero_boleto=n + 1,
+                   codigo_qr=str(uuid.uuid4()), estado='pagado')
+            for n in range(boletos)
+        ])
+        return rifa
+
+    def assertConsultasFijas(self, url, crear, consultas):
+        """Mismo número de consultas con 2 y con 8 registros creados por crear()"""
+        for cantidad in (2, 6):
+            for _ in range(cantidad):
+                crear()
+            with self.assertNumQueries(consultas):
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+
+    def test_listado_rifas(self):
+        self.assertConsultasFijas('/api/raffles/', self.crear_rifa, 2)
+
+    def test_rifas_activas(self):
+        self.assertConsultasFijas('/api/raffles/activas/', self.crear_rifa, 1)
+
+    def test_detalle_rifa(self):
+        rifa = self.crear_rifa()
+        crear = lambda: Ticket.objects.create(
+            rifa=rifa, usuario=self.sponsor, numero_boleto=Ticket.objects.filter(rifa=rifa).count() + 1,
+            codigo_qr=str(uuid.uuid4()), estado='pagado'
+        )
+        self.assertConsultasFijas(f'/api/raffles/{rifa.pk}/', crear, 2)
+
+    def test_listado_boletos(self):
+        self.assertConsultasFijas('/api/tickets/', lambda: self.crear_rifa(boletos=2), 1)
+
+    def test_detalle_boleto(self):
+        boleto = Ticket.objects.filter(rifa=self.crear_rifa(boletos=1)).get()
+        self.assertConsultasFijas(f'/api/tickets/{boleto.pk}/', self.crear_rifa, 1)
+
+    def test_mis_boletos(self):
+        self.client.force_authenticate(self.sponsor)
+        rifa = self.crear_rifa()
+        crear = lambda: Ticket.objects.create(
+            rifa=rifa, usuario=self.sponsor, numero_boleto=Ticket.objects.filter(rifa=rifa).count() + 1,
+            codigo_qr=str(uuid.uuid4()), estado='pagado'
+        )
+        self.assertConsultasFijas('/api/tickets/mis_boletos/', crear, 1)
+
+    def test_solicitudes_patrocinio(self):
+        crear = lambda: SponsorshipRequest.objects.create(
+            rifa=self.crear_rifa(), sponsor=self.sponsor, nombre_premio_adicional='Premio',
+            descripcion_premio='Premio', valor_premio=1000, imagen_premio='premio.png',
+            nombre_marca='Marca', logo_marca='logo.png', mensaje_patrocinio='Mensaje',
+        )
+        self.assertConsultasFijas('/api/sponsorship-requests/', crear, 2)
+
+    def test_invitaciones_a_sponsors(self):
+        crear = lambda: OrganizerSponsorRequest.objects.create(
+            rifa=self.crear_rifa(), sponsor=self.sponsor, organizador=self.organizador,
+            mensaje_invitacion='Mensaje', beneficios_ofrecidos='Beneficios',
+        )
+        self.assertConsultasFijas('/api/organizer-sponsor-requests/', crear, 2)
+
+    def test_ganadores(self):
+        def crear():
+            rifa = self.crear_rifa(boletos=1)
+            Winner.objects.create(rifa=rifa, boleto=rifa.boletos.get())
+        self.assertConsultasFijas('/api/winners/', crear, 2)
+
+
+class CursorBoletosTests(APITestCase):
+    """Paginación por cursor (fecha_compra, id) de /api/tickets/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.usuario = User.objects.create_user(email='part@test.cl', nombre='Participante', password=None)
+        cls.rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        Ticket.objects.bulk_create([
+            Ticket(rifa=cls.rifa, usuario=cls.usuario, numero_boleto=n, codigo_qr=str(uuid.uuid4()), estado='pagado')
+            for n in range(1, 26)
+        ])
+        # Fechas repetidas: el desempate por id no debe saltar ni repetir boletos
+        ids = list(Ticket.objects.order_by('id').values_list('id', flat=True))
+        Ticket.objects.filter(id__in=ids[5:15]).update(fecha_compra=timezone.now() + timedelta(hours=1))
+        cls.orden = list(Ticket.objects.order_by('fecha_compra', 'id').values_list('id', flat=True))
+
+    def recorrer(self, url):
+        vistos = []
+        while url:
+            with self.assertNumQueries(1):
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            vistos.extend(boleto['id'] for boleto in respuesta.data['results'])
+            url = respuesta.data['next']
+        return vistos, respuesta
+
+    def test_recorre_todos_una_vez_en_orden(self):
+        vistos, _ = self.recorrer(f'/api/tickets/?rifa={self.rifa.pk}&page_size=4')
+        self.assertEqual(vistos, self.orden)
+
+    def test_pagina_anterior(self):
+        _, ultima = self.recorrer(f'/api/tickets/?rifa={self.rifa.pk}&page_size=10')
+        anterior = self.client.get(ultima.data['previous'])
+        self.assertEqual([boleto['id'] for boleto in anterior.data['results']], self.orden[10:20])
+        self.assertIsNotNone(anterior.data['previous'])
+        self.assertIsNotNone(anterior.data['next'])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get('/api/tickets/?cursor=no-valido').status_code, 404)
+
+
+class ProyeccionCamposTests(APITestCase):
+    """?fields= / ?omit= recortan la respuesta y las columnas consultadas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.usuario = User.objects.create_user(email='part@test.cl', nombre='Participante', password=None)
+        cls.rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa', descripcion='Descripción larga ' * 50,
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100, boletos_vendidos=25,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        Ticket.objects.bulk_create([
+            Ticket(rifa=cls.rifa, usuario=cls.usuario, numero_boleto=n, codigo_qr=str(uuid.uuid4()), estado='pagado')
+            for n in range(1, 6)
+        ])
+
+    def consultar(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta, [consulta['sql'] for consulta in consultas]
+
+    def test_listado_con_fields(self):
+        respuesta, sql = self.consultar('/api/raffles/?fields=id,titulo,precio_boleto,porcentaje_vendido')
+        self.assertEqual(respuesta.data['results'], [
+            {'id': self.rifa.pk, 'titulo': 'Rifa', 'precio_boleto': '1000.00', 'porcentaje_vendido': 25.0}
+        ])
+        # Sin columnas ni JOIN que nadie pidió
+        self.assertNotIn('descripcion', sql[-1])
+        self.assertNotIn('users_user', sql[-1])
+
+    def test_detalle_con_omit(self):
+        with mock.patch.object(RaffleSerializer, 'get_tiempo_restante') as tiempo_restante:
+            with self.assertNumQueries(1):
+                respuesta = self.client.get(f'/api/raffles/{self.rifa.pk}/?omit=boletos,descripcion,tiempo_restante')
+        tiempo_restante.assert_not_called()
+        self.assertNotIn('boletos', respuesta.data)
+        self.assertNotIn('descripcion', respuesta.data)
+        self.assertEqual(respuesta.data['total_recaudado'], 25000.0)
+        self.assertEqual(respuesta.data['organizador_nombre'], 'Organizador')
+
+    def test_sin_parametros_respuesta_completa(self):
+        respuesta, _ = self.consultar(f'/api/raffles/{self.rifa.pk}/')
+        self.assertEqual(len(respuesta.data['boletos']), 5)
+        self.assertIn('descripcion', respuesta.data)
+
+    def test_boletos_con_cursor(self):
+        vistos, url = [], '/api/tickets/?fields=numero_boleto&page_size=2'
+        while url:
+            with self.assertNumQueries(1):
+                respuesta = self.client.get(url)
+            self.assertTrue(all(list(boleto) == ['numero_boleto'] for boleto in respuesta.data['results']))
+            vistos.extend(boleto['numero_boleto'] for boleto in respuesta.data['results'])
+            url = respuesta.data['next']
+        self.assertEqual(sorted(vistos), [1, 2, 3, 4, 5])
+
+
+class SerializacionRapidaTests(APITestCase):
+    """Serializers rápidos y renderer orjson: misma salida que los de DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizadora Ñandú', password=None, rol='organizador'
+        )
+        cls.usuario = usuario = User.objects.create_user(email='part@test.cl', nombre='Participante', password=None)
+        for i, total in enumerate([100, 0, 3]):
+            rifa = Raffle.objects.create(
+                organizador=organizador, titulo=f'Rifa {i}', descripcion='Rifa de prueba',
+                premio_principal='Premio', precio_boleto=Decimal('1500.5'), total_boletos=total,
+                boletos_vendidos=min(total, 7), imagen='raffles/rifa.png' if i else '',
+                fecha_sorteo=timezone.now() + timedelta(days=i), estado='activa',
+            )
+            Ticket.objects.bulk_create([
+                Ticket(rifa=rifa, usuario=usuario, numero_boleto=n, codigo_qr=str(uuid.uuid4()), estado='pagado')
+                for n in range(1, 4)
+            ])
+        Ticket.objects.filter(numero_boleto=1).update(fecha_compra=timezone.now().astimezone(dt_timezone.utc))
+
+    def comparar(self, serializer, rapido, queryset):
+        request = APIRequestFactory().get('/api/')
+        for contexto in ({}, {'request': request}):
+            esperado = serializer(queryset, many=True, context=contexto).data
+            obtenido = rapido(context=contexto).representar(queryset.values(*rapido.columnas))
+            self.assertEqual(obtenido, [dict(fila) for fila in esperado])
+
+    def test_rifas_igual_que_drf(self):
+        self.comparar(RaffleListSerializer, RaffleListFastSerializer, Raffle.objects.order_by('id'))
+
+    def test_boletos_igual_que_drf(self):
+        self.comparar(TicketListSerializer, TicketListFastSerializer, Ticket.objects.order_by('id'))
+
+    def test_listados_por_la_api(self):
+        rapido = self.client.get('/api/raffles/').data['results']
+        drf = self.client.get('/api/raffles/?omit=descripcion').data['results']
+        self.assertEqual(rapido, [dict(fila) for fila in drf])
+        self.assertEqual(len(self.client.get('/api/raffles/activas/').data), 3)
+        self.assertEqual(len(self.client.get('/api/tickets/?page_size=100').data['results']), 9)
+
+    @skipUnless(renderers.ORJSON_DISPONIBLE, 'orjson no instalado')
+    def test_renderer_igual_que_drf(self):
+        ahora = timezone.now()
+        datos = {
+            'texto': 'Ñandú \u2028 \u2029 "comillas" </script>', 'decimal': Decimal('10.50'),
+            'utc': ahora.astimezone(dt_timezone.utc), 'local': timezone.localtime(ahora), 'fecha': ahora.date(),
+            'uuid': uuid.uuid4(), 'traducible': gettext_lazy('Rifa'), 'lista': [1, 2.5, None, True],
+            'anidado': {1: 'clave numérica'},
+        }
+        self.assertEqual(renderers.FastJSONRenderer().render(datos), JSONRenderer().render(datos))
+
+    def test_parser(self):
+        cuerpo = '{"cantidad": 3, "nombre": "Ñandú"}'.encode()
+        self.assertEqual(renderers.FastJSONParser().parse(io.BytesIO(cuerpo)), {'cantidad': 3, 'nombre': 'Ñandú'})
+        self.client.force_authenticate(self.usuario)
+        rifa = Raffle.objects.first()
+        respuesta = self.client.post(f'/api/raffles/{rifa.pk}/comprar/', data=b'{no json', content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('JSON parse error', respuesta.data['detail'])
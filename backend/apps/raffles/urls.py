@@ -6,7 +6,10 @@ app_name = 'raffles'
 urlpatterns = [
     path('', views.raffles_list_view, name='list'),
     path('<int:pk>/', views.raffle_detail_view, name='detail'),
+    path('<int:pk>/participantes/', views.raffle_participants_view, name='participants'),
+    path('<int:pk>/eventos/', views.raffle_events_view, name='events'),
     path('<int:pk>/roulette/', views.roulette_view, name='roulette'),
+    path('<int:pk>/roulette/data/', views.roulette_data_view, name='roulette_data'),
     path('<int:pk>/perform-draw/', views.perform_raffle_draw, name='perform_draw'),
     path('<int:pk>/check-winner/', views.check_raffle_winner, name='check_winner'),
     path('<int:pk>/select-winner/', views.select_winner_view, name='select_winner'),
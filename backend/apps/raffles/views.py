@@ -3,7 +3,7 @@
 # ============================================================================
 # Gestiona el ciclo completo de rifas desde creación hasta sorteo
 # Incluye dashboards personalizados por rol (participante, organizador, sponsor)
-# Sistema de sorteo verificable con SHA256+Timestamp
+# Sistema de sorteo verificable (draw_service)
 # Integración con sistema de patrocinios
 # ============================================================================
 
@@ -19,7 +19,10 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 # - Sistema de mensajes flash para feedback al usuario
 
-from django.db.models import Count, Sum, Q, F, FloatField, ExpressionWrapper
+from django.db import connection
+# - connection: los streams de eventos en vivo la liberan mientras esperan
+
+from django.db.models import Count, Sum, Max, Q, F, FloatField, ExpressionWrapper
 # - Count: contar registros relacionados
 # - Sum: sumar valores de campos
 # - Q: consultas complejas con OR, AND, NOT
@@ -33,6 +36,16 @@ from .models import Raffle, Ticket, Winner
 # - Ticket: boletos de rifas
 # - Winner: ganadores de sorteos
 
+from .purchase_service import comprar_boletos, CompraError
+from .cache_service import respuesta_anonima, fragmento, firma, version_rifa
+from . import live_events
+from .draw_service import sortear, SorteoError
+# - comprar_boletos: reserva de boletos (pool de números + bulk_create)
+# - CompraError: errores de negocio de la compra
+# - sortear: sorteo verificable único (ganador, estado y notificaciones)
+
+from apps.core.safe_errors import safe_json_error, get_error_message
+
 from .forms import RaffleForm
 # - Formulario para crear/editar rifas
 
@@ -40,12 +53,24 @@ from apps.users.models import User, Notification
 # - User: modelo de usuarios
 # - Notification: sistema de notificaciones
 
+from apps.users.notification_service import notificar_usuarios
+# - notificar_usuarios: notificaciones masivas con bulk_create
+
 # === IMPORTACIONES DJANGO HTTP ===
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+# - Respuestas sin cuerpo (204 de los eventos en vivo)
 # - Respuestas JSON para AJAX
+# - Respuestas en streaming (Server-Sent Events)
 
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
 # - Decorador para restringir métodos HTTP (GET, POST, etc.)
+# - condition: respuestas condicionales con ETag / If-None-Match (304)
+
+from django.utils.cache import patch_cache_control
+# - Cabeceras Cache-Control
+
+from django.conf import settings
+# - Configuración (eventos en vivo)
 
 from django.utils import timezone
 # - Manejo de fechas con timezone awareness
@@ -54,122 +79,12 @@ from django.utils import timezone
 import uuid
 # - Generador de identificadores únicos (código QR de boletos)
 
-import hashlib
-# - Algoritmos de hash criptográficos (SHA256 para sorteos verificables)
-
 import time
-# - Manejo de timestamps para sorteos
-
-import random
-# - Generador de números aleatorios (con semilla para determinismo)
+# - Reloj monotónico (duración de los streams de eventos)
 
 import json
 # - Serialización de datos para JavaScript
 
-# ============================================================================
-# FUNCIÓN: generar_sorteo_verificable
-# ============================================================================
-# Genera un sorteo verificable y auditable usando SHA256+Timestamp
-#
-# Propósito:
-# - Garantizar transparencia en el proceso de sorteo
-# - Permitir verificación posterior del resultado
-# - Prevenir manipulación del sorteo
-#
-# Algoritmo:
-# 1. Capturar timestamp en microsegundos (precisión máxima)
-# 2. Combinar datos inmutables: timestamp + rifa_id + título + IDs de boletos
-# 3. Generar hash SHA256 como semilla aleatoria
-# 4. Usar semilla para selección determinística del ganador
-# 5. Generar hash de verificación del proceso completo
-# 6. Crear acta digital con toda la información
-#
-# Características de seguridad:
-# - Determinístico: misma entrada = mismo resultado
-# - Verificable: cualquiera puede validar el sorteo
-# - Inmutable: no se puede alterar sin cambiar el hash
-# - Transparente: toda la información es pública
-#
-# Parámetros:
-# - raffle: Instancia de Raffle (la rifa a sortear)
-# - tickets: Lista de Ticket instances (boletos participantes)
-#
-# Retorna:
-# - dict con: winning_ticket, seed_aleatorio, timestamp_sorteo,
-#             hash_verificacion, participantes_totales, acta_digital
-# ============================================================================
-def generar_sorteo_verificable(raffle, tickets):
-    """
-    Genera un sorteo verificable con aleatoriedad transparente
-    """
-    # === PASO 1: TIMESTAMP DE MÁXIMA PRECISIÓN ===
-    # Usar microsegundos (millonésimas de segundo) para unicidad
-    # Ejemplo: 1701436800000000 (6 dígitos más que segundos)
-    # Esto hace prácticamente imposible predecir el momento exacto
-    timestamp = int(time.time() * 1000000)  # Microsegundos
-
-    # === PASO 2: CREAR SEMILLA COMBINANDO DATOS INMUTABLES ===
-    # Ordenar boletos por ID para consistencia
-    # sorted() asegura que el orden siempre sea el mismo
-    boletos_ids = ','.join(str(t.id) for t in sorted(tickets, key=lambda x: x.id))
-
-    # Combinar en string separado por pipes |
-    # Formato: "timestamp|rifa_id|titulo|id1,id2,id3..."
-    # Ejemplo: "1701436800000000|42|iPhone 15|101,102,103"
-    seed_string = f"{timestamp}|{raffle.id}|{raffle.titulo}|{boletos_ids}"
-
-    # === PASO 3: GENERAR HASH SHA256 DE LA SEMILLA ===
-    # SHA256 produce un hash de 64 caracteres hexadecimales
-    # Ejemplo: "a3f5e9b2c4d7f1a8e6b9d2c5f8a1e4b7..."
-    # Es prácticamente imposible encontrar dos inputs con mismo hash
-    seed_hash = hashlib.sha256(seed_string.encode('utf-8')).hexdigest()
-
-    # === PASO 4: CONVERTIR HASH A NÚMERO PARA RANDOM ===
-    # El hash hexadecimal se convierte a entero
-    # int('a3f5...', 16) convierte de base 16 a base 10
-    # Este número se usa como semilla para random
-    seed_number = int(seed_hash, 16)
-
-    # === PASO 5: SELECCIÓN DETERMINÍSTICA DEL GANADOR ===
-    # random.seed() inicializa el generador con la semilla
-    # Con la misma semilla, random.choice() siempre retorna el mismo elemento
-    # Esto permite verificar que el sorteo fue justo
-    random.seed(seed_number)
-    winning_ticket = random.choice(tickets)
-
-    # === PASO 6: HASH DE VERIFICACIÓN DEL PROCESO COMPLETO ===
-    # Combinar todos los datos del sorteo en un string
-    # Incluye: semilla + timestamp + id del ganador + número de boleto
-    verificacion_string = f"{seed_hash}|{timestamp}|{winning_ticket.id}|{winning_ticket.numero_boleto}"
-
-    # Generar hash final de verificación
-    # Este hash permite validar que ningún dato fue alterado
-    hash_verificacion = hashlib.sha256(verificacion_string.encode('utf-8')).hexdigest()
-
-    # === PASO 7: GENERAR ACTA DIGITAL ===
-    # Documento legible con toda la información del sorteo
-    # Puede ser firmado digitalmente o impreso para auditoría
-    acta = f"""ACTA DIGITAL DE SORTEO - {raffle.titulo}
-ID Rifa: {raffle.id}
-Fecha sorteo: {timezone.now().strftime('%d/%m/%Y %H:%M:%S')}
-Timestamp: {timestamp}
-Participantes: {len(tickets)}
-Algoritmo: SHA256+Timestamp
-Semilla: {seed_hash}
-Hash Verificación: {hash_verificacion}
-Ganador: {winning_ticket.usuario.nombre} - Boleto #{winning_ticket.numero_boleto}
-"""
-
-    # === RETORNAR RESULTADO COMPLETO ===
-    return {
-        'winning_ticket': winning_ticket,          # Boleto ganador
-        'seed_aleatorio': seed_hash,                # Semilla SHA256
-        'timestamp_sorteo': timestamp,              # Timestamp en microsegundos
-        'hash_verificacion': hash_verificacion,     # Hash de verificación
-        'participantes_totales': len(tickets),      # Total de participantes
-        'acta_digital': acta                        # Documento del sorteo
-    }
-
 # ============================================================================
 # VISTA: home_view
 # ============================================================================
@@ -192,8 +107,14 @@ def home_view(request):
         estado='activa'
     ).order_by('-fecha_creacion')[:6]
 
-    # Renderizar home con rifas destacadas
-    return render(request, 'home.html', {'raffles': raffles_activas})
+    # === CACHÉ PARA ANÓNIMOS ===
+    # La clave incluye id y versión de cada rifa mostrada: una venta o un
+    # cambio de estado genera una clave nueva (ver cache_service)
+    return respuesta_anonima(
+        request,
+        lambda: f"home:{firma(raffles_activas.values_list('id', flat=True))}",
+        lambda: render(request, 'home.html', {'raffles': raffles_activas}),
+    )
 
 # ============================================================================
 # VISTA: raffles_list_view
@@ -251,20 +172,25 @@ def raffles_list_view(request):
         'estado_filter': estado_filter,  # Filtro activo (para mantener en UI)
     }
 
-    return render(request, 'raffles/list.html', context)
+    # === PASO 4: CACHÉ PARA ANÓNIMOS ===
+    # Solo los filtros conocidos (evita una entrada por cada ?estado= arbitrario)
+    def clave():
+        if estado_filter not in ('activa', 'finalizada', 'todas'):
+            return None
+        return f"listado:{estado_filter}:{firma(raffles.values_list('id', flat=True))}"
+
+    return respuesta_anonima(
+        request, clave, lambda: render(request, 'raffles/list.html', context)
+    )
 
 def raffle_detail_view(request, pk):
     import logging
-    import json
     logger = logging.getLogger(__name__)
     
     # Inicializar variables por defecto para evitar errores
     sold_tickets = 0
     available_tickets = 0
     progress_percentage = 0
-    tickets_data = []
-    tickets_json = '[]'
-    sold_tickets_qs = None
     sponsors_aceptados = []
     
     try:
@@ -280,16 +206,21 @@ def raffle_detail_view(request, pk):
             logger.warning(f"Rifa {pk} tiene total_boletos inválido: {raffle.total_boletos}")
             raffle.total_boletos = 100  # Valor por defecto
 
-        # Tickets sold - ORDENAR por ID para mantener consistencia con la ruleta
+        # Tickets sold
+        # Solo se cuenta: la lista de participantes la carga la página por
+        # partes desde raffle_participants_view, así el costo de renderizar
+        # no crece con los boletos vendidos. El conteo se cachea por rifa y
+        # versión (una venta o pago incrementa la versión).
         try:
-            sold_tickets_qs = Ticket.objects.filter(rifa=raffle, estado='pagado').select_related('usuario').order_by('id')
-            sold_tickets = sold_tickets_qs.count()
+            sold_tickets = fragmento(
+                f'vendidos:{raffle.pk}:{version_rifa(raffle.pk)}',
+                Ticket.objects.filter(rifa=raffle, estado='pagado').count,
+            )
             available_tickets = raffle.total_boletos - sold_tickets
             progress_percentage = int((sold_tickets / raffle.total_boletos) * 100) if raffle.total_boletos > 0 else 0
             logger.info(f"Tickets vendidos: {sold_tickets}/{raffle.total_boletos}")
         except Exception as e:
             logger.error(f"Error obteniendo tickets: {str(e)}", exc_info=True)
-            sold_tickets_qs = Ticket.objects.none()
 
         # Check if user is organizer (verificar autenticación primero)
         is_organizer = False
@@ -313,35 +244,19 @@ def raffle_detail_view(request, pk):
         # Si hay ganador pero la rifa sigue activa, actualizarla a finalizada
         if has_winner and raffle.estado == 'activa':
             raffle.estado = 'finalizada'
-            raffle.save()
+            raffle.save(update_fields=['estado', 'fecha_actualizacion'])
 
         # VENTANA DE ANIMACIÓN: Solo 3 minutos para mostrar la ruleta animada
-        tiempo_limite_sorteo = raffle.fecha_sorteo + timedelta(minutes=3)
+        tiempo_limite_sorteo = raffle.fecha_sorteo + timedelta(minutes=live_events.MINUTOS_DESPUES_DEL_SORTEO)
         is_live_draw = raffle.fecha_sorteo <= now <= tiempo_limite_sorteo and not has_winner
 
         # La ruleta ANIMADA solo se muestra durante los primeros 3 minutos
         show_roulette = is_live_draw and raffle.estado == 'activa' and sold_tickets > 0
         show_draw_button = now >= raffle.fecha_sorteo and not has_winner and raffle.estado == 'activa' and sold_tickets > 0
 
-        # Prepare tickets data for roulette
-        try:
-            if sold_tickets_qs and sold_tickets_qs.exists():
-                tickets_data = []
-                for ticket in sold_tickets_qs:
-                    try:
-                        tickets_data.append({
-                            'id': ticket.id,
-                            'numero_boleto': ticket.numero_boleto,
-                            'nombre': ticket.usuario.nombre if ticket.usuario else 'Usuario',
-                            'email': ticket.usuario.email if ticket.usuario else 'N/A'
-                        })
-                    except Exception as ticket_error:
-                        logger.error(f"Error procesando ticket {ticket.id}: {str(ticket_error)}")
-                        continue
-                logger.info(f"Datos de {len(tickets_data)} tickets preparados")
-        except Exception as e:
-            logger.error(f"Error preparando datos de tickets: {str(e)}", exc_info=True)
-            tickets_data = []
+        # Eventos en vivo (SSE): el navegador abre el stream solo dentro de
+        # la ventana del sorteo (ver live_events.ventana)
+        eventos_desde, eventos_hasta = live_events.ventana(raffle)
 
         # Convert fecha_sorteo to timestamp (milliseconds since epoch) for JavaScript
         fecha_sorteo_timestamp = 0
@@ -350,8 +265,6 @@ def raffle_detail_view(request, pk):
                 fecha_sorteo_timestamp = int(raffle.fecha_sorteo.timestamp() * 1000)
         except Exception as e:
             logger.error(f"Error convirtiendo fecha_sorteo: {str(e)}", exc_info=True)
-            
-        tickets_json = json.dumps(tickets_data) if tickets_data else '[]'
 
         # Obtener sponsors aceptados para mostrar sus premios adicionales
         sponsors_aceptados = []
@@ -367,17 +280,11 @@ def raffle_detail_view(request, pk):
         except Exception as e:
             logger.error(f"Error obteniendo sponsors: {str(e)}", exc_info=True)
 
-        # Asegurar que sold_tickets_qs no sea None
-        if sold_tickets_qs is None:
-            sold_tickets_qs = Ticket.objects.none()
-
         context = {
             'raffle': raffle,
             'sold_tickets': sold_tickets,
             'available_tickets': available_tickets,
             'progress_percentage': progress_percentage,
-            'sold_tickets_list': tickets_data,
-            'tickets_json': tickets_json,
             'show_roulette': show_roulette,
             'show_draw_button': show_draw_button,
             'is_organizer': is_organizer,
@@ -385,11 +292,13 @@ def raffle_detail_view(request, pk):
             'is_live_draw': is_live_draw,
             'has_winner': has_winner,
             'fecha_sorteo_timestamp': fecha_sorteo_timestamp,
-            'tickets': sold_tickets_qs,
             'sponsors_aceptados': sponsors_aceptados,
+            'eventos_en_vivo': live_events.activos(),
+            'eventos_desde_timestamp': int(eventos_desde.timestamp() * 1000),
+            'eventos_hasta_timestamp': int(eventos_hasta.timestamp() * 1000),
         }
 
-        logger.info(f"Renderizando template detail.html con {len(tickets_data)} tickets")
+        logger.info(f"Renderizando template detail.html ({sold_tickets} boletos vendidos)")
         return render(request, 'raffles/detail.html', context)
         
     except Raffle.DoesNotExist:
@@ -404,6 +313,54 @@ def raffle_detail_view(request, pk):
         messages.error(request, f'Error al cargar los detalles de la rifa: {str(e)}')
         return redirect('raffles:raffle_list')
 
+# ============================================================================
+# VISTA: raffle_participants_view
+# ============================================================================
+# Participantes (boletos pagados) de una rifa en formato JSON, por páginas
+#
+# URL: /raffles/<pk>/participantes/?desde=<id>&limite=<n>
+# Método: GET
+# Autenticación: No requerida (misma visibilidad que el detalle)
+#
+# Paginación por keyset: cada página retorna los boletos con id > desde,
+# ordenados por id (el mismo orden que usa la ruleta). 'siguiente' es el
+# valor de 'desde' para la próxima página o null si no hay más.
+#
+# Se lee con values_list (sin instanciar modelos) y cada página se cachea
+# por rifa y versión: el costo no depende de cuántas páginas haya antes.
+# ============================================================================
+PARTICIPANTES_POR_PAGINA = 1000
+PARTICIPANTES_MAXIMO_POR_PAGINA = 5000
+
+@require_http_methods(["GET"])
+def raffle_participants_view(request, pk):
+    try:
+        desde = max(int(request.GET.get('desde', 0)), 0)
+        limite = int(request.GET.get('limite', PARTICIPANTES_POR_PAGINA))
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    limite = min(max(limite, 1), PARTICIPANTES_MAXIMO_POR_PAGINA)
+
+    if not Raffle.objects.filter(pk=pk).exists():
+        return JsonResponse({'error': 'Rifa no encontrada'}, status=404)
+
+    def generar():
+        filas = list(
+            Ticket.objects.filter(rifa_id=pk, estado='pagado', id__gt=desde)
+            .order_by('id')
+            .values_list('id', 'numero_boleto', 'usuario__nombre')[:limite]
+        )
+        return {
+            'participantes': [
+                {'id': id_boleto, 'numero_boleto': numero, 'nombre': nombre or 'Usuario'}
+                for id_boleto, numero, nombre in filas
+            ],
+            'siguiente': filas[-1][0] if len(filas) == limite else None,
+        }
+
+    pagina = fragmento(f'participantes:{pk}:{version_rifa(pk)}:{desde}:{limite}', generar)
+    return JsonResponse(pagina)
+
 @login_required
 def participant_dashboard_view(request):
     from datetime import datetime, timedelta
@@ -672,15 +629,13 @@ def create_raffle_view(request):
                 raffle.fecha_solicitud = timezone.now()
 
                 # === NOTIFICAR A TODOS LOS ADMINS ===
-                admins = User.objects.filter(rol='admin')
-                for admin in admins:
-                    Notification.objects.create(
-                        usuario=admin,
-                        tipo='sistema',
-                        titulo='Nueva rifa pendiente de aprobación',
-                        mensaje=f'El organizador {request.user.nombre} ha solicitado aprobación para la rifa "{raffle.titulo}".',
-                        enlace='/admin-panel/rifas-pendientes/'
-                    )
+                notificar_usuarios(
+                    User.objects.filter(rol='admin').values_list('pk', flat=True),
+                    tipo='sistema',
+                    titulo='Nueva rifa pendiente de aprobación',
+                    mensaje=f'El organizador {request.user.nombre} ha solicitado aprobación para la rifa "{raffle.titulo}".',
+                    enlace='/admin-panel/rifas-pendientes/'
+                )
 
             # === PASO 5: GUARDAR RIFA ===
             raffle.save()
@@ -752,7 +707,7 @@ def edit_raffle_view(request, pk):
 
             # Registrar fecha de inicio (cuando se publicó)
             raffle.fecha_inicio = timezone.now()
-            raffle.save()
+            raffle.save(update_fields=['estado', 'fecha_inicio', 'fecha_actualizacion'])
 
             # === NOTIFICAR AL ORGANIZADOR ===
             Notification.objects.create(
@@ -783,22 +738,20 @@ def edit_raffle_view(request, pk):
                 updated_raffle.fecha_solicitud = timezone.now()
 
                 # === NOTIFICAR A TODOS LOS ADMINS ===
-                admins = User.objects.filter(rol='admin')
-                for admin in admins:
-                    Notification.objects.create(
-                        usuario=admin,
-                        tipo='sistema',
-                        titulo='Rifa actualizada - Pendiente de aprobación',
-                        mensaje=f'El organizador {request.user.nombre} ha solicitado aprobación para la rifa "{updated_raffle.titulo}".',
-                        enlace='/admin-panel/rifas-pendientes/'
-                    )
+                notificar_usuarios(
+                    User.objects.filter(rol='admin').values_list('pk', flat=True),
+                    tipo='sistema',
+                    titulo='Rifa actualizada - Pendiente de aprobación',
+                    mensaje=f'El organizador {request.user.nombre} ha solicitado aprobación para la rifa "{updated_raffle.titulo}".',
+                    enlace='/admin-panel/rifas-pendientes/'
+                )
 
                 messages.success(request, 'Rifa enviada a revisión administrativa.')
             else:
                 messages.success(request, 'Rifa actualizada exitosamente.')
 
-            # Guardar cambios en la base de datos
-            updated_raffle.save()
+            # Guardar solo los campos editados (boletos_vendidos se actualiza con F())
+            updated_raffle.save(update_fields=[*form.changed_data, 'fecha_solicitud', 'fecha_actualizacion'])
             return redirect('raffles:organizer_dashboard')
 
     # === PASO 4: MOSTRAR FORMULARIO (GET) ===
@@ -832,13 +785,17 @@ def edit_raffle_view(request, pk):
 # 2. Usuario selecciona cantidad de boletos
 # 3. Iniciar transacción atómica con bloqueo
 # 4. Verificar disponibilidad de boletos
-# 5. Crear tickets en estado 'reservado'
-# 6. Incrementar contador de boletos vendidos
+# 5. Crear tickets en estado 'reservado' (un único bulk_create)
+# 6. Incrementar contador de boletos vendidos (un único UPDATE con F())
 # 7. Commit de transacción
 # 8. Redirigir a proceso de pago
 #
+# La lógica de los pasos 3-7 vive en purchase_service.comprar_boletos(),
+# compartida con la API REST (RaffleViewSet.comprar) y los cargadores demo.
+#
 # Estados de Tickets:
-# - 'reservado': Creado pero pago pendiente (5-10 min)
+# - 'reservado': Creado pero pago pendiente (expira tras TICKET_RESERVATION_TTL_MINUTES,
+#   ver reservation_service / manage.py expirar_reservas)
 # - 'pagado': Pago confirmado, participa en sorteo
 # - 'cancelado': Pago falló o usuario canceló
 #
@@ -851,11 +808,14 @@ def edit_raffle_view(request, pk):
 # Solución (CON select_for_update):
 # Usuario A: Bloquea fila → Lee 98 → Compra 2 → Guarda 100 → Libera
 # Usuario B: Espera bloqueo → Lee 100 → Error "no disponible" ✓
+#
+# Modo optimista (settings.TICKET_PURCHASE_MODE = 'optimista'):
+# Sin select_for_update; el cupo se reserva con un UPDATE condicional
+# (boletos_vendidos + n <= total_boletos) que la base de datos evalúa
+# atómicamente, así los compradores no hacen fila detrás del bloqueo.
 # ============================================================================
 @login_required
 def buy_ticket_view(request, raffle_id):
-    # Importar transaction para manejo de transacciones atómicas
-    from django.db import transaction
     import logging
     logger = logging.getLogger(__name__)
 
@@ -875,74 +835,21 @@ def buy_ticket_view(request, raffle_id):
         # default=1 si no se especifica
         cantidad = int(request.POST.get('cantidad', 1))
 
-        # === PASO 3: TRANSACCIÓN ATÓMICA CON BLOQUEO ===
-        # transaction.atomic() garantiza que todas las operaciones
-        # se ejecuten completamente o ninguna (rollback automático en error)
+        # === PASO 3: RESERVAR BOLETOS ===
+        # comprar_boletos() ejecuta en una transacción atómica con la fila
+        # de la rifa bloqueada (select_for_update):
+        # - Verifica disponibilidad
+        # - Toma los N números libres más bajos del pool (ver TicketNumberPool)
+        # - Inserta todos los boletos con un único bulk_create (estado 'reservado')
+        # - Incrementa boletos_vendidos con un único UPDATE usando F()
         try:
-            with transaction.atomic():
-                # === PASO 4: BLOQUEAR FILA DE LA RIFA ===
-                # select_for_update() crea un SELECT ... FOR UPDATE en SQL
-                # Bloquea la fila hasta que termine la transacción
-                # Otros queries esperarán hasta que se libere el bloqueo
-                raffle = Raffle.objects.select_for_update().get(pk=raffle_id, estado='activa')
-
-                # === PASO 5: VERIFICAR DISPONIBILIDAD ===
-                # Calcular si hay suficientes boletos disponibles
-                # raffle.boletos_disponibles es una property calculada
-                if raffle.boletos_vendidos + cantidad > raffle.total_boletos:
-                    messages.error(request, f'Solo hay {raffle.boletos_disponibles} boletos disponibles.')
-                    return redirect('raffles:detail', pk=raffle_id)
-
-                # === PASO 6: CREAR BOLETOS ===
-                tickets_creados = []
-                
-                # Obtener números de boletos ya vendidos
-                numeros_ocupados = set(Ticket.objects.filter(rifa=raffle).values_list('numero_boleto', flat=True))
-                
-                # Obtener números disponibles
-                numeros_disponibles = [n for n in range(1, raffle.total_boletos + 1) if n not in numeros_ocupados]
-                
-                # Verificar que hay suficientes números disponibles
-                if len(numeros_disponibles) < cantidad:
-                    messages.error(request, f'Solo hay {len(numeros_disponibles)} boletos disponibles.')
-                    return redirect('raffles:detail', pk=raffle_id)
-                
-                # Tomar los primeros N números disponibles
-                numeros_a_usar = numeros_disponibles[:cantidad]
-                
-                for numero_boleto in numeros_a_usar:
-                    # Código QR único para validación
-                    # UUID4 genera identificador aleatorio único
-                    # Ejemplo: "a3f5e9b2-c4d7-f1a8-e6b9-d2c5f8a1e4b7"
-                    codigo_qr = str(uuid.uuid4())
-
-                    # Crear ticket en estado 'reservado'
-                    # El pago se procesa después
-                    ticket = Ticket.objects.create(
-                        rifa=raffle,
-                        usuario=request.user,
-                        numero_boleto=numero_boleto,
-                        codigo_qr=codigo_qr,
-                        estado='reservado'  # Pago pendiente
-                    )
-                    tickets_creados.append(ticket)
-
-                    # Incrementar contador de boletos vendidos
-                    raffle.boletos_vendidos += 1
-
-                # === PASO 7: GUARDAR CAMBIOS ===
-                # Guardar el contador actualizado de boletos vendidos
-                raffle.save()
-
-            # === PASO 8: REDIRIGIR A PAGO (FUERA DE TRANSACCIÓN) ===
-            # La transacción ya se completó (commit automático al salir del with)
-            # Crear string con IDs separados por comas: "1,2,3"
-            ticket_ids_str = ','.join(str(t.id) for t in tickets_creados)
-
-            # Redirigir a vista de procesamiento de pago
-            return redirect('payments:process_payment', ticket_ids=ticket_ids_str)
+            tickets_creados = comprar_boletos(raffle_id, request.user, cantidad)
 
         # === MANEJO DE ERRORES ===
+        except CompraError as e:
+            # Error de negocio (sin disponibilidad, cantidad inválida)
+            messages.error(request, str(e))
+            return redirect('raffles:detail', pk=raffle_id)
         except Exception as e:
             # Si hay error, transaction.atomic() hace rollback automático
             # Los tickets creados se eliminan y el contador no se incrementa
@@ -950,7 +857,14 @@ def buy_ticket_view(request, raffle_id):
             messages.error(request, f'Error al procesar la compra: {str(e)}. Por favor, intenta nuevamente.')
             return redirect('raffles:detail', pk=raffle_id)
 
-    # === PASO 9: MOSTRAR FORMULARIO (GET) ===
+        # === PASO 4: REDIRIGIR A PAGO (FUERA DE TRANSACCIÓN) ===
+        # Crear string con IDs separados por comas: "1,2,3"
+        ticket_ids_str = ','.join(str(t.id) for t in tickets_creados)
+
+        # Redirigir a vista de procesamiento de pago
+        return redirect('payments:process_payment', ticket_ids=ticket_ids_str)
+
+    # === PASO 5: MOSTRAR FORMULARIO (GET) ===
     return render(request, 'raffles/buy_ticket.html', {'raffle': raffle})
 
 # ============================================================================
@@ -982,33 +896,181 @@ def roulette_view(request, pk):
     # === OBTENER RIFA ===
     raffle = get_object_or_404(Raffle, pk=pk)
 
-    # === OBTENER BOLETOS PAGADOS ===
-    # select_related('usuario'): optimización para evitar N+1 queries
-    # Solo boletos con estado='pagado' participan en el sorteo
-    tickets = Ticket.objects.filter(
-        rifa=raffle,
-        estado='pagado'
-    ).select_related('usuario')
-
-    # === PREPARAR DATOS PARA JAVASCRIPT ===
-    # Crear lista de diccionarios con información de cada ticket
-    # Estos datos se usarán en la animación de la ruleta
-    tickets_data = [
-        {
-            'id': ticket.id,                      # ID del ticket
-            'numero_boleto': ticket.numero_boleto, # Número visible (#1, #2, #3...)
-            'usuario__nombre': ticket.usuario.nombre  # Nombre del participante
-        }
-        for ticket in tickets
-    ]
+    # === CONTAR BOLETOS PAGADOS ===
+    # Solo boletos con estado='pagado' participan en el sorteo.
+    # La lista de participantes la carga el template desde
+    # roulette_data_view (compacta, con ETag y actualizaciones por delta)
+    total_participantes = Ticket.objects.filter(rifa=raffle, estado='pagado').count()
 
     # === RENDERIZAR TEMPLATE ===
     return render(request, 'raffles/roulette.html', {
-        'raffle': raffle,              # Instancia de Raffle
-        'tickets': tickets,             # QuerySet de tickets
-        'tickets_json': json.dumps(tickets_data)  # JSON para JavaScript
+        'raffle': raffle,                          # Instancia de Raffle
+        'total_participantes': total_participantes,
     })
 
+# ============================================================================
+# VISTA: roulette_data_view
+# ============================================================================
+# Datos de la ruleta en formato columnar
+#
+# URL: /raffles/<pk>/roulette/data/?since=<ticket_id>&conocidos=<n>
+# Método: GET
+# Autenticación: No requerida (pública)
+#
+# Respuesta:
+#   {"completo": true, "ids": [...], "numeros": [...], "nombres": [...],
+#    "ultimo": <id del último boleto>}
+#
+# - Sin since: lista completa de boletos pagados ordenados por id.
+# - Con since: solo los boletos con id > since (delta). Como un boleto
+#   reservado antes puede pagarse después, el cliente envía 'conocidos'
+#   (cuántos tiene); si no coincide con los pagados hasta since, se
+#   retorna la lista completa con completo=true.
+# - ETag = rifa + estado de los boletos pagados leído de la base de datos
+#   (cantidad, id máximo y suma de ids; una consulta sobre el índice
+#   rifa+estado) + parámetros: los espectadores que recargan durante el
+#   sorteo reciben 304 sin cuerpo mientras no haya ventas nuevas. No
+#   depende de la caché, así ningún worker responde 304 con datos viejos.
+# ============================================================================
+def _parametros_ruleta(request):
+    try:
+        since = max(int(request.GET.get('since', 0)), 0)
+        conocidos = request.GET.get('conocidos')
+        conocidos = int(conocidos) if conocidos is not None else None
+    except ValueError:
+        return None
+    return since, conocidos
+
+def _estado_ruleta(request, pk):
+    # Se calcula una vez por request (lo usan el ETag y la clave de caché)
+    if not hasattr(request, '_estado_ruleta'):
+        resumen = Ticket.objects.filter(rifa_id=pk, estado='pagado').aggregate(
+            cantidad=Count('id'), maximo=Max('id'), suma=Sum('id')
+        )
+        request._estado_ruleta = f"{resumen['cantidad']}.{resumen['maximo'] or 0}.{resumen['suma'] or 0}"
+    return request._estado_ruleta
+
+def _etag_ruleta(request, pk):
+    parametros = _parametros_ruleta(request)
+    if parametros is None:
+        return None
+    since, conocidos = parametros
+    return f'{pk}-{_estado_ruleta(request, pk)}-{since}-{conocidos}'
+
+def _datos_ruleta(pk, since, conocidos):
+    boletos = Ticket.objects.filter(rifa_id=pk, estado='pagado')
+    completo = since == 0
+    if not completo and conocidos is not None:
+        completo = boletos.filter(id__lte=since).count() != conocidos
+    if not completo:
+        boletos = boletos.filter(id__gt=since)
+
+    filas = list(boletos.order_by('id').values_list('id', 'numero_boleto', 'usuario__nombre'))
+    ids = [fila[0] for fila in filas]
+    return {
+        'completo': completo,
+        'ids': ids,
+        'numeros': [fila[1] for fila in filas],
+        'nombres': [fila[2] or 'Usuario' for fila in filas],
+        'ultimo': ids[-1] if ids else since,
+    }
+
+@require_http_methods(["GET"])
+@condition(etag_func=_etag_ruleta)
+def roulette_data_view(request, pk):
+    parametros = _parametros_ruleta(request)
+    if parametros is None:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    if not Raffle.objects.filter(pk=pk).exists():
+        return JsonResponse({'error': 'Rifa no encontrada'}, status=404)
+
+    since, conocidos = parametros
+    datos = fragmento(
+        f'ruleta:{pk}:{_estado_ruleta(request, pk)}:{since}:{conocidos}',
+        lambda: _datos_ruleta(pk, since, conocidos),
+    )
+    response = JsonResponse(datos)
+    # Revalidar siempre con If-None-Match (la respuesta puede ser 304)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+# ============================================================================
+# VISTA: raffle_events_view
+# ============================================================================
+# Stream Server-Sent Events con el avance de la rifa en vivo
+#
+# URL: /raffles/<pk>/eventos/
+# Método: GET
+# Autenticación: No requerida (pública)
+#
+# Eventos (ver live_events):
+# - ventas:  boletos_vendidos, total_boletos, porcentaje_vendido
+# - estado:  estado de la rifa
+# - ganador: boleto ganador (id, numero_boleto, nombre)
+#
+# Al conectar se envía el estado actual; después, cada evento publicado.
+# Cada espectador es una sola suscripción al broker (no re-renderiza la
+# página). La conexión se cierra tras LIVE_EVENTS_STREAM_SECONDS y el
+# navegador (EventSource) se reconecta solo, liberando el hilo del worker.
+#
+# Fuera de la ventana del sorteo en vivo (live_events.ventana), con la rifa
+# no activa o con los eventos desactivados responde 204: EventSource no
+# vuelve a conectarse. Si el proceso ya tiene LIVE_EVENTS_MAX_STREAMS
+# abiertos, el stream solo indica reintentar más tarde.
+# ============================================================================
+LATIDO_SEGUNDOS = 15
+REINTENTO_MS = 3000
+REINTENTO_OCUPADO_MS = 15000
+
+@require_http_methods(["GET"])
+def raffle_events_view(request, pk):
+    raffle = get_object_or_404(Raffle, pk=pk)
+    if not live_events.activos() or not live_events.en_vivo(raffle):
+        return HttpResponse(status=204)
+    # El último stream termina con la ventana: la reconexión recibe 204
+    hasta = live_events.ventana(raffle)[1]
+    duracion = min(getattr(settings, 'LIVE_EVENTS_STREAM_SECONDS', 60), (hasta - timezone.now()).total_seconds())
+
+    def stream():
+        # El cupo se toma al empezar a enviar: un stream que nunca se
+        # inicia no lo retiene
+        if not live_events.tomar_stream():
+            yield f'retry: {REINTENTO_OCUPADO_MS}\n\n'
+            return
+        try:
+            yield from eventos()
+        finally:
+            live_events.soltar_stream()
+
+    def eventos():
+        # Suscribirse antes de leer el estado actual para no perder eventos
+        suscripcion = live_events.get_broker().suscribir(live_events.canal_rifa(pk))
+        try:
+            yield f'retry: {REINTENTO_MS}\n\n'
+            raffle.refresh_from_db(fields=['estado', 'boletos_vendidos', 'total_boletos'])
+            yield live_events.formatear('ventas', live_events.datos_ventas(raffle))
+            yield live_events.formatear('estado', {'estado': raffle.estado})
+            winner = Winner.objects.filter(rifa=raffle).select_related('boleto__usuario').first()
+            if winner:
+                yield live_events.formatear('ganador', live_events.datos_ganador(winner))
+            if not connection.in_atomic_block:
+                # El resto del stream no consulta la base de datos: liberar la
+                # conexión para que los streams abiertos no agoten las de MySQL
+                connection.close()
+
+            limite = time.monotonic() + duracion
+            while (restante := limite - time.monotonic()) > 0:
+                mensaje = suscripcion.esperar(min(LATIDO_SEGUNDOS, restante))
+                # Comentario SSE como latido para que proxies no corten la conexión
+                yield mensaje if mensaje is not None else ': ping\n\n'
+        finally:
+            suscripcion.cerrar()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Nginx: no acumular el stream
+    return response
+
 @require_http_methods(["POST"])
 def perform_raffle_draw(request, pk):
     """Realiza el sorteo de la rifa en el servidor"""
@@ -1028,54 +1090,12 @@ def perform_raffle_draw(request, pk):
             }
         })
 
-    # Verificar que haya boletos vendidos
-    tickets = list(Ticket.objects.filter(rifa=raffle, estado='pagado').select_related('usuario'))
-    if not tickets:
-        return JsonResponse({'success': False, 'error': 'No hay boletos vendidos'}, status=400)
-
-    # Realizar sorteo verificable
-    resultado_sorteo = generar_sorteo_verificable(raffle, tickets)
-    winning_ticket = resultado_sorteo['winning_ticket']
-
-    # Crear registro de ganador con datos de verificación
-    winner = Winner.objects.create(
-        rifa=raffle,
-        boleto=winning_ticket,
-        verificado=False,
-        premio_entregado=False,
-        seed_aleatorio=resultado_sorteo['seed_aleatorio'],
-        timestamp_sorteo=resultado_sorteo['timestamp_sorteo'],
-        hash_verificacion=resultado_sorteo['hash_verificacion'],
-        participantes_totales=resultado_sorteo['participantes_totales'],
-        acta_digital=resultado_sorteo['acta_digital'],
-        algoritmo='SHA256+Timestamp'
-    )
-
-    # Actualizar estado de la rifa
-    raffle.estado = 'finalizada'
-    raffle.save()
-
-    # Crear notificación para el ganador
-    Notification.objects.create(
-        usuario=winning_ticket.usuario,
-        tipo='ganador',
-        titulo='🎉 ¡Felicidades! Has ganado',
-        mensaje=f'¡Felicitaciones! Has ganado el sorteo "{raffle.titulo}". Premio: {raffle.premio_principal}',
-        enlace=f'/raffles/{raffle.id}/',
-        rifa_relacionada=raffle
-    )
-
-    # Crear notificaciones para todos los participantes (excepto el ganador)
-    participantes = set([t.usuario for t in tickets if t.usuario != winning_ticket.usuario])
-    for participante in participantes:
-        Notification.objects.create(
-            usuario=participante,
-            tipo='sorteo',
-            titulo=f'Sorteo finalizado: {raffle.titulo}',
-            mensaje=f'El sorteo ha finalizado. El ganador es {winning_ticket.usuario.nombre}.',
-            enlace=f'/raffles/{raffle.id}/',
-            rifa_relacionada=raffle
-        )
+    # Sorteo verificable (ver draw_service)
+    try:
+        winner = sortear(raffle)
+    except SorteoError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    winning_ticket = winner.boleto
 
     return JsonResponse({
         'success': True,
@@ -1111,7 +1131,6 @@ def check_raffle_winner(request, pk):
 @require_http_methods(["POST"])
 def select_winner_view(request, pk):
     """Automatically select winner from roulette"""
-    import random
     from django.utils import timezone
 
     raffle = get_object_or_404(Raffle, pk=pk)
@@ -1138,70 +1157,16 @@ def select_winner_view(request, pk):
         raffle.estado = 'cerrada'
         raffle.motivo_pausa = f'No se alcanzó el mínimo de {minimo_requerido} boletos vendidos para viabilidad económica. Boletos vendidos: {raffle.boletos_vendidos}'
         raffle.fecha_pausa = timezone.now()
-        raffle.save()
+        raffle.save(update_fields=['estado', 'motivo_pausa', 'fecha_pausa', 'fecha_actualizacion'])
         
         return JsonResponse({
             'success': False, 
             'error': f'No se puede realizar el sorteo. Se requiere un mínimo de {minimo_requerido} boletos vendidos para viabilidad económica (2x valor del premio). Actualmente: {raffle.boletos_vendidos}. La rifa ha sido cerrada y requiere revisión administrativa.'
         })
 
-    # Get ticket ID from request
+    # Sorteo verificable (ver draw_service)
     try:
-        ticket_id = None
-        if request.body:
-            try:
-                data = json.loads(request.body)
-                ticket_id = data.get('ticket_id')
-            except:
-                pass
-
-        # Obtener todos los boletos pagados
-        tickets = list(Ticket.objects.filter(rifa=raffle, estado='pagado').select_related('usuario'))
-        if not tickets:
-            return JsonResponse({'success': False, 'error': 'No hay boletos vendidos'})
-
-        # Realizar sorteo verificable
-        resultado_sorteo = generar_sorteo_verificable(raffle, tickets)
-        ticket = resultado_sorteo['winning_ticket']
-
-        # Create winner con datos de verificación
-        winner = Winner.objects.create(
-            rifa=raffle,
-            boleto=ticket,
-            seed_aleatorio=resultado_sorteo['seed_aleatorio'],
-            timestamp_sorteo=resultado_sorteo['timestamp_sorteo'],
-            hash_verificacion=resultado_sorteo['hash_verificacion'],
-            participantes_totales=resultado_sorteo['participantes_totales'],
-            acta_digital=resultado_sorteo['acta_digital'],
-            algoritmo='SHA256+Timestamp'
-        )
-
-        # Update raffle status
-        raffle.estado = 'finalizada'
-        raffle.save()
-
-        # Notify winner
-        Notification.objects.create(
-            usuario=ticket.usuario,
-            tipo='ganador',
-            titulo='🎉 ¡Felicidades! Has ganado',
-            mensaje=f'Has ganado la rifa "{raffle.titulo}". Premio: {raffle.premio_principal}',
-            enlace=f'/raffles/{raffle.id}/',
-            rifa_relacionada=raffle
-        )
-
-        # Notify participants
-        participants = Ticket.objects.filter(rifa=raffle, estado='pagado').exclude(usuario=ticket.usuario).select_related('usuario').distinct('usuario')
-        for participant_ticket in participants:
-            Notification.objects.create(
-                usuario=participant_ticket.usuario,
-                tipo='sorteo',
-                titulo=f'Sorteo finalizado: {raffle.titulo}',
-                mensaje=f'La rifa ha finalizado. El ganador es {ticket.usuario.nombre}',
-                enlace=f'/raffles/{raffle.id}/',
-                rifa_relacionada=raffle
-            )
-
+        ticket = sortear(raffle).boleto
         return JsonResponse({
             'success': True,
             'winner': {
@@ -1212,6 +1177,8 @@ def select_winner_view(request, pk):
             }
         })
 
+    except SorteoError as e:
+        return JsonResponse({'success': False, 'error': str(e)})
     except Exception as e:
         return JsonResponse(safe_json_error(e, get_error_message('winner')))
 
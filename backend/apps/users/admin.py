@@ -3,10 +3,14 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.db.models import Count, Q
+from django.db.models import Count, Sum, Q, OuterRef, Subquery, Value, IntegerField, DecimalField
+from django.db.models.functions import Coalesce
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 from .models import User, Profile, Notification, EmailConfirmationToken, PasswordResetToken
+from .notification_service import notificar_usuarios
+from apps.admin_panel import metrics
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -200,11 +204,10 @@ class UserAdmin(BaseUserAdmin):
         """Icono de validación de cuenta"""
         return obj.cuenta_validada
 
-    @admin.display(description='🎫 Boletos', ordering='tickets_count')
+    @admin.display(description='🎫 Boletos', ordering='num_boletos')
     def tickets_count(self, obj):
-        """Cantidad de boletos comprados"""
-        from apps.raffles.models import Ticket
-        count = Ticket.objects.filter(usuario=obj, estado='pagado').count()
+        """Cantidad de boletos comprados (anotada en get_queryset)"""
+        count = obj.num_boletos
         if count > 0:
             return format_html(
                 '<span style="background-color: #17a2b8; color: white; padding: 3px 8px; '
@@ -213,11 +216,10 @@ class UserAdmin(BaseUserAdmin):
             )
         return format_html('<span style="color: #999;">0</span>')
 
-    @admin.display(description='🎯 Rifas Org.', ordering='rifas_count')
+    @admin.display(description='🎯 Rifas Org.', ordering='num_rifas')
     def rifas_organizadas_count(self, obj):
-        """Cantidad de rifas organizadas"""
-        from apps.raffles.models import Raffle
-        count = Raffle.objects.filter(organizador=obj).count()
+        """Cantidad de rifas organizadas (anotada en get_queryset)"""
+        count = obj.num_rifas
         if count > 0:
             return format_html(
                 '<span style="background-color: #28a745; color: white; padding: 3px 8px; '
@@ -226,20 +228,14 @@ class UserAdmin(BaseUserAdmin):
             )
         return format_html('<span style="color: #999;">-</span>')
 
-    @admin.display(description='💰 Total Gastado')
+    @admin.display(description='💰 Total Gastado', ordering='total_gastado')
     def total_gastado_display(self, obj):
-        """Total gastado en boletos"""
-        from apps.payments.models import Payment
-        from django.db.models import Sum
-        total = Payment.objects.filter(
-            usuario=obj,
-            estado='completado'
-        ).aggregate(total=Sum('monto'))['total'] or 0
-
+        """Total gastado en boletos (anotado en get_queryset)"""
+        total = obj.total_gastado
         if total > 0:
             return format_html(
-                '<span style="color: #28a745; font-weight: 600;">${:,.0f}</span>',
-                total
+                '<span style="color: #28a745; font-weight: 600;">${}</span>',
+                f'{total:,.0f}'
             )
         return format_html('<span style="color: #999;">$0</span>')
 
@@ -460,20 +456,58 @@ class UserAdmin(BaseUserAdmin):
 
     # Optimización de queries
     def get_queryset(self, request):
-        """Optimiza las consultas con prefetch"""
+        """
+        Anota los totales de las columnas del listado: una sola consulta por
+        página en lugar de tres por usuario.
+
+        Cada total es una subconsulta correlacionada; con Count/Sum sobre
+        los JOIN de boletos, rifas y pagos a la vez las filas se
+        multiplicarían entre sí y los totales saldrían inflados.
+        """
+        from apps.payments.models import Payment
+        from apps.raffles.models import Raffle, Ticket
+
+        def total(queryset, campo_usuario, agregado, output_field):
+            subconsulta = queryset.order_by().values(campo_usuario).annotate(total=agregado).values('total')
+            return Coalesce(Subquery(subconsulta, output_field=output_field), Value(0), output_field=output_field)
+
         qs = super().get_queryset(request)
-        return qs.select_related('profile').prefetch_related(
-            'rifas_organizadas',
-            'boletos_comprados',
-            'notificaciones'
+        return qs.select_related('profile').annotate(
+            num_boletos=total(
+                Ticket.objects.filter(usuario=OuterRef('pk'), estado='pagado'), 'usuario',
+                Count('id'), IntegerField(),
+            ),
+            num_rifas=total(
+                Raffle.objects.filter(organizador=OuterRef('pk')), 'organizador',
+                Count('id'), IntegerField(),
+            ),
+            total_gastado=total(
+                Payment.objects.filter(usuario=OuterRef('pk'), estado='completado'), 'usuario',
+                Sum('monto'), DecimalField(max_digits=12, decimal_places=2),
+            ),
         )
 
     # Acciones masivas personalizadas
 
+    def _actualizar(self, queryset, **cambios):
+        """
+        update() masivo que registra el cambio en las métricas materializadas
+        (update() no emite post_save). Retorna la cantidad de filas actualizadas.
+        """
+        with transaction.atomic():
+            filas = list(
+                User.objects.select_for_update()
+                .filter(pk__in=queryset.values('pk'))
+                .values('pk', *metrics.CAMPOS_RASTREADOS[User])
+            )
+            updated = User.objects.filter(pk__in=[fila['pk'] for fila in filas]).update(**cambios)
+            metrics.registrar_usuarios(filas, cambios)
+        return updated
+
     @admin.action(description='✅ Activar usuarios seleccionados')
     def activate_users(self, request, queryset):
         """Activa usuarios masivamente"""
-        updated = queryset.update(is_active=True)
+        updated = self._actualizar(queryset, is_active=True)
         self.message_user(
             request,
             f'{updated} usuario(s) activado(s) exitosamente.',
@@ -483,7 +517,7 @@ class UserAdmin(BaseUserAdmin):
     @admin.action(description='🚫 Desactivar usuarios seleccionados')
     def deactivate_users(self, request, queryset):
         """Desactiva usuarios masivamente"""
-        updated = queryset.update(is_active=False)
+        updated = self._actualizar(queryset, is_active=False)
         self.message_user(
             request,
             f'{updated} usuario(s) desactivado(s) exitosamente.',
@@ -493,7 +527,7 @@ class UserAdmin(BaseUserAdmin):
     @admin.action(description='🔓 Validar cuentas seleccionadas')
     def validate_accounts(self, request, queryset):
         """Valida cuentas masivamente"""
-        updated = queryset.update(cuenta_validada=True)
+        updated = self._actualizar(queryset, cuenta_validada=True)
         self.message_user(
             request,
             f'{updated} cuenta(s) validada(s) exitosamente.',
@@ -503,7 +537,7 @@ class UserAdmin(BaseUserAdmin):
     @admin.action(description='⬆️ Promover a Organizador')
     def promote_to_organizer(self, request, queryset):
         """Promueve usuarios a organizador"""
-        updated = queryset.filter(rol='participante').update(rol='organizador')
+        updated = self._actualizar(queryset.filter(rol='participante'), rol='organizador')
         self.message_user(
             request,
             f'{updated} usuario(s) promovido(s) a Organizador.',
@@ -513,16 +547,15 @@ class UserAdmin(BaseUserAdmin):
     @admin.action(description='📧 Enviar notificación')
     def send_notification(self, request, queryset):
         """Envía notificación a usuarios seleccionados"""
-        for user in queryset:
-            Notification.objects.create(
-                usuario=user,
-                tipo='sistema',
-                titulo='Notificación del Sistema',
-                mensaje='Este es un mensaje enviado desde el panel administrativo.',
-            )
+        enviadas = notificar_usuarios(
+            queryset.values_list('pk', flat=True),
+            tipo='sistema',
+            titulo='Notificación del Sistema',
+            mensaje='Este es un mensaje enviado desde el panel administrativo.',
+        )
         self.message_user(
             request,
-            f'Notificación enviada a {queryset.count()} usuario(s).',
+            f'Notificación enviada a {enviadas} usuario(s).',
             level='success'
         )
 
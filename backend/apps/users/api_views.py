@@ -12,6 +12,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import logout
 from django.utils import timezone
 from django.db.models import Q
+from apps.core.pagination import NotificacionCursorPagination
 
 from .models import User, Profile, Notification, EmailConfirmationToken
 from .serializers import (
@@ -73,6 +74,9 @@ class UserViewSet(viewsets.ModelViewSet):
                 Q(nombre__icontains=search) | Q(email__icontains=search)
             )
         
+        # UserSerializer anida el perfil; UserListSerializer no
+        if self.action != 'list':
+            queryset = queryset.select_related('profile')
         return queryset
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
@@ -145,6 +149,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Cursor por (fecha_creacion, id): páginas profundas sin OFFSET ni COUNT
+    pagination_class = NotificacionCursorPagination
     
     def get_serializer_class(self):
         """Retorna serializer apropiado"""
@@ -167,6 +173,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
         if tipo:
             queryset = queryset.filter(tipo=tipo)
         
+        # NotificationSerializer lee el usuario y la rifa relacionada
+        if self.action != 'list':
+            queryset = queryset.select_related('usuario', 'rifa_relacionada')
         return queryset
     
     @action(detail=True, methods=['post'])
@@ -220,7 +229,7 @@ class EmailConfirmationViewSet(viewsets.ReadOnlyModelViewSet):
     - POST /api/email-confirmations/resend/ - Reenviar email de confirmación
     """
     
-    queryset = EmailConfirmationToken.objects.all()
+    queryset = EmailConfirmationToken.objects.select_related('user')
     serializer_class = EmailConfirmationTokenSerializer
     permission_classes = [permissions.IsAdminUser]
     
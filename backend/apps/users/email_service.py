@@ -15,13 +15,24 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def url_base(request=None):
+    """Protocolo y dominio para los links de los emails (ej: https://rifatrust.com)"""
+    if request:
+        domain = request.get_host()
+        protocol = 'https' if request.is_secure() else 'http'
+    else:
+        domain = getattr(settings, 'SITE_DOMAIN', 'localhost:8000')
+        protocol = 'http' if settings.DEBUG else 'https'
+    return f"{protocol}://{domain}"
+
+
 class EmailConfirmationService:
     """
     Servicio para enviar emails de confirmación de cuenta
     """
 
     @staticmethod
-    def send_confirmation_email(user, token, request=None):
+    def send_confirmation_email(user, token, request=None, base_url=None):
         """
         Envía email de confirmación al usuario con link de activación
 
@@ -29,20 +40,16 @@ class EmailConfirmationService:
             user: Usuario que se registró
             token: Token de confirmación generado
             request: Request de Django (opcional, para obtener dominio)
+            base_url: Protocolo y dominio ya resueltos (ver url_base), para
+                enviar desde la cola de tareas sin request
 
         Returns:
             bool: True si el email se envió exitosamente
         """
         try:
             # Construir URL de confirmación
-            if request:
-                domain = request.get_host()
-                protocol = 'https' if request.is_secure() else 'http'
-            else:
-                domain = getattr(settings, 'SITE_DOMAIN', 'localhost:8000')
-                protocol = 'http' if settings.DEBUG else 'https'
-
-            confirmation_url = f"{protocol}://{domain}/confirm-email/{token.token}/"
+            base_url = base_url or url_base(request)
+            confirmation_url = f"{base_url}/confirm-email/{token.token}/"
 
             # Contexto para el template
             context = {
@@ -153,7 +160,7 @@ class PasswordResetService:
     """
 
     @staticmethod
-    def send_reset_email(user, token, request=None):
+    def send_reset_email(user, token, request=None, base_url=None):
         """
         Envía email de recuperación de contraseña con link de reset
 
@@ -161,22 +168,19 @@ class PasswordResetService:
             user: Usuario que solicitó resetear contraseña
             token: Token de recuperación generado
             request: Request de Django (opcional, para obtener dominio)
+            base_url: Protocolo y dominio ya resueltos (ver url_base), para
+                enviar desde la cola de tareas sin request
 
         Returns:
             bool: True si el email se envió exitosamente
         """
         try:
             # Construir URL de reset
-            if request:
-                domain = request.get_host()
-                protocol = 'https' if request.is_secure() else 'http'
-            else:
-                domain = getattr(settings, 'SITE_DOMAIN', 'localhost:8000')
-                protocol = 'http' if settings.DEBUG else 'https'
+            base_url = base_url or url_base(request)
 
             # URL correcta según urls.py: /reset-password/<token>/
             token_str = token.token if hasattr(token, 'token') else str(token)
-            reset_url = f"{protocol}://{domain}/reset-password/{token_str}/"
+            reset_url = f"{base_url}/reset-password/{token_str}/"
 
             # Contexto para el template
             context = {
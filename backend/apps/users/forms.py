@@ -111,9 +111,12 @@ class RegisterForm(UserCreationForm):
         if User.objects.filter(email=email).exists():
             raise forms.ValidationError('Este correo ya está registrado')
 
-        # Verificar validez del email con API externa
+        # Verificar validez del email con API externa (resultado cacheado 7
+        # días). Si la API no responde se usa la validación básica y la
+        # consulta se repite después del registro en la cola de tareas
         try:
             verification_result = verify_email(email)
+            self.verificacion_email = verification_result
 
             # Verificar si el email es desechable
             if verification_result.get('is_disposable', False):
@@ -0,0 +1,74 @@
+"""
+Comando para calcular los índices ciegos (BlindIndexField) de filas existentes
+
+Recorre por lotes de id los modelos que tienen BlindIndexField y completa
+los hashes vacíos. Con --todos recalcula todos (p. ej. tras cambiar
+BLIND_INDEX_KEY).
+
+Uso:
+    python manage.py backfill_blind_indexes
+    python manage.py backfill_blind_indexes --modelo payments.Payment --lote 500
+    python manage.py backfill_blind_indexes --todos
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from apps.core.fields import BlindIndexField
+
+
+class Command(BaseCommand):
+    help = 'Calcula por lotes los índices ciegos de filas existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modelo', help='Limitar a un modelo (app_label.Modelo)')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote')
+        parser.add_argument('--todos', action='store_true', help='Recalcular también los hashes existentes')
+
+    def handle(self, *args, **options):
+        if options['modelo']:
+            try:
+                modelos = [apps.get_model(options['modelo'])]
+            except (LookupError, ValueError):
+                raise CommandError(f'Modelo no encontrado: {options["modelo"]}')
+        else:
+            modelos = apps.get_models()
+
+        for modelo in modelos:
+            campos = [f for f in modelo._meta.concrete_fields if isinstance(f, BlindIndexField)]
+            if campos:
+                self.rellenar(modelo, campos, options['lote'], options['todos'])
+
+    def rellenar(self, modelo, campos, tamano_lote, todos):
+        nombres = [campo.attname for campo in campos]
+        fuentes = [campo.source for campo in campos]
+
+        queryset = modelo._default_manager.only('pk', *nombres, *fuentes).order_by('pk')
+        if not todos:
+            pendientes = Q()
+            for nombre in nombres:
+                pendientes |= Q(**{f'{nombre}__isnull': True})
+            queryset = queryset.filter(pendientes)
+
+        self.stdout.write(f'🔎 {modelo._meta.label}: {", ".join(nombres)}')
+        total = 0
+        ultimo_pk = None
+        while True:
+            lote_qs = queryset if ultimo_pk is None else queryset.filter(pk__gt=ultimo_pk)
+            lote = list(lote_qs[:tamano_lote])
+            if not lote:
+                break
+
+            for objeto in lote:
+                for campo in campos:
+                    setattr(objeto, campo.attname, campo.calcular(objeto))
+
+            with transaction.atomic():
+                modelo._default_manager.bulk_update(lote, nombres)
+
+            total += len(lote)
+            ultimo_pk = lote[-1].pk
+            self.stdout.write(f'   … {total} fila(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'  ✅ {total} fila(s) actualizadas en {modelo._meta.label}'))
@@ -0,0 +1,43 @@
+"""
+Micro-benchmark del costo de desencriptar un valor por fila.
+
+Compara el camino anterior (derivar la clave y crear un Fernet en cada
+llamada) con decrypt_data, que reutiliza el cifrador cacheado del proceso.
+
+Uso: python manage.py benchmark_cifrado --filas 10000
+"""
+import time
+
+from cryptography.fernet import Fernet
+from django.core.management.base import BaseCommand
+
+from apps.core.encryption import encrypt_data, decrypt_data, get_encryption_key
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo por fila de desencriptar con y sin cifrador cacheado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=10000, help='Valores a desencriptar')
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        valores = [encrypt_data(f'+56 9 {i:08d}') for i in range(filas)]
+
+        def sin_cache(token):
+            return Fernet(get_encryption_key()).decrypt(token.encode()).decode()
+
+        self.stdout.write(self.style.SUCCESS(f'=== Desencriptando {filas} valores ===\n'))
+        antes = self.medir(sin_cache, valores)
+        despues = self.medir(decrypt_data, valores)
+
+        self.stdout.write(f'Fernet por llamada   {antes * 1e6 / filas:8.2f} µs/fila   ({antes:.3f} s)')
+        self.stdout.write(f'Cifrador cacheado    {despues * 1e6 / filas:8.2f} µs/fila   ({despues:.3f} s)')
+        if despues:
+            self.stdout.write(self.style.SUCCESS(f'\nRelación antes/después: {antes / despues:.2f}x'))
+
+    def medir(self, funcion, valores):
+        inicio = time.perf_counter()
+        for valor in valores:
+            funcion(valor)
+        return time.perf_counter() - inicio
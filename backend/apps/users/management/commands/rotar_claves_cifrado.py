@@ -0,0 +1,103 @@
+"""
+Comando para re-encriptar los campos encriptados con la clave actual
+
+Recorre por lotes de id los modelos con campos encriptados y re-encripta con
+la primera clave de settings.ENCRYPTION_KEYRING los valores cifrados con
+otra clave (MultiFernet.rotate). Los valores que ya usan la primera clave no
+se tocan: el comando se puede interrumpir y volver a ejecutar.
+
+Los valores que ninguna clave desencripta (texto plano antiguo o una clave
+ya retirada) se informan y se dejan tal cual.
+
+Uso:
+    python manage.py rotar_claves_cifrado
+    python manage.py rotar_claves_cifrado --modelo users.Profile --lote 500
+    python manage.py rotar_claves_cifrado --verificar
+
+Cuando --verificar informa 0 pendientes se puede retirar la clave anterior
+del keyring (o definir ENCRYPTION_LEGACY_SECRET_KEY=False).
+"""
+from cryptography.fernet import InvalidToken
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.core.encryption import recifrar
+from apps.core.fields import EncryptedFieldMixin, EncryptedValue
+
+
+class Command(BaseCommand):
+    help = 'Re-encripta por lotes los campos encriptados con la primera clave del keyring'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modelo', help='Limitar a un modelo (app_label.Modelo)')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote')
+        parser.add_argument('--verificar', action='store_true',
+                            help='Solo contar los valores pendientes, sin guardar')
+
+    def handle(self, *args, **options):
+        if options['modelo']:
+            try:
+                modelos = [apps.get_model(options['modelo'])]
+            except (LookupError, ValueError):
+                raise CommandError(f'Modelo no encontrado: {options["modelo"]}')
+        else:
+            modelos = apps.get_models()
+
+        pendientes = ilegibles = 0
+        for modelo in modelos:
+            campos = [f for f in modelo._meta.concrete_fields if isinstance(f, EncryptedFieldMixin)]
+            if campos:
+                rotados, sin_clave = self.rotar(modelo, campos, options['lote'], options['verificar'])
+                pendientes += rotados
+                ilegibles += sin_clave
+
+        if ilegibles:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {ilegibles} valor(es) que ninguna clave desencripta (se dejaron tal cual)'
+            ))
+        if options['verificar']:
+            estilo = self.style.SUCCESS if not pendientes else self.style.WARNING
+            self.stdout.write(estilo(f'{pendientes} valor(es) pendientes de re-encriptar'))
+
+    def rotar(self, modelo, campos, tamano_lote, verificar):
+        nombres = [campo.attname for campo in campos]
+        queryset = modelo._default_manager.values_list('pk', *nombres).order_by('pk')
+
+        self.stdout.write(f'🔎 {modelo._meta.label}: {", ".join(nombres)}')
+        rotados = ilegibles = 0
+        ultimo_pk = None
+        while True:
+            lote_qs = queryset if ultimo_pk is None else queryset.filter(pk__gt=ultimo_pk)
+            lote = list(lote_qs[:tamano_lote])
+            if not lote:
+                break
+
+            cambios = []
+            for pk, *valores in lote:
+                nuevos = dict(zip(nombres, valores))
+                cambio = False
+                for nombre, valor in nuevos.items():
+                    if not valor:
+                        continue
+                    try:
+                        nuevo = recifrar(valor)
+                    except InvalidToken:
+                        ilegibles += 1
+                        continue
+                    if nuevo is not None:
+                        nuevos[nombre] = EncryptedValue(nuevo)
+                        rotados += 1
+                        cambio = True
+                if cambio:
+                    cambios.append(modelo(pk=pk, **nuevos))
+
+            if cambios and not verificar:
+                with transaction.atomic():
+                    modelo._default_manager.bulk_update(cambios, nombres)
+
+            ultimo_pk = lote[-1][0]
+
+        accion = 'pendiente(s)' if verificar else 're-encriptado(s)'
+        self.stdout.write(self.style.SUCCESS(f'  ✅ {rotados} valor(es) {accion} en {modelo._meta.label}'))
+        return rotados, ilegibles
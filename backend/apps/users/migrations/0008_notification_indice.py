@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('raffles', '0014_indices_consultas'),
+        ('users', '0007_change_pais_default_to_empty'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['usuario', 'fecha_creacion'], name='notif_usuario_fecha_idx'),
+        ),
+    ]
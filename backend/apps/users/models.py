@@ -241,6 +241,12 @@ class Notification(models.Model):
         verbose_name_plural = 'Notificaciones'
         # Ordenamiento: más recientes primero (DESC por fecha_creacion)
         ordering = ['-fecha_creacion']
+        # Listado y conteo de no leídas del usuario (se consultan en cada página).
+        # 'leida' no va en el índice: Django compila leida=False como
+        # NOT leida, que no se puede buscar por índice
+        indexes = [
+            models.Index(fields=['usuario', 'fecha_creacion'], name='notif_usuario_fecha_idx'),
+        ]
 
     def __str__(self):
         """
@@ -0,0 +1,105 @@
+"""
+Envío masivo de notificaciones.
+
+En lugar de un Notification.objects.create por destinatario, se recorren
+solo los ids de los usuarios y se insertan en lotes con bulk_create
+(NOTIFICATION_BATCH_SIZE por INSERT). bulk_create no emite señales:
+Notification no tiene receptores.
+
+notificar_participantes() consulta los ids distintos de los compradores de
+una rifa (SELECT DISTINCT usuario_id, válido en SQLite, MySQL y PostgreSQL)
+y se ejecuta al confirmar la transacción. En rifas grandes (más de
+NOTIFICATION_ASYNC_THRESHOLD boletos vendidos) se envía a la cola de tareas
+(apps.admin_panel.task_queue) para no alargar el request del sorteo.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from apps.admin_panel.task_queue import encolar
+from .models import Notification
+
+
+def _tamano_lote():
+    return getattr(settings, 'NOTIFICATION_BATCH_SIZE', 1000)
+
+def notificar_usuarios(usuario_ids, tipo, titulo, mensaje, enlace='', rifa=None):
+    """
+    Crea la misma notificación para muchos usuarios con bulk_create.
+
+    Args:
+        usuario_ids (iterable): IDs de los destinatarios (lista, queryset
+            values_list o generador; se consume una sola vez)
+        tipo (str): Uno de Notification.TIPO_CHOICES
+        titulo (str): Título de la notificación
+        mensaje (str): Texto de la notificación
+        enlace (str): URL opcional
+        rifa (Raffle | int): Rifa relacionada (instancia o id)
+
+    Returns:
+        int: Notificaciones creadas
+    """
+    rifa_id = getattr(rifa, 'pk', rifa)
+    tamano = _tamano_lote()
+    lote = []
+    total = 0
+    for usuario_id in usuario_ids:
+        lote.append(Notification(
+            usuario_id=usuario_id,
+            tipo=tipo,
+            titulo=titulo,
+            mensaje=mensaje,
+            enlace=enlace,
+            rifa_relacionada_id=rifa_id,
+        ))
+        if len(lote) >= tamano:
+            Notification.objects.bulk_create(lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        Notification.objects.bulk_create(lote)
+        total += len(lote)
+    return total
+
+def ids_participantes(rifa_id, estados=('pagado',), excluir=None):
+    """IDs distintos de los usuarios con boletos de la rifa en los estados dados"""
+    from apps.raffles.models import Ticket
+
+    ids = Ticket.objects.filter(rifa_id=rifa_id, estado__in=estados)
+    if excluir is not None:
+        ids = ids.exclude(usuario_id=excluir)
+    ids = ids.order_by('usuario_id').values_list('usuario_id', flat=True).distinct()
+    return ids.iterator(chunk_size=_tamano_lote())
+
+def notificar_participantes(rifa, tipo, titulo, mensaje, enlace='', estados=('pagado',),
+                            excluir=None, asincrono=None):
+    """
+    Notifica a cada participante de la rifa una sola vez, al confirmar la transacción.
+
+    Args:
+        rifa (Raffle): Rifa cuyos compradores se notifican
+        tipo, titulo, mensaje, enlace: Contenido de la notificación
+        estados (tuple): Estados de boleto que cuentan como participante
+        excluir (int): ID de usuario a omitir (ej: el ganador)
+        asincrono (bool): Forzar (True) o evitar (False) la cola de tareas.
+            None decide según NOTIFICATION_ASYNC_THRESHOLD
+    """
+    if asincrono is None:
+        umbral = getattr(settings, 'NOTIFICATION_ASYNC_THRESHOLD', 2000)
+        asincrono = rifa.boletos_vendidos > umbral
+    argumentos = (rifa.pk, tipo, titulo, mensaje, enlace, list(estados), excluir)
+
+    if asincrono:
+        # La tarea se inserta en la misma transacción que el sorteo
+        encolar(enviar_a_participantes, *argumentos)
+    else:
+        transaction.on_commit(lambda: enviar_a_participantes(*argumentos))
+
+def enviar_a_participantes(rifa_id, tipo, titulo, mensaje, enlace, estados, excluir=None):
+    """
+    Tarea: inserta las notificaciones de los participantes de una rifa.
+
+    Todo o nada, para que un reintento de la cola no duplique notificaciones.
+    """
+    with transaction.atomic():
+        ids = ids_participantes(rifa_id, estados, excluir)
+        return notificar_usuarios(ids, tipo, titulo, mensaje, enlace, rifa_id)
@@ -0,0 +1,72 @@
+"""
+Tareas en segundo plano de usuarios (ver apps.admin_panel.task_queue).
+
+Reciben ids y textos, no instancias: se guardan como JSON en la cola. Una
+tarea que lanza una excepción se reintenta; por eso los envíos de email
+fallidos lanzan EnvioEmailError en lugar de retornar False.
+"""
+import logging
+
+from .email_service import EmailConfirmationService, PasswordResetService
+from .models import User, EmailConfirmationToken, PasswordResetToken
+from .notification_service import notificar_usuarios
+
+logger = logging.getLogger(__name__)
+
+
+class EnvioEmailError(Exception):
+    """El servicio de email no pudo enviar el mensaje (se reintenta)"""
+
+
+def enviar_email_confirmacion(token_id, base_url):
+    token = EmailConfirmationToken.objects.select_related('user').filter(pk=token_id).first()
+    if token is None or not token.is_valid():
+        # Token reemplazado o ya usado: el email no tiene sentido
+        return
+    if not EmailConfirmationService.send_confirmation_email(token.user, token, base_url=base_url):
+        raise EnvioEmailError(f'Email de confirmación a {token.user.email}')
+
+def enviar_email_bienvenida(user_id):
+    user = User.objects.get(pk=user_id)
+    if not EmailConfirmationService.send_welcome_email(user):
+        raise EnvioEmailError(f'Email de bienvenida a {user.email}')
+
+def enviar_email_recuperacion(token_id, base_url):
+    token = PasswordResetToken.objects.select_related('user').filter(pk=token_id).first()
+    if token is None or not token.is_valid():
+        return
+    if not PasswordResetService.send_reset_email(token.user, token, base_url=base_url):
+        raise EnvioEmailError(f'Email de recuperación a {token.user.email}')
+
+def enviar_email_cambio_password(user_id):
+    user = User.objects.get(pk=user_id)
+    if not PasswordResetService.send_password_changed_notification(user):
+        raise EnvioEmailError(f'Aviso de cambio de contraseña a {user.email}')
+
+def verificar_email_usuario(user_id):
+    """
+    Consulta la API externa de verificación para un usuario ya registrado.
+
+    Se encola cuando la API no respondió durante el registro (el formulario
+    usó la validación básica). Si la API detecta un email desechable o
+    inválido se avisa a los administradores.
+    """
+    from apps.core.email_validator import verify_email
+
+    user = User.objects.get(pk=user_id)
+    resultado = verify_email(user.email)
+    if 'error' in resultado:
+        # Falla de la API (timeout, estado HTTP): reintentar más tarde
+        raise RuntimeError(f'Verificación de {user.email}: {resultado["error"]}')
+
+    if resultado.get('is_disposable') or not resultado.get('is_valid', False) \
+            or resultado.get('quality_score', 0.0) < 0.5:
+        logger.warning(f"Email sospechoso detectado después del registro: {user.email}")
+        notificar_usuarios(
+            User.objects.filter(rol='admin', is_active=True).values_list('pk', flat=True),
+            tipo='sistema',
+            titulo='Email sospechoso en un registro',
+            mensaje=f'La verificación de {user.email} ({user.nombre}) indica un correo desechable, '
+                    f'inválido o de baja calidad (score: {resultado.get("quality_score", 0.0)}).',
+            enlace='/admin-panel/users/'
+        )
@@ -1,3 +1,329 @@
-from django.test import TestCase
+import io
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from cryptography.fernet import Fernet
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.admin_panel.models import BackgroundTask
+from apps.core.encryption import encrypt_data, decrypt_data, get_cipher
+from apps.core.fields import EncryptedValue
+from apps.payments.models import Payment
+from apps.raffles.models import Raffle, Ticket
+from apps.core import email_validator
+from .forms import RegisterForm
+from .models import User, Notification
+from .notification_service import (
+    notificar_usuarios, notificar_participantes, ids_participantes, enviar_a_participantes,
+)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class UserAdminTotalesTests(TestCase):
+    """Columnas de totales del listado de usuarios del admin (anotadas)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email='admin@test.cl', nombre='Admin', password='x')
+        cls.organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.rifas = 0
+
+    def crear_participante(self, boletos=2):
+        """Participante con boletos pagados en dos rifas y un pago por rifa"""
+        usuario = User.objects.create_user(email=f'p{uuid.uuid4().hex[:8]}@test.cl', nombre='P', password=None)
+        for _ in range(2):
+            self.rifas += 1
+            rifa = Raffle.objects.create(
+                organizador=self.organizador, titulo=f'Rifa {self.rifas}', descripcion='Rifa',
+                premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+                fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+            )
+            Ticket.objects.bulk_create([
+                Ticket(rifa=rifa, usuario=usuario, numero_boleto=n + 1, codigo_qr=str(uuid.uuid4()), estado='pagado')
+                for n in range(boletos)
+            ])
+            Payment.objects.create(usuario=usuario, monto=1000 * boletos, metodo_pago='tarjeta',
+                                   estado='completado', transaction_id=f'TX-{uuid.uuid4()}')
+        return usuario
+
+    def consultas_listado(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get('/django-admin/users/user/')
+        self.assertEqual(respuesta.status_code, 200)
+        return len(consultas)
+
+    def test_totales_anotados(self):
+        usuario = self.crear_participante(boletos=3)
+        request = RequestFactory().get('/django-admin/users/user/')
+        request.user = self.admin
+        fila = site._registry[User].get_queryset(request).get(pk=usuario.pk)
+        self.assertEqual(fila.num_boletos, 6)
+        self.assertEqual(fila.total_gastado, Decimal('6000'))
+        self.assertEqual(site._registry[User].get_queryset(request).get(pk=self.organizador.pk).num_rifas, 2)
+
+    def test_consultas_constantes_por_pagina(self):
+        self.crear_participante()
+        pocas = self.consultas_listado()
+        for _ in range(5):
+            self.crear_participante()
+        self.assertEqual(self.consultas_listado(), pocas)
+
+
+class RotacionClavesTests(TestCase):
+    """Keyring de encriptación: la primera clave cifra, todas desencriptan"""
+
+    CLAVE_NUEVA = Fernet.generate_key().decode()
+    CLAVE_ANTERIOR = Fernet.generate_key().decode()
+
+    def test_sin_keyring_usa_clave_de_secret_key(self):
+        with override_settings(ENCRYPTION_KEYRING=[]):
+            cifrado = encrypt_data('+56911112222')
+            self.assertIsInstance(get_cipher(), Fernet)
+        self.assertNotEqual(cifrado, '+56911112222')
+        self.assertEqual(decrypt_data(cifrado), '+56911112222')
+
+    def test_desencripta_con_clave_rotada(self):
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_ANTERIOR]):
+            cifrado_anterior = encrypt_data('dato antiguo')
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_NUEVA, self.CLAVE_ANTERIOR]):
+            self.assertEqual(decrypt_data(cifrado_anterior), 'dato antiguo')
+            cifrado_nuevo = encrypt_data('dato nuevo')
+        # Lo nuevo queda con la primera clave del keyring
+        self.assertEqual(Fernet(self.CLAVE_NUEVA.encode()).decrypt(cifrado_nuevo.encode()), b'dato nuevo')
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_ANTERIOR]):
+            # Sin la clave nueva el texto no se puede desencriptar (queda tal cual)
+            self.assertEqual(decrypt_data(cifrado_nuevo), cifrado_nuevo)
+
+    def test_datos_legados_con_secret_key_se_siguen_leyendo(self):
+        with override_settings(ENCRYPTION_KEYRING=[]):
+            legado = encrypt_data('dato legado')
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_NUEVA]):
+            self.assertEqual(decrypt_data(legado), 'dato legado')
+
+    def test_campo_se_recifra_con_la_clave_nueva_al_guardar(self):
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_ANTERIOR]):
+            usuario = User.objects.create_user(email='rotar@test.cl', nombre='Rotar', password=None,
+                                               telefono='+56933334444')
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_NUEVA, self.CLAVE_ANTERIOR]):
+            usuario = User.objects.get(pk=usuario.pk)
+            self.assertEqual(usuario.telefono, '+56933334444')
+            usuario.save(update_fields=['telefono'])
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_NUEVA]):
+            self.assertEqual(User.objects.get(pk=usuario.pk).telefono, '+56933334444')
+
+    def rotar(self, *args):
+        salida = io.StringIO()
+        call_command('rotar_claves_cifrado', *args, modelo='users.User', lote=2, stdout=salida)
+        return salida.getvalue()
+
+    def test_rotar_y_retirar_la_clave_de_secret_key(self):
+        with override_settings(ENCRYPTION_KEYRING=[]):
+            for n in range(3):
+                User.objects.create_user(email=f'legado{n}@test.cl', nombre='Legado', password=None,
+                                         telefono=f'+5699999000{n}')
+
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_NUEVA]):
+            self.assertIn('3 valor(es) pendientes', self.rotar('--verificar'))
+            self.assertIn('3 valor(es) re-encriptado(s)', self.rotar())
+            self.assertIn('0 valor(es) pendientes', self.rotar('--verificar'))
+
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_NUEVA], ENCRYPTION_LEGACY_SECRET_KEY=False):
+            self.assertIsInstance(get_cipher(), Fernet)
+            telefonos = sorted(usuario.telefono for usuario in User.objects.filter(nombre='Legado'))
+            self.assertEqual(telefonos, ['+56999990000', '+56999990001', '+56999990002'])
+
+    def test_sin_clave_de_secret_key_no_lee_datos_legados(self):
+        with override_settings(ENCRYPTION_KEYRING=[]):
+            legado = encrypt_data('dato legado')
+            User.objects.create_user(email='legado@test.cl', nombre='Legado', password=None, telefono='+56911110000')
+        with override_settings(ENCRYPTION_KEYRING=[self.CLAVE_NUEVA], ENCRYPTION_LEGACY_SECRET_KEY=False):
+            self.assertEqual(decrypt_data(legado), legado)
+            self.assertIn('1 valor(es) que ninguna clave desencripta', self.rotar('--verificar'))
+        with override_settings(ENCRYPTION_KEYRING=[], ENCRYPTION_LEGACY_SECRET_KEY=False):
+            # Sin keyring la clave de SECRET_KEY es la única y se mantiene
+            self.assertEqual(decrypt_data(legado), 'dato legado')
+
+
+class DesencriptacionPerezosaTests(TestCase):
+    """Campos encriptados: se desencriptan al leer el atributo, no al cargar la fila"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(email='lazy@test.cl', nombre='Lazy', password=None,
+                                               telefono='+56955556666')
+
+    def texto_cifrado(self):
+        return User.objects.filter(pk=self.usuario.pk).values_list('telefono', flat=True).get()
+
+    def test_no_desencripta_al_cargar(self):
+        with mock.patch('apps.core.fields.decrypt_data', wraps=decrypt_data) as descifrar:
+            usuario = User.objects.get(pk=self.usuario.pk)
+            self.assertEqual(descifrar.call_count, 0)
+            self.assertEqual(usuario.telefono, '+56955556666')
+            self.assertEqual(usuario.telefono, '+56955556666')
+        # Una sola desencriptación: el resultado queda en la instancia
+        self.assertEqual(descifrar.call_count, 1)
+
+    def test_values_retorna_texto_cifrado(self):
+        valor = self.texto_cifrado()
+        self.assertIsInstance(valor, EncryptedValue)
+        self.assertNotEqual(valor, '+56955556666')
+        self.assertEqual(valor.descifrar(), '+56955556666')
+
+    def test_guardar_sin_leer_conserva_el_texto_cifrado(self):
+        cifrado = self.texto_cifrado()
+        usuario = User.objects.get(pk=self.usuario.pk)
+        with mock.patch('apps.core.fields.encrypt_data') as cifrar, \
+                mock.patch('apps.core.fields.decrypt_data') as descifrar:
+            usuario.nombre = 'Lazy 2'
+            usuario.save()
+        cifrar.assert_not_called()
+        descifrar.assert_not_called()
+        self.assertEqual(self.texto_cifrado(), cifrado)
+
+    def test_guardar_despues_de_leer_vuelve_a_cifrar(self):
+        cifrado = self.texto_cifrado()
+        usuario = User.objects.get(pk=self.usuario.pk)
+        self.assertEqual(usuario.telefono, '+56955556666')
+        usuario.save(update_fields=['telefono'])
+        # Fernet es aleatorio: otro texto cifrado con el mismo texto plano
+        self.assertNotEqual(self.texto_cifrado(), cifrado)
+        self.assertEqual(self.texto_cifrado().descifrar(), '+56955556666')
+
+    def test_asignar_texto_plano(self):
+        usuario = User.objects.get(pk=self.usuario.pk)
+        usuario.telefono = '+56977778888'
+        self.assertEqual(usuario.telefono, '+56977778888')
+        usuario.save(update_fields=['telefono'])
+        self.assertEqual(User.objects.get(pk=self.usuario.pk).telefono, '+56977778888')
+
+
+@override_settings(NOTIFICATION_BATCH_SIZE=2, NOTIFICATION_ASYNC_THRESHOLD=100, TASK_QUEUE_EAGER=False)
+class NotificacionesMasivasTests(TestCase):
+    """notification_service: INSERT por lote y una notificación por participante"""
+
+    @classmethod
+    def setUpTestData(cls):
+        organizador = User.objects.create_user(
+            email='org@test.cl', nombre='Organizador', password=None, rol='organizador'
+        )
+        cls.rifa = Raffle.objects.create(
+            organizador=organizador, titulo='Rifa', descripcion='Rifa de prueba',
+            premio_principal='Premio', precio_boleto=1000, total_boletos=100,
+            fecha_sorteo=timezone.now() + timedelta(days=1), estado='activa',
+        )
+        cls.participantes = [
+            User.objects.create_user(email=f'p{i}@test.cl', nombre=f'Participante {i}', password=None)
+            for i in range(5)
+        ]
+        # Varios boletos por participante; el último solo tiene uno reservado
+        boletos = []
+        for i, usuario in enumerate(cls.participantes):
+            for _ in range(3 if i < 4 else 1):
+                boletos.append(Ticket(
+                    rifa=cls.rifa, usuario=usuario, numero_boleto=len(boletos) + 1,
+                    codigo_qr=str(uuid.uuid4()), estado='pagado' if i < 4 else 'reservado',
+                ))
+        Ticket.objects.bulk_create(boletos)
+        cls.pagados = [usuario.pk for usuario in cls.participantes[:4]]
+
+    def notificados(self):
+        return sorted(Notification.objects.filter(rifa_relacionada=self.rifa).values_list('usuario_id', flat=True))
+
+    def test_un_insert_por_lote(self):
+        ids = [usuario.pk for usuario in self.participantes]
+
+        with CaptureQueriesContext(connection) as consultas:
+            creadas = notificar_usuarios(iter(ids), 'sistema', 'Aviso', 'Mensaje', rifa=self.rifa)
+
+        self.assertEqual(creadas, 5)
+        inserts = [c for c in consultas if c['sql'].startswith('INSERT INTO "users_notification"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(self.notificados(), sorted(ids))
+
+    def test_ids_participantes_distintos(self):
+        self.assertEqual(list(ids_participantes(self.rifa.pk)), self.pagados)
+        self.assertEqual(
+            list(ids_participantes(self.rifa.pk, estados=('pagado', 'reservado'), excluir=self.pagados[0])),
+            [usuario.pk for usuario in self.participantes[1:]],
+        )
+
+    def test_enviar_a_participantes_notifica_una_vez_a_cada_uno(self):
+        creadas = enviar_a_participantes(self.rifa.pk, 'sorteo', 'Sorteo', 'Mensaje', '', ['pagado'],
+                                         excluir=self.pagados[0])
+
+        self.assertEqual(creadas, 3)
+        self.assertEqual(self.notificados(), self.pagados[1:])
+
+    def test_notificar_participantes_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            notificar_participantes(self.rifa, 'sorteo', 'Sorteo', 'Mensaje')
+            self.assertEqual(self.notificados(), [])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.notificados(), self.pagados)
+        self.assertFalse(BackgroundTask.objects.exists())
+
+    def test_rifa_grande_se_envia_a_la_cola(self):
+        rifa = Raffle.objects.get(pk=self.rifa.pk)
+        rifa.boletos_vendidos = 101
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notificar_participantes(rifa, 'sorteo', 'Sorteo', 'Mensaje', excluir=self.pagados[0])
+
+        self.assertEqual(self.notificados(), [])
+        tarea = BackgroundTask.objects.get()
+        self.assertEqual(tarea.tarea, 'apps.users.notification_service.enviar_a_participantes')
+        self.assertEqual(
+            tarea.argumentos['args'],
+            [self.rifa.pk, 'sorteo', 'Sorteo', 'Mensaje', '', ['pagado'], self.pagados[0]],
+        )
+
+
+class RegistroEmailDesechableTests(TestCase):
+    """RegisterForm rechaza correos desechables (validación básica o API de verificación)"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def formulario(self, email):
+        return RegisterForm(data={
+            'email': email, 'nombre': 'Nuevo', 'fecha_nacimiento': '1990-01-01', 'telefono': '',
+            'rol': 'participante', 'password1': 'Clave-segura-123', 'password2': 'Clave-segura-123',
+            'aceptar_terminos': True,
+        })
+
+    def test_rechaza_dominio_desechable_conocido(self):
+        form = self.formulario('alguien@mailinator.com')
+        self.assertFalse(form.is_valid())
+        self.assertIn('desechables', str(form.errors['email']))
+
+    def test_rechaza_desechable_segun_la_api(self):
+        respuesta = mock.Mock(status_code=200)
+        respuesta.json.return_value = {
+            'is_valid_format': {'value': True}, 'is_mx_found': {'value': True},
+            'is_smtp_valid': {'value': True}, 'is_disposable_email': {'value': True},
+            'is_free_email': {'value': False}, 'quality_score': 0.9,
+        }
+        with mock.patch.object(email_validator.email_verifier, 'enabled', True), \
+                mock.patch.object(email_validator.email_verifier, 'api_key', 'clave'), \
+                mock.patch('apps.core.email_validator.requests.get', return_value=respuesta) as get:
+            form = self.formulario('alguien@desechable-nuevo.cl')
+            self.assertFalse(form.is_valid())
+
+        get.assert_called_once()
+        self.assertIn('desechables', str(form.errors['email']))
@@ -42,9 +42,19 @@ from .models import Profile, Notification, EmailConfirmationToken, PasswordReset
 # - Modelo EmailConfirmationToken (confirmación de email)
 # - Modelo PasswordResetToken (recuperación de contraseña)
 
-from .email_service import EmailConfirmationService, PasswordResetService
-# - Servicio para envío de emails de confirmación
-# - Servicio para envío de emails de recuperación de contraseña
+from .email_service import url_base
+# - Protocolo y dominio para los links de los emails
+
+from .tasks import (
+    enviar_email_confirmacion, enviar_email_bienvenida, enviar_email_recuperacion,
+    enviar_email_cambio_password, verificar_email_usuario,
+)
+from apps.admin_panel.task_queue import encolar
+# - Los emails y la verificación externa se envían desde la cola de tareas
+#   (python manage.py procesar_tareas), fuera del request
+
+from .notification_service import notificar_usuarios
+# - Notificaciones masivas con bulk_create
 
 from apps.core.email_validator import verify_email
 # - Verificación de validez de emails
@@ -124,25 +134,17 @@ def register_view(request):
                     # Crear token de confirmación (expira en 24h)
                     token = EmailConfirmationToken.create_token(user)
 
-                    # Enviar email con link de activación
-                    email_sent = EmailConfirmationService.send_confirmation_email(
-                        user=user,
-                        token=token,
-                        request=request
-                    )
+                    # Encolar email con link de activación (lo envía el worker)
+                    encolar(enviar_email_confirmacion, token.pk, url_base(request))
+                    # La API de verificación no respondió en el registro: reintentar desde el worker
+                    if 'error' in getattr(form, 'verificacion_email', {'error': None}):
+                        encolar(verificar_email_usuario, user.pk)
 
-                    if email_sent:
-                        messages.success(
-                            request,
-                            f'¡Cuenta creada exitosamente! Hemos enviado un email de confirmación a {user.email}. '
-                            f'Por favor revisa tu bandeja de entrada y haz clic en el enlace para activar tu cuenta.'
-                        )
-                    else:
-                        messages.warning(
-                            request,
-                            'Cuenta creada, pero hubo un problema al enviar el email de confirmación. '
-                            'Contacta al soporte para activar tu cuenta.'
-                        )
+                    messages.success(
+                        request,
+                        f'¡Cuenta creada exitosamente! Hemos enviado un email de confirmación a {user.email}. '
+                        f'Por favor revisa tu bandeja de entrada y haz clic en el enlace para activar tu cuenta.'
+                    )
 
                 except Exception as e:
                     # Log del error para debugging
@@ -166,15 +168,13 @@ def register_view(request):
             elif user.rol == 'sponsor':
                 # SPONSORS: Notificar que requiere aprobación del administrador
                 # Crear notificación para administradores
-                admin_users = User.objects.filter(rol='admin', is_active=True)
-                for admin in admin_users:
-                    Notification.objects.create(
-                        usuario=admin,
-                        tipo='sistema',
-                        titulo='Nueva solicitud de Sponsor',
-                        mensaje=f'{user.nombre} ({user.email}) ha solicitado una cuenta de Sponsor y requiere aprobación.',
-                        enlace=f'/admin-panel/users/'
-                    )
+                notificar_usuarios(
+                    User.objects.filter(rol='admin', is_active=True).values_list('pk', flat=True),
+                    tipo='sistema',
+                    titulo='Nueva solicitud de Sponsor',
+                    mensaje=f'{user.nombre} ({user.email}) ha solicitado una cuenta de Sponsor y requiere aprobación.',
+                    enlace=f'/admin-panel/users/'
+                )
 
                 messages.info(
                     request,
@@ -617,14 +617,8 @@ def confirm_email_view(request, token):
         # Marcar token como usado
         token_obj.mark_as_used()
 
-        # Enviar email de bienvenida
-        try:
-            EmailConfirmationService.send_welcome_email(user)
-        except Exception as e:
-            # No fallar si no se puede enviar el email de bienvenida
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error al enviar email de bienvenida: {str(e)}")
+        # Encolar email de bienvenida
+        encolar(enviar_email_bienvenida, user.pk)
 
         # Mensaje de éxito
         messages.success(
@@ -680,24 +674,14 @@ def resend_confirmation_email_view(request):
             # Crear nuevo token
             token = EmailConfirmationToken.create_token(user)
 
-            # Enviar email
-            email_sent = EmailConfirmationService.send_confirmation_email(
-                user=user,
-                token=token,
-                request=request
-            )
+            # Encolar email
+            encolar(enviar_email_confirmacion, token.pk, url_base(request))
 
-            if email_sent:
-                messages.success(
-                    request,
-                    f'Email de confirmación reenviado a {email}. '
-                    f'Por favor revisa tu bandeja de entrada.'
-                )
-            else:
-                messages.error(
-                    request,
-                    'Hubo un problema al enviar el email. Por favor intenta nuevamente.'
-                )
+            messages.success(
+                request,
+                f'Email de confirmación reenviado a {email}. '
+                f'Por favor revisa tu bandeja de entrada.'
+            )
 
             return redirect('email_confirmation_sent')
 
@@ -747,12 +731,8 @@ def password_reset_request_view(request):
             ip_address = get_client_ip(request)
             token = PasswordResetToken.create_token(user, ip_address=ip_address)
 
-            # Enviar email
-            PasswordResetService.send_reset_email(
-                user=user,
-                token=token,
-                request=request
-            )
+            # Encolar email
+            encolar(enviar_email_recuperacion, token.pk, url_base(request))
 
             messages.success(
                 request,
@@ -830,8 +810,8 @@ def password_reset_confirm_view(request, token):
             # Marcar token como usado
             reset_token.mark_as_used()
 
-            # Enviar email de notificación
-            PasswordResetService.send_password_changed_notification(user)
+            # Encolar email de notificación
+            encolar(enviar_email_cambio_password, user.pk)
 
             messages.success(
                 request,
@@ -921,30 +901,17 @@ def request_password_reset(request):
         ip_address = get_client_ip(request)
         token = PasswordResetToken.create_token(user, ip_address=ip_address)
 
-        # Enviar email
-        email_sent = PasswordResetService.send_reset_email(
-            user=user,
-            token=token,
-            request=request
-        )
+        # Encolar email
+        encolar(enviar_email_recuperacion, token.pk, url_base(request))
 
-        if email_sent:
-            return Response(
-                {
-                    'success': True,
-                    'message': 'Si el email existe en nuestro sistema, recibirás instrucciones para recuperar tu contraseña.',
-                    'expires_in': '1 hora'
-                },
-                status=status.HTTP_200_OK
-            )
-        else:
-            return Response(
-                {
-                    'success': True,
-                    'message': 'Si el email existe en nuestro sistema, recibirás instrucciones para recuperar tu contraseña.'
-                },
-                status=status.HTTP_200_OK
-            )
+        return Response(
+            {
+                'success': True,
+                'message': 'Si el email existe en nuestro sistema, recibirás instrucciones para recuperar tu contraseña.',
+                'expires_in': '1 hora'
+            },
+            status=status.HTTP_200_OK
+        )
 
     except User.DoesNotExist:
         # Por seguridad, no revelar si el email existe o no
@@ -1070,8 +1037,8 @@ def confirm_password_reset(request, token):
         # Marcar token como usado
         reset_token.mark_as_used()
 
-        # Enviar notificación de cambio
-        PasswordResetService.send_password_changed_notification(user)
+        # Encolar notificación de cambio
+        encolar(enviar_email_cambio_password, user.pk)
 
         return Response(
             {
@@ -5,6 +5,7 @@ Django settings for RifaTrust.
 from pathlib import Path
 from decouple import config as env_config
 import os
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths
 BASE_DIR = Path(__file__).resolve().parent.parent  # backend/
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'axes.middleware.AxesMiddleware',  # Rate limiting - debe ir después de AuthenticationMiddleware
     'django.contrib.messages.middleware.MessageMiddleware',
+    'apps.admin_panel.audit.AuditLogMiddleware',  # Audit log: una escritura por request
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -113,6 +115,10 @@ else:
             },
         }
     }
+    # MySQL no soporta índices parciales: el de reservas de Ticket
+    # (boleto_reservado_idx) no se crea y la limpieza de reservas vencidas
+    # recorre la tabla por id. Es un comando periódico, no un request.
+    SILENCED_SYSTEM_CHECKS = ['models.W037']
 
 
 # Password validation
@@ -148,6 +154,21 @@ PASSWORD_HASHERS = [
 # IMPORTANTE: En producción, usar una clave diferente a SECRET_KEY
 ENCRYPTION_KEY = env_config('ENCRYPTION_KEY', default=SECRET_KEY)
 
+# Keyring opcional para rotar la clave de los campos encriptados
+# Lista separada por comas, la clave nueva primero: encripta la primera,
+# desencriptan todas (MultiFernet). La clave derivada de SECRET_KEY se
+# agrega al final para leer los datos existentes.
+encryption_keyring_str = env_config('ENCRYPTION_KEYRING', default='')
+ENCRYPTION_KEYRING = [k.strip() for k in encryption_keyring_str.split(',') if k.strip()]
+# False retira la clave derivada de SECRET_KEY del keyring (sin efecto si el
+# keyring está vacío). Antes: python manage.py rotar_claves_cifrado y que
+# rotar_claves_cifrado --verificar no informe filas pendientes
+ENCRYPTION_LEGACY_SECRET_KEY = env_config('ENCRYPTION_LEGACY_SECRET_KEY', default=True, cast=bool)
+
+# Clave HMAC de los índices ciegos (búsqueda exacta sobre campos encriptados)
+# Si cambia, ejecutar: python manage.py backfill_blind_indexes --todos
+BLIND_INDEX_KEY = env_config('BLIND_INDEX_KEY', default=SECRET_KEY)
+
 # Email Verification API
 # Obtén tu API key gratuita en: https://www.abstractapi.com/api/email-verification-validation-api
 # Plan gratuito: 100 verificaciones/mes
@@ -258,6 +279,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # orjson si está instalado (pip install ".[rapido]"); si no, json de DRF
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -319,6 +350,117 @@ CORS_ALLOW_HEADERS = [
 STRIPE_PUBLIC_KEY = env_config('STRIPE_PUBLIC_KEY', default='')
 STRIPE_SECRET_KEY = env_config('STRIPE_SECRET_KEY', default='')
 
+# Compra de boletos
+# 'pesimista': bloquea la fila de la rifa (select_for_update) durante la compra
+# 'optimista': reserva cupo con un UPDATE condicional y asigna números sin bloquear
+#              la rifa (recomendado para picos de demanda en el lanzamiento)
+TICKET_PURCHASE_MODE = env_config('TICKET_PURCHASE_MODE', default='pesimista')
+# Minutos que un boleto 'reservado' espera el pago antes de expirar
+# (ver: python manage.py expirar_reservas)
+TICKET_RESERVATION_TTL_MINUTES = env_config('TICKET_RESERVATION_TTL_MINUTES', default=15, cast=int)
+
+# Panel de administración
+# Segundos que se cachean las estadísticas agregadas de los dashboards
+ADMIN_STATS_CACHE_TTL = env_config('ADMIN_STATS_CACHE_TTL', default=60, cast=int)
+
+# Procesos web (workers de gunicorn). gunicorn.conf.py, startup.sh, el
+# Dockerfile y docker-compose leen la misma variable, así la configuración
+# sabe si hay más de un proceso atendiendo requests.
+WEB_CONCURRENCY = env_config('WEB_CONCURRENCY', default=1, cast=int)
+# Hilos por worker (gunicorn gthread, ver gunicorn.conf.py)
+WEB_THREADS = env_config('WEB_THREADS', default=32, cast=int)
+
+# Caché
+# CACHE_BACKEND:
+# - 'locmem': memoria de cada proceso (solo con WEB_CONCURRENCY=1: las
+#             invalidaciones de un worker no llegarían a los demás)
+# - 'file':   directorio en disco compartido por los workers de una máquina
+#             (default con varios workers)
+# - 'redis':  servidor Redis o compatible (Valkey, KeyDB...) en CACHE_LOCATION;
+#             usa el paquete redis (requirements.txt, o el extra [redis] de
+#             pyproject.toml). En local basta un redis-server/valkey
+#             en 127.0.0.1:6379. Necesario con varias máquinas
+CACHE_BACKEND = env_config('CACHE_BACKEND', default='file' if WEB_CONCURRENCY > 1 else 'locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'rifatrust'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(PROJECT_ROOT / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+if CACHE_BACKEND not in _CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"CACHE_BACKEND inválido: {CACHE_BACKEND!r} (locmem, file o redis)")
+if CACHE_BACKEND == 'locmem' and WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND='locmem' con WEB_CONCURRENCY={WEB_CONCURRENCY}: cada worker tendría su "
+        f"propia caché y las páginas invalidadas en uno se seguirían sirviendo en los otros. "
+        f"Usar CACHE_BACKEND=file o redis"
+    )
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': env_config('CACHE_LOCATION', default=_CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': env_config('CACHE_KEY_PREFIX', default='rifatrust'),
+        'TIMEOUT': 300,
+    }
+}
+# Segundos que se cachean las páginas públicas para visitantes anónimos
+# (0 desactiva). Se invalidan antes al vender boletos o cambiar la rifa.
+PUBLIC_PAGE_CACHE_TTL = env_config('PUBLIC_PAGE_CACHE_TTL', default=60, cast=int)
+
+# Eventos en vivo de las rifas (SSE en /raffles/<id>/eventos/)
+# LIVE_EVENTS_BROKER:
+# - 'memoria':     pub/sub dentro del proceso (solo con WEB_CONCURRENCY=1)
+# - 'redis':       pub/sub de Redis en LIVE_EVENTS_REDIS_URL (varios workers)
+# - 'desactivado': sin streams; la página consulta el ganador cada pocos
+#                  segundos (default con varios workers)
+# - o la ruta a una clase broker propia (ver apps.raffles.live_events)
+LIVE_EVENTS_BROKER = env_config('LIVE_EVENTS_BROKER', default='memoria' if WEB_CONCURRENCY == 1 else 'desactivado')
+if LIVE_EVENTS_BROKER == 'memoria' and WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured(
+        f"LIVE_EVENTS_BROKER='memoria' con WEB_CONCURRENCY={WEB_CONCURRENCY}: los eventos publicados "
+        f"en un worker no llegan a los espectadores conectados a otro. Usar redis o desactivado"
+    )
+LIVE_EVENTS_REDIS_URL = env_config('LIVE_EVENTS_REDIS_URL', default='redis://127.0.0.1:6379/2')
+# Segundos que dura cada conexión SSE antes de que el navegador se reconecte
+LIVE_EVENTS_STREAM_SECONDS = env_config('LIVE_EVENTS_STREAM_SECONDS', default=60, cast=int)
+# Minutos antes de la hora del sorteo en que la página abre el stream (hasta
+# 3 minutos después del sorteo); fuera de esa ventana la vista responde 204
+LIVE_EVENTS_WINDOW_MINUTES = env_config('LIVE_EVENTS_WINDOW_MINUTES', default=10, cast=int)
+# Streams abiertos a la vez por proceso. Cada uno ocupa un hilo del worker
+# (gunicorn gthread, WEB_THREADS hilos) y una conexión a LIVE_EVENTS_REDIS_URL,
+# pero no una conexión a la base de datos; 8 hilos quedan para el resto de
+# los requests. Capacidad total: WEB_CONCURRENCY x LIVE_EVENTS_MAX_STREAMS
+# espectadores (4 x 24 con docker-compose); los demás reintentan cada 15 s
+LIVE_EVENTS_MAX_STREAMS = env_config('LIVE_EVENTS_MAX_STREAMS', default=max(WEB_THREADS - 8, 1), cast=int)
+
+# Notificaciones masivas (ver apps.users.notification_service)
+# Notificaciones por INSERT (bulk_create)
+NOTIFICATION_BATCH_SIZE = env_config('NOTIFICATION_BATCH_SIZE', default=1000, cast=int)
+# Desde cuántos boletos vendidos la notificación a los participantes de una
+# rifa se envía a la cola de tareas, fuera del request
+NOTIFICATION_ASYNC_THRESHOLD = env_config('NOTIFICATION_ASYNC_THRESHOLD', default=2000, cast=int)
+
+# Cola de tareas en segundo plano (ver apps.admin_panel.task_queue)
+# Worker: python manage.py procesar_tareas --loop
+# TASK_QUEUE_EAGER=True ejecuta las tareas al confirmar la transacción, en el
+# mismo proceso (desarrollo sin worker)
+TASK_QUEUE_EAGER = env_config('TASK_QUEUE_EAGER', default=False, cast=bool)
+TASK_QUEUE_MAX_ATTEMPTS = env_config('TASK_QUEUE_MAX_ATTEMPTS', default=5, cast=int)
+# Espera antes del primer reintento; se duplica en cada intento hasta el tope
+TASK_QUEUE_RETRY_DELAY = env_config('TASK_QUEUE_RETRY_DELAY', default=30, cast=int)
+TASK_QUEUE_MAX_RETRY_DELAY = env_config('TASK_QUEUE_MAX_RETRY_DELAY', default=3600, cast=int)
+# El worker renueva el latido de la tarea en ejecución cada
+# TASK_QUEUE_HEARTBEAT segundos; sin latido en TASK_QUEUE_TIMEOUT segundos la
+# tarea se considera abandonada (el worker se detuvo) y cuenta como intento
+TASK_QUEUE_HEARTBEAT = env_config('TASK_QUEUE_HEARTBEAT', default=60, cast=int)
+TASK_QUEUE_TIMEOUT = env_config('TASK_QUEUE_TIMEOUT', default=600, cast=int)
+
+# Audit log (ver apps.admin_panel.audit)
+# AUDIT_LOG_SINK:
+# - 'db':   bulk_create al terminar cada request o tarea (default)
+# - 'cola': una tarea de la cola por request; la inserción la hace el worker
+# - o la ruta a una función propia que recibe la lista de entradas
+AUDIT_LOG_SINK = env_config('AUDIT_LOG_SINK', default='db')
+
 # Security Settings
 SESSION_COOKIE_HTTPONLY = True
 CSRF_COOKIE_HTTPONLY = True
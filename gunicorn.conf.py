@@ -24,8 +24,16 @@ bind = "0.0.0.0:8000"
 backlog = 2048
 
 # Worker processes
-workers = 2
-worker_class = 'sync'
+# WEB_CONCURRENCY también lo lee Django (config.settings) para elegir una
+# caché compartida entre los workers
+workers = int(os.environ.setdefault('WEB_CONCURRENCY', '2'))
+# gthread: cada request ocupa un hilo y no el proceso completo. Los streams
+# de eventos en vivo (SSE) quedan abiertos hasta un minuto; con workers
+# 'sync' dos espectadores bastaban para bloquear el sitio. Django limita los
+# streams por proceso a WEB_THREADS - 8 (LIVE_EVENTS_MAX_STREAMS). Los hilos
+# se crean a demanda y un stream en espera no ocupa la CPU
+worker_class = 'gthread'
+threads = int(os.environ.setdefault('WEB_THREADS', '32'))
 worker_connections = 1000
 timeout = 600
 keepalive = 2
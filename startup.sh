@@ -21,11 +21,32 @@ echo "PYTHONPATH set to: $PYTHONPATH"
 export DJANGO_SETTINGS_MODULE="config.settings"
 echo "DJANGO_SETTINGS_MODULE: $DJANGO_SETTINGS_MODULE"
 
+# Workers de gunicorn (Django usa el valor para elegir la caché compartida)
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-2}"
+export WEB_THREADS="${WEB_THREADS:-32}"
+echo "WEB_CONCURRENCY: $WEB_CONCURRENCY, WEB_THREADS: $WEB_THREADS"
+
+# Worker de la cola de tareas (emails, notificaciones, reembolsos) en segundo
+# plano: se reinicia si termina. TASK_QUEUE_WORKER=0 si corre en otro servicio
+if [ "${TASK_QUEUE_WORKER:-1}" = "1" ]; then
+    echo "Starting task queue worker..."
+    (
+        cd /home/site/wwwroot || exit 1
+        while true; do
+            python manage.py procesar_tareas --loop --purgar-dias 7
+            echo "Task queue worker exited with status $?, restarting in 5s..."
+            sleep 5
+        done
+    ) &
+fi
+
 # Start gunicorn
 echo "Starting gunicorn..."
 exec gunicorn --bind=0.0.0.0:${PORT:-8000} \
     --timeout 600 \
-    --workers 2 \
+    --workers "$WEB_CONCURRENCY" \
+    --worker-class gthread \
+    --threads "$WEB_THREADS" \
     --access-logfile - \
     --error-logfile - \
     --log-level debug \